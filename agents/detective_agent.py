@@ -2,8 +2,11 @@
 from google import adk
 from google.adk.agents import Agent
 from google.adk.models import Gemini
-from agents.tools.bigquery_tools import user_history_tool, beneficiary_tool
-from agents.tools.session_tools import session_context_tool
+from agents.tools.async_tools import (
+    user_history_async_tool,
+    beneficiary_async_tool,
+    session_context_async_tool,
+)
 from config.gcp_credentials import setup_gcp_credentials
 
 DETECTIVE_INSTRUCTION = """
@@ -18,6 +21,7 @@ CRITICAL INSTRUCTIONS:
 3. NEVER return null for any field that has data available in the prompt
 4. Use the exact values provided in the "Fallback Customer Profile", "Fallback Beneficiary Data", and "Fallback Session Context" sections
 5. Analyze the data to calculate risk scores and make recommendations
+6. When you need tools, request get_user_history, get_beneficiary_risk and get_session_context together in ONE turn - they run in parallel
 
 Output format - YOU MUST return ONLY valid JSON in exactly this format:
 ```json
@@ -68,6 +72,15 @@ Risk Assessment Guidelines:
 - High velocity (> 3 transfers in 1 hour) = HIGH risk
 - New account (< 24 hours) = MEDIUM-HIGH risk
 - Rooted/jailbroken device = MEDIUM risk
+- Alert "prescreen": known_bad_account / known_bad_device true = probably already flagged (Bloom filter, rare false positives);
+  HIGH risk when confirmed by linked_to_flagged_device, a high beneficiary risk_score or a flagged "network"
+- Beneficiary "fan_in": distinct_senders_1h >= alert_threshold (investigation_type "mule_fan_in") = HIGH risk
+  (many unrelated senders paying one account is the mule pattern)
+- Beneficiary "network": flagged or hops_to_flagged <= 2 = HIGH risk (mule network); large cluster with several cluster_flagged nodes raises risk
+- Deviations from the user's own baseline (session "baseline_deviations", profile "transfer_baseline"):
+  |z| >= 3 on amount, hour, typing cadence or duration is unusual for this user = raises risk; null means no baseline yet
+- "Deterministic pre-score" in the prompt = these guidelines applied mechanically to the context; start from its
+  risk_score and security_flags and adjust only for evidence the rules do not capture
 
 IMPORTANT: Return ONLY the JSON object, no other text before or after.
 
@@ -156,7 +169,9 @@ def get_detective_agent():
             model=Gemini(model="gemini-2.0-flash-001"),  # Standard Gemini Flash model
             description="The Detective Agent investigates user context, beneficiary risk, and session behavior.",
             instruction=DETECTIVE_INSTRUCTION,
-            tools=[user_history_tool, beneficiary_tool, session_context_tool]
+            # Async tools: lookups run on a bounded thread pool, so parallel
+            # function calls (and concurrent investigations) overlap
+            tools=[user_history_async_tool, beneficiary_async_tool, session_context_async_tool]
         )
     return _detective_agent_instance
 
@@ -1,7 +1,9 @@
 """The Router Agent - Orchestrates the agent swarm."""
 import asyncio
 import json
+import os
 import re
+import threading
 from typing import Dict, Any, Optional
 from pydantic import ValidationError
 
@@ -15,7 +17,13 @@ from agents.detective_agent import get_detective_agent
 from agents.judge_agent import get_judge_agent
 from agents.enforcer_agent import enforcer_agent
 from agents.liaison_agent import liaison_agent
-from config.models import InvestigationReport, JudgmentDecision
+from agents.tools.async_tools import gather_context_async
+from agents.tools.violation_store import get_violation_store
+from agents.tools.graph_index import get_graph_index
+from agents.tools.known_bad_filter import flag_known_bad, prescreen
+from agents.tools.risk_prescorer import PreScore, build_investigation, prescore
+from config.metrics import get_metrics_registry
+from config.models import Decision, InvestigationReport, JudgmentDecision
 from config.gcp_credentials import setup_gcp_credentials
 from config.validation import (
     validate_investigation_completeness,
@@ -99,6 +107,52 @@ def _validate_judgment(data: Dict[str, Any]) -> Optional[JudgmentDecision]:
         print(f"Judgment validation error: {e}")
         return None
 
+def _prescore_mode() -> str:
+    """DETECTIVE_PRESCORE: "shadow" (default) only adds the pre-score to the
+    prompt, "skip" decides clear-cut LOW/CRITICAL cases without the LLM,
+    "off" disables it."""
+    return os.getenv("DETECTIVE_PRESCORE", "shadow").lower()
+
+
+def _prescore(threat_data: dict, context: dict) -> Optional[PreScore]:
+    """Deterministic pre-score of the pre-fetched context (None if disabled or it fails)."""
+    if _prescore_mode() == "off":
+        return None
+    try:
+        score = prescore(context, threat_data)
+    except Exception as e:
+        print(f"[Detective] Pre-score failed, leaving it to the LLM: {e}")
+        return None
+    get_metrics_registry().inc("prescore.verdicts", verdict=score.verdict or "GRAY")
+    return score
+
+
+def _log_replay(threat_data: dict, context: Optional[dict], score: Optional[PreScore],
+                report: InvestigationReport, source: str) -> None:
+    """Append the Detective inputs and outcome to PRESCORE_REPLAY_LOG (JSONL), if set.
+
+    scripts/benchmark_prescorer.py --input replays these records.
+    """
+    path = os.getenv("PRESCORE_REPLAY_LOG")
+    if not path or context is None:
+        return
+    record = {
+        "threat": threat_data,
+        "context": context,
+        "prescore": score.as_dict() if score is not None else None,
+        "investigation": {"risk_score": report.risk_score, "risk_level": report.risk_level.value,
+                          "security_flags": report.security_flags, "source": source},
+    }
+    try:
+        with _replay_log_lock, open(path, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    except OSError as e:
+        print(f"[Detective] Could not write {path}: {e}")
+
+
+_replay_log_lock = threading.Lock()
+
+
 # Sequential workflow for threat processing
 class ThreatProcessingWorkflow:
     """
@@ -135,6 +189,64 @@ class ThreatProcessingWorkflow:
             self._judge = get_judge_agent()
         return self._judge
 
+    async def _investigate_with_llm(self, user_id: str, session_id: str, transaction_id: str,
+                                    prompt: str, errors: list) -> InvestigationReport:
+        """Run the Detective agent on `prompt` and return its validated report.
+
+        Raises:
+            ValueError: If the Detective returns no JSON or invalid JSON
+        """
+        await self.session_service.create_session(
+            app_name=self.app_name,
+            user_id=user_id,
+            session_id=session_id
+        )
+        runner_det = Runner(
+            agent=self.detective,
+            session_service=self.session_service,
+            app_name=self.app_name
+        )
+
+        msg_det = types.Content(
+            role="user",
+            parts=[types.Part(text=prompt)]
+        )
+
+        events_det = []
+        async for event in runner_det.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=msg_det
+        ):
+            events_det.append(event)
+
+        investigation_text = _get_text(events_det)
+        print(f"[Detective] Raw response length: {len(investigation_text)} chars")
+
+        # Parse and validate JSON output
+        investigation_json = _extract_json(investigation_text)
+        if not investigation_json:
+            error_msg = f"Detective failed to return valid JSON for {transaction_id}"
+            errors.append(error_msg)
+            raise ValueError(error_msg)
+
+        investigation_report = _validate_investigation(investigation_json)
+        if not investigation_report:
+            error_msg = f"Detective output failed validation for {transaction_id}"
+            errors.append(error_msg)
+            raise ValueError(error_msg)
+
+        # Validate that all required tools were called
+        try:
+            validate_investigation_completeness(investigation_report)
+        except ToolCallError as e:
+            error_msg = f"Detective tool validation failed: {str(e)}"
+            errors.append(error_msg)
+            print(f"[Detective] WARNING: {error_msg}")
+            # Don't raise - continue with partial data but log the issue
+
+        return investigation_report
+
     async def process_threat_async(self, threat_data: dict) -> dict:
         """Process a threat through the full agent pipeline with structured communication.
 
@@ -164,54 +276,54 @@ class ThreatProcessingWorkflow:
         session_id_det = f"det_{transaction_id}"
 
         try:
-            await self.session_service.create_session(
-                app_name=self.app_name,
-                user_id=user_id,
-                session_id=session_id_det
-            )
-            runner_det = Runner(
-                agent=self.detective,
-                session_service=self.session_service,
-                app_name=self.app_name
-            )
-
-            msg_det = types.Content(
-                role="user",
-                parts=[types.Part(text=f"Investigate this transaction:\n{json.dumps(threat_data, indent=2)}")]
-            )
-
-            events_det = []
-            async for event in runner_det.run_async(
-                user_id=user_id,
-                session_id=session_id_det,
-                new_message=msg_det
-            ):
-                events_det.append(event)
-
-            investigation_text = _get_text(events_det)
-            print(f"[Detective] Raw response length: {len(investigation_text)} chars")
-
-            # Parse and validate JSON output
-            investigation_json = _extract_json(investigation_text)
-            if not investigation_json:
-                error_msg = f"Detective failed to return valid JSON for {transaction_id}"
-                errors.append(error_msg)
-                raise ValueError(error_msg)
-
-            investigation_report = _validate_investigation(investigation_json)
-            if not investigation_report:
-                error_msg = f"Detective output failed validation for {transaction_id}"
-                errors.append(error_msg)
-                raise ValueError(error_msg)
-
-            # Validate that all required tools were called
-            try:
-                validate_investigation_completeness(investigation_report)
-            except ToolCallError as e:
-                error_msg = f"Detective tool validation failed: {str(e)}"
-                errors.append(error_msg)
-                print(f"[Detective] WARNING: {error_msg}")
-                # Don't raise - continue with partial data but log the issue
+            user_id_tx = threat_data.get('user_id')
+            account_id = threat_data.get('beneficiary_account') or threat_data.get('beneficiary_account_id')
+            device_fingerprint = threat_data.get('device_fingerprint')
+            # Known-bad Bloom prescreen (the stream trigger may already have run it)
+            if 'prescreen' not in threat_data:
+                threat_data = {**threat_data, 'prescreen': prescreen(account_id, device_fingerprint)}
+            if threat_data['prescreen'].get('hit'):
+                print(f"[Detective] Prescreen hit for {transaction_id}: {threat_data['prescreen']}")
+
+            # Pre-fetch all three lookups concurrently so the Detective does not
+            # have to wait on them one tool call at a time
+            prompt_det = f"Investigate this transaction:\n{json.dumps(threat_data, indent=2)}"
+            context = None
+            score = None
+            if user_id_tx and account_id and transaction_id:
+                context = await gather_context_async(
+                    user_id_tx, account_id, transaction_id, amount=threat_data.get('amount'),
+                    event_time=threat_data.get('event_time')
+                )
+                prompt_det += (
+                    "\n\nPre-fetched context (same data the tools return; call a tool "
+                    f"only if a section is missing or marked as an error):\n{json.dumps(context, indent=2, default=str)}"
+                )
+                score = _prescore(threat_data, context)
+                if score is not None:
+                    prompt_det += (
+                        "\n\nDeterministic pre-score (your risk guidelines applied to the context above; "
+                        f"use it as the starting point):\n{json.dumps(score.as_dict())}"
+                    )
+
+            if score is not None and score.clear_cut and _prescore_mode() == "skip":
+                # Clear-cut LOW / CRITICAL: the rules decide, no LLM call
+                investigation_report = build_investigation(transaction_id, context, score)
+                source = "prescore"
+                get_metrics_registry().inc("prescore.llm_skipped", verdict=score.verdict)
+                print(f"[Detective] Pre-score {score.verdict} ({score.risk_score}/100), skipping LLM investigation")
+            else:
+                investigation_report = await self._investigate_with_llm(
+                    user_id, session_id_det, transaction_id, prompt_det, errors
+                )
+                source = "llm"
+            _log_replay(threat_data, context, score, investigation_report, source)
+
+            # previous_violations comes from the violation store, not the model
+            profile = investigation_report.user_profile
+            recorded = get_violation_store().get(profile.user_id)
+            if recorded > profile.previous_violations:
+                profile.previous_violations = recorded
 
             print(f"[Detective] Investigation complete - Risk: {investigation_report.risk_level.value}")
 
@@ -280,6 +392,17 @@ class ThreatProcessingWorkflow:
 
             print(f"[Judge] Decision: {judgment_decision.decision.value} (Policy #{judgment_decision.policy_applied})")
 
+            if judgment_decision.decision == Decision.BLOCK:
+                offender = investigation_report.user_profile.user_id
+                count = get_violation_store().record(offender, transaction_id)
+                print(f"[Judge] Recorded violation #{count} for {offender}")
+                # Flag the beneficiary (not the sender, who is often the victim)
+                # so accounts sharing its network are scored as close to it.
+                # Process-local until the graph is rebuilt from quarantined_transactions
+                if account_id:
+                    get_graph_index().flag("account", account_id)
+                flag_known_bad(account_id, device_fingerprint)
+
         except Exception as e:
             error_msg = f"Judge agent error: {str(e)}"
             errors.append(error_msg)
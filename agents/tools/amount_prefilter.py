@@ -0,0 +1,143 @@
+"""Per-user adaptive pre-filter for high-value transfer alerts.
+
+The Flink trigger (terraform/flink.tf) raises a high_value_transaction alert
+for every transfer above a flat $1000. For a customer who routinely moves
+$5000, most of those alerts are routine and cost a full agent
+investigation. This stage compares the alert amount with that user's own
+history before any agent runs:
+
+- the transfer-amount sketch in the baseline store (amount_percentile
+  among the user's transfers), once the user has `min_transfers` of them
+- the profile's avg_transfer_amount from the local feature store
+
+An alert is DROPped when the amount is inside the user's spend distribution
+(percentile <= drop_percentile) and, when the average is known, within
+avg_multiple x the average. It is DOWNGRADEd (investigated after live
+alerts; see PREFILTER_DEFER_* in scripts/run_adk_swarm.py) when it is near
+the tail of the distribution
+(percentile <= downgrade_percentile) or when only the average vouches for
+it. Everything else, including every non-amount alert type, users without
+history and prescreen hits, PASSes unchanged.
+
+Thresholds come from PREFILTER_DROP_PERCENTILE (default 0.90),
+PREFILTER_DOWNGRADE_PERCENTILE (0.97), PREFILTER_AVG_MULTIPLE (2.0) and
+PREFILTER_MIN_TRANSFERS (20). Each decision increments
+prefilter.decisions{action, reason}.
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+
+from config.metrics import get_metrics_registry
+from .baseline_store import get_baseline_store
+from .feature_store import get_feature_store
+
+PASS = "pass"
+DOWNGRADE = "downgrade"
+DROP = "drop"
+
+# Alert types whose only trigger is the amount
+AMOUNT_ALERT_TYPES = frozenset({"high_value_transaction"})
+
+DEFAULT_DROP_PERCENTILE = 0.90
+DEFAULT_DOWNGRADE_PERCENTILE = 0.97
+DEFAULT_AVG_MULTIPLE = 2.0
+DEFAULT_MIN_TRANSFERS = 20
+
+
+@dataclass(frozen=True)
+class PrefilterConfig:
+    """Thresholds for judging an amount against the user's norms.
+
+    Args:
+        drop_percentile: Drop at or below this percentile of the user's transfers
+        downgrade_percentile: Downgrade at or below this percentile
+        avg_multiple: Amounts up to this multiple of avg_transfer_amount are
+            within the user's average
+        min_transfers: Transfers needed before the user's distribution is trusted
+    """
+    drop_percentile: float = DEFAULT_DROP_PERCENTILE
+    downgrade_percentile: float = DEFAULT_DOWNGRADE_PERCENTILE
+    avg_multiple: float = DEFAULT_AVG_MULTIPLE
+    min_transfers: int = DEFAULT_MIN_TRANSFERS
+
+    @classmethod
+    def from_env(cls) -> "PrefilterConfig":
+        return cls(
+            drop_percentile=float(os.getenv("PREFILTER_DROP_PERCENTILE", DEFAULT_DROP_PERCENTILE)),
+            downgrade_percentile=float(os.getenv("PREFILTER_DOWNGRADE_PERCENTILE", DEFAULT_DOWNGRADE_PERCENTILE)),
+            avg_multiple=float(os.getenv("PREFILTER_AVG_MULTIPLE", DEFAULT_AVG_MULTIPLE)),
+            min_transfers=int(os.getenv("PREFILTER_MIN_TRANSFERS", DEFAULT_MIN_TRANSFERS)),
+        )
+
+
+@dataclass
+class PrefilterDecision:
+    """What to do with an alert, and the evidence behind it."""
+    action: str
+    reason: str
+    amount_percentile: Optional[float] = None
+    typical_amount_p90: Optional[float] = None
+    avg_transfer_amount: Optional[float] = None
+
+    def describe(self) -> str:
+        parts = [f"{self.action.upper()} ({self.reason})"]
+        if self.amount_percentile is not None:
+            parts.append(f"percentile {self.amount_percentile:.2f}, p90 {self.typical_amount_p90}")
+        if self.avg_transfer_amount:
+            parts.append(f"avg {self.avg_transfer_amount:,.2f}")
+        return ", ".join(parts)
+
+
+def assess(alert: Mapping[str, Any], baseline: Optional[Mapping[str, Any]],
+           profile: Optional[Mapping[str, Any]], config: PrefilterConfig) -> PrefilterDecision:
+    """Decide on one alert from already-fetched lookups (no I/O).
+
+    Args:
+        alert: FraudInvestigationAlert fields (with the optional prescreen result)
+        baseline: BaselineStore.transfer_baseline(user_id, amount) or None
+        profile: Feature-store profile (avg_transfer_amount) or None
+        config: Thresholds
+    """
+    if alert.get("investigation_type") not in AMOUNT_ALERT_TYPES:
+        return PrefilterDecision(PASS, "not_amount_alert")
+    if (alert.get("prescreen") or {}).get("hit"):
+        return PrefilterDecision(PASS, "prescreen_hit")
+    amount = alert.get("amount")
+    if amount is None:
+        return PrefilterDecision(PASS, "no_amount")
+
+    baseline = baseline or {}
+    percentile = baseline.get("amount_percentile")
+    if (baseline.get("transfers_observed") or 0) < config.min_transfers:
+        percentile = None
+    average = (profile or {}).get("avg_transfer_amount") or None
+    within_average = average is not None and amount <= average * config.avg_multiple
+    evidence = {
+        "amount_percentile": percentile,
+        "typical_amount_p90": baseline.get("typical_amount_p90") if percentile is not None else None,
+        "avg_transfer_amount": average,
+    }
+
+    if percentile is not None:
+        if percentile <= config.drop_percentile and (average is None or within_average):
+            return PrefilterDecision(DROP, "within_spend_distribution", **evidence)
+        if percentile <= config.downgrade_percentile:
+            return PrefilterDecision(DOWNGRADE, "near_distribution_tail", **evidence)
+        return PrefilterDecision(PASS, "unusual_amount", **evidence)
+    if within_average:
+        return PrefilterDecision(DOWNGRADE, "within_average_only", **evidence)
+    return PrefilterDecision(PASS, "no_baseline" if average is None else "above_average", **evidence)
+
+
+def prefilter_alert(alert: Mapping[str, Any], config: Optional[PrefilterConfig] = None) -> PrefilterDecision:
+    """Look up the user's norms and decide on one alert (counted in metrics)."""
+    config = config or PrefilterConfig.from_env()
+    baseline = profile = None
+    user_id = alert.get("user_id")
+    if user_id and alert.get("investigation_type") in AMOUNT_ALERT_TYPES:
+        baseline = get_baseline_store().transfer_baseline(user_id, alert.get("amount"))
+        profile = get_feature_store().get_profile(user_id)
+    decision = assess(alert, baseline, profile, config)
+    get_metrics_registry().inc("prefilter.decisions", action=decision.action, reason=decision.reason)
+    return decision
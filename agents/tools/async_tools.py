@@ -0,0 +1,141 @@
+"""Async versions of the Detective context tools.
+
+The tools in bigquery_tools.py and session_tools.py do blocking I/O (BigQuery,
+SQLite, mmap snapshots). Called directly from the asyncio loop that runs the
+ADK Runner, one slow lookup stalls every investigation in flight. These
+coroutines run the same lookups on a bounded thread pool instead, so:
+
+- tool calls from different investigations overlap, and
+- when the model emits several function calls in one turn, ADK gathers the
+  coroutines and the lookups run concurrently.
+
+The functions keep the names and docstrings of the sync tools, so the tool
+names the model sees (get_user_history, get_beneficiary_risk,
+get_session_context) do not change.
+
+Concurrent calls with the same arguments (e.g. many investigations of one
+mule account) are coalesced into one lookup by single_flight, here and in
+the sync tools.
+
+The pool size is set with DETECTIVE_TOOL_WORKERS (default 16).
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from google.adk.tools import FunctionTool
+
+from config.metrics import get_metrics_registry
+from . import bigquery_tools, session_tools
+from .single_flight import single_flight
+
+DEFAULT_TOOL_WORKERS = 16
+
+# Singleton executor
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Get the shared, bounded executor used for blocking tool lookups."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.getenv("DETECTIVE_TOOL_WORKERS", DEFAULT_TOOL_WORKERS))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detective-tool")
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args) -> Any:
+    """Run a blocking tool function on the tool executor without blocking the loop."""
+    metrics = get_metrics_registry()
+    tool = getattr(func, "__name__", "tool")
+    metrics.inc("detective_tools.calls", tool=tool)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_tool_executor(), functools.partial(func, *args))
+
+
+@single_flight("user_history.async")
+async def get_user_history(user_id: str, amount: Optional[float] = None) -> dict:
+    """
+    Query the configured storage backend for user's profile and risk segments.
+
+    Args:
+        user_id: The user identifier to look up
+        amount: Optional transfer amount under investigation, compared
+            against the user's transfer baseline
+
+    Returns:
+        dict with user's profile (age, tenure, normal usage),
+        previous_violations (BLOCK decisions so far) and transfer_baseline (typical amounts; amount_z / amount_percentile
+        when `amount` is given)
+    """
+    return await run_blocking(bigquery_tools.get_user_history, user_id, amount)
+
+
+@single_flight("beneficiary_risk.async")
+async def get_beneficiary_risk(account_id: str) -> dict:
+    """
+    Check if a beneficiary account is associated with known fraud in the graph.
+
+    Args:
+        account_id: The destination account to check
+
+    Returns:
+        dict with account age, risk score, linked fraud indicators,
+        network (hops to the nearest flagged account/device/user, size and
+        flagged nodes of its transfer network) and fan_in (distinct senders
+        and transfers received in the last 1h / 24h)
+    """
+    return await run_blocking(bigquery_tools.get_beneficiary_risk, account_id)
+
+
+@single_flight("session_context.async")
+async def get_session_context(transaction_id: str, event_time: Optional[int] = None) -> dict:
+    """
+    Retrieves mobile banking session context for a specific transaction.
+
+    Enriches the raw session with geolocation, velocity (sessions in the last
+    hour) and time-of-day risk signals, plus deviations from the user's
+    behavioral baseline.
+
+    Args:
+        transaction_id: The ID of the transaction to investigate.
+        event_time: The alert's event_time (epoch milliseconds), if known.
+
+    Returns:
+        dict containing session details and calculated risk signals.
+    """
+    return await run_blocking(session_tools.get_session_context, transaction_id, event_time)
+
+
+async def gather_context_async(user_id: str, account_id: str, transaction_id: str,
+                               amount: Optional[float] = None, event_time: Optional[int] = None) -> dict:
+    """Fetch user history, beneficiary risk and session context concurrently.
+
+    Args:
+        user_id: The user identifier
+        account_id: The beneficiary account
+        transaction_id: The transaction under investigation
+        amount: Optional transfer amount, compared against the user's baseline
+        event_time: Optional alert event_time, bounds the session search
+
+    Returns:
+        dict with "user_profile", "beneficiary", and "session" tool results
+    """
+    user_profile, beneficiary, session = await asyncio.gather(
+        get_user_history(user_id, amount),
+        get_beneficiary_risk(account_id),
+        get_session_context(transaction_id, event_time),
+    )
+    return {"user_profile": user_profile, "beneficiary": beneficiary, "session": session}
+
+
+# Export as ADK tools
+user_history_async_tool = FunctionTool(get_user_history)
+beneficiary_async_tool = FunctionTool(get_beneficiary_risk)
+session_context_async_tool = FunctionTool(get_session_context)
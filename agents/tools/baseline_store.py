@@ -0,0 +1,397 @@
+"""Per-user behavioral baselines with O(1) incremental updates.
+
+Each user owns a slot of fixed-size arrays summarising their normal behavior:
+
+- hour_hist: 24-bin histogram of session hour-of-day
+- cadence mean/variance: exponentially weighted (EWMA) typing cadence
+- duration sketch: log-bucket histogram of session duration (seconds)
+- amount sketch: log-bucket histogram of transfer amount
+
+An update touches one slot and a constant number of bins, so it is O(1)
+regardless of how much history a user has. Histograms are halved once they
+hold SKETCH_DECAY_TOTAL observations, which both bounds the uint16 counters
+and lets old behavior fade out.
+
+Slots live in the same 4-way set-associative layout as the location index
+(64-bit user_id hash, least recently updated user evicted when a set is
+full). With SKETCH_BUCKETS = 40 a slot takes ~230 bytes, so 1M users fit in
+about 230 MB. Capacity is set with BASELINE_STORE_CAPACITY.
+
+The store is written by a single updater (scripts/update_baselines.py) that
+consumes the session and transfer streams and saves atomic .npz snapshots.
+Detective processes load the snapshot read-only from BASELINE_STORE_PATH and
+pick up newer snapshots automatically; the tools never write to it. A
+session may already be folded into the snapshot by the time it is
+investigated, but with MIN_OBSERVATIONS or more sessions of history one
+observation moves the baseline very little.
+"""
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from .location_index import FINGERPRINT_VERSION, WAYS, _fingerprint, fingerprints, to_epoch_seconds
+from .snapshot_loader import SnapshotHolder
+
+DEFAULT_CAPACITY = 1_000_000
+HOURS = 24
+
+# Log-bucket sketches: bucket i covers [low * g**i, low * g**(i + 1)) with
+# g = (high / low) ** (1 / SKETCH_BUCKETS); values outside [low, high) are
+# clamped to the first/last bucket
+SKETCH_BUCKETS = 40
+DURATION_RANGE = (1.0, 86_400.0)       # seconds (g ~ 1.33)
+AMOUNT_RANGE = (1.0, 10_000_000.0)     # currency units (g ~ 1.50)
+SKETCH_DECAY_TOTAL = 4096
+
+# Typing cadence EWMA smoothing (plain running mean for the first 1/alpha sessions)
+CADENCE_ALPHA = 0.05
+CADENCE_MIN_STD = 0.02
+
+# Fewer observations than this are not a baseline yet
+MIN_OBSERVATIONS = 5
+
+# 0.6745 * 2: IQR of a normal distribution in standard deviations
+_IQR_TO_STD = 1.349
+_HOUR_ANGLE = 2 * np.pi / HOURS
+
+
+def _bucket_positions(values: np.ndarray, value_range) -> np.ndarray:
+    """Continuous log-bucket position of each value, clamped to [0, SKETCH_BUCKETS)."""
+    low, high = value_range
+    scale = SKETCH_BUCKETS / math.log(high / low)
+    # NaN stays NaN (missing value); zero/negative values land in bucket 0
+    position = np.log(np.maximum(values, low) / low) * scale
+    return np.minimum(position, SKETCH_BUCKETS - 1e-9)
+
+
+def _sketch_stats(counts: np.ndarray, position: np.ndarray):
+    """Robust z-score and percentile of `position` against per-row sketches.
+
+    Works in bucket units: median and IQR come from the cumulative counts, and
+    the spread is floored at one bucket so a user with a single habitual
+    value does not turn every small difference into a huge z-score.
+    """
+    counts = counts.astype(np.float64)
+    total = counts.sum(axis=1)
+    cumulative = np.cumsum(counts, axis=1)
+
+    def _quantile(q):
+        return np.argmax(cumulative >= (q * total)[:, None], axis=1) + 0.5
+
+    median = _quantile(0.5)
+    spread = np.maximum((_quantile(0.75) - _quantile(0.25)) / _IQR_TO_STD, 1.0)
+    z = (position - median) / spread
+
+    rows = np.arange(len(counts))
+    bucket = np.nan_to_num(position).astype(np.int64)
+    below = np.where(bucket > 0, cumulative[rows, np.maximum(bucket - 1, 0)], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentile = (below + 0.5 * counts[rows, bucket]) / total
+    return z, percentile
+
+
+def _sketch_quantile(counts: np.ndarray, q: float, value_range) -> float:
+    """Approximate quantile of one sketch row (geometric bucket midpoint)."""
+    cumulative = np.cumsum(counts.astype(np.float64))
+    bucket = int(np.argmax(cumulative >= q * cumulative[-1]))
+    low, high = value_range
+    return low * (high / low) ** ((bucket + 0.5) / SKETCH_BUCKETS)
+
+
+def _present(value) -> bool:
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+
+def _rounded(values: np.ndarray, digits: int) -> list:
+    """Round an array to a list, with None for NaN."""
+    return [None if math.isnan(v) else v for v in np.round(values, digits).tolist()]
+
+
+class BaselineStore:
+    """Fixed-memory per-user behavioral baselines."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """Allocate the store.
+
+        Args:
+            capacity: Maximum number of users tracked (rounded up to a multiple of 4)
+        """
+        self.num_sets = max(1, -(-capacity // WAYS))
+        self.capacity = self.num_sets * WAYS
+        self._lock = threading.Lock()
+        # Stream positions of the updater (e.g. last session event time)
+        self.watermarks: Dict[str, Any] = {}
+
+        self._fp = np.zeros(self.capacity, dtype=np.uint64)
+        self._last_seen = np.zeros(self.capacity, dtype=np.uint32)
+        self._hours = np.zeros((self.capacity, HOURS), dtype=np.uint16)
+        self._cadence_mean = np.zeros(self.capacity, dtype=np.float32)
+        self._cadence_var = np.zeros(self.capacity, dtype=np.float32)
+        self._cadence_n = np.zeros(self.capacity, dtype=np.uint16)
+        self._duration = np.zeros((self.capacity, SKETCH_BUCKETS), dtype=np.uint16)
+        self._amount = np.zeros((self.capacity, SKETCH_BUCKETS), dtype=np.uint16)
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "fp": self._fp, "last_seen": self._last_seen, "hours": self._hours,
+            "cadence_mean": self._cadence_mean, "cadence_var": self._cadence_var,
+            "cadence_n": self._cadence_n, "duration": self._duration, "amount": self._amount,
+        }
+
+    @property
+    def memory_bytes(self) -> int:
+        """Total size of the backing arrays."""
+        return sum(a.nbytes for a in self._arrays().values())
+
+    @property
+    def num_users(self) -> int:
+        """Users currently holding a slot."""
+        return int(np.count_nonzero(self._fp))
+
+    def _find(self, user_id: str, create: bool = False) -> int:
+        """Return the user's slot, or -1 (allocating/evicting when `create`)."""
+        fp = np.uint64(_fingerprint(user_id))
+        base = ((int(fp) >> 1) % self.num_sets) * WAYS
+        ways = self._fp[base:base + WAYS]
+        match = np.flatnonzero(ways == fp)
+        if match.size:
+            return base + int(match[0])
+        if not create:
+            return -1
+
+        empty = np.flatnonzero(ways == 0)
+        if empty.size:
+            slot = base + int(empty[0])
+        else:
+            # Evict the least recently updated user in this set
+            slot = base + int(np.argmin(self._last_seen[base:base + WAYS]))
+        for array in self._arrays().values():
+            array[slot] = 0
+        self._fp[slot] = fp
+        return slot
+
+    def _find_many(self, user_ids: Sequence[str]) -> np.ndarray:
+        """Vectorized _find (no allocation): slot per user, -1 if unknown."""
+        fps = fingerprints(user_ids)
+        bases = ((fps >> np.uint64(1)) % np.uint64(self.num_sets)).astype(np.int64) * WAYS
+        candidates = bases[:, None] + np.arange(WAYS)
+        match = self._fp[candidates] == fps[:, None]
+        return np.where(match.any(axis=1), candidates[np.arange(len(fps)), match.argmax(axis=1)], -1)
+
+    @staticmethod
+    def _add(histogram: np.ndarray, slot: int, bucket: int) -> None:
+        """Count one observation, halving the row once it is full."""
+        row = histogram[slot]
+        if int(row.sum()) >= SKETCH_DECAY_TOTAL:
+            row >>= 1
+        row[bucket] += 1
+
+    def _touch(self, slot: int, event_time: Any) -> None:
+        if event_time is not None:
+            self._last_seen[slot] = max(int(self._last_seen[slot]), int(to_epoch_seconds(event_time)))
+
+    def update_session(self, user_id: str, hour: Optional[int] = None, typing_cadence: Optional[float] = None,
+                       duration_seconds: Optional[float] = None, event_time: Any = None) -> None:
+        """Fold one session into the user's baseline (missing values are skipped)."""
+        with self._lock:
+            slot = self._find(user_id, create=True)
+            if _present(hour):
+                self._add(self._hours, slot, int(hour) % HOURS)
+            if _present(typing_cadence):
+                n = min(int(self._cadence_n[slot]) + 1, np.iinfo(np.uint16).max)
+                alpha = max(CADENCE_ALPHA, 1.0 / n)
+                delta = float(typing_cadence) - float(self._cadence_mean[slot])
+                self._cadence_mean[slot] += alpha * delta
+                self._cadence_var[slot] = (1 - alpha) * (float(self._cadence_var[slot]) + alpha * delta * delta)
+                self._cadence_n[slot] = n
+            if _present(duration_seconds):
+                position = _bucket_positions(np.array([float(duration_seconds)]), DURATION_RANGE)
+                self._add(self._duration, slot, int(position[0]))
+            self._touch(slot, event_time)
+
+    def update_transfer(self, user_id: str, amount: float, event_time: Any = None) -> None:
+        """Fold one transfer amount into the user's baseline."""
+        if not _present(amount):
+            return
+        with self._lock:
+            slot = self._find(user_id, create=True)
+            position = _bucket_positions(np.array([float(amount)]), AMOUNT_RANGE)
+            self._add(self._amount, slot, int(position[0]))
+            self._touch(slot, event_time)
+
+    def session_deviations_batch(self, user_ids: Sequence[str], hours, typing_cadence, duration_seconds) -> Dict[str, np.ndarray]:
+        """How unusual each session is for its user (does not update the store).
+
+        Args:
+            user_ids: User per session
+            hours: Session hour-of-day (NaN when unknown)
+            typing_cadence: Typing cadence score (NaN when unknown)
+            duration_seconds: Session duration (NaN when unknown)
+
+        Returns:
+            dict of arrays (NaN where the user has fewer than MIN_OBSERVATIONS
+            or the input is missing):
+            - sessions_observed: sessions in the user's hour histogram
+            - hour_share: fraction of the user's sessions in this hour
+            - hour_z: circular distance from the user's mean hour, in circular
+              standard deviations (floored at one hour)
+            - typing_cadence_z: (cadence - EWMA mean) / EWMA std
+            - duration_z / duration_percentile: against the duration sketch
+        """
+        hours = np.asarray(hours, dtype=np.float64)
+        cadence = np.asarray(typing_cadence, dtype=np.float64)
+        duration = np.asarray(duration_seconds, dtype=np.float64)
+        slots = self._find_many(user_ids)
+        known = slots >= 0
+        safe = np.where(known, slots, 0)
+
+        hist = np.where(known[:, None], self._hours[safe], 0).astype(np.float64)
+        observed = hist.sum(axis=1)
+        has_hours = (observed >= MIN_OBSERVATIONS) & ~np.isnan(hours)
+        hour_bin = np.nan_to_num(hours).astype(np.int64) % HOURS
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hour_share = hist[np.arange(len(slots)), hour_bin] / observed
+            angles = np.arange(HOURS) * _HOUR_ANGLE
+            cos_sum, sin_sum = hist @ np.cos(angles), hist @ np.sin(angles)
+            resultant = np.hypot(cos_sum, sin_sum) / observed
+            circular_std = np.maximum(np.sqrt(-2 * np.log(np.clip(resultant, 1e-12, 1.0))), _HOUR_ANGLE)
+            offset = np.angle(np.exp(1j * (hours * _HOUR_ANGLE - np.arctan2(sin_sum, cos_sum))))
+            hour_z = np.abs(offset) / circular_std
+
+        cadence_n = np.where(known, self._cadence_n[safe], 0)
+        cadence_std = np.maximum(np.sqrt(self._cadence_var[safe].astype(np.float64)), CADENCE_MIN_STD)
+        cadence_z = (cadence - self._cadence_mean[safe]) / cadence_std
+        has_cadence = (cadence_n >= MIN_OBSERVATIONS) & ~np.isnan(cadence)
+
+        duration_counts = np.where(known[:, None], self._duration[safe], 0)
+        duration_z, duration_pct = _sketch_stats(duration_counts, _bucket_positions(duration, DURATION_RANGE))
+        has_duration = (duration_counts.sum(axis=1) >= MIN_OBSERVATIONS) & ~np.isnan(duration)
+
+        return {
+            "sessions_observed": observed,
+            "hour_share": np.where(has_hours, hour_share, np.nan),
+            "hour_z": np.where(has_hours, hour_z, np.nan),
+            "typing_cadence_z": np.where(has_cadence, cadence_z, np.nan),
+            "duration_z": np.where(has_duration, duration_z, np.nan),
+            "duration_percentile": np.where(has_duration, duration_pct, np.nan),
+        }
+
+    def session_deviations(self, user_id: str, hour=None, typing_cadence=None, duration_seconds=None) -> Dict[str, Any]:
+        """session_deviations_batch() for one session, as a result dict (None for NaN)."""
+        def _value(v):
+            return np.nan if v is None else float(v)
+
+        return deviations_to_dicts(self.session_deviations_batch(
+            [user_id], [_value(hour)], [_value(typing_cadence)], [_value(duration_seconds)]
+        ))[0]
+
+    def transfer_baseline(self, user_id: str, amount: Optional[float] = None) -> Dict[str, Any]:
+        """The user's typical transfer amounts, and how unusual `amount` is.
+
+        Returns:
+            dict with transfers_observed, typical_amount_p50/p90 and (when
+            `amount` is given) amount_z / amount_percentile; values are None
+            until the user has MIN_OBSERVATIONS transfers
+        """
+        slot = self._find(user_id)
+        counts = self._amount[slot] if slot >= 0 else np.zeros(SKETCH_BUCKETS, dtype=np.uint16)
+        observed = int(counts.sum())
+        result = {"transfers_observed": observed, "typical_amount_p50": None, "typical_amount_p90": None,
+                  "amount_z": None, "amount_percentile": None}
+        if observed < MIN_OBSERVATIONS:
+            return result
+
+        result["typical_amount_p50"] = round(_sketch_quantile(counts, 0.5, AMOUNT_RANGE), 2)
+        result["typical_amount_p90"] = round(_sketch_quantile(counts, 0.9, AMOUNT_RANGE), 2)
+        if amount is not None:
+            z, percentile = _sketch_stats(counts[None, :], _bucket_positions(np.array([float(amount)]), AMOUNT_RANGE))
+            result["amount_z"] = round(float(z[0]), 2)
+            result["amount_percentile"] = round(float(percentile[0]), 2)
+        return result
+
+    def save(self, path: str) -> None:
+        """Write an atomic .npz snapshot (readers never see a partial file)."""
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.array(json.dumps({
+                        "capacity": self.capacity,
+                        "sketch_buckets": SKETCH_BUCKETS,
+                        "duration_range": DURATION_RANGE,
+                        "amount_range": AMOUNT_RANGE,
+                        "fingerprint": FINGERPRINT_VERSION,
+                        "watermarks": self.watermarks,
+                        "saved_at": time.time(),
+                    })),
+                    **self._arrays(),
+                )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BaselineStore":
+        """Load a snapshot written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if (meta["sketch_buckets"] != SKETCH_BUCKETS
+                    or tuple(meta["duration_range"]) != DURATION_RANGE
+                    or tuple(meta["amount_range"]) != AMOUNT_RANGE):
+                raise ValueError(f"{path} was written with a different sketch layout")
+            if meta.get("fingerprint") != FINGERPRINT_VERSION:
+                raise ValueError(f"{path} was written with a different user_id hash; rebuild it")
+            store = cls(capacity=meta["capacity"])
+            for name, array in store._arrays().items():
+                array[...] = data[name]
+        store.watermarks = meta.get("watermarks", {})
+        return store
+
+
+def deviations_to_dicts(deviations: Dict[str, np.ndarray]) -> list:
+    """Per-row result dicts from session_deviations_batch() arrays."""
+    observed = deviations["sessions_observed"].astype(np.int64).tolist()
+    columns = {
+        "hour_share": _rounded(deviations["hour_share"], 2),
+        "hour_z": _rounded(deviations["hour_z"], 2),
+        "typing_cadence_z": _rounded(deviations["typing_cadence_z"], 2),
+        "duration_z": _rounded(deviations["duration_z"], 2),
+        "duration_percentile": _rounded(deviations["duration_percentile"], 2),
+    }
+    return [
+        {"sessions_observed": observed[i], **{name: values[i] for name, values in columns.items()}}
+        for i in range(len(observed))
+    ]
+
+
+def default_baseline_path() -> str:
+    """Snapshot path (BASELINE_STORE_PATH or <FEATURE_STORE_DIR>/baselines.npz)."""
+    from .feature_store import _default_directory
+    return os.getenv("BASELINE_STORE_PATH", os.path.join(_default_directory(), "baselines.npz"))
+
+
+# Singleton instance
+_baseline_store = SnapshotHolder(
+    "Baselines",
+    default_baseline_path,
+    BaselineStore.load,
+    lambda: BaselineStore(capacity=int(os.getenv("BASELINE_STORE_CAPACITY", DEFAULT_CAPACITY))),
+)
+
+
+def get_baseline_store() -> BaselineStore:
+    """Get the process-wide baseline store, reloading the snapshot when it is replaced.
+
+    Without a snapshot this is an empty store (BASELINE_STORE_CAPACITY users),
+    so every deviation is None.
+    """
+    return _baseline_store.get()
+
+
+def set_baseline_store(store) -> None:
+    """Override the baseline store (e.g. an in-process one for replays). None resets to config."""
+    _baseline_store.set(store)
@@ -1,10 +1,16 @@
 """BigQuery-based tools for user context retrieval."""
-import os
-from google.cloud import bigquery
-from google.oauth2 import service_account
+from typing import Optional
+
 from google.adk.tools import FunctionTool
 from dotenv import load_dotenv
-from .bigquery_utils import retry_query_with_backoff
+from .bigquery_utils import get_client  # noqa: F401 - re-exported for existing callers
+from .feature_store import get_feature_store
+from .storage_backends import get_storage_backend
+from .baseline_store import get_baseline_store
+from .violation_store import get_violation_store
+from .graph_index import get_graph_index
+from .fan_in_tracker import get_fan_in_tracker
+from .single_flight import single_flight
 
 # Load environment variables
 load_dotenv()
@@ -21,112 +27,178 @@ def _get_form_fallback(data_type: str, key: str):
         pass
     return None
 
-# Initialize client lazily to avoid errors if credentials are missing during import
-def get_client():
-    """
-    Get a BigQuery client using the same credential system as data insertion.
-    Tries Streamlit secrets first, then environment variables, then default credentials.
-    """
-    # Try Streamlit secrets first (for deployed app)
+def _simulated_user_history(user_id: str):
+    """Simulation fallback for test users (None for real users)."""
+    if user_id == "user_good_history":
+         return {"user_id": user_id, "age_group": "Active", "account_tenure_days": 3650, "avg_transfer_amount": 120.5, "behavioral_segment": "Conservative Saver"}
+    if user_id == "user_senior":
+         return {"user_id": user_id, "age_group": "Senior", "account_tenure_days": 5000, "avg_transfer_amount": 500.0, "behavioral_segment": "Vulnerable"}
+    return None
+
+
+def _user_history_result(user_id: str, row) -> dict:
+    """Shape a customer_profiles row (or a miss) into the tool result."""
+    if not row:
+        print(f"[BigQuery] User {user_id} not found after retries, trying form fallback...")
+
+        # Try to get data from form (playground mode)
+        form_user = _get_form_fallback("user", "user_id")
+        if form_user == user_id:
+            print(f"[BigQuery] Using form data for user {user_id}")
+            return {
+                "user_id": user_id,
+                "age_group": _get_form_fallback("user", "age_group"),
+                "account_tenure_days": _get_form_fallback("user", "tenure"),
+                "avg_transfer_amount": _get_form_fallback("user", "avg_transfer"),
+                "behavioral_segment": _get_form_fallback("user", "segment")
+            }
+
+        return {"user_id": user_id, "status": "not_found", "risk": "unknown"}
+
+    return {
+        "user_id": user_id,
+        "age_group": row["age_group"],
+        "account_tenure_days": row["account_tenure_days"],
+        "avg_transfer_amount": float(row["avg_transfer_amount"]) if row["avg_transfer_amount"] else 0.0,
+        "behavioral_segment": row["behavioral_segment"]
+    }
+
+
+def _with_user_signals(result: dict, amount: Optional[float] = None) -> dict:
+    """Add previous_violations and the user's transfer-amount baseline (and how unusual `amount` is)."""
+    if result.get("status") in ("not_found", "simulated_error"):
+        return result
+    result = {**result, "previous_violations": get_violation_store().get(result["user_id"])}
     try:
-        import streamlit as st
-        if hasattr(st, 'secrets') and "gcp_service_account" in st.secrets:
-            credentials = service_account.Credentials.from_service_account_info(
-                dict(st.secrets["gcp_service_account"])
-            )
-            project_id = st.secrets.get("GCP_PROJECT_ID", "partner-catalyst")
-            return bigquery.Client(credentials=credentials, project=project_id)
-    except (ImportError, Exception):
-        pass
+        result["transfer_baseline"] = get_baseline_store().transfer_baseline(result["user_id"], amount)
+    except Exception as e:
+        print(f"[Baselines] Lookup failed for {result['user_id']}: {e}")
+    return result
 
-    # Try environment variable for service account key file
-    key_path = os.getenv("GCP_SERVICE_ACCOUNT_KEY") or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-    if key_path and os.path.exists(key_path):
-        try:
-            credentials = service_account.Credentials.from_service_account_file(key_path)
-            return bigquery.Client(credentials=credentials)
-        except Exception:
-            pass
 
-    # Fall back to default credentials (ADC)
-    return bigquery.Client()
+def _simulated_beneficiary_risk(account_id: str):
+    """Simulation fallback for test accounts (None for real accounts)."""
+    if account_id == "acc_normal":
+        return {"account_id": account_id, "account_age_hours": 8760, "risk_score": 10, "linked_to_flagged_device": False}
+    if account_id == "acc_mule":
+        return {"account_id": account_id, "account_age_hours": 12, "risk_score": 95, "linked_to_flagged_device": True}
+    return None
+
+
+def _with_beneficiary_signals(result: dict) -> dict:
+    """Add the account's mule-network position and recent fan-in (None when unknown)."""
+    if result.get("status") == "simulated_error":
+        return result
+    account_id = result["account_id"]
+    signals = {}
+    try:
+        signals["network"] = get_graph_index().node_risk("account", account_id)
+    except Exception as e:
+        print(f"[GraphIndex] Lookup failed for {account_id}: {e}")
+    try:
+        signals["fan_in"] = get_fan_in_tracker().fan_in(account_id)
+    except Exception as e:
+        print(f"[FanIn] Lookup failed for {account_id}: {e}")
+    return {**result, **signals}
+
+
+def _beneficiary_risk_result(account_id: str, row) -> dict:
+    """Shape a beneficiary_graph row (or a miss) into the tool result."""
+    if not row:
+        print(f"[BigQuery] Beneficiary {account_id} not found after retries, trying form fallback...")
+
+        # Try to get data from form (playground mode)
+        form_acc = _get_form_fallback("beneficiary", "acc_id")
+        if form_acc == account_id:
+            print(f"[BigQuery] Using form data for beneficiary {account_id}")
+            return {
+                "account_id": account_id,
+                "account_age_hours": _get_form_fallback("beneficiary", "acc_age"),
+                "risk_score": _get_form_fallback("beneficiary", "risk_score"),
+                "linked_to_flagged_device": _get_form_fallback("beneficiary", "flagged_device")
+            }
+
+        # Default to high risk for unknown new accounts
+        return {"account_id": account_id, "status": "unknown_account", "risk_score": 50}
 
-def get_user_history(user_id: str) -> dict:
+    return {
+        "account_id": account_id,
+        "account_age_hours": row["account_age_hours"],
+        "risk_score": row["risk_score"],
+        "linked_to_flagged_device": row["linked_to_flagged_device"]
+    }
+
+
+@single_flight("user_history")
+def get_user_history(user_id: str, amount: Optional[float] = None) -> dict:
     """
-    Query BigQuery for user's profile and risk segments.
+    Query the configured storage backend for user's profile and risk segments.
 
     Args:
         user_id: The user identifier to look up
+        amount: Optional transfer amount under investigation, compared
+            against the user's transfer baseline
 
     Returns:
-        dict with user's profile (age, tenure, normal usage)
+        dict with user's profile (age, tenure, normal usage),
+        previous_violations (BLOCK decisions so far) and transfer_baseline (typical amounts; amount_z / amount_percentile
+        when `amount` is given)
     """
-    # Simulation fallback for test users
-    if user_id == "user_good_history":
-         return {"user_id": user_id, "age_group": "Active", "account_tenure_days": 3650, "avg_transfer_amount": 120.5, "behavioral_segment": "Conservative Saver"}
-    if user_id == "user_senior":
-         return {"user_id": user_id, "age_group": "Senior", "account_tenure_days": 5000, "avg_transfer_amount": 500.0, "behavioral_segment": "Vulnerable"}
+    simulated = _simulated_user_history(user_id)
+    if simulated is not None:
+        return simulated
+
+    # Serve from the local snapshot when one is available
+    snapshot_row = get_feature_store().get_profile(user_id)
+    if snapshot_row is not None:
+        return _with_user_signals(snapshot_row, amount)
 
     try:
-        client = get_client()
-        # Dataset: streamguard_threats, Table: customer_profiles
-        dataset_id = "streamguard_threats"
-        table_id = "customer_profiles"
-
-        query = f"""
-        SELECT
-            user_id,
-            age_group,
-            account_tenure_days,
-            avg_transfer_amount,
-            behavioral_segment
-        FROM `{dataset_id}.{table_id}`
-        WHERE user_id = @user_id
-        """
-
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("user_id", "STRING", user_id)
-            ]
-        )
-
-        def execute_query():
-            results = client.query(query, job_config=job_config).result()
-            row = next(iter(results), None)
-            return row
-
-        # Retry with exponential backoff to handle data latency
-        row = retry_query_with_backoff(execute_query, max_retries=3, initial_delay=2)
-
-        if not row:
-            print(f"[BigQuery] User {user_id} not found after retries, trying form fallback...")
-
-            # Try to get data from form (playground mode)
-            form_user = _get_form_fallback("user", "user_id")
-            if form_user == user_id:
-                print(f"[BigQuery] Using form data for user {user_id}")
-                return {
-                    "user_id": user_id,
-                    "age_group": _get_form_fallback("user", "age_group"),
-                    "account_tenure_days": _get_form_fallback("user", "tenure"),
-                    "avg_transfer_amount": _get_form_fallback("user", "avg_transfer"),
-                    "behavioral_segment": _get_form_fallback("user", "segment")
-                }
-
-            return {"user_id": user_id, "status": "not_found", "risk": "unknown"}
-
-        return {
-            "user_id": user_id,
-            "age_group": row.age_group,
-            "account_tenure_days": row.account_tenure_days,
-            "avg_transfer_amount": float(row.avg_transfer_amount) if row.avg_transfer_amount else 0.0,
-            "behavioral_segment": row.behavioral_segment
-        }
+        # Table: customer_profiles (backend selected by DETECTIVE_STORAGE_BACKEND)
+        row = get_storage_backend().get_profile(user_id)
+        return _with_user_signals(_user_history_result(user_id, row), amount)
     except Exception as e:
         print(f"[BQ SIM] Fallback due to error: {e}")
         return {"user_id": user_id, "status": "simulated_error", "risk": "medium"}
 
 
+def get_user_history_batch(user_ids: list[str]) -> dict:
+    """
+    Look up profiles for many users with a single backend query.
+
+    Args:
+        user_ids: The user identifiers to look up
+
+    Returns:
+        dict keyed by user_id, each value shaped like get_user_history()
+    """
+    results = {}
+    pending = []
+    for user_id in dict.fromkeys(user_ids):
+        simulated = _simulated_user_history(user_id)
+        if simulated is not None:
+            results[user_id] = simulated
+            continue
+        row = get_feature_store().get_profile(user_id)
+        if row is not None:
+            results[user_id] = _with_user_signals(row)
+        else:
+            pending.append(user_id)
+
+    if pending:
+        try:
+            rows = get_storage_backend().get_profiles(pending)
+            for user_id in pending:
+                results[user_id] = _with_user_signals(_user_history_result(user_id, rows.get(user_id)))
+        except Exception as e:
+            print(f"[BQ SIM] Batch fallback due to error: {e}")
+            for user_id in pending:
+                results[user_id] = {"user_id": user_id, "status": "simulated_error", "risk": "medium"}
+
+    return results
+
+
+@single_flight("beneficiary_risk")
 def get_beneficiary_risk(account_id: str) -> dict:
     """
     Check if a beneficiary account is associated with known fraud in the graph.
@@ -135,71 +207,66 @@ def get_beneficiary_risk(account_id: str) -> dict:
         account_id: The destination account to check
 
     Returns:
-        dict with account age, risk score, and linked fraud indicators
+        dict with account age, risk score, linked fraud indicators,
+        network (hops to the nearest flagged account/device/user, size and
+        flagged nodes of its transfer network) and fan_in (distinct senders
+        and transfers received in the last 1h / 24h)
     """
-    # Simulation fallbacks
-    if account_id == "acc_normal":
-        return {"account_id": account_id, "account_age_hours": 8760, "risk_score": 10, "linked_to_flagged_device": False}
-    if account_id == "acc_mule":
-        return {"account_id": account_id, "account_age_hours": 12, "risk_score": 95, "linked_to_flagged_device": True}
+    simulated = _simulated_beneficiary_risk(account_id)
+    if simulated is not None:
+        return simulated
+
+    # Serve from the local snapshot when one is available
+    snapshot_row = get_feature_store().get_beneficiary(account_id)
+    if snapshot_row is not None:
+        return _with_beneficiary_signals(snapshot_row)
 
     try:
-        client = get_client()
-        # Dataset: streamguard_threats, Table: beneficiary_graph
-        dataset_id = "streamguard_threats"
-        table_id = "beneficiary_graph"
-
-        query = f"""
-        SELECT
-            account_id,
-            account_age_hours,
-            risk_score,
-            linked_to_flagged_device
-        FROM `{dataset_id}.{table_id}`
-        WHERE account_id = @account_id
-        """
-
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("account_id", "STRING", account_id)
-            ]
-        )
-
-        def execute_query():
-            results = client.query(query, job_config=job_config).result()
-            row = next(iter(results), None)
-            return row
-
-        # Retry with exponential backoff to handle data latency
-        row = retry_query_with_backoff(execute_query, max_retries=3, initial_delay=2)
-
-        if not row:
-            print(f"[BigQuery] Beneficiary {account_id} not found after retries, trying form fallback...")
-
-            # Try to get data from form (playground mode)
-            form_acc = _get_form_fallback("beneficiary", "acc_id")
-            if form_acc == account_id:
-                print(f"[BigQuery] Using form data for beneficiary {account_id}")
-                return {
-                    "account_id": account_id,
-                    "account_age_hours": _get_form_fallback("beneficiary", "acc_age"),
-                    "risk_score": _get_form_fallback("beneficiary", "risk_score"),
-                    "linked_to_flagged_device": _get_form_fallback("beneficiary", "flagged_device")
-                }
-
-            # Default to high risk for unknown new accounts
-            return {"account_id": account_id, "status": "unknown_account", "risk_score": 50}
-
-        return {
-            "account_id": account_id,
-            "account_age_hours": row.account_age_hours,
-            "risk_score": row.risk_score,
-            "linked_to_flagged_device": row.linked_to_flagged_device
-        }
+        # Table: beneficiary_graph (backend selected by DETECTIVE_STORAGE_BACKEND)
+        row = get_storage_backend().get_beneficiary(account_id)
+        return _with_beneficiary_signals(_beneficiary_risk_result(account_id, row))
     except Exception as e:
         print(f"[BQ SIM] Fallback due to error: {e}")
         return {"account_id": account_id, "status": "simulated_error", "risk_score": -1}
 
+
+def get_beneficiary_risk_batch(account_ids: list[str]) -> dict:
+    """
+    Check many beneficiary accounts with a single backend query.
+
+    Args:
+        account_ids: The destination accounts to check
+
+    Returns:
+        dict keyed by account_id, each value shaped like get_beneficiary_risk()
+    """
+    results = {}
+    pending = []
+    for account_id in dict.fromkeys(account_ids):
+        simulated = _simulated_beneficiary_risk(account_id)
+        if simulated is not None:
+            results[account_id] = simulated
+            continue
+        row = get_feature_store().get_beneficiary(account_id)
+        if row is not None:
+            results[account_id] = _with_beneficiary_signals(row)
+        else:
+            pending.append(account_id)
+
+    if pending:
+        try:
+            rows = get_storage_backend().get_beneficiaries(pending)
+            for account_id in pending:
+                results[account_id] = _with_beneficiary_signals(_beneficiary_risk_result(account_id, rows.get(account_id)))
+        except Exception as e:
+            print(f"[BQ SIM] Batch fallback due to error: {e}")
+            for account_id in pending:
+                results[account_id] = {"account_id": account_id, "status": "simulated_error", "risk_score": -1}
+
+    return results
+
 # Export as ADK tools
 user_history_tool = FunctionTool(get_user_history)
 beneficiary_tool = FunctionTool(get_beneficiary_risk)
+user_history_batch_tool = FunctionTool(get_user_history_batch)
+beneficiary_batch_tool = FunctionTool(get_beneficiary_risk_batch)
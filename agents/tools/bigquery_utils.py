@@ -1,43 +1,196 @@
 """Shared utilities for BigQuery operations."""
+import json
+import os
+import threading
 import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
+from config.metrics import get_metrics_registry
+from config.resilience import RetryPolicy, call_with_retry
 
-def retry_query_with_backoff(query_func, max_retries=3, initial_delay=2):
+# Most recent query telemetry records kept in memory per process
+QUERY_TELEMETRY_HISTORY = 1000
+_recent_queries = deque(maxlen=QUERY_TELEMETRY_HISTORY)
+_telemetry_log_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Get a BigQuery client using the same credential system as data insertion.
+    Tries Streamlit secrets first, then environment variables, then default credentials.
     """
-    Retry a BigQuery query with exponential backoff.
+    # Imported lazily so non-BigQuery storage backends work without the GCP SDK
+    from google.cloud import bigquery
+    from google.oauth2 import service_account
+
+    # Try Streamlit secrets first (for deployed app)
+    try:
+        import streamlit as st
+        if hasattr(st, 'secrets') and "gcp_service_account" in st.secrets:
+            credentials = service_account.Credentials.from_service_account_info(
+                dict(st.secrets["gcp_service_account"])
+            )
+            project_id = st.secrets.get("GCP_PROJECT_ID", "partner-catalyst")
+            return bigquery.Client(credentials=credentials, project=project_id)
+    except (ImportError, Exception):
+        pass
+
+    # Try environment variable for service account key file
+    key_path = os.getenv("GCP_SERVICE_ACCOUNT_KEY") or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    if key_path and os.path.exists(key_path):
+        try:
+            credentials = service_account.Credentials.from_service_account_file(key_path)
+            return bigquery.Client(credentials=credentials)
+        except Exception:
+            pass
+
+    # Fall back to default credentials (ADC)
+    return bigquery.Client()
+
+
+def retry_query_with_backoff(query_func, max_retries=3, initial_delay=2, deadline_seconds=None):
+    """
+    Retry a BigQuery query with jittered exponential backoff.
 
     This handles the data latency issue where streaming data
-    hasn't fully propagated to BigQuery yet.
+    hasn't fully propagated to BigQuery yet. Waits use full jitter and
+    count against the shared "bigquery" retry budget (config/resilience.py),
+    so many investigations waiting on the same late data do not retry in
+    lockstep.
 
     Args:
         query_func: Function that executes the query and returns results
-        max_retries: Maximum number of retry attempts
-        initial_delay: Initial delay in seconds (doubles each retry)
+        max_retries: Maximum number of attempts
+        initial_delay: Backoff cap in seconds for the first retry (doubles each retry)
+        deadline_seconds: Optional time budget across all attempts
 
     Returns:
         Query results or None if all retries exhausted
+
+    Raises:
+        The last query error if the final attempt fails
+    """
+    policy = RetryPolicy(
+        max_attempts=max_retries,
+        base_delay=initial_delay,
+        max_delay=initial_delay * (2 ** max(max_retries - 1, 0)),
+        deadline_seconds=deadline_seconds,
+        retry_on_result=lambda result: result is None,
+    )
+    return call_with_retry(query_func, dependency="bigquery", policy=policy)
+
+
+def _millis_between(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    """Milliseconds between two job timestamps (None if either is missing)."""
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds() * 1000
+
+
+def record_query_telemetry(record: Dict[str, Any]) -> None:
+    """Store a telemetry record in the metrics registry, history and optional log.
+
+    Counters are broken down by `table` and `source` so per-table scan cost and
+    latency can be read from get_metrics_registry().snapshot(). When
+    QUERY_TELEMETRY_LOG is set, each record is also appended to that JSONL file
+    for scripts/query_report.py.
     """
-    delay = initial_delay
+    metrics = get_metrics_registry()
+    labels = {"table": record["table"], "source": record["source"]}
 
-    for attempt in range(max_retries):
+    metrics.inc("bigquery.queries", **labels)
+    metrics.inc("bigquery.latency_ms", record["latency_ms"], **labels)
+    for field in ("bytes_processed", "slot_millis", "queue_ms", "exec_ms"):
+        if record.get(field) is not None:
+            metrics.inc(f"bigquery.{field}", record[field], **labels)
+    if record.get("cache_hit"):
+        metrics.inc("bigquery.cache_hits", **labels)
+    if record.get("error"):
+        metrics.inc("bigquery.errors", **labels)
+
+    _recent_queries.append(record)
+
+    log_path = os.getenv("QUERY_TELEMETRY_LOG")
+    if log_path:
         try:
-            result = query_func()
-            if result is not None:
-                if attempt > 0:
-                    print(f"[BigQuery Retry] Data found after {attempt + 1} attempt(s)")
-                return result
-
-            # Data not found yet, wait before retrying
-            if attempt < max_retries - 1:
-                print(f"[BigQuery Retry] No data yet, waiting {delay}s before retry {attempt + 2}/{max_retries}...")
-                time.sleep(delay)
-                delay *= 2  # Exponential backoff
-        except Exception as e:
-            print(f"[BigQuery Retry] Query error on attempt {attempt + 1}: {str(e)[:100]}")
-            if attempt < max_retries - 1:
-                time.sleep(delay)
-                delay *= 2
-            else:
-                raise
-
-    return None
+            with _telemetry_log_lock, open(log_path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            print(f"[BigQuery Telemetry] Could not write {log_path}: {e}")
+
+
+def run_query(client, query: str, job_config=None, table: str = "unknown", source: str = "detective", **result_kwargs):
+    """
+    Run a BigQuery query and record its job statistics.
+
+    Captures bytes processed, slot-ms, cache hit, queue time (created -> started),
+    execution time (started -> ended) and wall-clock latency for every call.
+    The job is also labelled with the table and source so it can be found in
+    INFORMATION_SCHEMA.JOBS.
+
+    Args:
+        client: BigQuery client
+        query: SQL text
+        job_config: Optional QueryJobConfig
+        table: Table the query reads (telemetry label)
+        source: Calling component, e.g. "detective", "dashboard" (telemetry label)
+        **result_kwargs: Passed through to QueryJob.result()
+
+    Returns:
+        The RowIterator from QueryJob.result()
+    """
+    from google.cloud import bigquery
+
+    job_config = job_config or bigquery.QueryJobConfig()
+    job_config.labels = {
+        **(job_config.labels or {}),
+        # Label values: lowercase, max 63 characters
+        "streamguard_table": table.lower().replace(".", "_")[:63],
+        "streamguard_source": source.lower()[:63],
+    }
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "table": table,
+        "source": source,
+        "query": " ".join(query.split()),
+    }
+    start = time.perf_counter()
+    job = None
+    try:
+        job = client.query(query, job_config=job_config)
+        return job.result(**result_kwargs)
+    except Exception as e:
+        record["error"] = str(e)[:200]
+        raise
+    finally:
+        record["latency_ms"] = (time.perf_counter() - start) * 1000
+        if job is not None:
+            record.update({
+                "job_id": job.job_id,
+                "bytes_processed": job.total_bytes_processed,
+                "slot_millis": job.slot_millis,
+                "cache_hit": job.cache_hit,
+                "queue_ms": _millis_between(job.created, job.started),
+                "exec_ms": _millis_between(job.started, job.ended),
+            })
+        record_query_telemetry(record)
+
+
+def record_insert_telemetry(table: str, source: str, latency_seconds: float, rows: int, error: bool = False) -> None:
+    """Record a streaming insert (insert_rows_json), which has no job statistics."""
+    metrics = get_metrics_registry()
+    labels = {"table": table, "source": source}
+    metrics.inc("bigquery.inserts", **labels)
+    metrics.inc("bigquery.insert_rows", rows, **labels)
+    metrics.inc("bigquery.insert_latency_ms", latency_seconds * 1000, **labels)
+    if error:
+        metrics.inc("bigquery.insert_errors", **labels)
+
+
+def recent_queries(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Return the most recent query telemetry records (newest last)."""
+    records = list(_recent_queries)
+    return records[-limit:] if limit else records
@@ -0,0 +1,357 @@
+"""Per-beneficiary fan-in (distinct senders) over sliding windows.
+
+A mule account receives transfers from many distinct senders in a short
+time. For every beneficiary_account_id this tracker estimates the number of
+distinct sender_user_ids in each window (1h and 24h by default) with
+HyperLogLog sketches:
+
+- each window is a ring of WINDOW_SLICES time buckets (5 minutes for 1h,
+  2 hours for 24h) plus the bucket being filled; the window estimate merges
+  the registers (element-wise max) of the buckets that overlap it, so old
+  senders age out one slice at a time
+- a bucket's registers start sparse ({register: rank}) and become a dense
+  2**precision byte array once they fill a quarter of it
+- at most `capacity` beneficiaries are tracked (least recently updated
+  evicted), so memory is bounded by
+  capacity * windows * (WINDOW_SLICES + 1) * 2**precision bytes even if
+  every tracked account were a hub; typical accounts use a few dozen bytes
+
+With the default precision of 8 (256 registers) the standard error is about
+6.5%; small counts use linear counting and are close to exact.
+
+scripts/track_fan_in.py is the single writer: it consumes
+customer_bank_transfers, raises a FraudInvestigationAlert
+(investigation_type "mule_fan_in") the first time a beneficiary crosses
+FAN_IN_ALERT_THRESHOLD distinct senders within the alert window, and saves
+atomic snapshots that get_beneficiary_risk reads from FAN_IN_TRACKER_PATH
+(default <FEATURE_STORE_DIR>/fan_in.npz).
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from .location_index import to_epoch_seconds
+from .snapshot_loader import SnapshotHolder
+
+MULE_FAN_IN = "mule_fan_in"
+
+DEFAULT_PRECISION = 8
+DEFAULT_WINDOWS = (3600, 86400)
+WINDOW_SLICES = 12
+DEFAULT_CAPACITY = 100_000
+DEFAULT_ALERT_THRESHOLD = 10
+
+_MASK_64 = (1 << 64) - 1
+
+
+def _window_label(seconds: int) -> str:
+    """3600 -> "1h", 86400 -> "24h", 900 -> "15m"."""
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def hll_estimate(registers: np.ndarray) -> float:
+    """Cardinality estimate from HyperLogLog registers (linear counting when small)."""
+    m = len(registers)
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    estimate = alpha * m * m / float(np.ldexp(1.0, -registers.astype(np.int32)).sum())
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return estimate
+
+
+class _Bucket:
+    """HLL registers and transfer count for one time slice."""
+
+    __slots__ = ("registers", "transfers")
+
+    def __init__(self):
+        self.registers: Any = {}
+        self.transfers = 0
+
+
+class FanInTracker:
+    """Sliding-window distinct-sender estimates per beneficiary account."""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, windows: Sequence[int] = DEFAULT_WINDOWS,
+                 capacity: int = DEFAULT_CAPACITY, alert_threshold: Optional[int] = None):
+        """Create an empty tracker.
+
+        Args:
+            precision: log2 of the HLL register count (4-16)
+            windows: Window lengths in seconds; the first (shortest) is the
+                alert window
+            capacity: Beneficiaries tracked before the least recently
+                updated is evicted
+            alert_threshold: Distinct senders in the alert window that
+                trigger an alert (defaults to FAN_IN_ALERT_THRESHOLD, 10)
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        self.windows = tuple(sorted(int(w) for w in windows))
+        self.capacity = capacity
+        self.alert_threshold = alert_threshold if alert_threshold is not None else int(
+            os.getenv("FAN_IN_ALERT_THRESHOLD", DEFAULT_ALERT_THRESHOLD)
+        )
+        self.watermarks: Dict[str, Any] = {}
+        self._slice = [max(w // WINDOW_SLICES, 1) for w in self.windows]
+        self._registers = 1 << precision
+        self._sparse_max = self._registers // 4
+        self._lock = threading.Lock()
+        # beneficiary -> per-window {bucket_id: _Bucket}
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._alerted_until: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Approximate register memory (sparse entries counted at ~100 bytes)."""
+        total = 0
+        for rings in self._entries.values():
+            for ring in rings:
+                for bucket in ring.values():
+                    registers = bucket.registers
+                    total += len(registers) * 100 if isinstance(registers, dict) else len(registers)
+        return total
+
+    def _register(self, sender_id: str):
+        h = _hash(sender_id)
+        index = h >> (64 - self.precision)
+        rest = (h << self.precision) & _MASK_64
+        return index, min(64 - rest.bit_length(), 64 - self.precision) + 1
+
+    def observe(self, beneficiary_id: str, sender_id: str, event_time=None) -> Optional[int]:
+        """Fold one transfer into the beneficiary's sketches.
+
+        Args:
+            beneficiary_id: beneficiary_account_id
+            sender_id: sender_user_id
+            event_time: Transfer time (datetime, epoch seconds or ms); now if None
+
+        Returns:
+            The distinct-sender estimate when this transfer takes the
+            beneficiary to alert_threshold or above in the alert window for
+            the first time in that window, else None
+        """
+        t = to_epoch_seconds(event_time) if event_time is not None else time.time()
+        index, rank = self._register(sender_id)
+
+        with self._lock:
+            rings = self._entries.get(beneficiary_id)
+            if rings is None:
+                rings = [{} for _ in self.windows]
+                self._entries[beneficiary_id] = rings
+                if len(self._entries) > self.capacity:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._alerted_until.pop(evicted, None)
+            else:
+                self._entries.move_to_end(beneficiary_id)
+
+            for ring, slice_seconds in zip(rings, self._slice):
+                bucket_id = int(t // slice_seconds)
+                bucket = ring.get(bucket_id)
+                if bucket is None:
+                    bucket = ring[bucket_id] = _Bucket()
+                    for old in [b for b in ring if b <= bucket_id - WINDOW_SLICES - 1]:
+                        del ring[old]
+                bucket.transfers += 1
+                registers = bucket.registers
+                current = registers.get(index, 0) if isinstance(registers, dict) else registers[index]
+                if current < rank:
+                    registers[index] = rank
+                    if isinstance(registers, dict) and len(registers) > self._sparse_max:
+                        dense = bytearray(self._registers)
+                        for i, r in registers.items():
+                            dense[i] = r
+                        bucket.registers = dense
+
+            if t < self._alerted_until.get(beneficiary_id, 0.0):
+                return None
+            distinct, _ = self._window_estimate(rings[0], self._slice[0], t)
+            if distinct < self.alert_threshold:
+                return None
+            self._alerted_until[beneficiary_id] = t + self.windows[0]
+            return distinct
+
+    def _window_estimate(self, ring: dict, slice_seconds: int, now: float):
+        """(distinct senders, transfers) over the buckets overlapping the window ending at `now`."""
+        current = int(now // slice_seconds)
+        merged = np.zeros(self._registers, dtype=np.uint8)
+        transfers = 0
+        for bucket_id, bucket in ring.items():
+            if current - WINDOW_SLICES < bucket_id <= current:
+                transfers += bucket.transfers
+                registers = bucket.registers
+                if isinstance(registers, dict):
+                    if registers:
+                        idx = np.fromiter(registers.keys(), dtype=np.int64, count=len(registers))
+                        ranks = np.fromiter(registers.values(), dtype=np.uint8, count=len(registers))
+                        merged[idx] = np.maximum(merged[idx], ranks)
+                else:
+                    np.maximum(merged, np.frombuffer(registers, dtype=np.uint8), out=merged)
+        if not transfers:
+            return 0, 0
+        return int(round(hll_estimate(merged))), transfers
+
+    def fan_in(self, beneficiary_id: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Distinct-sender and transfer counts per window (None if never seen).
+
+        Returns:
+            dict with distinct_senders_<window>, transfers_<window> for each
+            window (e.g. distinct_senders_1h) and alert_threshold
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rings = self._entries.get(beneficiary_id)
+            if rings is None:
+                return None
+            result: Dict[str, Any] = {}
+            for window, ring, slice_seconds in zip(self.windows, rings, self._slice):
+                distinct, transfers = self._window_estimate(ring, slice_seconds, now)
+                label = _window_label(window)
+                result[f"distinct_senders_{label}"] = distinct
+                result[f"transfers_{label}"] = transfers
+        result["alert_threshold"] = self.alert_threshold
+        return result
+
+    # -- persistence ---------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Write an atomic .npz snapshot (readers never see a partial file)."""
+        with self._lock:
+            keys = list(self._entries)
+            owners, window_index, bucket_ids, transfers, offsets = [], [], [], [], [0]
+            reg_index, reg_value = [], []
+            for owner, key in enumerate(keys):
+                for w, ring in enumerate(self._entries[key]):
+                    for bucket_id, bucket in ring.items():
+                        registers = bucket.registers
+                        if isinstance(registers, dict):
+                            items = sorted(registers.items())
+                        else:
+                            dense = np.frombuffer(registers, dtype=np.uint8)
+                            nonzero = np.flatnonzero(dense)
+                            items = zip(nonzero.tolist(), dense[nonzero].tolist())
+                        for i, r in items:
+                            reg_index.append(i)
+                            reg_value.append(r)
+                        owners.append(owner)
+                        window_index.append(w)
+                        bucket_ids.append(bucket_id)
+                        transfers.append(bucket.transfers)
+                        offsets.append(len(reg_index))
+            encoded = [key.encode("utf-8") for key in keys]
+            key_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(key) for key in encoded], out=key_offsets[1:])
+            alerted_until = np.array([self._alerted_until.get(key, 0.0) for key in keys], dtype=np.float64)
+            meta = {
+                "precision": self.precision, "windows": self.windows, "capacity": self.capacity,
+                "window_slices": WINDOW_SLICES, "alert_threshold": self.alert_threshold,
+                "watermarks": self.watermarks, "saved_at": time.time(),
+            }
+
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta)),
+                key_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8), key_offsets=key_offsets,
+                alerted_until=alerted_until,
+                owner=np.array(owners, dtype=np.int32), window=np.array(window_index, dtype=np.uint8),
+                bucket_id=np.array(bucket_ids, dtype=np.int64), transfers=np.array(transfers, dtype=np.int64),
+                reg_offsets=np.array(offsets, dtype=np.int64),
+                reg_index=np.array(reg_index, dtype=np.uint16), reg_value=np.array(reg_value, dtype=np.uint8),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FanInTracker":
+        """Load a snapshot written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["window_slices"] != WINDOW_SLICES:
+                raise ValueError(f"{path} was written with {meta['window_slices']} window slices")
+            tracker = cls(precision=meta["precision"], windows=meta["windows"], capacity=meta["capacity"],
+                          alert_threshold=meta["alert_threshold"])
+            tracker.watermarks = meta.get("watermarks", {})
+            key_bytes, key_offsets = data["key_bytes"].tobytes(), data["key_offsets"].tolist()
+            keys = [key_bytes[key_offsets[i]:key_offsets[i + 1]].decode("utf-8") for i in range(len(key_offsets) - 1)]
+            alerted_until = data["alerted_until"].tolist()
+            owners, windows = data["owner"].tolist(), data["window"].tolist()
+            bucket_ids, transfers = data["bucket_id"].tolist(), data["transfers"].tolist()
+            offsets = data["reg_offsets"].tolist()
+            reg_index, reg_value = data["reg_index"].tolist(), data["reg_value"].tolist()
+
+        for key, until in zip(keys, alerted_until):
+            tracker._entries[key] = [{} for _ in tracker.windows]
+            if until:
+                tracker._alerted_until[key] = until
+        for row, owner in enumerate(owners):
+            bucket = _Bucket()
+            bucket.transfers = transfers[row]
+            start, end = offsets[row], offsets[row + 1]
+            if end - start > tracker._sparse_max:
+                dense = bytearray(tracker._registers)
+                for i, r in zip(reg_index[start:end], reg_value[start:end]):
+                    dense[i] = r
+                bucket.registers = dense
+            else:
+                bucket.registers = dict(zip(reg_index[start:end], reg_value[start:end]))
+            tracker._entries[keys[owner]][windows[row]][bucket_ids[row]] = bucket
+        return tracker
+
+
+def fan_in_alert(transfer: Dict[str, Any]) -> Dict[str, Any]:
+    """FraudInvestigationAlert for the transfer that crossed the fan-in threshold."""
+    sender = transfer["sender_user_id"]
+    return {
+        "alert_id": f"fanin_{transfer['transaction_id']}",
+        "transaction_id": transfer["transaction_id"],
+        "user_id": sender,
+        "amount": float(transfer["amount"]),
+        "beneficiary_account": transfer["beneficiary_account_id"],
+        "investigation_type": MULE_FAN_IN,
+        "suggested_quarantine_name": f"fraud-quarantine-{sender}",
+        "priority": "HIGH",
+        "event_time": int(to_epoch_seconds(transfer["event_time"]) * 1000) if transfer.get("event_time")
+        else int(time.time() * 1000),
+        "device_fingerprint": transfer.get("device_fingerprint"),
+    }
+
+
+def default_fan_in_path() -> str:
+    """Snapshot path (FAN_IN_TRACKER_PATH or <FEATURE_STORE_DIR>/fan_in.npz)."""
+    from .feature_store import _default_directory
+    return os.getenv("FAN_IN_TRACKER_PATH", os.path.join(_default_directory(), "fan_in.npz"))
+
+
+# Singleton instance
+_fan_in_tracker = SnapshotHolder("FanIn", default_fan_in_path, FanInTracker.load, FanInTracker)
+
+
+def get_fan_in_tracker() -> FanInTracker:
+    """Get the process-wide tracker, reloading the snapshot when it is replaced."""
+    return _fan_in_tracker.get()
+
+
+def set_fan_in_tracker(tracker) -> None:
+    """Override the tracker (e.g. one updated in-process). None resets to the snapshot."""
+    _fan_in_tracker.set(tracker)
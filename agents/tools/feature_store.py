@@ -0,0 +1,457 @@
+"""Local snapshot feature store for Detective lookups.
+
+Bulk-exports `customer_profiles` and `beneficiary_graph` from BigQuery into
+compact on-disk columnar files with an open-addressing hash index. Readers
+memory-map the files, so a point lookup costs microseconds instead of a
+BigQuery round trip, and every worker process on the host shares the same
+page-cache pages.
+
+Snapshot file layout (little-endian):
+    header   magic, version, column count, row count, index slots, created_at
+    columns  per column: name, type code, data offset
+    index    int32[index_slots] row numbers (-1 = empty slot), linear probing
+    data     per column: uint8[nrows] validity bytes (8-byte aligned), then
+               int   -> int64[nrows]
+               float -> float64[nrows]
+               bool  -> uint8[nrows]
+               str   -> uint32[nrows + 1] offsets, then UTF-8 bytes
+
+Column 0 is always the (non-null, string) lookup key.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.metrics import get_metrics_registry
+from .bigquery_utils import run_query
+
+MAGIC = b"SGFS"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHQQd")
+_COLUMN = struct.Struct("<32s1s7xQ")
+_INT64 = struct.Struct("<q")
+_FLOAT64 = struct.Struct("<d")
+_OFFSETS = struct.Struct("<II")
+_SLOT = struct.Struct("<i")
+
+# Type codes stored in the column descriptors
+_TYPE_CODES = {"str": b"s", "int": b"q", "float": b"d", "bool": b"?"}
+_TYPE_NAMES = {v: k for k, v in _TYPE_CODES.items()}
+
+# Snapshot column definitions (key column first). These mirror the columns
+# returned by get_user_history / get_beneficiary_risk.
+PROFILE_COLUMNS = [
+    ("user_id", "str"),
+    ("age_group", "str"),
+    ("account_tenure_days", "int"),
+    ("avg_transfer_amount", "float"),
+    ("behavioral_segment", "str"),
+]
+
+BENEFICIARY_COLUMNS = [
+    ("account_id", "str"),
+    ("account_age_hours", "int"),
+    ("risk_score", "int"),
+    ("linked_to_flagged_device", "bool"),
+]
+
+SNAPSHOT_TABLES = {
+    "customer_profiles": PROFILE_COLUMNS,
+    "beneficiary_graph": BENEFICIARY_COLUMNS,
+}
+
+# How often readers stat() the snapshot file to pick up a newer export
+_RECHECK_SECONDS = 5.0
+
+
+def _default_directory() -> str:
+    """Default snapshot directory (FEATURE_STORE_DIR or <repo>/.feature_store)."""
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.getenv("FEATURE_STORE_DIR", os.path.join(base_dir, ".feature_store"))
+
+
+def _hash_key(key: str) -> int:
+    """64-bit hash of a lookup key."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _align8(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_snapshot(
+    path: str,
+    columns: List[Tuple[str, str]],
+    rows: List[Dict[str, Any]],
+    created_at: Optional[float] = None
+) -> int:
+    """Write rows to a snapshot file, replacing any existing file atomically.
+
+    Args:
+        path: Destination file path
+        columns: List of (name, type) pairs; the first column is the lookup key
+        rows: Row dicts keyed by column name. Later rows win on duplicate keys.
+        created_at: Snapshot timestamp (epoch seconds, defaults to now)
+
+    Returns:
+        Number of rows written (after de-duplication)
+    """
+    key_name = columns[0][0]
+
+    # De-duplicate on the key, keeping the last occurrence
+    by_key: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        key = row.get(key_name)
+        if key is not None:
+            by_key[str(key)] = row
+    rows = list(by_key.values())
+    nrows = len(rows)
+
+    slots = 8
+    while slots < nrows * 2:
+        slots *= 2
+
+    # Build the hash index
+    index = array("i", [-1]) * slots
+    mask = slots - 1
+    for row_num, row in enumerate(rows):
+        slot = _hash_key(str(row[key_name])) & mask
+        while index[slot] != -1:
+            slot = (slot + 1) & mask
+        index[slot] = row_num
+
+    # Encode each column
+    sections = []
+    for name, col_type in columns:
+        values = [row.get(name) for row in rows]
+        validity = bytes(0 if v is None else 1 for v in values)
+        if col_type == "str":
+            encoded = [b"" if v is None else str(v).encode("utf-8") for v in values]
+            offsets = array("I", [0]) * (nrows + 1)
+            position = 0
+            for i, item in enumerate(encoded):
+                position += len(item)
+                offsets[i + 1] = position
+            payload = offsets.tobytes() + b"".join(encoded)
+        elif col_type == "int":
+            payload = array("q", (0 if v is None else int(v) for v in values)).tobytes()
+        elif col_type == "float":
+            payload = array("d", (0.0 if v is None else float(v) for v in values)).tobytes()
+        elif col_type == "bool":
+            payload = bytes(1 if v else 0 for v in values)
+        else:
+            raise ValueError(f"Unsupported column type: {col_type}")
+        sections.append((validity, payload))
+
+    # Lay out the file
+    header_size = _HEADER.size + _COLUMN.size * len(columns)
+    index_offset = _align8(header_size)
+    cursor = _align8(index_offset + slots * _SLOT.size)
+    data_offsets = []
+    for validity, payload in sections:
+        data_offsets.append(cursor)
+        cursor = _align8(_align8(cursor + len(validity)) + len(payload))
+
+    buf = bytearray(cursor)
+    _HEADER.pack_into(buf, 0, MAGIC, FORMAT_VERSION, len(columns), nrows, slots,
+                      created_at if created_at is not None else time.time())
+    for i, (name, col_type) in enumerate(columns):
+        _COLUMN.pack_into(buf, _HEADER.size + i * _COLUMN.size,
+                          name.encode("utf-8")[:32], _TYPE_CODES[col_type], data_offsets[i])
+    buf[index_offset:index_offset + slots * _SLOT.size] = index.tobytes()
+    for offset, (validity, payload) in zip(data_offsets, sections):
+        buf[offset:offset + len(validity)] = validity
+        values_offset = _align8(offset + len(validity))
+        buf[values_offset:values_offset + len(payload)] = payload
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(buf)
+    os.replace(tmp_path, path)
+    return nrows
+
+
+class SnapshotTable:
+    """Read-only, memory-mapped view of one snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._stat = os.fstat(f.fileno())
+
+        magic, version, ncols, nrows, slots, created_at = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a v{FORMAT_VERSION} feature snapshot")
+
+        self.nrows = nrows
+        self.created_at = created_at
+        self._slots = slots
+        self._index_offset = _align8(_HEADER.size + _COLUMN.size * ncols)
+
+        # (name, type, validity offset, values offset)
+        self.columns: List[Tuple[str, str, int, int]] = []
+        for i in range(ncols):
+            raw_name, code, offset = _COLUMN.unpack_from(self._mm, _HEADER.size + i * _COLUMN.size)
+            name = raw_name.rstrip(b"\x00").decode("utf-8")
+            self.columns.append((name, _TYPE_NAMES[code], offset, _align8(offset + nrows)))
+
+    def is_stale_file(self) -> bool:
+        """Check whether the file on disk was replaced by a newer export."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return True
+        return (st.st_ino, st.st_mtime_ns) != (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    @property
+    def age_seconds(self) -> float:
+        """Seconds since the snapshot was exported."""
+        return max(0.0, time.time() - self.created_at)
+
+    def _read_value(self, column: Tuple[str, str, int, int], row_num: int) -> Any:
+        _, col_type, validity_offset, values_offset = column
+        if not self._mm[validity_offset + row_num]:
+            return None
+        if col_type == "str":
+            start, end = _OFFSETS.unpack_from(self._mm, values_offset + 4 * row_num)
+            heap = values_offset + 4 * (self.nrows + 1)
+            return self._mm[heap + start:heap + end].decode("utf-8")
+        if col_type == "int":
+            return _INT64.unpack_from(self._mm, values_offset + 8 * row_num)[0]
+        if col_type == "float":
+            return _FLOAT64.unpack_from(self._mm, values_offset + 8 * row_num)[0]
+        return bool(self._mm[values_offset + row_num])
+
+    def find_row(self, key: str) -> int:
+        """Return the row number for a key, or -1 if absent."""
+        if self.nrows == 0:
+            return -1
+        key_column = self.columns[0]
+        mask = self._slots - 1
+        slot = _hash_key(key) & mask
+        while True:
+            row_num = _SLOT.unpack_from(self._mm, self._index_offset + 4 * slot)[0]
+            if row_num == -1:
+                return -1
+            if self._read_value(key_column, row_num) == key:
+                return row_num
+            slot = (slot + 1) & mask
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a row by key.
+
+        Returns:
+            Row dict keyed by column name, or None if the key is not present
+        """
+        row_num = self.find_row(key)
+        if row_num < 0:
+            return None
+        return {column[0]: self._read_value(column, row_num) for column in self.columns}
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class FeatureStore:
+    """Snapshot-backed lookups for customer profiles and beneficiaries.
+
+    Snapshots are produced by `refresh()` (typically from a single exporter
+    process, see scripts/export_feature_snapshots.py) and picked up by all
+    readers automatically when the files are replaced.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_age_seconds: Optional[float] = None):
+        """Initialize the feature store.
+
+        Args:
+            directory: Snapshot directory (defaults to FEATURE_STORE_DIR)
+            max_age_seconds: Ignore snapshots older than this
+                (defaults to FEATURE_STORE_MAX_AGE_SECONDS, 24 hours)
+        """
+        self.directory = directory or _default_directory()
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else float(
+            os.getenv("FEATURE_STORE_MAX_AGE_SECONDS", "86400")
+        )
+        self._lock = threading.Lock()
+        self._tables: Dict[str, Optional[SnapshotTable]] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._refresher: Optional[threading.Thread] = None
+
+        metrics = get_metrics_registry()
+        for table_name in SNAPSHOT_TABLES:
+            metrics.register_gauge(
+                "feature_store.snapshot_age_seconds",
+                lambda t=table_name: self._age_or_missing(t),
+                table=table_name
+            )
+
+    def path_for(self, table_name: str) -> str:
+        """Path of the snapshot file for a table."""
+        return os.path.join(self.directory, f"{table_name}.sgfs")
+
+    def _table(self, table_name: str) -> Optional[SnapshotTable]:
+        """Get the open snapshot for a table, reopening it if it was replaced."""
+        now = time.monotonic()
+        if now - self._checked_at.get(table_name, -_RECHECK_SECONDS) < _RECHECK_SECONDS:
+            return self._tables.get(table_name)
+
+        with self._lock:
+            self._checked_at[table_name] = now
+            current = self._tables.get(table_name)
+            if current is not None and not current.is_stale_file():
+                return current
+
+            path = self.path_for(table_name)
+            try:
+                table = SnapshotTable(path) if os.path.exists(path) else None
+            except Exception as e:
+                print(f"[FeatureStore] Failed to open snapshot {path}: {e}")
+                table = None
+
+            # Old mappings are left to the garbage collector: concurrent readers
+            # may still hold a reference to them.
+            self._tables[table_name] = table
+            return table
+
+    def lookup(self, table_name: str, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a key in a table snapshot.
+
+        Returns:
+            Row dict, or None if there is no fresh snapshot or the key is absent
+        """
+        metrics = get_metrics_registry()
+        table = self._table(table_name)
+        if table is None or table.age_seconds > self.max_age_seconds:
+            metrics.inc("feature_store.unavailable", table=table_name)
+            return None
+
+        try:
+            row = table.get(key)
+        except Exception as e:
+            print(f"[FeatureStore] Lookup failed in {table_name}: {e}")
+            return None
+
+        metrics.inc("feature_store.hits" if row else "feature_store.misses", table=table_name)
+        return row
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Customer profile in the get_user_history result shape."""
+        row = self.lookup("customer_profiles", user_id)
+        if row is None:
+            return None
+        row["avg_transfer_amount"] = float(row["avg_transfer_amount"]) if row["avg_transfer_amount"] else 0.0
+        return row
+
+    def get_beneficiary(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """Beneficiary record in the get_beneficiary_risk result shape."""
+        return self.lookup("beneficiary_graph", account_id)
+
+    def snapshot_age_seconds(self, table_name: str) -> Optional[float]:
+        """Age of the current snapshot for a table, or None if there is none."""
+        table = self._table(table_name)
+        return table.age_seconds if table is not None else None
+
+    def _age_or_missing(self, table_name: str) -> float:
+        """Snapshot age for the metrics gauge (-1 when no snapshot exists)."""
+        age = self.snapshot_age_seconds(table_name)
+        return -1.0 if age is None else age
+
+    def refresh(self, client=None, dataset: Optional[str] = None) -> Dict[str, int]:
+        """Export fresh snapshots of all tables from BigQuery.
+
+        Args:
+            client: BigQuery client (defaults to bigquery_utils.get_client())
+            dataset: Dataset name (defaults to BIGQUERY_DATASET)
+
+        Returns:
+            dict mapping table name to number of rows exported
+        """
+        if client is None:
+            from .bigquery_utils import get_client
+            client = get_client()
+        dataset = dataset or os.getenv("BIGQUERY_DATASET", "streamguard_threats")
+
+        exported = {}
+        for table_name, columns in SNAPSHOT_TABLES.items():
+            started = time.time()
+            exported[table_name] = export_table(client, dataset, table_name, columns, self.path_for(table_name))
+            print(f"[FeatureStore] Exported {exported[table_name]} rows from {table_name} "
+                  f"in {time.time() - started:.1f}s")
+        return exported
+
+    def start_refresher(self, interval_seconds: float, client=None) -> threading.Thread:
+        """Start a daemon thread that re-exports snapshots periodically.
+
+        Only one process per host should run the refresher; readers in other
+        processes pick up the new files on their next recheck.
+        """
+        if self._refresher is not None and self._refresher.is_alive():
+            return self._refresher
+
+        def _loop():
+            while True:
+                try:
+                    self.refresh(client=client)
+                except Exception as e:
+                    print(f"[FeatureStore] Snapshot refresh failed: {e}")
+                time.sleep(interval_seconds)
+
+        self._refresher = threading.Thread(target=_loop, name="feature-store-refresher", daemon=True)
+        self._refresher.start()
+        return self._refresher
+
+
+def export_table(client, dataset: str, table_name: str, columns: List[Tuple[str, str]], path: str) -> int:
+    """Bulk-export one BigQuery table into a snapshot file.
+
+    Keeps only the most recent row per key (tables are append-only, so the
+    playground may have inserted several versions of the same record).
+
+    Args:
+        client: BigQuery client
+        dataset: Dataset name
+        table_name: Source table
+        columns: Snapshot columns (key first)
+        path: Destination snapshot path
+
+    Returns:
+        Number of rows written
+    """
+    key_name = columns[0][0]
+    column_list = ", ".join(name for name, _ in columns)
+    query = f"""
+    SELECT {column_list}
+    FROM `{dataset}.{table_name}`
+    WHERE {key_name} IS NOT NULL
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY {key_name} ORDER BY created_at DESC) = 1
+    """
+
+    created_at = time.time()
+    result = run_query(client, query, table=table_name, source="feature_store", page_size=100_000)
+    try:
+        # Streams through the BigQuery Storage Read API when
+        # google-cloud-bigquery-storage is installed
+        rows = result.to_arrow(create_bqstorage_client=True).to_pylist()
+    except (ImportError, ValueError):
+        rows = [dict(row.items()) for row in result]
+    return write_snapshot(path, columns, rows, created_at=created_at)
+
+
+# Singleton instance
+_feature_store = None
+
+def get_feature_store() -> FeatureStore:
+    """Get the singleton feature store instance."""
+    global _feature_store
+    if _feature_store is None:
+        _feature_store = FeatureStore()
+    return _feature_store
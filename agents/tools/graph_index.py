@@ -0,0 +1,437 @@
+"""Multi-hop mule-network index over users, beneficiary accounts and devices.
+
+beneficiary_graph.linked_to_flagged_device is a single precomputed flag. This
+index keeps the whole transfer graph in memory so get_beneficiary_risk can
+also answer "how many hops is this account from a known-bad node?" and "how
+big is the network it belongs to?".
+
+Nodes are typed keys ("user:<id>", "account:<id>", "device:<fingerprint>").
+Edges come from customer_bank_transfers: sender -> beneficiary account and
+sender -> device. Flagged nodes are known-bad accounts, devices and users
+(quarantined transfers, high-risk beneficiaries).
+
+Layout (all NumPy, no Python object per edge):
+
+- adjacency: CSR arrays (int64 indptr, int32 indices), undirected
+- clusters: union-find parent/size arrays with a flagged-node count per root
+- hops_to_flagged: uint8 distance to the nearest flagged node (multi-source
+  BFS, capped at max_hops)
+
+Both queries are array reads, so they take microseconds. The index is built
+in bulk with vectorized operations (build / from_edges), then kept current
+incrementally: add_edge() unions the two clusters and relaxes distances with
+a bounded BFS, flag() marks a node and relaxes around it. New edges live in
+a small delta adjacency until compact() folds them into the CSR arrays.
+Distances only ever shrink; un-flagging a node needs a rebuild.
+
+Snapshots are written by scripts/build_graph_index.py and loaded by the
+tools from GRAPH_INDEX_PATH (default <FEATURE_STORE_DIR>/graph_index.npz).
+Edges and flags added at runtime are process-local until the next rebuild
+(see flag()).
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .snapshot_loader import SnapshotHolder
+
+NODE_KINDS = ("user", "account", "device")
+DEFAULT_MAX_HOPS = 4
+UNREACHED = np.iinfo(np.uint8).max
+
+_LOW_32 = np.uint64(0xFFFFFFFF)
+
+
+def node_key(kind: str, value: str) -> str:
+    """Typed node key, e.g. node_key("account", "acc_1") == "account:acc_1"."""
+    if kind not in NODE_KINDS:
+        raise ValueError(f"Unknown node kind {kind!r} (expected one of {NODE_KINDS})")
+    return f"{kind}:{value}"
+
+
+def build_csr(src: np.ndarray, dst: np.ndarray, num_nodes: int):
+    """Undirected CSR adjacency from an edge list (duplicates and self-loops dropped).
+
+    Edges are packed as (head << 32 | tail) uint64 and sorted in place, which
+    needs ~16 bytes per edge of scratch instead of an int64 argsort.
+
+    Returns:
+        (indptr int64[num_nodes + 1], indices int32[...])
+    """
+    edges = len(src)
+    packed = np.empty(2 * edges, dtype=np.uint64)
+    np.left_shift(src.astype(np.uint64), np.uint64(32), out=packed[:edges])
+    packed[:edges] |= dst.astype(np.uint64)
+    np.left_shift(dst.astype(np.uint64), np.uint64(32), out=packed[edges:])
+    packed[edges:] |= src.astype(np.uint64)
+    packed.sort()
+
+    keep = np.empty(len(packed), dtype=bool)
+    keep[:1] = True
+    np.not_equal(packed[1:], packed[:-1], out=keep[1:])
+
+    tails = (packed & _LOW_32).astype(np.int32)
+    packed >>= np.uint64(32)
+    heads = packed.astype(np.int32)
+    del packed
+    keep &= heads != tails
+
+    indices = tails[keep]
+    del tails
+    counts = np.bincount(heads[keep], minlength=num_nodes)
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, indices
+
+
+def gather_neighbors(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """All CSR neighbors of `nodes`, concatenated (vectorized)."""
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+    return indices[offsets]
+
+
+def connected_components(src: np.ndarray, dst: np.ndarray, num_nodes: int) -> np.ndarray:
+    """Union-find roots for every node, computed with vectorized hooking.
+
+    Each round hooks the larger root of every cross-component edge onto the
+    smaller one, then compresses paths by pointer jumping until every node
+    points at its root. Edges inside one component are dropped as they go,
+    so rounds get cheaper; a handful of rounds suffice in practice.
+
+    Returns:
+        int32 array: the root (smallest node ID) of each node's component
+    """
+    parent = np.arange(num_nodes, dtype=np.int32)
+    src, dst = src.astype(np.int32, copy=False), dst.astype(np.int32, copy=False)
+    while True:
+        src_root, dst_root = parent[src], parent[dst]
+        active = src_root != dst_root
+        if not active.any():
+            return parent
+        src, dst = src[active], dst[active]
+        src_root, dst_root = src_root[active], dst_root[active]
+        # Roots only ever point at smaller IDs, so no cycles can form
+        parent[np.maximum(src_root, dst_root)] = np.minimum(src_root, dst_root)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+def multi_source_distances(indptr: np.ndarray, indices: np.ndarray, sources: np.ndarray,
+                           num_nodes: int, max_hops: int) -> np.ndarray:
+    """Hop distance from the nearest source (UNREACHED beyond max_hops), level-synchronous BFS."""
+    dist = np.full(num_nodes, UNREACHED, dtype=np.uint8)
+    frontier = np.unique(sources)
+    dist[frontier] = 0
+    for hop in range(1, max_hops + 1):
+        if frontier.size == 0:
+            break
+        neighbors = gather_neighbors(indptr, indices, frontier)
+        frontier = np.unique(neighbors[dist[neighbors] == UNREACHED])
+        dist[frontier] = hop
+    return dist
+
+
+class GraphIndex:
+    """In-memory user/account/device graph with cluster and flagged-distance queries."""
+
+    def __init__(self, max_hops: int = DEFAULT_MAX_HOPS):
+        """Create an empty index (use build / from_edges for bulk loads).
+
+        Args:
+            max_hops: Distances to flagged nodes are tracked up to this many hops
+        """
+        self.max_hops = max_hops
+        self.built_at = time.time()
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self.num_nodes = 0
+
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._delta: Dict[int, set] = {}
+
+        self._parent = np.zeros(0, dtype=np.int32)
+        self._size = np.zeros(0, dtype=np.int32)
+        self._flagged_count = np.zeros(0, dtype=np.int32)
+        self._flagged = np.zeros(0, dtype=bool)
+        self._dist = np.zeros(0, dtype=np.uint8)
+
+    @classmethod
+    def build(cls, src: np.ndarray, dst: np.ndarray, num_nodes: int, flagged: Optional[np.ndarray] = None,
+              keys: Optional[List[str]] = None, max_hops: int = DEFAULT_MAX_HOPS) -> "GraphIndex":
+        """Bulk-build from integer edge arrays (node IDs in [0, num_nodes)).
+
+        Args:
+            src, dst: Undirected edges
+            num_nodes: Number of nodes
+            flagged: Node IDs of known-bad nodes
+            keys: Node key per ID (optional; without keys only ID queries work)
+            max_hops: Distance cap for hops_to_flagged
+        """
+        index = cls(max_hops=max_hops)
+        flagged = np.asarray(flagged if flagged is not None else [], dtype=np.int64)
+
+        index._indptr, index._indices = build_csr(src, dst, num_nodes)
+        index._parent = connected_components(src, dst, num_nodes)
+        index._size = np.bincount(index._parent, minlength=num_nodes).astype(np.int32)
+        index._flagged = np.zeros(num_nodes, dtype=bool)
+        index._flagged[flagged] = True
+        flagged_nodes = np.flatnonzero(index._flagged)
+        index._flagged_count = np.bincount(index._parent[flagged_nodes], minlength=num_nodes).astype(np.int32)
+        index._dist = multi_source_distances(index._indptr, index._indices, flagged_nodes, num_nodes, max_hops)
+        index.num_nodes = num_nodes
+
+        if keys is not None:
+            index._keys = list(keys)
+            index._ids = {key: i for i, key in enumerate(index._keys)}
+        return index
+
+    @classmethod
+    def from_edges(cls, left_keys: Sequence[str], right_keys: Sequence[str], flagged_keys: Iterable[str] = (),
+                   max_hops: int = DEFAULT_MAX_HOPS) -> "GraphIndex":
+        """Bulk-build from typed node keys (see node_key) with vectorized ID assignment."""
+        flagged_keys = list(flagged_keys)
+        all_keys = np.concatenate([
+            np.asarray(left_keys, dtype=object),
+            np.asarray(right_keys, dtype=object),
+            np.asarray(flagged_keys, dtype=object),
+        ])
+        if all_keys.size == 0:
+            return cls(max_hops=max_hops)
+        unique_keys, ids = np.unique(all_keys, return_inverse=True)
+        edges = len(left_keys)
+        return cls.build(
+            ids[:edges], ids[edges:2 * edges], len(unique_keys),
+            flagged=ids[2 * edges:], keys=unique_keys.tolist(), max_hops=max_hops,
+        )
+
+    @property
+    def num_edges(self) -> int:
+        """Undirected edges (CSR plus delta)."""
+        return (len(self._indices) + sum(len(v) for v in self._delta.values())) // 2
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the backing arrays (excludes the key dictionary)."""
+        return sum(a.nbytes for a in (
+            self._indptr, self._indices, self._parent, self._size,
+            self._flagged_count, self._flagged, self._dist,
+        ))
+
+    # -- node IDs -----------------------------------------------------------
+
+    def node_id(self, kind: str, value: str) -> int:
+        """ID of a node, or -1 if it is not in the graph."""
+        return self._ids.get(node_key(kind, value), -1)
+
+    def _ensure_node(self, key: str) -> int:
+        """ID of a node, adding it (as its own cluster) if new. Caller holds the lock."""
+        node = self._ids.get(key)
+        if node is not None:
+            return node
+        node = self.num_nodes
+        if node >= len(self._parent):
+            capacity = max(16, 2 * len(self._parent))
+            self._parent = np.concatenate([self._parent, np.arange(len(self._parent), capacity, dtype=np.int32)])
+            for name, fill in (("_size", 1), ("_flagged_count", 0), ("_flagged", False), ("_dist", UNREACHED)):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.full(capacity - len(array), fill, dtype=array.dtype)]))
+        self._parent[node] = node
+        self._size[node] = 1
+        self._ids[key] = node
+        self._keys.append(key)
+        self.num_nodes += 1
+        return node
+
+    # -- union-find ----------------------------------------------------------
+
+    def _root(self, node: int) -> int:
+        """Cluster root (read-only walk, safe for concurrent readers)."""
+        parent = self._parent
+        while parent[node] != node:
+            node = int(parent[node])
+        return node
+
+    def _find(self, node: int) -> int:
+        """Cluster root with path halving. Caller holds the lock."""
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = int(parent[node])
+        return node
+
+    def _union(self, a: int, b: int) -> None:
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+        self._flagged_count[root_a] += self._flagged_count[root_b]
+
+    # -- incremental updates -------------------------------------------------
+
+    def _neighbors(self, node: int) -> List[int]:
+        neighbors = []
+        if node + 1 < len(self._indptr):
+            neighbors = self._indices[self._indptr[node]:self._indptr[node + 1]].tolist()
+        delta = self._delta.get(node)
+        return neighbors + list(delta) if delta else neighbors
+
+    def _relax(self, seeds: Iterable[int]) -> None:
+        """Propagate shorter flagged distances from `seeds` (bounded BFS). Caller holds the lock."""
+        dist = self._dist
+        queue = deque(seeds)
+        while queue:
+            node = queue.popleft()
+            next_hop = int(dist[node]) + 1
+            if next_hop > self.max_hops:
+                continue
+            for neighbor in self._neighbors(node):
+                if dist[neighbor] > next_hop:
+                    dist[neighbor] = next_hop
+                    queue.append(neighbor)
+
+    def add_edge(self, kind_a: str, value_a: str, kind_b: str, value_b: str) -> None:
+        """Add an undirected edge (e.g. user -> account for a new transfer)."""
+        with self._lock:
+            a = self._ensure_node(node_key(kind_a, value_a))
+            b = self._ensure_node(node_key(kind_b, value_b))
+            if a == b or b in self._delta.get(a, ()):
+                return
+            self._delta.setdefault(a, set()).add(b)
+            self._delta.setdefault(b, set()).add(a)
+            self._union(a, b)
+            self._relax((a, b))
+
+    def flag(self, kind: str, value: str) -> None:
+        """Mark a node as known-bad (e.g. after a BLOCK).
+
+        Only this process's in-memory copy changes. Other workers do not see
+        the flag, and it is dropped when a rebuilt snapshot is swapped in. It
+        persists through the next rebuild by scripts/build_graph_index.py,
+        which re-flags the accounts and devices of quarantined_transactions
+        (the same way build_known_bad_filter.py handles the prescreen).
+        """
+        with self._lock:
+            node = self._ensure_node(node_key(kind, value))
+            if self._flagged[node]:
+                return
+            self._flagged[node] = True
+            self._flagged_count[self._find(node)] += 1
+            self._dist[node] = 0
+            self._relax((node,))
+
+    def compact(self) -> None:
+        """Fold delta edges into the CSR arrays."""
+        with self._lock:
+            if not self._delta:
+                return
+            csr_nodes = len(self._indptr) - 1
+            heads = np.repeat(np.arange(csr_nodes, dtype=np.int32), np.diff(self._indptr))
+            delta_src = np.fromiter((a for a, bs in self._delta.items() for _ in bs), dtype=np.int32)
+            delta_dst = np.fromiter((b for bs in self._delta.values() for b in bs), dtype=np.int32)
+            self._indptr, self._indices = build_csr(
+                np.concatenate([heads, delta_src]), np.concatenate([self._indices, delta_dst]), self.num_nodes
+            )
+            self._delta = {}
+
+    # -- queries -------------------------------------------------------------
+
+    def hops_to_flagged(self, node: int) -> Optional[int]:
+        """Hops to the nearest flagged node (0 = flagged itself), None beyond max_hops."""
+        hops = int(self._dist[node])
+        return None if hops == UNREACHED else hops
+
+    def cluster(self, node: int) -> Dict[str, int]:
+        """Size and flagged-node count of the node's connected component."""
+        root = self._root(node)
+        return {"cluster_size": int(self._size[root]), "cluster_flagged": int(self._flagged_count[root])}
+
+    def node_risk(self, kind: str, value: str) -> Optional[Dict[str, Any]]:
+        """Network risk for one node, or None if it is not in the graph.
+
+        Returns:
+            dict with flagged, hops_to_flagged, cluster_size, cluster_flagged
+        """
+        node = self.node_id(kind, value)
+        if node < 0:
+            return None
+        return {
+            "flagged": bool(self._flagged[node]),
+            "hops_to_flagged": self.hops_to_flagged(node),
+            **self.cluster(node),
+        }
+
+    # -- persistence ---------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Write an atomic .npz snapshot (delta edges are compacted first)."""
+        self.compact()
+        with self._lock:
+            n = self.num_nodes
+            encoded = [key.encode("utf-8") for key in self._keys]
+            key_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(key) for key in encoded], out=key_offsets[1:])
+            tmp_path = f"{path}.tmp.{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.array(json.dumps({"max_hops": self.max_hops, "num_nodes": n, "built_at": self.built_at})),
+                    indptr=self._indptr, indices=self._indices,
+                    parent=self._parent[:n], size=self._size[:n], flagged_count=self._flagged_count[:n],
+                    flagged=self._flagged[:n], dist=self._dist[:n],
+                    key_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8), key_offsets=key_offsets,
+                )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "GraphIndex":
+        """Load a snapshot written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            index = cls(max_hops=meta["max_hops"])
+            index.built_at = meta["built_at"]
+            index.num_nodes = meta["num_nodes"]
+            index._indptr, index._indices = data["indptr"], data["indices"]
+            index._parent, index._size = data["parent"], data["size"]
+            index._flagged_count, index._flagged, index._dist = data["flagged_count"], data["flagged"], data["dist"]
+            key_bytes, offsets = data["key_bytes"].tobytes(), data["key_offsets"].tolist()
+        index._keys = [key_bytes[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        index._ids = {key: i for i, key in enumerate(index._keys)}
+        return index
+
+
+def default_graph_path() -> str:
+    """Snapshot path (GRAPH_INDEX_PATH or <FEATURE_STORE_DIR>/graph_index.npz)."""
+    from .feature_store import _default_directory
+    return os.getenv("GRAPH_INDEX_PATH", os.path.join(_default_directory(), "graph_index.npz"))
+
+
+# Singleton instance
+_graph_index = SnapshotHolder("GraphIndex", default_graph_path, GraphIndex.load, GraphIndex)
+
+
+def get_graph_index() -> GraphIndex:
+    """Get the process-wide graph index, reloading the snapshot when it is replaced."""
+    return _graph_index.get()
+
+
+def set_graph_index(index) -> None:
+    """Override the graph index (e.g. one built in-process). None resets to the snapshot."""
+    _graph_index.set(index)
@@ -9,6 +9,10 @@ from confluent_kafka.schema_registry import SchemaRegistryClient, Schema
 from google.adk.tools import FunctionTool
 from dotenv import load_dotenv
 
+from config.resilience import (
+    RETRYABLE_HTTP_STATUSES, Deadline, RetryPolicy, call_with_retry, jittered, retryable_http_error,
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -42,16 +46,47 @@ CONNECT_API_BASE = "https://api.confluent.cloud/connect/v1"
 CONFLUENT_CLOUD_API_KEY = os.getenv('CONFLUENT_CLOUD_API_KEY')
 CONFLUENT_CLOUD_API_SECRET = os.getenv('CONFLUENT_CLOUD_API_SECRET')
 
+# Confluent REST calls: throttling, 5xx and connection errors are retried with
+# full jitter against the shared "confluent_rest" retry budget
+REST_TIMEOUT_SECONDS = 30
+REST_RETRY_POLICY = RetryPolicy(
+    max_attempts=4,
+    base_delay=1.0,
+    max_delay=15.0,
+    retry_on=(requests.RequestException,),
+    should_retry=retryable_http_error,
+)
+
 # --- Helper Functions ---
 
+def _rest_call(method: str, url: str, auth: HTTPBasicAuth, deadline: Deadline = None, **kwargs) -> requests.Response:
+    """Send a Confluent REST request, retrying transient failures.
+
+    Responses with other statuses (404, 409, ...) are returned for the
+    caller to handle.
+    """
+    def send():
+        response = requests.request(method, url, auth=auth, timeout=REST_TIMEOUT_SECONDS, **kwargs)
+        if response.status_code in RETRYABLE_HTTP_STATUSES:
+            response.raise_for_status()
+        return response
+
+    return call_with_retry(send, dependency="confluent_rest", policy=REST_RETRY_POLICY, deadline=deadline)
+
+
+def _sleep_within(deadline: Deadline, seconds: float) -> None:
+    """Sleep a jittered poll interval, but not past the deadline."""
+    time.sleep(min(jittered(seconds), deadline.remaining()))
+
+
 def wait_for_flink_statement(statement_name: str, timeout: int = 60) -> bool:
     """Wait for Flink statement to reach RUNNING state."""
     url = f"{FLINK_API_BASE}/sql/v1/organizations/{CONFLUENT_ORG_ID}/environments/{CONFLUENT_ENVIRONMENT_ID}/statements/{statement_name}"
     
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+    deadline = Deadline(timeout)
+    while not deadline.expired():
         try:
-            response = requests.get(url, auth=HTTPBasicAuth(FLINK_API_KEY, FLINK_API_SECRET))
+            response = _rest_call("GET", url, HTTPBasicAuth(FLINK_API_KEY, FLINK_API_SECRET), deadline=deadline)
             response.raise_for_status()
             
             state = response.json().get("status", {}).get("phase")
@@ -62,11 +97,9 @@ def wait_for_flink_statement(statement_name: str, timeout: int = 60) -> bool:
             elif state in ["FAILED", "STOPPED"]:
                 print(f"[Flink] ❌ Statement failed: {state}")
                 return False
-            
-            time.sleep(5)
         except Exception as e:
             print(f"[Flink] ⚠️ Error checking status: {e}")
-            time.sleep(5)
+        _sleep_within(deadline, 5)
             
     print("[Flink] ⚠️ Timeout waiting for RUNNING state")
     return False
@@ -75,14 +108,16 @@ def wait_for_connector_running(connector_name: str, timeout: int = 120) -> bool:
     """Wait for connector to reach RUNNING state."""
     url = f"{CONNECT_API_BASE}/environments/{CONFLUENT_ENVIRONMENT_ID}/clusters/{CONFLUENT_KAFKA_CLUSTER_ID}/connectors/{connector_name}/status"
     
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+    deadline = Deadline(timeout)
+    while not deadline.expired():
         try:
-            response = requests.get(url, auth=HTTPBasicAuth(CONFLUENT_CLOUD_API_KEY, CONFLUENT_CLOUD_API_SECRET))
+            response = _rest_call(
+                "GET", url, HTTPBasicAuth(CONFLUENT_CLOUD_API_KEY, CONFLUENT_CLOUD_API_SECRET), deadline=deadline
+            )
             # 404 is common while provisioning
             if response.status_code == 404:
                 print(f"[Connect] Connector '{connector_name}' not found yet (provisioning)...")
-                time.sleep(10)
+                _sleep_within(deadline, 10)
                 continue
                 
             response.raise_for_status()
@@ -98,11 +133,9 @@ def wait_for_connector_running(connector_name: str, timeout: int = 120) -> bool:
                     print("[Connect] Connector running, waiting for tasks...")
             elif state == "FAILED":
                 return False
-                
-            time.sleep(10)
         except Exception as e:
             print(f"[Connect] ⚠️ Error checking status: {e}")
-            time.sleep(10)
+        _sleep_within(deadline, 10)
             
     print("[Connect] ⚠️ Timeout waiting for RUNNING state")
     return False
@@ -208,7 +241,7 @@ def create_flink_statement(statement_name: str, sql: str) -> str:
     }
     
     try:
-        response = requests.post(url, json=payload, auth=HTTPBasicAuth(FLINK_API_KEY, FLINK_API_SECRET))
+        response = _rest_call("POST", url, HTTPBasicAuth(FLINK_API_KEY, FLINK_API_SECRET), json=payload)
         response.raise_for_status()
         
         result = response.json()
@@ -281,7 +314,7 @@ def create_connector(connector_name: str, topic_name: str, dataset: str = "strea
     }
     
     try:
-        response = requests.post(url, json=config, auth=HTTPBasicAuth(CONFLUENT_CLOUD_API_KEY, CONFLUENT_CLOUD_API_SECRET))
+        response = _rest_call("POST", url, HTTPBasicAuth(CONFLUENT_CLOUD_API_KEY, CONFLUENT_CLOUD_API_SECRET), json=config)
         if response.status_code == 409:
              print(f"ℹ️ Connector {connector_name} already exists.")
              # Check if running
@@ -0,0 +1,309 @@
+"""Bloom-filter prescreen for known-bad beneficiary accounts and devices.
+
+Answering "is this beneficiary / device already known to be bad?" from
+beneficiary_graph or quarantined_transactions costs a BigQuery query. This
+module keeps one Bloom filter per kind ("account", "device") in a single
+file that every worker memory-maps, so the check is k bit probes:
+
+- a negative answer is exact: the value was never flagged;
+- a positive answer is "probably flagged" (false-positive rate chosen at
+  build time, 0.1% by default) and should be confirmed with the exact
+  lookup before acting on it.
+
+scripts/build_known_bad_filter.py rebuilds the file from BigQuery and
+replaces it atomically. Workers map it shared and read-write, so
+add() (called when the Judge blocks a transfer) sets bits that every other
+process sees immediately; writers take an flock so concurrent read-modify-
+write of the same byte cannot lose a bit. Bits are never cleared: removing
+a value needs a rebuild.
+
+File layout (little-endian):
+    header   magic, version, filter count, created_at
+    filters  per filter: name, hash count, bit count, items inserted at
+             build time, data offset
+    data     per filter: bit array (bit i = byte i >> 3, mask 1 << (i & 7)),
+             4096-byte aligned
+
+Bit positions use double hashing: a 128-bit blake2b digest is split into
+h1, h2 and probe i is (h1 + i * h2) mod num_bits.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from config.metrics import get_metrics_registry
+from .snapshot_loader import SnapshotHolder
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows: single-writer only
+    HAS_FCNTL = False
+
+MAGIC = b"SGBF"
+FORMAT_VERSION = 1
+FILTER_KINDS = ("account", "device")
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+# Room for values added after the build before the false-positive rate degrades
+DEFAULT_HEADROOM = 2.0
+MIN_CAPACITY = 1024
+
+_HEADER = struct.Struct("<4sHHd")
+_FILTER = struct.Struct("<16sI4xQQQ")
+_PAGE = 4096
+_MASK_64 = (1 << 64) - 1
+
+
+def _digest(value: str):
+    """(h1, h2) for double hashing; h2 is forced odd so probes never collapse."""
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+def optimal_parameters(capacity: int, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE):
+    """(num_bits, num_hashes) for `capacity` items at the target false-positive rate."""
+    capacity = max(int(capacity), 1)
+    num_bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+    num_bits = -(-num_bits // 64) * 64
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+def bloom_bits(values: Iterable[str], num_bits: int, num_hashes: int) -> np.ndarray:
+    """Bit array (uint8[num_bits / 8]) with every value inserted, built vectorized."""
+    digests = b"".join(hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest() for value in values)
+    bits = np.zeros(num_bits // 8, dtype=np.uint8)
+    if not digests:
+        return bits
+    hashes = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+    h1, h2 = hashes[:, 0:1], hashes[:, 1:2] | np.uint64(1)
+    # uint64 arithmetic wraps like the scalar path's & _MASK_64
+    positions = (h1 + np.arange(num_hashes, dtype=np.uint64) * h2) % np.uint64(num_bits)
+    positions = np.unique(positions.ravel())
+    byte_index = (positions >> np.uint64(3)).astype(np.int64)
+    masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+    starts = np.flatnonzero(np.concatenate(([True], byte_index[1:] != byte_index[:-1])))
+    bits[byte_index[starts]] = np.bitwise_or.reduceat(masks, starts)
+    return bits
+
+
+class _MappedFile:
+    """An mmap plus the descriptor writers flock; closed with the last filter using it."""
+
+    def __init__(self, path: str):
+        writable = os.access(path, os.W_OK)
+        self.fd = os.open(path, os.O_RDWR if writable else os.O_RDONLY)
+        try:
+            self.mm = mmap.mmap(self.fd, 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except Exception:
+            os.close(self.fd)
+            raise
+        self.writable = writable
+
+    def __del__(self):
+        try:
+            os.close(self.fd)
+            self.mm.close()
+        except (AttributeError, BufferError, OSError):
+            pass
+
+
+class BloomFilter:
+    """Bloom filter over a byte buffer (a bytearray, or a region of a mapped file)."""
+
+    def __init__(self, buffer, offset: int, num_bits: int, num_hashes: int, items: int = 0,
+                 mapped: Optional[_MappedFile] = None):
+        self._buf = buffer
+        self._offset = offset
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.items = items
+        self._mapped = mapped
+        self._lock_fd = mapped.fd if mapped is not None and mapped.writable and HAS_FCNTL else None
+        self._lock = threading.Lock()
+
+    def _positions(self, value: str):
+        h1, h2 = _digest(value)
+        num_bits = self.num_bits
+        return [((h1 + i * h2) & _MASK_64) % num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, value: str) -> bool:
+        buf, offset = self._buf, self._offset
+        for position in self._positions(value):
+            if not buf[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, value: str) -> None:
+        """Insert a value (visible to every process mapping the same file)."""
+        positions = self._positions(value)
+        with self._lock:
+            if self._lock_fd is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                buf, offset = self._buf, self._offset
+                for position in positions:
+                    index = offset + (position >> 3)
+                    buf[index] = buf[index] | (1 << (position & 7))
+            finally:
+                if self._lock_fd is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def fill_ratio(self) -> float:
+        """Fraction of bits set (scans the whole array; for reporting only)."""
+        view = np.frombuffer(self._buf, dtype=np.uint8, count=self.num_bits // 8, offset=self._offset)
+        return int(np.unpackbits(view).sum()) / self.num_bits
+
+    def estimated_false_positive_rate(self) -> float:
+        """Current false-positive rate implied by the fill ratio."""
+        return self.fill_ratio() ** self.num_hashes
+
+
+class KnownBadFilter:
+    """One Bloom filter per kind ("account", "device"), usually memory-mapped from a file."""
+
+    def __init__(self, filters: Dict[str, BloomFilter], created_at: float = 0.0):
+        self.filters = filters
+        self.created_at = created_at
+
+    @classmethod
+    def empty(cls, capacity: int = MIN_CAPACITY) -> "KnownBadFilter":
+        """In-memory filters with nothing flagged (used while there is no file)."""
+        num_bits, num_hashes = optimal_parameters(capacity)
+        return cls({kind: BloomFilter(bytearray(num_bits // 8), 0, num_bits, num_hashes) for kind in FILTER_KINDS})
+
+    @staticmethod
+    def write(path: str, values: Dict[str, Iterable[str]],
+              false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+              headroom: float = DEFAULT_HEADROOM) -> Dict[str, dict]:
+        """Build a filter file atomically from {kind: values}.
+
+        Args:
+            path: Output file
+            values: Flagged values per kind (missing kinds get an empty filter)
+            false_positive_rate: Target rate at capacity
+            headroom: Capacity = headroom x the number of values (min MIN_CAPACITY)
+
+        Returns:
+            {kind: {"items", "num_bits", "num_hashes"}}
+        """
+        stats, sections = {}, []
+        offset = -(-(_HEADER.size + _FILTER.size * len(FILTER_KINDS)) // _PAGE) * _PAGE
+        for kind in FILTER_KINDS:
+            unique = set(v for v in values.get(kind, ()) if v)
+            num_bits, num_hashes = optimal_parameters(max(int(len(unique) * headroom), MIN_CAPACITY),
+                                                      false_positive_rate)
+            bits = bloom_bits(unique, num_bits, num_hashes)
+            sections.append((kind, offset, num_bits, num_hashes, len(unique), bits))
+            stats[kind] = {"items": len(unique), "num_bits": num_bits, "num_hashes": num_hashes}
+            offset += -(-len(bits) // _PAGE) * _PAGE
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            header = bytearray(sections[0][1])
+            _HEADER.pack_into(header, 0, MAGIC, FORMAT_VERSION, len(sections), time.time())
+            for i, (kind, data_offset, num_bits, num_hashes, items, _) in enumerate(sections):
+                _FILTER.pack_into(header, _HEADER.size + i * _FILTER.size,
+                                  kind.encode("utf-8"), num_hashes, num_bits, items, data_offset)
+            f.write(header)
+            for kind, data_offset, _, _, _, bits in sections:
+                f.seek(data_offset)
+                f.write(bits.tobytes())
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return stats
+
+    @classmethod
+    def open(cls, path: str) -> "KnownBadFilter":
+        """Map a filter file (read-write and shared when the file is writable)."""
+        mapped = _MappedFile(path)
+        mm = mapped.mm
+        magic, version, count, created_at = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a known-bad filter file (version {FORMAT_VERSION})")
+        filters = {}
+        for i in range(count):
+            raw_name, num_hashes, num_bits, items, offset = _FILTER.unpack_from(mm, _HEADER.size + i * _FILTER.size)
+            kind = raw_name.rstrip(b"\0").decode("utf-8")
+            filters[kind] = BloomFilter(mm, offset, num_bits, num_hashes, items, mapped=mapped)
+        return cls(filters, created_at=created_at)
+
+    def contains(self, kind: str, value: Optional[str]) -> bool:
+        """True if `value` is probably flagged (False is exact)."""
+        bloom = self.filters.get(kind)
+        return bool(value) and bloom is not None and value in bloom
+
+    def add(self, kind: str, value: Optional[str]) -> None:
+        """Flag a value. Read-only mappings cannot be updated (logged, not raised)."""
+        bloom = self.filters.get(kind)
+        if not value or bloom is None:
+            return
+        try:
+            bloom.add(value)
+        except TypeError as e:
+            print(f"[KnownBad] Cannot flag {kind} {value}: filter file is read-only ({e})")
+
+
+def default_filter_path() -> str:
+    """Filter path (KNOWN_BAD_FILTER_PATH or <FEATURE_STORE_DIR>/known_bad.bloom)."""
+    from .feature_store import _default_directory
+    return os.getenv("KNOWN_BAD_FILTER_PATH", os.path.join(_default_directory(), "known_bad.bloom"))
+
+
+# Singleton instance
+# Rebuilds replace the file (new inode); add() writes through the mapping
+# and only changes mtime, which must not trigger a remap
+_known_bad_filter = SnapshotHolder("KnownBad", default_filter_path, KnownBadFilter.open, KnownBadFilter.empty,
+                                   identity=lambda st: st.st_ino)
+
+
+def get_known_bad_filter() -> KnownBadFilter:
+    """Get the process-wide filter, remapping the file when it is rebuilt."""
+    return _known_bad_filter.get()
+
+
+def set_known_bad_filter(known_bad) -> None:
+    """Override the filter (e.g. an in-memory one for replays). None resets to the file."""
+    _known_bad_filter.set(known_bad)
+
+
+def prescreen(account_id: Optional[str] = None, device_fingerprint: Optional[str] = None) -> Dict[str, bool]:
+    """O(1) known-bad check before spending LLM or BigQuery budget.
+
+    Args:
+        account_id: Beneficiary account ID
+        device_fingerprint: Sender device fingerprint, if known
+
+    Returns:
+        dict with known_bad_account, known_bad_device (True = probably
+        flagged; confirm before acting) and hit (either is True)
+    """
+    known_bad = get_known_bad_filter()
+    result = {
+        "known_bad_account": known_bad.contains("account", account_id),
+        "known_bad_device": known_bad.contains("device", device_fingerprint),
+    }
+    result["hit"] = result["known_bad_account"] or result["known_bad_device"]
+
+    metrics = get_metrics_registry()
+    metrics.inc("prescreen.checks")
+    if result["hit"]:
+        metrics.inc("prescreen.hits")
+    return result
+
+
+def flag_known_bad(account_id: Optional[str] = None, device_fingerprint: Optional[str] = None) -> None:
+    """Add a blocked transfer's beneficiary / device to the shared filter."""
+    known_bad = get_known_bad_filter()
+    known_bad.add("account", account_id)
+    known_bad.add("device", device_fingerprint)
@@ -0,0 +1,357 @@
+"""Learned first-stage filter: P(SAFE) for an alert before any agent runs.
+
+Every alert over $1000 goes through the Detective, the Judge and the
+Enforcer (three LLM calls), and most of them end SAFE. This module scores
+an alert with a logistic regression over a handful of features that are
+available without BigQuery or an LLM:
+
+- the alert itself (amount, investigation_type, event hour),
+- the sender profile and beneficiary record from the local feature store,
+- the sender's count from the violation store.
+
+Alerts scoring at or above the model's threshold can skip the agent
+pipeline (scripts/run_adk_swarm.py). Missing lookups become explicit
+"missing" features; in the training data they correspond to not-found users
+and unknown accounts, so the model treats them as risky instead of
+extrapolating.
+
+The model is trained offline by scripts/train_learned_scorer.py from
+{"alert", "features", "investigation", "judgment"} records
+(LEARNED_SCORER_TRAINING_LOG written by the swarm). "features" is the exact
+vector features_for_alert() computed from the stores when the alert arrived,
+so the model trains on what it will see at serving time: a feature-store
+miss is a "missing" feature in both, even where the Detective later found
+the record in BigQuery. Older records without it fall back to the
+investigation's lookups. The label is judgment.decision == "SAFE". The
+threshold is the lowest score at which held-out alerts were still SAFE at
+the requested precision.
+
+Model file (.npz, written atomically like the baseline snapshot):
+    meta     JSON: format_version, model_version, features, threshold,
+             trained_at, training metrics
+    mean     float64[n_features] standardization offsets
+    scale    float64[n_features] standardization scales
+    weights  float64[n_features] coefficients on standardized features
+    bias     float64[1]
+
+A model whose format_version or feature list differs from this module is
+rejected, so a stale file cannot silently score a different feature layout.
+The file is LEARNED_SCORER_PATH (default
+<FEATURE_STORE_DIR>/learned_scorer.npz); readers reload it when it is
+replaced, and without a file there is no scorer (every alert is
+investigated).
+"""
+import json
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .snapshot_loader import SnapshotHolder
+
+FORMAT_VERSION = 1
+SAFE_DECISION = "SAFE"
+
+# Alert investigation types with their own indicator (others share none)
+ALERT_TYPES = ("high_value_transaction", "mule_fan_in")
+NEW_BENEFICIARY_HOURS = 24
+NIGHT_HOURS = range(0, 6)
+MAX_VIOLATIONS = 10
+
+# Feature order of the model vectors
+FEATURES = (
+    "log_amount",
+    "log_amount_ratio",
+    "amount_ratio_missing",
+    "type_high_value_transaction",
+    "type_mule_fan_in",
+    "night",
+    "profile_missing",
+    "log_tenure_days",
+    "previous_violations",
+    "beneficiary_missing",
+    "log_beneficiary_age_hours",
+    "beneficiary_age_missing",
+    "new_beneficiary",
+    "beneficiary_risk",
+    "linked_to_flagged_device",
+)
+
+DEFAULT_L2 = 1.0
+DEFAULT_TARGET_PRECISION = 0.995
+# Fewest held-out alerts above the threshold for its precision to count
+MIN_BYPASS_SUPPORT = 50
+
+
+def _present(record: Optional[Mapping[str, Any]]) -> bool:
+    """False for lookups that failed or returned an error placeholder."""
+    return bool(record) and not record.get("status")
+
+
+def _event_hour(event_time: Any) -> Optional[int]:
+    """UTC hour of an alert event_time (epoch millis, datetime or ISO string)."""
+    if isinstance(event_time, str):
+        try:
+            event_time = datetime.fromisoformat(event_time)
+        except ValueError:
+            return None
+    if isinstance(event_time, datetime):
+        if event_time.tzinfo is not None:
+            event_time = event_time.astimezone(timezone.utc)
+        return event_time.hour
+    if isinstance(event_time, (int, float)):
+        return int(event_time // 3_600_000 % 24)
+    return None
+
+
+def alert_features(
+    alert: Mapping[str, Any],
+    profile: Optional[Mapping[str, Any]],
+    beneficiary: Optional[Mapping[str, Any]],
+    previous_violations: Optional[int] = None,
+) -> list:
+    """Feature values (FEATURES order) for one alert.
+
+    Args:
+        alert: FraudInvestigationAlert fields
+        profile: Sender profile (get_user_history shape) or None
+        beneficiary: Beneficiary record (get_beneficiary_risk shape) or None
+        previous_violations: Violation store count; the larger of this and
+            the profile's count is used
+    """
+    amount = float(alert.get("amount") or 0.0)
+    has_profile = _present(profile)
+    has_beneficiary = _present(beneficiary)
+    profile = profile if has_profile else {}
+    beneficiary = beneficiary if has_beneficiary else {}
+
+    average = profile.get("avg_transfer_amount")
+    ratio_known = bool(average)
+    tenure = profile.get("account_tenure_days")
+    violations = max(int(profile.get("previous_violations") or 0), int(previous_violations or 0))
+    age = beneficiary.get("account_age_hours")
+    risk = beneficiary.get("risk_score")
+    investigation_type = alert.get("investigation_type")
+    hour = _event_hour(alert.get("event_time"))
+
+    return [
+        math.log1p(amount),
+        math.log((amount + 1.0) / (float(average) + 1.0)) if ratio_known else 0.0,
+        0.0 if ratio_known else 1.0,
+        1.0 if investigation_type == ALERT_TYPES[0] else 0.0,
+        1.0 if investigation_type == ALERT_TYPES[1] else 0.0,
+        1.0 if hour in NIGHT_HOURS else 0.0,
+        0.0 if has_profile else 1.0,
+        math.log1p(float(tenure)) if tenure is not None else 0.0,
+        float(min(violations, MAX_VIOLATIONS)),
+        0.0 if has_beneficiary else 1.0,
+        math.log1p(float(age)) if age is not None else 0.0,
+        1.0 if has_beneficiary and age is None else 0.0,
+        1.0 if age is not None and age < NEW_BENEFICIARY_HOURS else 0.0,
+        float(risk) / 100.0 if has_beneficiary and risk is not None else 0.0,
+        1.0 if beneficiary.get("linked_to_flagged_device") else 0.0,
+    ]
+
+
+def features_for_alert(alert: Mapping[str, Any]) -> list:
+    """Serving-time feature values for a live alert (feature and violation stores)."""
+    from .feature_store import get_feature_store
+    from .violation_store import get_violation_store
+
+    store = get_feature_store()
+    user_id = alert.get("user_id")
+    account = alert.get("beneficiary_account")
+    profile = store.get_profile(user_id) if user_id else None
+    beneficiary = store.get_beneficiary(account) if account else None
+    violations = get_violation_store().get(user_id) if user_id else 0
+    return alert_features(alert, profile, beneficiary, violations)
+
+
+def logged_features(record: Mapping[str, Any]) -> Optional[list]:
+    """The serving-time vector stored in a training record, if it has this module's FEATURES."""
+    features = record.get("features")
+    if not isinstance(features, Mapping) or features.keys() != set(FEATURES):
+        return None
+    return [float(features[name]) for name in FEATURES]
+
+
+def training_example(record: Mapping[str, Any]) -> Optional[Tuple[list, bool]]:
+    """(features, is_safe) from an {"alert", "features", "investigation", "judgment"} record.
+
+    Uses the logged serving-time features; records written before they were
+    logged (or with another feature list) are rebuilt from the
+    InvestigationReport's profile and beneficiary. Records without an alert
+    amount or a decision return None.
+    """
+    alert = record.get("alert") or {}
+    investigation = record.get("investigation") or {}
+    decision = (record.get("judgment") or {}).get("decision")
+    if alert.get("amount") is None or not decision:
+        return None
+    features = logged_features(record)
+    if features is None:
+        if not investigation:
+            return None
+        features = alert_features(
+            alert, investigation.get("user_profile"), investigation.get("beneficiary_analysis")
+        )
+    return features, decision == SAFE_DECISION
+
+
+def _sigmoid(logits: np.ndarray) -> np.ndarray:
+    return np.exp(-np.logaddexp(0.0, -logits))
+
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, l2: float = DEFAULT_L2,
+                 max_iter: int = 50, tol: float = 1e-8) -> Dict[str, np.ndarray]:
+    """L2-regularized logistic regression fitted with Newton's method.
+
+    Features are standardized first (constant columns keep scale 1), and the
+    bias is not penalized. With a few dozen features each Newton step is a
+    tiny linear solve, so millions of rows fit in seconds.
+
+    Returns:
+        mean, scale, weights and bias arrays for LearnedScorer
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = np.hstack([(X - mean) / scale, np.ones((len(X), 1))])
+
+    beta = np.zeros(Z.shape[1])
+    penalty = np.full(Z.shape[1], l2)
+    penalty[-1] = 0.0
+    for _ in range(max_iter):
+        p = _sigmoid(Z @ beta)
+        gradient = Z.T @ (p - y) + penalty * beta
+        hessian = (Z * (p * (1 - p))[:, None]).T @ Z + np.diag(penalty) + 1e-9 * np.eye(len(beta))
+        step = np.linalg.solve(hessian, gradient)
+        beta -= step
+        if np.max(np.abs(step)) < tol:
+            break
+    return {"mean": mean, "scale": scale, "weights": beta[:-1], "bias": beta[-1:]}
+
+
+def choose_threshold(probabilities: np.ndarray, is_safe: np.ndarray,
+                     target_precision: float = DEFAULT_TARGET_PRECISION,
+                     min_support: int = MIN_BYPASS_SUPPORT) -> Optional[float]:
+    """Lowest score whose alerts at or above it are SAFE with `target_precision`.
+
+    Returns None when no cutoff with at least `min_support` alerts above it
+    reaches the target (the model should not gate anything).
+    """
+    order = np.argsort(-probabilities, kind="stable")
+    ranked = probabilities[order]
+    precision = np.cumsum(is_safe[order]) / np.arange(1, len(order) + 1)
+    # Only cut between distinct scores: ties are bypassed together
+    boundary = np.append(ranked[1:] != ranked[:-1], True)
+    ok = np.flatnonzero(boundary & (precision >= target_precision) & (np.arange(1, len(order) + 1) >= min_support))
+    if len(ok) == 0:
+        return None
+    return float(ranked[ok[-1]])
+
+
+def auc(probabilities: np.ndarray, is_safe: np.ndarray) -> float:
+    """Area under the ROC curve (rank statistic, ties averaged)."""
+    positives = int(is_safe.sum())
+    negatives = len(is_safe) - positives
+    if positives == 0 or negatives == 0:
+        return float("nan")
+    order = np.argsort(probabilities, kind="stable")
+    ranks = np.empty(len(order))
+    ranks[order] = np.arange(1, len(order) + 1)
+    _, inverse, counts = np.unique(probabilities, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(inverse, ranks) / counts)[inverse]
+    return float((ranks[is_safe].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+class LearnedScorer:
+    """A trained model: P(SAFE) for feature vectors and the bypass threshold."""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, weights: np.ndarray, bias: np.ndarray,
+                 threshold: float, model_version: str, metadata: Optional[Dict[str, Any]] = None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64).reshape(1)
+        self.threshold = float(threshold)
+        self.model_version = model_version
+        self.metadata = metadata or {}
+        # Fold standardization into the coefficients: one dot product per alert
+        self._coefficients = self.weights / self.scale
+        self._intercept = float(self.bias[0] - self.mean @ self._coefficients)
+        self._coefficient_list = self._coefficients.tolist()
+
+    def score(self, features: Sequence[float]) -> float:
+        """P(SAFE) for one FEATURES vector."""
+        logit = self._intercept + sum(c * x for c, x in zip(self._coefficient_list, features))
+        return 1.0 / (1.0 + math.exp(-logit)) if logit >= 0 else math.exp(logit) / (1.0 + math.exp(logit))
+
+    def score_batch(self, X: np.ndarray) -> np.ndarray:
+        """P(SAFE) for every row of a float64[n, n_features] matrix."""
+        return _sigmoid(np.asarray(X, dtype=np.float64) @ self._coefficients + self._intercept)
+
+    def bypasses(self, probability: float) -> bool:
+        return probability >= self.threshold
+
+    def score_alert(self, alert: Mapping[str, Any]) -> float:
+        """P(SAFE) for a live alert, using the feature and violation stores."""
+        return self.score(features_for_alert(alert))
+
+    def save(self, path: str) -> None:
+        """Write an atomic .npz model file (readers never see a partial file)."""
+        meta = {
+            **self.metadata,
+            "format_version": FORMAT_VERSION,
+            "model_version": self.model_version,
+            "features": list(FEATURES),
+            "threshold": self.threshold,
+            "saved_at": time.time(),
+        }
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), mean=self.mean, scale=self.scale,
+                     weights=self.weights, bias=self.bias)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LearnedScorer":
+        """Load a model written by save().
+
+        Raises:
+            ValueError: If the file's format version or feature list does not
+                match this module
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"{path} has model format {meta.get('format_version')}, expected {FORMAT_VERSION}")
+            if tuple(meta.get("features", ())) != FEATURES:
+                raise ValueError(f"{path} was trained on different features")
+            return cls(data["mean"], data["scale"], data["weights"], data["bias"],
+                       threshold=meta["threshold"], model_version=meta["model_version"], metadata=meta)
+
+
+def default_scorer_path() -> str:
+    """Model path (LEARNED_SCORER_PATH or <FEATURE_STORE_DIR>/learned_scorer.npz)."""
+    from .feature_store import _default_directory
+    return os.getenv("LEARNED_SCORER_PATH", os.path.join(_default_directory(), "learned_scorer.npz"))
+
+
+# Singleton instance (None while there is no model file)
+_learned_scorer = SnapshotHolder("LearnedScorer", default_scorer_path, LearnedScorer.load, lambda: None)
+
+
+def get_learned_scorer() -> Optional[LearnedScorer]:
+    """Get the current model, reloading it when the file is replaced (None = no model)."""
+    return _learned_scorer.get()
+
+
+def set_learned_scorer(scorer: Optional[LearnedScorer]) -> None:
+    """Override the model (e.g. one trained in-process). None resets to the model file."""
+    _learned_scorer.set(scorer)
@@ -0,0 +1,539 @@
+"""Per-user home-location index with vectorized impossible-travel detection.
+
+Each user owns a slot holding a small ring buffer of recent session centroids
+(lat, lon, event time). The user's "home" is the coordinate-wise median of
+that history, and travel speed is measured against the most recent earlier
+session. Both are computed with NumPy, one transaction at a time (assess) or
+for a whole replay batch (assess_batch).
+
+Memory is bounded: slots live in fixed-size arrays (no Python object per
+user), addressed by a 64-bit hash of the user_id in a 4-way set-associative
+table. When a set is full the least recently seen user is evicted. With the
+default history of 8 centroids a slot takes ~114 bytes. An empty index fills
+LOCATION_INDEX_MEMORY_MB (32, ~290k users) unless LOCATION_INDEX_CAPACITY is
+set. The updater sizes a new index from the users in the baseline store and
+grows it (resized()) as the users it tracks approach capacity, so 10M users
+take ~2.3 GB only when there are 10M users. LOCATION_INDEX_HISTORY sets the
+history.
+
+Like the baseline store, the index is written by scripts/update_baselines.py,
+which folds every new session's coordinates into it and saves atomic .npz
+snapshots. Detective processes memory-map the snapshot from
+LOCATION_INDEX_PATH copy-on-write, so workers on one host share its pages,
+and they never record the sessions they look up. Each slot remembers the time up to
+which its history is complete. When a lookup is later than that (a user the
+snapshot lacks, or sessions since the last snapshot), the tools first merge
+the user's latest sessions before the lookup from the storage backend (see
+needs_seed / seed).
+"""
+import json
+import math
+import os
+import statistics
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Sequence, Tuple
+
+import numpy as np
+
+from .snapshot_loader import SnapshotHolder, memmap_npz
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Faster than a commercial flight between sessions is not physically plausible
+MAX_TRAVEL_SPEED_KMH = 900.0
+# Ignore speeds over short hops (GPS jitter, neighbouring cell towers)
+MIN_TRAVEL_DISTANCE_KM = 50.0
+# Floor for the time between sessions so near-simultaneous sessions don't divide by ~0
+MIN_TRAVEL_SECONDS = 60.0
+
+DEFAULT_MEMORY_MB = 32
+DEFAULT_HISTORY = 8
+WAYS = 4
+
+# The updater grows the index past this share of users per slot
+MAX_LOAD = 0.75
+
+# User_id hash: FNV-1a over the code points, then the splitmix64 finalizer.
+# The low bit is always set (0 marks an empty slot), so sets are picked by
+# the remaining bits. Stored in snapshots (here and in the baseline store),
+# so changing the hash or the set mapping needs a new version.
+FINGERPRINT_VERSION = "fnv1a64-codepoints-v2"
+_FNV_OFFSET = 0xCBF29CE484222325
+_FNV_PRIME = 0x100000001B3
+_MASK64 = (1 << 64) - 1
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km (NumPy broadcasting; NaN in, NaN out)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _haversine_scalar(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """haversine_km for a single pair of points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(max(a, 0.0), 1.0)))
+
+
+def to_epoch_seconds(value: Any) -> float:
+    """Convert a datetime or epoch (seconds or milliseconds) to epoch seconds."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    value = float(value)
+    return value / 1000 if value > 1e11 else value
+
+
+def epoch_seconds_array(values) -> np.ndarray:
+    """Vectorized to_epoch_seconds for numeric or datetime64 arrays (datetimes per item)."""
+    array = np.asarray(values)
+    if array.dtype.kind == "M":
+        return array.astype("datetime64[us]").astype(np.int64) / 1e6
+    if array.dtype.kind in "iuf":
+        array = array.astype(np.float64)
+        return np.where(array > 1e11, array / 1000, array)
+    return np.fromiter(map(to_epoch_seconds, values), dtype=np.float64, count=len(array))
+
+
+def _row_median(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of each row's `counts` non-NaN values (NaN sorts last); 0.0 for empty rows.
+
+    Same result as np.nanmedian(values, axis=1) without its masked-array path.
+    """
+    ordered = np.sort(values, axis=1)
+    rows = np.arange(len(values))
+    middle = (ordered[rows, np.maximum(counts - 1, 0) // 2] + ordered[rows, counts // 2]) / 2
+    return np.where(counts > 0, middle, 0.0)
+
+
+def _fingerprint(user_id: str) -> int:
+    """Non-zero 64-bit hash of a user_id (0 marks an empty slot)."""
+    h = _FNV_OFFSET
+    for code in map(ord, user_id):
+        if code:
+            h = ((h ^ code) * _FNV_PRIME) & _MASK64
+    h ^= h >> 30
+    h = (h * 0xBF58476D1CE4E5B9) & _MASK64
+    h ^= h >> 27
+    h = (h * 0x94D049BB133111EB) & _MASK64
+    h ^= h >> 31
+    return h | 1
+
+
+def fingerprints(user_ids: Sequence[str]) -> np.ndarray:
+    """_fingerprint for many user_ids at once.
+
+    The ids are packed into a fixed-width UTF-32 array and hashed one
+    character column at a time; the zero padding of shorter ids is skipped,
+    so every row gets the same value as _fingerprint (which likewise skips
+    NUL characters).
+    """
+    codes = np.ascontiguousarray(np.asarray(user_ids, dtype=np.str_))
+    width = codes.dtype.itemsize // 4
+    columns = codes.view(np.uint32).reshape(len(codes), width)
+    h = np.full(len(codes), _FNV_OFFSET, dtype=np.uint64)
+    prime = np.uint64(_FNV_PRIME)
+    for column in columns.T:
+        h = np.where(column != 0, (h ^ column) * prime, h)
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return h | np.uint64(1)
+
+
+def slot_bytes(history: int = DEFAULT_HISTORY) -> int:
+    """Bytes per user slot: fingerprint, `history` (lat, lon, ts) and bookkeeping."""
+    return 8 + 12 * history + 10
+
+
+def capacity_for_memory(memory_mb: float, history: int = DEFAULT_HISTORY) -> int:
+    """Users that fit in `memory_mb` megabytes of index arrays."""
+    return max(WAYS, int(memory_mb * 1024 ** 2) // slot_bytes(history))
+
+
+DEFAULT_CAPACITY = capacity_for_memory(DEFAULT_MEMORY_MB)
+
+
+class LocationIndex:
+    """Fixed-memory index of recent session locations per user."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, history: int = DEFAULT_HISTORY):
+        """Allocate the index.
+
+        Args:
+            capacity: Maximum number of users tracked (rounded up to a multiple of 4)
+            history: Session centroids kept per user
+        """
+        self.num_sets = max(1, -(-capacity // WAYS))
+        self.capacity = self.num_sets * WAYS
+        self.history = history
+        self._lock = threading.Lock()
+
+        # Zero-filled: a slot's first `count` history entries are valid
+        self._fp = np.zeros(self.capacity, dtype=np.uint64)
+        self._lat = np.zeros((self.capacity, history), dtype=np.float32)
+        self._lon = np.zeros((self.capacity, history), dtype=np.float32)
+        self._ts = np.zeros((self.capacity, history), dtype=np.uint32)
+        self._count = np.zeros(self.capacity, dtype=np.uint8)
+        self._head = np.zeros(self.capacity, dtype=np.uint8)
+        # History holds every located session before this time (epoch seconds)
+        self._synced = np.zeros(self.capacity, dtype=np.uint32)
+        self._last_seen = np.zeros(self.capacity, dtype=np.uint32)
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "fp": self._fp, "lat": self._lat, "lon": self._lon, "ts": self._ts,
+            "count": self._count, "head": self._head, "synced": self._synced, "last_seen": self._last_seen,
+        }
+
+    @property
+    def memory_bytes(self) -> int:
+        """Total size of the backing arrays."""
+        return sum(a.nbytes for a in self._arrays().values())
+
+    @property
+    def num_users(self) -> int:
+        """Users currently holding a slot."""
+        return int(np.count_nonzero(self._fp))
+
+    def resized(self, capacity: int) -> "LocationIndex":
+        """Copy of the index with a new capacity (users re-slotted by fingerprint).
+
+        When shrinking, users that no longer fit evict the least recently
+        seen ones as usual.
+        """
+        index = type(self)(capacity=capacity, history=self.history)
+        with self._lock:
+            occupied = np.flatnonzero(self._fp)
+            # Least recently seen first, so a later (newer) user wins a contested slot
+            occupied = occupied[np.argsort(self._last_seen[occupied], kind="stable")]
+            targets = np.empty(len(occupied), dtype=np.int64)
+            for i, (fp, last_seen) in enumerate(zip(self._fp[occupied].tolist(),
+                                                    self._last_seen[occupied].tolist())):
+                targets[i] = index._find_fp(fp, create=True)
+                index._last_seen[targets[i]] = last_seen
+            # Keep only the last user placed in each slot
+            last = len(targets) - 1 - np.unique(targets[::-1], return_index=True)[1]
+            for name, array in index._arrays().items():
+                array[targets[last]] = self._arrays()[name][occupied[last]]
+        return index
+
+    def _find(self, user_id: str, create: bool = False) -> int:
+        """Return the user's slot, or -1 (allocating/evicting when `create`)."""
+        return self._find_fp(_fingerprint(user_id), create)
+
+    def _find_fp(self, fp: int, create: bool = False) -> int:
+        """_find for an already computed fingerprint."""
+        base = ((int(fp) >> 1) % self.num_sets) * WAYS
+        fp = np.uint64(fp)
+        ways = self._fp[base:base + WAYS]
+        match = np.flatnonzero(ways == fp)
+        if match.size:
+            return base + int(match[0])
+        if not create:
+            return -1
+
+        empty = np.flatnonzero(ways == 0)
+        if empty.size:
+            slot = base + int(empty[0])
+        else:
+            # Evict the least recently seen user in this set
+            slot = base + int(np.argmin(self._last_seen[base:base + WAYS]))
+        self._fp[slot] = fp
+        self._count[slot] = 0
+        self._head[slot] = 0
+        self._synced[slot] = 0
+        self._last_seen[slot] = 0
+        return slot
+
+    def _find_many(self, user_ids: Sequence[str]) -> np.ndarray:
+        """Vectorized _find (no allocation): slot per user, -1 if not indexed."""
+        return self._find_fps(fingerprints(user_ids))
+
+    def _find_fps(self, fps: np.ndarray) -> np.ndarray:
+        """_find_many for already computed fingerprints."""
+        bases = ((fps >> np.uint64(1)) % np.uint64(self.num_sets)).astype(np.int64) * WAYS
+        candidates = bases[:, None] + np.arange(WAYS)
+        match = self._fp[candidates] == fps[:, None]
+        return np.where(match.any(axis=1), candidates[np.arange(len(fps)), match.argmax(axis=1)], -1)
+
+    def _append(self, slot: int, lat: float, lon: float, ts: int) -> None:
+        count = int(self._count[slot])
+        if count and ts <= self._last_seen[slot]:
+            # Not newer than the history: skip a session already held (e.g.
+            # seeded from the backend and then observed by the updater)
+            held = ((self._ts[slot, :count] == ts) & (self._lat[slot, :count] == np.float32(lat))
+                    & (self._lon[slot, :count] == np.float32(lon)))
+            if held.any():
+                return
+        head = int(self._head[slot])
+        self._lat[slot, head] = lat
+        self._lon[slot, head] = lon
+        self._ts[slot, head] = ts
+        self._head[slot] = (head + 1) % self.history
+        self._count[slot] = min(count + 1, self.history)
+        self._last_seen[slot] = max(int(self._last_seen[slot]), ts)
+
+    def observe(self, user_id: str, lat: float, lon: float, event_time: Any) -> None:
+        """Record a session centroid for a user.
+
+        Sessions are expected in event-time order (as the updater reads
+        them), so the user's history counts as complete up to this one.
+        """
+        if lat is None or lon is None or math.isnan(lat) or math.isnan(lon):
+            return
+        ts = int(to_epoch_seconds(event_time))
+        with self._lock:
+            slot = self._find(user_id, create=True)
+            self._append(slot, lat, lon, ts)
+            self._synced[slot] = max(int(self._synced[slot]), ts)
+
+    def needs_seed(self, user_id: str, event_time: Any) -> bool:
+        """True when the user's history may lack sessions before `event_time`.
+
+        That is every user the index has not seen, and every user whose
+        history was last completed (by seed() or observe()) before that
+        time.
+        """
+        slot = self._find(user_id)
+        return slot < 0 or int(self._synced[slot]) < math.floor(to_epoch_seconds(event_time))
+
+    def seed(self, user_id: str, locations: Iterable[Tuple[float, float, Any]], until: Any) -> None:
+        """Merge the user's sessions before `until` as (lat, lon, event_time), oldest first.
+
+        `locations` are the user's latest `history` sessions before `until`
+        from the storage backend; ones already held are skipped.
+        """
+        with self._lock:
+            slot = self._find(user_id, create=True)
+            for lat, lon, event_time in locations:
+                if lat is not None and lon is not None:
+                    self._append(slot, lat, lon, int(to_epoch_seconds(event_time)))
+            self._synced[slot] = max(int(self._synced[slot]), math.floor(to_epoch_seconds(until)))
+
+    def _gather(self, slots: np.ndarray, ts: np.ndarray):
+        """History rows for each slot, masked to sessions strictly before `ts`."""
+        known = slots >= 0
+        safe = np.where(known, slots, 0)
+        lat = self._lat[safe].astype(np.float64)
+        lon = self._lon[safe].astype(np.float64)
+        hist_ts = self._ts[safe].astype(np.float64)
+        filled = np.arange(self.history) < self._count[safe][:, None]
+        # History is stored at whole-second resolution
+        valid = known[:, None] & filled & (hist_ts < np.floor(ts)[:, None])
+        lat[~valid] = np.nan
+        lon[~valid] = np.nan
+        hist_ts[~valid] = -np.inf
+        return lat, lon, hist_ts, valid
+
+    def _assess_arrays(self, slots, lat, lon, ts, prev_lat=None, prev_lon=None, prev_ts=None) -> Dict[str, np.ndarray]:
+        hist_lat, hist_lon, hist_ts, valid = self._gather(slots, ts)
+        history = valid.sum(axis=1)
+        has_history = history > 0
+
+        home_lat = _row_median(hist_lat, history)
+        home_lon = _row_median(hist_lon, history)
+        distance = np.where(has_history, haversine_km(lat, lon, home_lat, home_lon), 0.0)
+
+        # Most recent earlier session from the index...
+        last = np.argmax(hist_ts, axis=1)
+        rows = np.arange(len(slots))
+        last_lat, last_lon, last_ts = hist_lat[rows, last], hist_lon[rows, last], hist_ts[rows, last]
+        # ...unless an earlier row in the same batch is more recent
+        if prev_ts is not None:
+            newer = prev_ts > last_ts
+            last_lat = np.where(newer, prev_lat, last_lat)
+            last_lon = np.where(newer, prev_lon, last_lon)
+            last_ts = np.where(newer, prev_ts, last_ts)
+
+        has_last = np.isfinite(last_ts)
+        hop_km = np.where(has_last, haversine_km(lat, lon, last_lat, last_lon), 0.0)
+        hours = np.maximum(ts - np.where(has_last, last_ts, ts), MIN_TRAVEL_SECONDS) / 3600.0
+        speed = np.where(has_last, hop_km / hours, np.nan)
+        impossible = has_last & (hop_km > MIN_TRAVEL_DISTANCE_KM) & (speed > MAX_TRAVEL_SPEED_KMH)
+
+        distance = np.nan_to_num(distance, nan=0.0)
+        return {
+            "geolocation_distance_km": distance,
+            "travel_speed_kmh": speed,
+            "impossible_travel": impossible,
+            "location_history": history,
+        }
+
+    def assess(self, user_id: str, lat: float, lon: float, event_time: Any) -> Dict[str, Any]:
+        """Distance from home and travel speed for one session (does not update the index).
+
+        Per-transaction path: works on the user's <= `history` centroids with
+        plain math, since NumPy call overhead dominates at that size. Applies
+        the same rules as assess_batch().
+
+        Returns:
+            dict with geolocation_distance_km, travel_speed_kmh (None without
+            history), impossible_travel and location_history
+        """
+        ts = to_epoch_seconds(event_time)
+        slot = self._find(user_id)
+        points = []
+        if slot >= 0:
+            cutoff = math.floor(ts)
+            count = int(self._count[slot])
+            points = [
+                (p_lat, p_lon, p_ts)
+                for p_lat, p_lon, p_ts in zip(self._lat[slot, :count].tolist(), self._lon[slot, :count].tolist(),
+                                              self._ts[slot, :count].tolist())
+                if p_ts < cutoff
+            ]
+        if not points:
+            return {"geolocation_distance_km": 0.0, "travel_speed_kmh": None,
+                    "impossible_travel": False, "location_history": 0}
+
+        home_lat = statistics.median(p[0] for p in points)
+        home_lon = statistics.median(p[1] for p in points)
+        distance = _haversine_scalar(lat, lon, home_lat, home_lon)
+
+        last_lat, last_lon, last_ts = max(points, key=lambda p: p[2])
+        hop_km = _haversine_scalar(lat, lon, last_lat, last_lon)
+        speed = hop_km / (max(ts - last_ts, MIN_TRAVEL_SECONDS) / 3600.0)
+        return {
+            "geolocation_distance_km": round(distance, 1),
+            "travel_speed_kmh": round(speed, 1),
+            "impossible_travel": hop_km > MIN_TRAVEL_DISTANCE_KM and speed > MAX_TRAVEL_SPEED_KMH,
+            "location_history": len(points),
+        }
+
+    def assess_batch(self, user_ids: Sequence[str], lat, lon, event_times) -> Dict[str, np.ndarray]:
+        """Vectorized assess() for a batch of sessions.
+
+        Home and history come from the index state before the batch; travel
+        speed also accounts for earlier sessions of the same user within the
+        batch. Call observe_batch() afterwards to record the batch.
+
+        Args:
+            user_ids: User per session
+            lat, lon: Session coordinates (NaN when unknown)
+            event_times: datetimes or epoch seconds/milliseconds
+
+        Returns:
+            dict of arrays: geolocation_distance_km, travel_speed_kmh (NaN
+            without history), impossible_travel, location_history
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        ts = epoch_seconds_array(event_times)
+        fps = fingerprints(user_ids)
+        slots = self._find_fps(fps)
+
+        # Previous session of the same user within the batch (by event time)
+        order = np.lexsort((ts, fps))
+        same_user = np.zeros(len(order), dtype=bool)
+        same_user[1:] = fps[order][1:] == fps[order][:-1]
+        prev_lat = np.full(len(order), np.nan)
+        prev_lon = np.full(len(order), np.nan)
+        prev_ts = np.full(len(order), -np.inf)
+        shifted = order[np.flatnonzero(same_user) - 1]
+        target = order[same_user]
+        prev_lat[target], prev_lon[target], prev_ts[target] = lat[shifted], lon[shifted], ts[shifted]
+        prev_ts[np.isnan(prev_lat)] = -np.inf
+
+        known_coords = ~(np.isnan(lat) | np.isnan(lon))
+        result = self._assess_arrays(slots, lat, lon, ts, prev_lat, prev_lon, prev_ts)
+        result["geolocation_distance_km"] = np.where(known_coords, result["geolocation_distance_km"], 0.0)
+        result["travel_speed_kmh"] = np.where(known_coords, result["travel_speed_kmh"], np.nan)
+        result["impossible_travel"] &= known_coords
+        return result
+
+    def observe_batch(self, user_ids: Sequence[str], lat, lon, event_times) -> None:
+        """Record a batch of session centroids (in event-time order; None/NaN coordinates are skipped)."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        ts = epoch_seconds_array(event_times)
+        fps = fingerprints(user_ids).tolist()
+        located = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        order = located[np.argsort(ts[located], kind="stable")].tolist()
+        lat, lon, ts = lat.tolist(), lon.tolist(), ts.tolist()
+        with self._lock:
+            for i in order:
+                slot = self._find_fp(fps[i], create=True)
+                self._append(slot, lat[i], lon[i], int(ts[i]))
+                self._synced[slot] = max(int(self._synced[slot]), int(ts[i]))
+
+    def save(self, path: str) -> None:
+        """Write an atomic .npz snapshot (readers never see a partial file)."""
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with self._lock:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.array(json.dumps({
+                        "capacity": self.capacity,
+                        "history": self.history,
+                        "fingerprint": FINGERPRINT_VERSION,
+                        "saved_at": time.time(),
+                    })),
+                    **self._arrays(),
+                )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocationIndex":
+        """Memory-map a snapshot written by save() (copy-on-write; see memmap_npz)."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+        if meta.get("fingerprint") != FINGERPRINT_VERSION:
+            raise ValueError(f"{path} was written with a different user_id hash; rebuild it")
+        # The zero-filled arrays allocated here are never touched, so they take no memory
+        index = cls(capacity=meta["capacity"], history=meta["history"])
+        arrays = memmap_npz(path, index._arrays())
+        for name, array in index._arrays().items():
+            if arrays[name].shape != array.shape or arrays[name].dtype != array.dtype:
+                raise ValueError(f"{path}: {name} has shape {arrays[name].shape}, expected {array.shape}")
+            setattr(index, f"_{name}", arrays[name])
+        return index
+
+
+def default_location_path() -> str:
+    """Snapshot path (LOCATION_INDEX_PATH or <FEATURE_STORE_DIR>/locations.npz)."""
+    from .feature_store import _default_directory
+    return os.getenv("LOCATION_INDEX_PATH", os.path.join(_default_directory(), "locations.npz"))
+
+
+def configured_index(users: int = 0) -> LocationIndex:
+    """Empty index sized by LOCATION_INDEX_CAPACITY, else for `users` or LOCATION_INDEX_MEMORY_MB.
+
+    Args:
+        users: Users expected (e.g. tracked by the baseline store); the
+            index gets room for them at MAX_LOAD when that is larger than
+            the memory default
+    """
+    history = int(os.getenv("LOCATION_INDEX_HISTORY", DEFAULT_HISTORY))
+    capacity = os.getenv("LOCATION_INDEX_CAPACITY")
+    if capacity is None:
+        capacity = max(
+            capacity_for_memory(float(os.getenv("LOCATION_INDEX_MEMORY_MB", DEFAULT_MEMORY_MB)), history),
+            int(users / MAX_LOAD),
+        )
+    return LocationIndex(capacity=int(capacity), history=history)
+
+
+# Singleton instance
+_location_index = SnapshotHolder("Locations", default_location_path, LocationIndex.load, configured_index)
+
+
+def get_location_index() -> LocationIndex:
+    """Get the process-wide location index, reloading the snapshot when it is replaced.
+
+    Without a snapshot this is an empty index (see configured_index) that
+    only holds users seeded from the storage backend.
+    """
+    return _location_index.get()
+
+
+def set_location_index(index) -> None:
+    """Override the location index (e.g. a fresh one for replays). None resets to the snapshot."""
+    _location_index.set(index)
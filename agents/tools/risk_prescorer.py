@@ -0,0 +1,321 @@
+"""Deterministic risk pre-score computed from the Detective's tool results.
+
+The Detective instruction spells out most of its scoring as rules (active
+call + new beneficiary = CRITICAL, rushed session at night = HIGH, ...).
+This module applies those rules directly to the three tool results
+(get_user_history, get_beneficiary_risk, get_session_context) plus the
+alert's known-bad prescreen, producing the seven security_flags, a
+baseline risk_score / risk_level and a verdict:
+
+- "CRITICAL": active voice call to a beneficiary younger than 24h
+- "LOW": every tool returned data, no flag or mule signal is set, the
+  beneficiary is established (>= 7 days, risk score < 30) and nothing
+  deviates from the user's baseline
+- None: the gray zone, left to the Detective LLM
+
+With DETECTIVE_PRESCORE=skip (opt-in, see agents/router_agent.py) the router
+skips the LLM for LOW and CRITICAL verdicts and builds the InvestigationReport with
+build_investigation(). prescore_batch() applies the same rules to columns
+for replays; scripts/benchmark_prescorer.py checks both forms agree and
+reports how much LLM traffic is skipped.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from config.models import BeneficiaryRisk, InvestigationReport, Recommendation, SessionContext, UserProfile
+from config.risk_features import RISK_LEVEL_CODES
+from .session_enrichment import GEO_ANOMALY_KM, RUSHED_SESSION_SECONDS
+
+NEW_BENEFICIARY_HOURS = 24
+ESTABLISHED_BENEFICIARY_HOURS = 24 * 7
+HIGH_VELOCITY_TRANSFERS = 3         # more than this in the last hour
+NETWORK_HOPS_RISK = 2               # within this many hops of a flagged node
+CONFIRMED_BENEFICIARY_RISK = 70     # beneficiary risk_score confirming a known-bad hit
+LOW_BENEFICIARY_RISK = 30           # below this counts as clean
+UNUSUAL_Z = 3.0                     # |z| against the user's own baseline
+
+# Flat inputs the rules read (one value per investigation)
+SIGNAL_COLUMNS = (
+    "complete", "is_call_active", "account_age_hours", "session_duration_sec", "unusual_time",
+    "velocity_last_hour", "is_rooted", "unusual_location", "beneficiary_risk_score",
+    "linked_to_flagged_device", "network_flagged", "hops_to_flagged", "fan_in_alert", "max_abs_z",
+    "known_bad_account", "known_bad_device",
+)
+NUMERIC_SIGNALS = frozenset({
+    "account_age_hours", "session_duration_sec", "velocity_last_hour",
+    "beneficiary_risk_score", "hops_to_flagged", "max_abs_z",
+})
+
+SECURITY_FLAGS = (
+    "active_voice_call", "suspect_device", "new_beneficiary", "rushed_session",
+    "high_velocity", "unusual_time", "unusual_location",
+)
+
+# prescore_batch verdict codes
+VERDICT_GRAY, VERDICT_LOW, VERDICT_CRITICAL = 0, 1, 2
+VERDICT_NAMES = {VERDICT_GRAY: None, VERDICT_LOW: "LOW", VERDICT_CRITICAL: "CRITICAL"}
+
+# Additive score per signal, on top of BASE_SCORE + beneficiary risk_score / 5
+BASE_SCORE = 10
+WEIGHTS = {
+    "active_voice_call": 15, "suspect_device": 10, "new_beneficiary": 10, "rushed_session": 10,
+    "high_velocity": 10, "unusual_time": 10, "unusual_location": 10, "baseline_deviation": 10,
+}
+# Minimum score when a guideline rule fires
+FLOORS = {
+    "call_to_new_beneficiary": 90,   # CRITICAL
+    "known_bad_confirmed": 80,       # HIGH
+    "mule_or_takeover": 70,          # HIGH: rushed at night, velocity, fan-in, mule network
+    "new_beneficiary": 50,           # MEDIUM-HIGH
+    "active_voice_call": 50,
+    "suspect_device": 40,            # MEDIUM
+}
+
+
+@dataclass
+class PreScore:
+    """Result of prescore() for one investigation."""
+    risk_score: int
+    risk_level: str
+    security_flags: Dict[str, bool]
+    verdict: Optional[str]            # "LOW", "CRITICAL" or None (gray zone)
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def clear_cut(self) -> bool:
+        return self.verdict is not None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"risk_score": self.risk_score, "risk_level": self.risk_level, "verdict": self.verdict,
+                "security_flags": self.security_flags, "reasons": self.reasons}
+
+
+def _level_for(score: int) -> str:
+    if score >= 85:
+        return "CRITICAL"
+    if score >= 60:
+        return "HIGH"
+    if score >= 30:
+        return "MEDIUM"
+    return "LOW"
+
+
+def _number(value) -> float:
+    try:
+        return float("nan") if value is None else float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def extract_signals(context: Mapping[str, Any], threat: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """Flatten gather_context_async() results (and the alert) into SIGNAL_COLUMNS.
+
+    Missing numbers are NaN; `complete` is False when any tool reported an
+    error, a miss or a simulated failure.
+    """
+    user = context.get("user_profile") or {}
+    beneficiary = context.get("beneficiary") or {}
+    session = context.get("session") or {}
+    metrics = session.get("behavioral_metrics") or {}
+    device = session.get("device_context") or {}
+    risk = session.get("risk_signals") or {}
+    network = beneficiary.get("network") or {}
+    fan_in = beneficiary.get("fan_in") or {}
+    prescreen = (threat or {}).get("prescreen") or {}
+
+    complete = (
+        bool(user.get("user_id")) and user.get("status") is None
+        and bool(beneficiary.get("account_id")) and beneficiary.get("status") is None
+        and beneficiary.get("risk_score") is not None
+        and "is_call_active" in session and session.get("status") is None
+    )
+
+    z_scores = [
+        (session.get("baseline_deviations") or {}).get(name)
+        for name in ("hour_z", "typing_cadence_z", "duration_z")
+    ] + [(user.get("transfer_baseline") or {}).get("amount_z")]
+    z_scores = [abs(z) for z in z_scores if z is not None]
+
+    distinct = fan_in.get("distinct_senders_1h")
+    threshold = fan_in.get("alert_threshold")
+    distance = _number(risk.get("geolocation_distance_km"))
+    return {
+        "complete": complete,
+        "is_call_active": bool(session.get("is_call_active")),
+        "account_age_hours": _number(beneficiary.get("account_age_hours")),
+        "session_duration_sec": _number(metrics.get("session_duration_sec")),
+        "unusual_time": risk.get("time_of_day_risk") in ("HIGH", "CRITICAL"),
+        "velocity_last_hour": int(risk.get("velocity_last_hour") or 0),
+        "is_rooted": bool(device.get("is_rooted")),
+        "unusual_location": bool(risk.get("geolocation_anomalous")) or distance > GEO_ANOMALY_KM,
+        "beneficiary_risk_score": _number(beneficiary.get("risk_score")),
+        "linked_to_flagged_device": bool(beneficiary.get("linked_to_flagged_device")),
+        "network_flagged": bool(network.get("flagged")),
+        "hops_to_flagged": _number(network.get("hops_to_flagged")),
+        "fan_in_alert": distinct is not None and threshold is not None and distinct >= threshold,
+        "max_abs_z": max(z_scores) if z_scores else float("nan"),
+        "known_bad_account": bool(prescreen.get("known_bad_account")),
+        "known_bad_device": bool(prescreen.get("known_bad_device")),
+    }
+
+
+def prescore_signals(s: Mapping[str, Any]) -> PreScore:
+    """Apply the scoring rules to one extract_signals() row."""
+    age = s["account_age_hours"]
+    benef_risk = s["beneficiary_risk_score"]
+    flags = {
+        "active_voice_call": s["is_call_active"],
+        "suspect_device": s["is_rooted"] or s["known_bad_device"],
+        "new_beneficiary": age < NEW_BENEFICIARY_HOURS,             # NaN compares False
+        "rushed_session": s["session_duration_sec"] < RUSHED_SESSION_SECONDS,
+        "high_velocity": s["velocity_last_hour"] > HIGH_VELOCITY_TRANSFERS,
+        "unusual_time": s["unusual_time"],
+        "unusual_location": s["unusual_location"],
+    }
+    network_risk = s["network_flagged"] or s["hops_to_flagged"] <= NETWORK_HOPS_RISK
+    baseline_deviation = s["max_abs_z"] >= UNUSUAL_Z
+    known_bad_confirmed = (s["known_bad_account"] or s["known_bad_device"]) and (
+        s["linked_to_flagged_device"] or benef_risk >= CONFIRMED_BENEFICIARY_RISK or network_risk
+    )
+
+    score = BASE_SCORE + (0 if benef_risk != benef_risk else int(benef_risk // 5))
+    score += sum(WEIGHTS[name] for name, value in flags.items() if value)
+    score += WEIGHTS["baseline_deviation"] if baseline_deviation else 0
+
+    reasons = [name.replace("_", " ") for name, value in flags.items() if value]
+    floors = [0]
+    if flags["active_voice_call"] and flags["new_beneficiary"]:
+        floors.append(FLOORS["call_to_new_beneficiary"])
+        reasons.insert(0, "active call while paying a beneficiary created under 24h ago")
+    if known_bad_confirmed:
+        floors.append(FLOORS["known_bad_confirmed"])
+        reasons.append("confirmed known-bad account or device")
+    if (flags["rushed_session"] and flags["unusual_time"]) or flags["high_velocity"] or s["fan_in_alert"] or network_risk:
+        floors.append(FLOORS["mule_or_takeover"])
+        if s["fan_in_alert"]:
+            reasons.append("beneficiary fan-in above alert threshold")
+        if network_risk:
+            reasons.append("beneficiary in a flagged mule network")
+    if flags["new_beneficiary"]:
+        floors.append(FLOORS["new_beneficiary"])
+    if flags["active_voice_call"]:
+        floors.append(FLOORS["active_voice_call"])
+    if flags["suspect_device"]:
+        floors.append(FLOORS["suspect_device"])
+    if baseline_deviation:
+        reasons.append("unusual for this user's baseline")
+    score = min(100, max(score, *floors))
+
+    verdict = None
+    if flags["active_voice_call"] and flags["new_beneficiary"]:
+        verdict = "CRITICAL"
+    elif (
+        s["complete"] and not any(flags.values()) and not network_risk and not s["fan_in_alert"]
+        and not baseline_deviation and not s["known_bad_account"] and not s["known_bad_device"]
+        and not s["linked_to_flagged_device"]
+        and age >= ESTABLISHED_BENEFICIARY_HOURS and benef_risk < LOW_BENEFICIARY_RISK
+    ):
+        verdict = "LOW"
+        reasons = ["established beneficiary and no risk signals in user, beneficiary or session context"]
+    return PreScore(score, _level_for(score), flags, verdict, reasons)
+
+
+def prescore(context: Mapping[str, Any], threat: Optional[Mapping[str, Any]] = None) -> PreScore:
+    """Pre-score one investigation from its tool results (see module docstring)."""
+    return prescore_signals(extract_signals(context, threat))
+
+
+def signals_to_columns(rows: List[Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+    """Stack extract_signals() rows into prescore_batch() columns."""
+    return {
+        name: np.array([row[name] for row in rows], dtype=np.float64 if name in NUMERIC_SIGNALS else bool)
+        for name in SIGNAL_COLUMNS
+    }
+
+
+def prescore_batch(columns: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """prescore_signals() over SIGNAL_COLUMNS arrays.
+
+    Returns:
+        dict with risk_score (int16), risk_level (RISK_LEVEL_CODES, int8),
+        verdict (VERDICT_* codes, int8) and one bool array per SECURITY_FLAGS
+    """
+    c = {name: np.asarray(columns[name]) for name in SIGNAL_COLUMNS}
+    age = c["account_age_hours"]
+    benef_risk = c["beneficiary_risk_score"]
+    with np.errstate(invalid="ignore"):
+        flags = {
+            "active_voice_call": c["is_call_active"].astype(bool),
+            "suspect_device": c["is_rooted"] | c["known_bad_device"],
+            "new_beneficiary": age < NEW_BENEFICIARY_HOURS,
+            "rushed_session": c["session_duration_sec"] < RUSHED_SESSION_SECONDS,
+            "high_velocity": c["velocity_last_hour"] > HIGH_VELOCITY_TRANSFERS,
+            "unusual_time": c["unusual_time"].astype(bool),
+            "unusual_location": c["unusual_location"].astype(bool),
+        }
+        network_risk = c["network_flagged"] | (c["hops_to_flagged"] <= NETWORK_HOPS_RISK)
+        baseline_deviation = c["max_abs_z"] >= UNUSUAL_Z
+        known_bad_confirmed = (c["known_bad_account"] | c["known_bad_device"]) & (
+            c["linked_to_flagged_device"] | (benef_risk >= CONFIRMED_BENEFICIARY_RISK) | network_risk
+        )
+        established = (age >= ESTABLISHED_BENEFICIARY_HOURS) & (benef_risk < LOW_BENEFICIARY_RISK)
+
+    score = BASE_SCORE + np.where(np.isnan(benef_risk), 0, np.nan_to_num(benef_risk) // 5).astype(np.int16)
+    for name, mask in flags.items():
+        score += WEIGHTS[name] * mask
+    score += WEIGHTS["baseline_deviation"] * baseline_deviation
+
+    call_to_new = flags["active_voice_call"] & flags["new_beneficiary"]
+    floor = np.zeros(len(score), dtype=np.int16)
+    for mask, value in (
+        (call_to_new, FLOORS["call_to_new_beneficiary"]),
+        (known_bad_confirmed, FLOORS["known_bad_confirmed"]),
+        ((flags["rushed_session"] & flags["unusual_time"]) | flags["high_velocity"] | c["fan_in_alert"] | network_risk,
+         FLOORS["mule_or_takeover"]),
+        (flags["new_beneficiary"], FLOORS["new_beneficiary"]),
+        (flags["active_voice_call"], FLOORS["active_voice_call"]),
+        (flags["suspect_device"], FLOORS["suspect_device"]),
+    ):
+        np.maximum(floor, np.where(mask, value, 0).astype(np.int16), out=floor)
+    score = np.minimum(100, np.maximum(score, floor)).astype(np.int16)
+
+    level = np.select([score >= 85, score >= 60, score >= 30],
+                      [RISK_LEVEL_CODES["CRITICAL"], RISK_LEVEL_CODES["HIGH"], RISK_LEVEL_CODES["MEDIUM"]],
+                      RISK_LEVEL_CODES["LOW"]).astype(np.int8)
+    any_flag = np.logical_or.reduce(list(flags.values()))
+    clean = (
+        c["complete"] & ~any_flag & ~network_risk & ~c["fan_in_alert"] & ~baseline_deviation
+        & ~c["known_bad_account"] & ~c["known_bad_device"] & ~c["linked_to_flagged_device"] & established
+    )
+    verdict = np.where(call_to_new, VERDICT_CRITICAL, np.where(clean, VERDICT_LOW, VERDICT_GRAY)).astype(np.int8)
+    return {"risk_score": score, "risk_level": level, "verdict": verdict, **flags}
+
+
+def build_investigation(transaction_id: str, context: Mapping[str, Any], score: PreScore) -> InvestigationReport:
+    """The InvestigationReport the router uses when the LLM is skipped.
+
+    Raises:
+        ValueError: For a gray-zone score (the LLM must investigate those)
+    """
+    if not score.clear_cut:
+        raise ValueError("build_investigation needs a LOW or CRITICAL pre-score")
+    user = context["user_profile"]
+    beneficiary = context["beneficiary"]
+    session = context["session"]
+
+    def _fields(model, data):
+        return {k: v for k, v in data.items() if k in model.model_fields and v is not None}
+
+    return InvestigationReport(
+        transaction_id=transaction_id,
+        user_profile=UserProfile(**_fields(UserProfile, user)),
+        beneficiary_analysis=BeneficiaryRisk(**_fields(BeneficiaryRisk, beneficiary)),
+        session_analysis=SessionContext(**{"transaction_id": transaction_id, **_fields(SessionContext, session)}),
+        risk_score=score.risk_score,
+        risk_level=score.risk_level,
+        reasoning=f"Deterministic pre-score {score.risk_score}/100 ({score.risk_level}): {'; '.join(score.reasons)}.",
+        recommendation=Recommendation.BLOCK if score.verdict == "CRITICAL" else Recommendation.APPROVE,
+        security_flags=score.security_flags,
+    )
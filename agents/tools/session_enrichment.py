@@ -0,0 +1,185 @@
+"""Vectorized risk-signal enrichment for batches of session rows.
+
+get_session_context enriches one mobile_banking_sessions row at a time. Replays
+and backfills over millions of sessions use enrich_sessions_batch instead,
+which derives the same signals with NumPy array operations:
+
+- rushed: session shorter than RUSHED_SESSION_SECONDS
+- time_of_day_risk: HIGH outside [NIGHT_END_HOUR, NIGHT_START_HOUR]
+- geolocation_distance_km / travel_speed_kmh / impossible_travel /
+  geolocation_anomalous, from a location_index assessment
+- os_risk: HIGH on rooted/jailbroken devices
+- baseline_deviations: how unusual the session is for the user, from a
+  baseline_store assessment
+
+The rule constants are shared with the scalar path in session_tools, so both
+produce identical results.
+"""
+import math
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from .baseline_store import deviations_to_dicts
+
+# Rule constants (shared with session_tools._enrich_session)
+RUSHED_SESSION_SECONDS = 60
+NIGHT_END_HOUR = 6        # hours before this are HIGH risk
+NIGHT_START_HOUR = 23     # hours after this are HIGH risk
+GEO_ANOMALY_KM = 50.0     # distance from home that counts as anomalous
+
+# Raw columns copied into the result as-is
+PASSTHROUGH_COLUMNS = [
+    "transaction_id", "user_id", "session_id", "is_call_active",
+    "session_duration_seconds", "battery_level", "is_rooted_jailbroken",
+]
+
+
+def _column(columns: Mapping[str, Any], name: str, size: int, default=None) -> np.ndarray:
+    """Get a column as an array, filling a missing column with `default`."""
+    if name not in columns:
+        return np.full(size, default, dtype=object)
+    values = columns[name]
+    return values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+
+
+def _as_float(values: np.ndarray) -> np.ndarray:
+    """Convert a column to float64 with NaN for missing values (None/NaN)."""
+    if values.dtype.kind in "fiub":
+        return values.astype(np.float64)
+    # Object columns (rows with None); typed columns from pandas/Arrow take
+    # the fast path above
+    return np.where(np.equal(values, None), np.nan, values).astype(np.float64)
+
+
+def _as_flag(values: np.ndarray) -> np.ndarray:
+    """Truthiness of a column as a bool array (None/NaN/0 are False)."""
+    if values.dtype.kind == "b":
+        return values
+    numeric = _as_float(values)
+    return np.nan_to_num(numeric, nan=0.0) != 0
+
+
+def _num_rows(columns: Mapping[str, Any]) -> int:
+    for values in columns.values():
+        return len(values)
+    return 0
+
+
+def compute_session_signals(columns: Mapping[str, Any], location: Optional[Mapping[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """Compute derived risk signals for a column batch of session rows.
+
+    Args:
+        columns: Mapping of column name to array/list (or a pandas DataFrame)
+            with mobile_banking_sessions columns. `velocity_count` is optional.
+        location: Optional LocationIndex.assess_batch() result for the same
+            rows. Without it no home is known: distance 0, no travel speed.
+
+    Returns:
+        dict of arrays: typing_cadence, rushed, time_of_day_high,
+        geolocation_distance_km, travel_speed_kmh, impossible_travel,
+        geolocation_anomalous, os_high, velocity_count
+    """
+    size = _num_rows(columns)
+
+    typing = np.nan_to_num(_as_float(_column(columns, "typing_cadence_score", size)), nan=0.0)
+    duration = _as_float(_column(columns, "session_duration_seconds", size))
+    hour = _as_float(_column(columns, "time_of_day_hour", size))
+    rooted = _as_flag(_column(columns, "is_rooted_jailbroken", size))
+    velocity = np.nan_to_num(_as_float(_column(columns, "velocity_count", size, 0)), nan=0.0).astype(np.int64)
+
+    # NaN comparisons are False, so missing values never raise a flag
+    rushed = duration < RUSHED_SESSION_SECONDS
+    time_high = (hour < NIGHT_END_HOUR) | (hour > NIGHT_START_HOUR)
+
+    if location is None:
+        distance_km = np.zeros(size)
+        speed = np.full(size, np.nan)
+        impossible = np.zeros(size, dtype=bool)
+    else:
+        distance_km = np.asarray(location["geolocation_distance_km"], dtype=np.float64)
+        speed = np.asarray(location["travel_speed_kmh"], dtype=np.float64)
+        impossible = np.asarray(location["impossible_travel"], dtype=bool)
+
+    return {
+        "typing_cadence": typing,
+        "rushed": rushed,
+        "time_of_day_high": time_high,
+        "geolocation_distance_km": distance_km,
+        "travel_speed_kmh": speed,
+        "impossible_travel": impossible,
+        "geolocation_anomalous": (distance_km > GEO_ANOMALY_KM) | impossible,
+        "os_high": rooted,
+        "velocity_count": velocity,
+    }
+
+
+def enrich_sessions_batch(
+    columns: Mapping[str, Any],
+    location: Optional[Mapping[str, np.ndarray]] = None,
+    baseline: Optional[Mapping[str, np.ndarray]] = None
+) -> List[dict]:
+    """Enrich a column batch of session rows into get_session_context() dicts.
+
+    Signals are computed with compute_session_signals(); only the final
+    assembly of the per-row dicts happens in Python.
+
+    Args:
+        columns: Mapping of column name to array/list (or a pandas DataFrame)
+        location: Optional LocationIndex.assess_batch() result for the same rows
+        baseline: Optional BaselineStore.session_deviations_batch() result for
+            the same rows (baseline_deviations is None without it)
+
+    Returns:
+        List of dicts in the same shape (and order) as get_session_context()
+    """
+    size = _num_rows(columns)
+    signals = compute_session_signals(columns, location)
+    raw = {name: _column(columns, name, size).tolist() for name in PASSTHROUGH_COLUMNS}
+
+    typing = signals["typing_cadence"].tolist()
+    rushed = signals["rushed"].tolist()
+    time_risk = np.where(signals["time_of_day_high"], "HIGH", "LOW").tolist()
+    distance = np.round(signals["geolocation_distance_km"], 1).tolist()
+    speed = [None if math.isnan(v) else v for v in np.round(signals["travel_speed_kmh"], 1).tolist()]
+    impossible = signals["impossible_travel"].tolist()
+    anomalous = signals["geolocation_anomalous"].tolist()
+    os_risk = np.where(signals["os_high"], "HIGH", "LOW").tolist()
+    velocity = signals["velocity_count"].tolist()
+    deviations = deviations_to_dicts(baseline) if baseline is not None else [None] * size
+
+    results = []
+    for i in range(size):
+        results.append({
+            "transaction_id": raw["transaction_id"][i],
+            "user_id": raw["user_id"][i],
+            "session_id": raw["session_id"][i],
+            "is_call_active": raw["is_call_active"][i],
+            "behavioral_metrics": {
+                "typing_cadence": typing[i],
+                "session_duration_sec": raw["session_duration_seconds"][i],
+                "rushed": rushed[i]
+            },
+            "device_context": {
+                "battery_level": raw["battery_level"][i],
+                "is_rooted": raw["is_rooted_jailbroken"][i],
+                "os_risk": os_risk[i]
+            },
+            "risk_signals": {
+                "velocity_last_hour": velocity[i],
+                "time_of_day_risk": time_risk[i],
+                "geolocation_distance_km": distance[i],
+                "travel_speed_kmh": speed[i],
+                "impossible_travel": impossible[i],
+                "geolocation_anomalous": anomalous[i]
+            },
+            "baseline_deviations": deviations[i]
+        })
+    return results
+
+
+def rows_to_columns(rows: List[Dict[str, Any]], names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """Transpose row dicts (e.g. backend results) into a column batch."""
+    if names is None:
+        names = list(rows[0].keys()) if rows else []
+    return {name: np.array([row.get(name) for row in rows], dtype=object) for name in names}
@@ -1,11 +1,26 @@
 """Tools for querying mobile banking session context and behavior."""
-import os
-from google.cloud import bigquery
-from google.oauth2 import service_account
 from google.adk.tools import FunctionTool
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from .bigquery_utils import retry_query_with_backoff
+from typing import Optional
+import numpy as np
+from .bigquery_utils import get_client  # noqa: F401 - re-exported for existing callers
+from .storage_backends import get_storage_backend, to_datetime
+from .session_enrichment import (
+    RUSHED_SESSION_SECONDS,
+    NIGHT_END_HOUR,
+    NIGHT_START_HOUR,
+    GEO_ANOMALY_KM,
+    enrich_sessions_batch,
+    rows_to_columns,
+)
+from .location_index import get_location_index, to_epoch_seconds
+from .baseline_store import get_baseline_store
+from .single_flight import single_flight
+
+# Playground form fallback only: the form has no session history, so a
+# latitude above FAR_LATITUDE stands in for "far from home" (~200 miles)
+FAR_LATITUDE = 40.0
+FAR_DISTANCE_KM = 320.0
 
 # Load environment variables
 load_dotenv()
@@ -22,53 +37,9 @@ def _get_form_fallback(data_type: str, key: str):
         pass
     return None
 
-# Initialize client lazily
-def get_client():
-    """
-    Get a BigQuery client using the same credential system as data insertion.
-    Tries Streamlit secrets first, then environment variables, then default credentials.
-    """
-    # Try Streamlit secrets first (for deployed app)
-    try:
-        import streamlit as st
-        if hasattr(st, 'secrets') and "gcp_service_account" in st.secrets:
-            credentials = service_account.Credentials.from_service_account_info(
-                dict(st.secrets["gcp_service_account"])
-            )
-            project_id = st.secrets.get("GCP_PROJECT_ID", "partner-catalyst")
-            return bigquery.Client(credentials=credentials, project=project_id)
-    except (ImportError, Exception):
-        pass
 
-    # Try environment variable for service account key file
-    key_path = os.getenv("GCP_SERVICE_ACCOUNT_KEY") or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-    if key_path and os.path.exists(key_path):
-        try:
-            credentials = service_account.Credentials.from_service_account_file(key_path)
-            return bigquery.Client(credentials=credentials)
-        except Exception:
-            pass
-
-    # Fall back to default credentials (ADC)
-    return bigquery.Client()
-
-def get_session_context(transaction_id: str) -> dict:
-    """
-    Retrieves mobile banking session context for a specific transaction.
-    
-    This tool queries the mobile_banking_sessions table to find the session
-    linked to the transaction. It enriches the raw data with:
-    - Geolocation analysis (distance from home)
-    - Velocity analysis (number of sessions in last hour)
-    - Temporal analysis (time of day risk)
-    
-    Args:
-        transaction_id: The ID of the transaction to investigate.
-        
-    Returns:
-        dict containing session details and calculated risk signals.
-    """
-    # Simulation fallback for tests
+def _simulated_session_context(transaction_id: str):
+    """Simulation fallback for test transactions (None for real transactions)."""
     if transaction_id == "tx_valid":
         return {
             "transaction_id": transaction_id,
@@ -117,167 +88,288 @@ def get_session_context(transaction_id: str) -> dict:
             }
         }
 
-    if transaction_id.startswith("tx_verify"):
-        return {
-            "transaction_id": transaction_id,
-            "user_id": "user_test_verify",
-            "is_call_active": True,
-            "risk_signals": {
-                "geolocation_distance_km": 500.0,
-                "velocity_last_hour": 10,
-                "time_of_day_risk": "CRITICAL"
-            },
-            "device_context": {
-                "battery_level": 5,
-                "is_rooted": True
-            }
-        }
+    return None
 
-    try:
-        client = get_client()
-        dataset_id = "streamguard_threats"
-        table_id = "mobile_banking_sessions"
 
-        # 1. Get the specific session for this transaction
-        query_session = f"""
-        SELECT
-            session_id, user_id, event_type, is_call_active,
-            typing_cadence_score, session_duration_seconds,
-            battery_level, is_rooted_jailbroken,
-            geolocation_lat, geolocation_lon,
-            time_of_day_hour, event_time
-        FROM `{dataset_id}.{table_id}`
-        WHERE transaction_id = @transaction_id
-        LIMIT 1
-        """
-
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("transaction_id", "STRING", transaction_id)
-            ]
-        )
-
-        def execute_session_query():
-            session_result = client.query(query_session, job_config=job_config).result()
-            session = next(iter(session_result), None)
-            return session
-
-        # Retry with exponential backoff to handle data latency
-        session = retry_query_with_backoff(execute_session_query, max_retries=3, initial_delay=2)
+def _missing_session_context(transaction_id: str) -> dict:
+    """Result when no session row exists: form data (playground) or a not-found marker."""
+    print(f"[BigQuery] Session for transaction {transaction_id} not found after retries, trying form fallback...")
 
-        if not session:
-            print(f"[BigQuery] Session for transaction {transaction_id} not found after retries, trying form fallback...")
-
-            # Try to get data from form (playground mode)
-            form_user_id = _get_form_fallback("session", "user_id")
-            if form_user_id:
-                print(f"[BigQuery] Using form data for session")
-                is_call = _get_form_fallback("session", "call_active") or False
-                typing = _get_form_fallback("session", "typing") or 0.5
-                duration = _get_form_fallback("session", "duration") or 120
-                lat = _get_form_fallback("session", "lat") or 0.0
-                hour = _get_form_fallback("session", "hour") or 12
-                rooted = _get_form_fallback("session", "rooted") or False
-
-                distance_km = 320.0 if lat > 40.0 else 0.0
-                time_risk = "HIGH" if hour < 6 or hour > 23 else "LOW"
-
-                return {
-                    "transaction_id": transaction_id,
-                    "user_id": form_user_id,
-                    "session_id": f"pg_form_session_{transaction_id}",
-                    "is_call_active": is_call,
-                    "behavioral_metrics": {
-                        "typing_cadence": float(typing),
-                        "session_duration_sec": duration,
-                        "rushed": (duration < 60)
-                    },
-                    "device_context": {
-                        "battery_level": 75,
-                        "is_rooted": rooted,
-                        "os_risk": "HIGH" if rooted else "LOW"
-                    },
-                    "risk_signals": {
-                        "velocity_last_hour": 1,
-                        "time_of_day_risk": time_risk,
-                        "geolocation_distance_km": distance_km,
-                        "geolocation_anomalous": (distance_km > 50.0)
-                    }
-                }
-
-            return {"transaction_id": transaction_id, "status": "no_session_found", "risk": "high_missing_context"}
+    # Try to get data from form (playground mode)
+    form_user_id = _get_form_fallback("session", "user_id")
+    if form_user_id:
+        print(f"[BigQuery] Using form data for session")
+        is_call = _get_form_fallback("session", "call_active") or False
+        typing = _get_form_fallback("session", "typing") or 0.5
+        duration = _get_form_fallback("session", "duration") or 120
+        lat = _get_form_fallback("session", "lat") or 0.0
+        hour = _get_form_fallback("session", "hour") or 12
+        rooted = _get_form_fallback("session", "rooted") or False
+
+        distance_km = FAR_DISTANCE_KM if lat > FAR_LATITUDE else 0.0
+        time_risk = "HIGH" if hour < NIGHT_END_HOUR or hour > NIGHT_START_HOUR else "LOW"
 
-        # 2. Calculate Velocity (Sessions in last hour for this user)
-        # Note: In a real system we'd use current timestamp, but here we query relative to the event
-        user_id = session.user_id
-        event_time = session.event_time
-        
-        query_velocity = f"""
-        SELECT COUNT(*) as session_count
-        FROM `{dataset_id}.{table_id}`
-        WHERE user_id = @user_id
-        AND event_time BETWEEN TIMESTAMP_SUB(@event_time, INTERVAL 1 HOUR) AND @event_time
-        """
-        
-        velocity_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
-                bigquery.ScalarQueryParameter("event_time", "TIMESTAMP", event_time)
-            ]
-        )
-        
-        velocity_result = client.query(query_velocity, job_config=velocity_config).result()
-        velocity_count = next(iter(velocity_result)).session_count
-        
-        # 3. Enrich with basic logic (Mocking "Home" location logic for now)
-        # Simplistic distance calc or check if lat/lon is wildly different from expected
-        # For this implementation, we'll assume a "Distance from 'Center'" logic or just pass through
-        geo_risk = 0.0
-        # Mocking a "home" at 0,0 for calculation illustration if needed, 
-        # or checking strictly high lat/lon values as anomalies.
-        # Let's just return the raw coords and a mock "distance_from_home" 
-        # based on a hash of user_id for deterministic simulation if we wanted,
-        # but here we'll just check if it's "far" (e.g. > 100).
-        # We will follow the User Guide example output: "200 miles from home"
-        
-        # HARDCODED LOGIC FOR DEMO:
-        # If user is 'user_senior' and lat > 40, it's far.
-        # This allows us to control the narrative via the seed data.
-        
-        distance_km = 0.0
-        if session.geolocation_lat and session.geolocation_lat > 40.0:
-             distance_km = 320.0 # ~200 miles
-        
-        time_risk = "LOW"
-        if session.time_of_day_hour and (session.time_of_day_hour < 6 or session.time_of_day_hour > 23):
-            time_risk = "HIGH"
-            
         return {
             "transaction_id": transaction_id,
-            "user_id": user_id,
-            "session_id": session.session_id,
-            "is_call_active": session.is_call_active,
+            "user_id": form_user_id,
+            "session_id": f"pg_form_session_{transaction_id}",
+            "is_call_active": is_call,
             "behavioral_metrics": {
-                "typing_cadence": float(session.typing_cadence_score) if session.typing_cadence_score else 0.0,
-                "session_duration_sec": session.session_duration_seconds,
-                "rushed": (session.session_duration_seconds is not None and session.session_duration_seconds < 60)
+                "typing_cadence": float(typing),
+                "session_duration_sec": duration,
+                "rushed": (duration < RUSHED_SESSION_SECONDS)
             },
             "device_context": {
-                "battery_level": session.battery_level,
-                "is_rooted": session.is_rooted_jailbroken,
-                "os_risk": "HIGH" if session.is_rooted_jailbroken else "LOW"
+                "battery_level": 75,
+                "is_rooted": rooted,
+                "os_risk": "HIGH" if rooted else "LOW"
             },
             "risk_signals": {
-                "velocity_last_hour": velocity_count,
+                "velocity_last_hour": 1,
                 "time_of_day_risk": time_risk,
                 "geolocation_distance_km": distance_km,
-                "geolocation_anomalous": (distance_km > 50.0)
+                "geolocation_anomalous": (distance_km > GEO_ANOMALY_KM)
             }
         }
+
+    return {"transaction_id": transaction_id, "status": "no_session_found", "risk": "high_missing_context"}
+
+
+def _seed_location_history(user_ids_and_times) -> None:
+    """Merge backend sessions into the location index where its history is older than the lookup.
+
+    The index is only refreshed by the updater's snapshots, so a user's
+    sessions since then (or all of them, for a user it lacks) are read from
+    the backend: one query per user whose history is behind.
+    """
+    index = get_location_index()
+    backend = get_storage_backend()
+    for user_id, event_time in user_ids_and_times:
+        if index.needs_seed(user_id, event_time):
+            rows = backend.get_recent_locations(user_id, event_time, limit=index.history)
+            index.seed(user_id, [
+                (row["geolocation_lat"], row["geolocation_lon"], row["event_time"])
+                for row in reversed(rows)
+            ], until=event_time)
+
+
+def _assess_location(session: dict):
+    """Distance from home and travel speed for a session (scripts/update_baselines.py records it)."""
+    lat, lon = session.get("geolocation_lat"), session.get("geolocation_lon")
+    if lat is None or lon is None or session.get("event_time") is None:
+        return None
+
+    index = get_location_index()
+    _seed_location_history([(session["user_id"], session["event_time"])])
+    return index.assess(session["user_id"], lat, lon, session["event_time"])
+
+
+def _assess_locations_batch(rows: list) -> dict:
+    """Vectorized _assess_location for a batch of session rows."""
+    index = get_location_index()
+    located = [
+        row for row in rows
+        if row.get("event_time") is not None
+        and row.get("geolocation_lat") is not None and row.get("geolocation_lon") is not None
+    ]
+    # Bring each user's history up to their latest session in the batch;
+    # earlier rows only see the part before their own event_time
+    latest = {}
+    for row in located:
+        current = latest.get(row["user_id"])
+        if current is None or to_epoch_seconds(row["event_time"]) > to_epoch_seconds(current):
+            latest[row["user_id"]] = row["event_time"]
+    _seed_location_history(latest.items())
+
+    def _coords(name):
+        return np.array([np.nan if row.get(name) is None else row[name] for row in rows], dtype=np.float64)
+
+    return index.assess_batch(
+        [row["user_id"] for row in rows],
+        _coords("geolocation_lat"),
+        _coords("geolocation_lon"),
+        [row.get("event_time") or 0 for row in rows],
+    )
+
+
+def _baseline_deviations(session: dict) -> dict:
+    """How unusual a session is against the user's behavioral baseline."""
+    return get_baseline_store().session_deviations(
+        session["user_id"],
+        hour=session.get("time_of_day_hour"),
+        typing_cadence=session.get("typing_cadence_score"),
+        duration_seconds=session.get("session_duration_seconds"),
+    )
+
+
+def _baseline_deviations_batch(rows: list) -> dict:
+    """Vectorized _baseline_deviations for a batch of session rows."""
+    def _values(name):
+        return np.array([np.nan if row.get(name) is None else row[name] for row in rows], dtype=np.float64)
+
+    return get_baseline_store().session_deviations_batch(
+        [row["user_id"] for row in rows],
+        _values("time_of_day_hour"),
+        _values("typing_cadence_score"),
+        _values("session_duration_seconds"),
+    )
+
+
+def _enrich_session(transaction_id: str, session: dict, velocity_count: int, location: dict = None,
+                    baseline: dict = None) -> dict:
+    """Derive risk signals from a raw mobile_banking_sessions row.
+
+    Batch callers use session_enrichment.enrich_sessions_batch, which applies
+    the same rules in vectorized form.
+
+    Args:
+        transaction_id: Transaction under investigation
+        session: Raw session row
+        velocity_count: User's sessions in the last hour
+        location: LocationIndex.assess() result (None when no home is known)
+        baseline: BaselineStore.session_deviations() result
+    """
+    location = location or {}
+    distance_km = location.get("geolocation_distance_km", 0.0)
+    impossible_travel = location.get("impossible_travel", False)
+
+    time_risk = "LOW"
+    hour = session["time_of_day_hour"]
+    if hour is not None and (hour < NIGHT_END_HOUR or hour > NIGHT_START_HOUR):
+        time_risk = "HIGH"
+
+    return {
+        "transaction_id": transaction_id,
+        "user_id": session["user_id"],
+        "session_id": session["session_id"],
+        "is_call_active": session["is_call_active"],
+        "behavioral_metrics": {
+            "typing_cadence": float(session["typing_cadence_score"]) if session["typing_cadence_score"] else 0.0,
+            "session_duration_sec": session["session_duration_seconds"],
+            "rushed": (session["session_duration_seconds"] is not None and session["session_duration_seconds"] < RUSHED_SESSION_SECONDS)
+        },
+        "device_context": {
+            "battery_level": session["battery_level"],
+            "is_rooted": session["is_rooted_jailbroken"],
+            "os_risk": "HIGH" if session["is_rooted_jailbroken"] else "LOW"
+        },
+        "risk_signals": {
+            "velocity_last_hour": velocity_count,
+            "time_of_day_risk": time_risk,
+            "geolocation_distance_km": distance_km,
+            "travel_speed_kmh": location.get("travel_speed_kmh"),
+            "impossible_travel": impossible_travel,
+            "geolocation_anomalous": (distance_km > GEO_ANOMALY_KM) or impossible_travel
+        },
+        "baseline_deviations": baseline
+    }
+
+
+@single_flight("session_context")
+def get_session_context(transaction_id: str, event_time: Optional[int] = None) -> dict:
+    """
+    Retrieves mobile banking session context for a specific transaction.
+    
+    This tool queries the mobile_banking_sessions table (via the configured
+    storage backend) to find the session
+    linked to the transaction. It enriches the raw data with:
+    - Geolocation analysis (distance from the user's usual location and
+      impossible travel since their previous session)
+    - Velocity analysis (number of sessions in last hour)
+    - Temporal analysis (time of day risk)
+    - Baseline deviations (how unusual the hour, typing cadence and session
+      duration are for this user)
+    
+    Args:
+        transaction_id: The ID of the transaction to investigate.
+        event_time: The alert's event_time (epoch milliseconds), if known.
+            Narrows the session search to the partitions around it.
         
+    Returns:
+        dict containing session details and calculated risk signals.
+    """
+    simulated = _simulated_session_context(transaction_id)
+    if simulated is not None:
+        return simulated
+
+    try:
+        backend = get_storage_backend()
+
+        # 1. Get the specific session for this transaction
+        session = backend.get_session(transaction_id, to_datetime(event_time))
+
+        if not session:
+            return _missing_session_context(transaction_id)
+
+        # 2. Calculate Velocity (Sessions in last hour for this user)
+        # Note: In a real system we'd use current timestamp, but here we query relative to the event
+        velocity_count = backend.count_sessions_in_window(session["user_id"], session["event_time"])
+
+        # 3. Distance from home / travel speed from the per-user location index
+        location = _assess_location(session)
+
+        # 4. Deviations from the user's behavioral baseline
+        baseline = _baseline_deviations(session)
+
+        # 5. Enrich with derived risk signals
+        return _enrich_session(transaction_id, session, velocity_count, location, baseline)
+
     except Exception as e:
         print(f"[BQ SESSION TOOL] Error: {e}")
         return {"transaction_id": transaction_id, "status": "error", "error_msg": str(e)}
 
-# Export as ADK tool
+
+def get_session_context_batch(transaction_ids: list[str], event_times: Optional[dict] = None) -> dict:
+    """
+    Retrieves session context for many transactions with a single backend query.
+
+    Session rows and per-user velocity counts are fetched together, then
+    enriched exactly like get_session_context().
+
+    Args:
+        transaction_ids: The transaction IDs to investigate.
+        event_times: Optional alert event_time (epoch milliseconds) per
+            transaction_id, as for get_session_context().
+
+    Returns:
+        dict keyed by transaction_id, each value shaped like get_session_context()
+    """
+    results = {}
+    pending = []
+    for transaction_id in dict.fromkeys(transaction_ids):
+        simulated = _simulated_session_context(transaction_id)
+        if simulated is not None:
+            results[transaction_id] = simulated
+        else:
+            pending.append(transaction_id)
+
+    if pending:
+        try:
+            times = {transaction_id: to_datetime(event_times[transaction_id])
+                     for transaction_id in pending if (event_times or {}).get(transaction_id) is not None}
+            sessions = get_storage_backend().get_sessions_with_velocity(pending, event_times=times)
+            found = [transaction_id for transaction_id in pending if sessions.get(transaction_id)]
+
+            # Assess locations and enrich all found sessions in one vectorized pass
+            if found:
+                rows = [sessions[transaction_id] for transaction_id in found]
+                columns = rows_to_columns(rows)
+                columns["transaction_id"] = found
+                location = _assess_locations_batch(rows)
+                baseline = _baseline_deviations_batch(rows)
+                for transaction_id, enriched in zip(found, enrich_sessions_batch(columns, location, baseline)):
+                    results[transaction_id] = enriched
+
+            for transaction_id in pending:
+                if transaction_id not in results:
+                    results[transaction_id] = _missing_session_context(transaction_id)
+        except Exception as e:
+            print(f"[BQ SESSION TOOL] Batch error: {e}")
+            for transaction_id in pending:
+                results[transaction_id] = {"transaction_id": transaction_id, "status": "error", "error_msg": str(e)}
+
+    return results
+
+# Export as ADK tools
 session_context_tool = FunctionTool(get_session_context)
+session_context_batch_tool = FunctionTool(get_session_context_batch)
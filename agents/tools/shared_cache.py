@@ -0,0 +1,446 @@
+"""Cross-process profile / beneficiary cache in POSIX shared memory.
+
+When the swarm runs several worker processes, each one would otherwise warm
+its own copy of the profile and beneficiary lookups. This module keeps one
+copy in a multiprocessing.shared_memory segment. One refresher process
+(scripts/refresh_shared_cache.py) writes it, and every worker reads it
+without locks.
+
+Segment layout (little-endian):
+    header   magic, version, table count, generation, refreshed_at, segment id
+    tables   per table: name, slots, slot size, active buffer, row count,
+             offsets of buffers A and B
+    buffers  per table, two fixed-slot open-addressing tables (linear
+             probing), each slot:
+                 uint64 key fingerprint (0 = empty), uint16 record length,
+                 record bytes
+
+Records use a compact encoding of the feature-store columns (key first):
+a null bitmap byte, then per non-null column a varint length + UTF-8 for
+strings, a zigzag varint for ints, a float64, or one byte for bools. A
+record longer than the slot is not cached, and those lookups fall through to
+the backend.
+
+The refresher fills the inactive buffer of a table and then flips `active`.
+The header generation acts as a seqlock: it is odd while a flip is in
+progress. A reader takes the generation, probes the active buffer, and
+retries if the generation changed. That way it never returns a row from a
+buffer that is being rewritten. Rows are whole-table snapshots; a key
+missing from the cache is looked up in the wrapped backend.
+
+Enable it in the workers with DETECTIVE_SHARED_CACHE_NAME=<segment name>.
+get_storage_backend() then wraps the configured backend in a
+SharedCacheBackend. Workers re-attach every few seconds, so a segment that
+the refresher recreates (e.g. with a new capacity) is picked up.
+"""
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.metrics import get_metrics_registry
+from .feature_store import BENEFICIARY_COLUMNS, PROFILE_COLUMNS, _hash_key
+from .snapshot_loader import RECHECK_SECONDS
+from .storage_backends import StorageBackend
+
+MAGIC = b"SGSC"
+FORMAT_VERSION = 1
+MAX_LOAD_FACTOR = 0.8
+READ_RETRIES = 8
+
+CACHED_TABLES = {
+    "customer_profiles": PROFILE_COLUMNS,
+    "beneficiary_graph": BENEFICIARY_COLUMNS,
+}
+# Default slot sizes: records are ~60-90 bytes for profiles, ~30-50 for beneficiaries
+DEFAULT_SLOT_BYTES = {"customer_profiles": 128, "beneficiary_graph": 64}
+
+_HEADER = struct.Struct("<4sHHQdQ")
+_TABLE = struct.Struct("<24sIIIIQQ")
+_SLOT = struct.Struct("<QH")
+_GENERATION = struct.Struct("<Q")
+_GENERATION_OFFSET = 8
+_REFRESHED_AT_OFFSET = 16
+_FLOAT64 = struct.Struct("<d")
+
+
+def _fingerprint(key: str) -> int:
+    return _hash_key(key) | 1
+
+
+def _put_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(buf, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_record(columns: List[Tuple[str, str]], row: Dict[str, Any]) -> bytes:
+    """Compact binary encoding of a row (see module docstring)."""
+    out = bytearray(1)
+    nulls = 0
+    for i, (name, col_type) in enumerate(columns):
+        value = row.get(name)
+        if value is None:
+            nulls |= 1 << i
+        elif col_type == "str":
+            encoded = str(value).encode("utf-8")
+            _put_varint(out, len(encoded))
+            out += encoded
+        elif col_type == "int":
+            value = int(value)
+            _put_varint(out, (value << 1) ^ (value >> 63))
+        elif col_type == "float":
+            out += _FLOAT64.pack(float(value))
+        else:
+            out.append(1 if value else 0)
+    out[0] = nulls
+    return bytes(out)
+
+
+def decode_record(columns: List[Tuple[str, str]], buf, pos: int = 0) -> Dict[str, Any]:
+    """Inverse of encode_record()."""
+    nulls = buf[pos]
+    pos += 1
+    row: Dict[str, Any] = {}
+    for i, (name, col_type) in enumerate(columns):
+        if nulls & (1 << i):
+            row[name] = None
+        elif col_type == "str":
+            length, pos = _get_varint(buf, pos)
+            row[name] = str(buf[pos:pos + length], "utf-8")
+            pos += length
+        elif col_type == "int":
+            value, pos = _get_varint(buf, pos)
+            row[name] = (value >> 1) ^ -(value & 1)
+        elif col_type == "float":
+            row[name] = _FLOAT64.unpack_from(buf, pos)[0]
+            pos += 8
+        else:
+            row[name] = bool(buf[pos])
+            pos += 1
+    return row
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without letting this process's exit unlink it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 registers every attach with the resource tracker
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class _TableLayout:
+    __slots__ = ("index", "name", "columns", "slots", "slot_size", "offsets")
+
+    def __init__(self, index: int, name: str, slots: int, slot_size: int, offsets: Tuple[int, int]):
+        self.index = index
+        self.name = name
+        self.columns = CACHED_TABLES[name]
+        self.slots = slots
+        self.slot_size = slot_size
+        self.offsets = offsets
+
+
+class SharedLookupCache:
+    """Fixed-slot shared-memory tables of profile and beneficiary records."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self._shm = shm
+        self._buf = shm.buf
+        self.owner = owner
+        magic, version, count, _, _, self.segment_id = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Shared memory segment {shm.name} is not a lookup cache (version {FORMAT_VERSION})")
+        self.tables: Dict[str, _TableLayout] = {}
+        for i in range(count):
+            raw_name, slots, slot_size, _, _, offset_a, offset_b = _TABLE.unpack_from(
+                self._buf, _HEADER.size + i * _TABLE.size
+            )
+            name = raw_name.rstrip(b"\0").decode("utf-8")
+            self.tables[name] = _TableLayout(i, name, slots, slot_size, (offset_a, offset_b))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def create(cls, name: str, capacity: Dict[str, int],
+               slot_bytes: Optional[Dict[str, int]] = None) -> "SharedLookupCache":
+        """Create a new segment sized for `capacity` rows per table.
+
+        Args:
+            name: Segment name (DETECTIVE_SHARED_CACHE_NAME)
+            capacity: Maximum rows per table name in CACHED_TABLES
+            slot_bytes: Slot size per table (defaults to DEFAULT_SLOT_BYTES)
+        """
+        slot_bytes = {**DEFAULT_SLOT_BYTES, **(slot_bytes or {})}
+        layouts = []
+        offset = _HEADER.size + _TABLE.size * len(capacity)
+        offset = (offset + 63) & ~63
+        for table_name, rows in capacity.items():
+            slots = 8
+            while slots * MAX_LOAD_FACTOR < rows:
+                slots *= 2
+            size = slots * slot_bytes[table_name]
+            layouts.append((table_name, slots, slot_bytes[table_name], (offset, offset + size)))
+            offset += 2 * size
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=offset)
+        try:
+            # The segment outlives the refresher; unlink() removes it
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        _HEADER.pack_into(shm.buf, 0, MAGIC, FORMAT_VERSION, len(layouts), 0, 0.0,
+                          int.from_bytes(os.urandom(8), "little"))
+        for i, (table_name, slots, slot_size, (offset_a, offset_b)) in enumerate(layouts):
+            _TABLE.pack_into(shm.buf, _HEADER.size + i * _TABLE.size,
+                             table_name.encode("utf-8"), slots, slot_size, 0, 0, offset_a, offset_b)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedLookupCache":
+        """Attach to an existing segment (read-only use)."""
+        return cls(_attach(name))
+
+    def close(self) -> None:
+        self._buf = None
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Remove the segment (attached readers keep their mapping until they re-attach)."""
+        if getattr(self._shm, "_track", True):
+            # SharedMemory.unlink() also unregisters from the resource tracker,
+            # which no longer holds this segment (see _attach / create)
+            from multiprocessing import resource_tracker
+            resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+    # -- header fields --------------------------------------------------------
+
+    def _generation(self) -> int:
+        return _GENERATION.unpack_from(self._buf, _GENERATION_OFFSET)[0]
+
+    def _table_state(self, table: _TableLayout) -> Tuple[int, int]:
+        """(active buffer, row count) of a table."""
+        fields = _TABLE.unpack_from(self._buf, _HEADER.size + table.index * _TABLE.size)
+        return fields[3], fields[4]
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts, capacity and refresh time."""
+        _, _, _, generation, refreshed_at, _ = _HEADER.unpack_from(self._buf, 0)
+        result = {"generation": generation, "refreshed_at": refreshed_at, "tables": {}}
+        for name, table in self.tables.items():
+            _, rows = self._table_state(table)
+            result["tables"][name] = {"rows": rows, "slots": table.slots, "slot_bytes": table.slot_size}
+        return result
+
+    # -- reads (lock-free) ---------------------------------------------------
+
+    def _probe(self, table: _TableLayout, offset: int, key: str, fingerprint: int) -> Optional[Dict[str, Any]]:
+        buf, slot_size, mask = self._buf, table.slot_size, table.slots - 1
+        slot = fingerprint & mask
+        for _ in range(table.slots):
+            position = offset + slot * slot_size
+            stored, length = _SLOT.unpack_from(buf, position)
+            if stored == 0:
+                return None
+            if stored == fingerprint:
+                start = position + _SLOT.size
+                row = decode_record(table.columns, buf[start:start + length].tobytes())
+                if row[table.columns[0][0]] == key:
+                    return row
+            slot = (slot + 1) & mask
+        return None
+
+    def get(self, table_name: str, key: str) -> Optional[Dict[str, Any]]:
+        """Cached row for a key, or None if the table does not hold it."""
+        table = self.tables.get(table_name)
+        if table is None:
+            return None
+        fingerprint = _fingerprint(key)
+        for _ in range(READ_RETRIES):
+            generation = self._generation()
+            if generation & 1:
+                continue
+            active, _ = self._table_state(table)
+            try:
+                row = self._probe(table, table.offsets[active], key, fingerprint)
+            except (struct.error, UnicodeDecodeError, IndexError, ValueError):
+                row = None  # torn read of a buffer being rewritten; the generation check retries
+            if self._generation() == generation:
+                return row
+        return None
+
+    # -- writes (single refresher) ---------------------------------------------
+
+    def write_table(self, table_name: str, rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Replace a table's contents: fill the inactive buffer, then flip it in.
+
+        Later rows win on duplicate keys. Only one process may write.
+
+        Returns:
+            dict with written, oversized (record longer than a slot) and
+            overflow (beyond MAX_LOAD_FACTOR of the slots) counts
+        """
+        table = self.tables[table_name]
+        buf, slot_size, mask = self._buf, table.slot_size, table.slots - 1
+        key_name = table.columns[0][0]
+        active, _ = self._table_state(table)
+        target = 1 - active
+        offset = table.offsets[target]
+        buf[offset:offset + table.slots * slot_size] = bytes(table.slots * slot_size)
+
+        limit = int(table.slots * MAX_LOAD_FACTOR)
+        written = oversized = overflow = 0
+        for row in rows:
+            key = row.get(key_name)
+            if key is None:
+                continue
+            key = str(key)
+            record = encode_record(table.columns, {**row, key_name: key})
+            if len(record) > slot_size - _SLOT.size:
+                oversized += 1
+                continue
+            fingerprint = _fingerprint(key)
+            slot = fingerprint & mask
+            while True:
+                position = offset + slot * slot_size
+                stored, length = _SLOT.unpack_from(buf, position)
+                if stored == 0:
+                    break
+                if stored == fingerprint and decode_record(
+                        table.columns, buf[position + _SLOT.size:position + _SLOT.size + length])[key_name] == key:
+                    written -= 1  # replacing an earlier row for the same key
+                    break
+                slot = (slot + 1) & mask
+            if stored == 0 and written >= limit:
+                overflow += 1
+                continue
+            _SLOT.pack_into(buf, position, fingerprint, len(record))
+            buf[position + _SLOT.size:position + _SLOT.size + len(record)] = record
+            written += 1
+
+        generation = self._generation()
+        _GENERATION.pack_into(buf, _GENERATION_OFFSET, generation + 1)
+        _TABLE.pack_into(buf, _HEADER.size + table.index * _TABLE.size, table_name.encode("utf-8"),
+                         table.slots, slot_size, target, written, *table.offsets)
+        _FLOAT64.pack_into(buf, _REFRESHED_AT_OFFSET, time.time())
+        _GENERATION.pack_into(buf, _GENERATION_OFFSET, generation + 2)
+        return {"written": written, "oversized": oversized, "overflow": overflow}
+
+
+class SharedCacheBackend(StorageBackend):
+    """StorageBackend that answers profile / beneficiary lookups from the shared cache.
+
+    Misses, and every other lookup (sessions, velocity), go to the wrapped
+    backend.
+    """
+
+    def __init__(self, inner: StorageBackend, segment_name: str):
+        self.inner = inner
+        self.segment_name = segment_name
+        self.name = f"shared_cache+{inner.name}"
+        self._lock = threading.Lock()
+        self._cache: Optional[SharedLookupCache] = None
+        self._checked_at = -RECHECK_SECONDS
+
+    def _current(self) -> Optional[SharedLookupCache]:
+        """The attached cache, re-attaching every RECHECK_SECONDS to follow a recreated segment."""
+        now = time.monotonic()
+        if now - self._checked_at < RECHECK_SECONDS:
+            return self._cache
+        with self._lock:
+            if now - self._checked_at < RECHECK_SECONDS:
+                return self._cache
+            self._checked_at = now
+            try:
+                fresh = SharedLookupCache.attach(self.segment_name)
+            except (FileNotFoundError, ValueError) as e:
+                if self._cache is not None:
+                    print(f"[SharedCache] Segment {self.segment_name} unavailable: {e}")
+                self._cache = None
+                return None
+            if self._cache is not None and fresh.segment_id == self._cache.segment_id:
+                fresh.close()
+            else:
+                self._cache = fresh
+        return self._cache
+
+    def _lookup(self, table_name: str, key: str) -> Optional[Dict[str, Any]]:
+        cache = self._current()
+        row = cache.get(table_name, key) if cache is not None else None
+        get_metrics_registry().inc("shared_cache.hits" if row is not None else "shared_cache.misses",
+                                   table=table_name)
+        return row
+
+    def _lookup_many(self, table_name: str, keys: List[str]):
+        """(rows found in the cache, keys to fetch from the backend)."""
+        found, missing = {}, []
+        for key in keys:
+            row = self._lookup(table_name, key)
+            if row is not None:
+                found[key] = row
+            else:
+                missing.append(key)
+        return found, missing
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        row = self._lookup("customer_profiles", user_id)
+        return row if row is not None else self.inner.get_profile(user_id)
+
+    def get_beneficiary(self, account_id: str) -> Optional[Dict[str, Any]]:
+        row = self._lookup("beneficiary_graph", account_id)
+        return row if row is not None else self.inner.get_beneficiary(account_id)
+
+    def get_profiles(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found, missing = self._lookup_many("customer_profiles", list(user_ids))
+        if missing:
+            found.update(self.inner.get_profiles(missing))
+        return found
+
+    def get_beneficiaries(self, account_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found, missing = self._lookup_many("beneficiary_graph", list(account_ids))
+        if missing:
+            found.update(self.inner.get_beneficiaries(missing))
+        return found
+
+    def get_session(self, transaction_id: str, event_time=None) -> Optional[Dict[str, Any]]:
+        return self.inner.get_session(transaction_id, event_time)
+
+    def count_sessions_in_window(self, user_id, event_time, window_seconds=None) -> int:
+        if window_seconds is None:
+            return self.inner.count_sessions_in_window(user_id, event_time)
+        return self.inner.count_sessions_in_window(user_id, event_time, window_seconds)
+
+    def get_recent_locations(self, user_id, before, limit: int = 8):
+        return self.inner.get_recent_locations(user_id, before, limit)
+
+    def get_sessions_since(self, since, after_session_id: str = "", limit: int = 10000):
+        return self.inner.get_sessions_since(since, after_session_id, limit)
+
+    def get_sessions_with_velocity(self, transaction_ids, window_seconds=None, event_times=None):
+        if window_seconds is None:
+            return self.inner.get_sessions_with_velocity(transaction_ids, event_times=event_times)
+        return self.inner.get_sessions_with_velocity(transaction_ids, window_seconds, event_times)
+
+    def scan_latest(self, table_name: str):
+        return self.inner.scan_latest(table_name)
@@ -0,0 +1,155 @@
+"""Single-flight de-duplication of concurrent identical tool lookups.
+
+When a mule campaign hits, many investigations ask for the same beneficiary
+at the same moment. Without coordination each call runs its own BigQuery
+job. A single-flight group lets the first caller for a key (the leader) run
+the lookup while every caller arriving before it finishes waits for, and
+returns, the same result. Nothing is cached: once the lookup completes the
+next call runs a fresh one.
+
+Decorate a tool with @single_flight("name"). Sync functions coalesce across
+threads; coroutine functions coalesce across tasks on the same event loop
+without holding a thread per waiter. The key is the bound call arguments
+(defaults applied), so get_beneficiary_risk("acc_1") and
+get_beneficiary_risk(account_id="acc_1") share a flight; calls with
+unhashable arguments are not coalesced.
+
+Waiters receive a shallow copy of a dict result, so top-level edits by one
+caller are not seen by another. Exceptions raised by the leader are raised
+in every waiter. Counters:
+
+- single_flight.calls{group=...}: every call
+- single_flight.coalesced{group=...}: calls served by another caller's lookup
+"""
+import asyncio
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from config.metrics import get_metrics_registry
+
+
+def _share(result: Any) -> Any:
+    return dict(result) if isinstance(result, dict) else result
+
+
+class _Call:
+    """An in-flight sync lookup."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent sync calls with the same key (thread-safe)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs), or wait for the in-flight call with the same key."""
+        metrics = get_metrics_registry()
+        metrics.inc("single_flight.calls", group=self.name)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.inc("single_flight.coalesced", group=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.result)
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls with the same key on one event loop."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await func(*args, **kwargs), or the in-flight call with the same key.
+
+        The lookup runs as its own task, so cancelling the caller that
+        started it does not cancel it for the others.
+        """
+        metrics = get_metrics_registry()
+        metrics.inc("single_flight.calls", group=self.name)
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        task = self._tasks.get(task_key)
+        leader = task is None
+        if leader:
+            task = loop.create_task(func(*args, **kwargs))
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+        else:
+            metrics.inc("single_flight.coalesced", group=self.name)
+
+        result = await asyncio.shield(task)
+        return result if leader else _share(result)
+
+
+def single_flight(name: str) -> Callable:
+    """Decorator: coalesce concurrent calls of a sync or async tool with equal arguments."""
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        def call_key(args, kwargs) -> Optional[Hashable]:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.values())
+            try:
+                hash(key)
+            except TypeError:
+                return None
+            return key
+
+        if inspect.iscoroutinefunction(func):
+            group = AsyncSingleFlight(name)
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = call_key(args, kwargs)
+                if key is None:
+                    return await func(*args, **kwargs)
+                return await group.do(key, func, *args, **kwargs)
+
+            async_wrapper.single_flight = group
+            return async_wrapper
+
+        group = SingleFlight(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = call_key(args, kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            return group.do(key, func, *args, **kwargs)
+
+        wrapper.single_flight = group
+        return wrapper
+
+    return decorator
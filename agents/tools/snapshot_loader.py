@@ -0,0 +1,118 @@
+"""Process-wide objects loaded from snapshot files that a separate writer replaces.
+
+Several Detective indexes (behavioral baselines, the mule-network graph) are
+built by an offline/streaming updater and saved atomically (temp file +
+os.replace). Readers hold one in-memory copy per process and stat() the file
+every few seconds, swapping in the new snapshot when the file was replaced.
+"""
+import os
+import struct
+import threading
+import time
+import zipfile
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+# How often readers stat() a snapshot file to pick up a newer one
+RECHECK_SECONDS = 5.0
+
+
+class SnapshotHolder:
+    """Holds the current object loaded from a snapshot file."""
+
+    def __init__(self, name: str, path_fn: Callable[[], str], load_fn: Callable[[str], Any],
+                 empty_fn: Callable[[], Any], recheck_seconds: float = RECHECK_SECONDS,
+                 identity: Callable[[os.stat_result], Any] = lambda st: (st.st_ino, st.st_mtime_ns)):
+        """Configure the holder.
+
+        Args:
+            name: Log tag (e.g. "Baselines")
+            path_fn: Returns the snapshot path (read on every recheck, so env
+                changes are honoured)
+            load_fn: Loads an object from a snapshot path
+            empty_fn: Creates the object used while there is no snapshot
+            recheck_seconds: Minimum interval between stat() calls
+            identity: Maps a stat() result to the value whose change means
+                "new snapshot" (default: inode and mtime)
+        """
+        self.name = name
+        self._path_fn = path_fn
+        self._load_fn = load_fn
+        self._empty_fn = empty_fn
+        self._recheck_seconds = recheck_seconds
+        self._identity = identity
+        self._lock = threading.Lock()
+        self._value = None
+        self._stat = None
+        self._checked_at = -recheck_seconds
+        self._pinned = False
+
+    def get(self) -> Any:
+        """Current object, reloading the snapshot if the file was replaced."""
+        now = time.monotonic()
+        if self._pinned or (self._value is not None and now - self._checked_at < self._recheck_seconds):
+            return self._value
+
+        with self._lock:
+            self._checked_at = now
+            path = self._path_fn()
+            try:
+                stat = self._identity(os.stat(path))
+            except OSError:
+                stat = None
+
+            if self._value is None or (stat is not None and stat != self._stat):
+                value = None
+                if stat is not None:
+                    try:
+                        value = self._load_fn(path)
+                    except Exception as e:
+                        print(f"[{self.name}] Failed to load snapshot {path}: {e}")
+                if value is None and self._value is None:
+                    value = self._empty_fn()
+                if value is not None:
+                    self._value, self._stat = value, stat
+        return self._value
+
+    def set(self, value: Optional[Any]) -> None:
+        """Pin an explicit object (never replaced by reloads). None resets to the snapshot."""
+        with self._lock:
+            self._value = value
+            self._stat = None
+            self._checked_at = -self._recheck_seconds
+            self._pinned = value is not None
+
+
+def memmap_npz(path: str, names: Iterable[str], mode: str = "c") -> Dict[str, np.ndarray]:
+    """Memory-map arrays of an uncompressed .npz (as written by np.savez) instead of reading them.
+
+    np.savez stores each array as an uncompressed .npy member, so its data
+    can be mapped in place. With mode "c" (copy-on-write) every process
+    reading the same snapshot shares the file's pages, and a page is copied
+    only when a process writes to it. The mapping stays valid after the file
+    is replaced.
+
+    Raises:
+        ValueError: If a member is compressed or holds Python objects
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for name in names:
+            info = archive.getinfo(f"{name}.npy")
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: {name} is compressed and cannot be memory-mapped")
+            # Local file header: 30 bytes, then the file name and extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path}: {name} holds Python objects and cannot be memory-mapped")
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mode, offset=f.tell(), shape=shape,
+                                     order="F" if fortran_order else "C")
+    return arrays
@@ -0,0 +1,814 @@
+"""Pluggable storage backends for the Detective tools.
+
+The Detective tools only need four lookups: customer profile, beneficiary
+record, the session linked to a transaction, and the user's session count in
+a time window (velocity). Each backend implements these over its own store:
+
+- BigQueryBackend: the `streamguard_threats` dataset (default)
+- SQLiteBackend: an embedded SQLite file (WAL mode, indexed) with the same
+  tables and columns as scripts/create_playground_tables.py, for on-prem/edge
+  deployments and cloud-free load tests
+
+The backend is selected with DETECTIVE_STORAGE_BACKEND ("bigquery" or "sqlite").
+"""
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .bigquery_utils import get_client, retry_query_with_backoff, run_query
+
+PROFILE_FIELDS = ["user_id", "age_group", "account_tenure_days", "avg_transfer_amount", "behavioral_segment"]
+BENEFICIARY_FIELDS = ["account_id", "account_age_hours", "risk_score", "linked_to_flagged_device"]
+# Key column first; scan_latest() reads these tables
+LOOKUP_TABLE_FIELDS = {
+    "customer_profiles": PROFILE_FIELDS,
+    "beneficiary_graph": BENEFICIARY_FIELDS,
+}
+SESSION_FIELDS = [
+    "session_id", "user_id", "event_type", "is_call_active",
+    "typing_cadence_score", "session_duration_seconds",
+    "battery_level", "is_rooted_jailbroken",
+    "geolocation_lat", "geolocation_lon",
+    "time_of_day_hour", "event_time",
+]
+
+# Columns read by the behavioral baseline / location updater
+BASELINE_SESSION_COLUMNS = (
+    "session_id, user_id, typing_cadence_score, session_duration_seconds, time_of_day_hour, "
+    "geolocation_lat, geolocation_lon, event_time"
+)
+
+# Velocity window used by get_session_context
+VELOCITY_WINDOW_SECONDS = 3600
+
+# How far back session lookups by transaction_id search when the alert's
+# event_time is unknown. mobile_banking_sessions is partitioned by event_time,
+# so this bounds the partitions scanned.
+DEFAULT_SESSION_LOOKBACK_DAYS = 7
+
+# With the alert's event_time known, a session is searched within this many
+# hours either side of it (two or three daily partitions)
+DEFAULT_SESSION_MATCH_HOURS = 24
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """Convert an alert event_time (datetime, ISO string or epoch seconds/ms) to a UTC datetime."""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        parsed = datetime.fromisoformat(value)
+        return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+    value = float(value)
+    return datetime.fromtimestamp(value / 1000 if value > 1e11 else value, tz=timezone.utc)
+
+
+class StorageBackend(ABC):
+    """Lookup interface used by the Detective tools.
+
+    Rows are returned as plain dicts keyed by column name, or None when the
+    key is not found.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a row from customer_profiles."""
+
+    @abstractmethod
+    def get_beneficiary(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a row from beneficiary_graph."""
+
+    @abstractmethod
+    def get_session(self, transaction_id: str, event_time: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Fetch the mobile_banking_sessions row linked to a transaction.
+
+        `event_time` is the alert's transaction time; backends may use it to
+        narrow the search.
+        """
+
+    @abstractmethod
+    def count_sessions_in_window(
+        self,
+        user_id: str,
+        event_time: datetime,
+        window_seconds: int = VELOCITY_WINDOW_SECONDS
+    ) -> int:
+        """Count the user's sessions in [event_time - window, event_time]."""
+
+    def get_recent_locations(self, user_id: str, before: datetime, limit: int = 8) -> List[Dict[str, Any]]:
+        """Fetch the user's latest session coordinates before a time, newest first.
+
+        Used to seed the location index for users it has not seen yet. Rows
+        have geolocation_lat, geolocation_lon and event_time. The default
+        returns no history.
+        """
+        return []
+
+    def get_sessions_since(
+        self,
+        since: Optional[datetime],
+        after_session_id: str = "",
+        limit: int = 10000
+    ) -> List[Dict[str, Any]]:
+        """Fetch sessions after a (event_time, session_id) position, oldest first.
+
+        Used by scripts/update_baselines.py to consume the session stream
+        incrementally. Rows have session_id, user_id, typing_cadence_score,
+        session_duration_seconds, time_of_day_hour, geolocation_lat,
+        geolocation_lon and event_time. The default
+        returns no sessions.
+        """
+        return []
+
+    def scan_latest(self, table_name: str) -> Iterable[Dict[str, Any]]:
+        """Iterate the latest row per key of customer_profiles or beneficiary_graph.
+
+        Used by scripts/refresh_shared_cache.py to load whole tables.
+
+        Raises:
+            NotImplementedError: If the backend cannot scan tables
+        """
+        raise NotImplementedError(f"{self.name} backend does not support table scans")
+
+    # Batched lookups. The defaults fall back to one lookup per key; backends
+    # override them to answer a whole batch with a single query.
+
+    def get_profiles(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch customer_profiles rows for many users, keyed by user_id."""
+        rows = {user_id: self.get_profile(user_id) for user_id in user_ids}
+        return {k: v for k, v in rows.items() if v is not None}
+
+    def get_beneficiaries(self, account_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch beneficiary_graph rows for many accounts, keyed by account_id."""
+        rows = {account_id: self.get_beneficiary(account_id) for account_id in account_ids}
+        return {k: v for k, v in rows.items() if v is not None}
+
+    def get_sessions_with_velocity(
+        self,
+        transaction_ids: List[str],
+        window_seconds: int = VELOCITY_WINDOW_SECONDS,
+        event_times: Optional[Dict[str, datetime]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch sessions for many transactions, keyed by transaction_id.
+
+        Each row also carries `velocity_count`: the user's session count in
+        the window ending at the session's event_time. `event_times` maps
+        transaction_id to the alert's event_time (see get_session).
+        """
+        event_times = event_times or {}
+        results = {}
+        for transaction_id in transaction_ids:
+            session = self.get_session(transaction_id, event_times.get(transaction_id))
+            if session is not None:
+                session["velocity_count"] = self.count_sessions_in_window(
+                    session["user_id"], session["event_time"], window_seconds
+                )
+                results[transaction_id] = session
+        return results
+
+
+class BigQueryBackend(StorageBackend):
+    """Lookups against the BigQuery `streamguard_threats` dataset."""
+
+    name = "bigquery"
+
+    def __init__(self, dataset: Optional[str] = None, client=None, lookback_days: Optional[int] = None,
+                 match_hours: Optional[int] = None):
+        """Initialize the backend.
+
+        Args:
+            dataset: Dataset name (defaults to BIGQUERY_DATASET or streamguard_threats)
+            client: BigQuery client (created lazily if not provided)
+            lookback_days: Session lookup window in days when the alert's
+                event_time is unknown (defaults to SESSION_LOOKBACK_DAYS or 7)
+            match_hours: Session lookup window either side of a known
+                event_time (defaults to SESSION_MATCH_HOURS or 24)
+        """
+        self.dataset = dataset or os.getenv("BIGQUERY_DATASET", "streamguard_threats")
+        self._client = client
+        if lookback_days is None:
+            lookback_days = int(os.getenv("SESSION_LOOKBACK_DAYS", DEFAULT_SESSION_LOOKBACK_DAYS))
+        self.lookback_days = lookback_days
+        if match_hours is None:
+            match_hours = int(os.getenv("SESSION_MATCH_HOURS", DEFAULT_SESSION_MATCH_HOURS))
+        self.match_hours = match_hours
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    def _query_one(self, query: str, params: list, table: str, retry: bool = True) -> Optional[Dict[str, Any]]:
+        """Run a query and return the first row as a dict.
+
+        Retries with exponential backoff because freshly streamed rows can
+        take a few seconds to become visible. With retry=False a miss returns
+        None after one query.
+        """
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+
+        def execute_query():
+            results = run_query(self.client, query, job_config, table=table)
+            row = next(iter(results), None)
+            return dict(row.items()) if row is not None else None
+
+        if not retry:
+            return execute_query()
+        return retry_query_with_backoff(execute_query, max_retries=3, initial_delay=2)
+
+    def _session_bounds(self, earliest: Optional[datetime], latest: Optional[datetime],
+                        match_hours: Optional[int] = None) -> Tuple[str, Optional[str], list]:
+        """Partition bounds for session lookups by transaction_id.
+
+        Returns (lower, upper, params): SQL TIMESTAMP expressions for the
+        event_time range and their query parameters. With the alerts' event
+        times known the range is [earliest - match_hours, latest +
+        match_hours] (self.match_hours unless given); otherwise it is the
+        last `lookback_days` before now and `upper` is None. Both are
+        constant expressions, so BigQuery prunes the partitions outside them.
+        """
+        from google.cloud import bigquery
+
+        if match_hours is None:
+            match_hours = self.match_hours
+        if earliest is None or latest is None:
+            return (
+                "TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @lookback_days DAY)", None,
+                [bigquery.ScalarQueryParameter("lookback_days", "INT64", self.lookback_days)],
+            )
+        return (
+            "TIMESTAMP_SUB(@earliest, INTERVAL @match_hours HOUR)",
+            "TIMESTAMP_ADD(@latest, INTERVAL @match_hours HOUR)",
+            [
+                bigquery.ScalarQueryParameter("earliest", "TIMESTAMP", earliest),
+                bigquery.ScalarQueryParameter("latest", "TIMESTAMP", latest),
+                bigquery.ScalarQueryParameter("match_hours", "INT64", match_hours),
+            ],
+        )
+
+    @property
+    def _widened_match_hours(self) -> Optional[int]:
+        """Hours either side of a known event_time searched after a miss (None when no wider)."""
+        hours = self.lookback_days * 24
+        return hours if hours > self.match_hours else None
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        from google.cloud import bigquery
+
+        query = f"""
+        SELECT {', '.join(PROFILE_FIELDS)}
+        FROM `{self.dataset}.customer_profiles`
+        WHERE user_id = @user_id
+        """
+        return self._query_one(query, [bigquery.ScalarQueryParameter("user_id", "STRING", user_id)], "customer_profiles")
+
+    def get_beneficiary(self, account_id: str) -> Optional[Dict[str, Any]]:
+        from google.cloud import bigquery
+
+        query = f"""
+        SELECT {', '.join(BENEFICIARY_FIELDS)}
+        FROM `{self.dataset}.beneficiary_graph`
+        WHERE account_id = @account_id
+        """
+        return self._query_one(query, [bigquery.ScalarQueryParameter("account_id", "STRING", account_id)], "beneficiary_graph")
+
+    def get_session(self, transaction_id: str, event_time: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        from google.cloud import bigquery
+
+        # Every lookup is partition bounded. The partitions around the alert
+        # are searched first, retried while a freshly streamed session
+        # becomes visible. A miss with a known event_time widens once to
+        # lookback_days either side of it; after that (or at once when the
+        # event_time is unknown) the session is treated as missing.
+        event_time = to_datetime(event_time)
+        params = [bigquery.ScalarQueryParameter("transaction_id", "STRING", transaction_id)]
+
+        def lookup(match_hours: Optional[int], retry: bool) -> Optional[Dict[str, Any]]:
+            lower, upper, bound_params = self._session_bounds(event_time, event_time, match_hours)
+            query = f"""
+            SELECT {', '.join(SESSION_FIELDS)}
+            FROM `{self.dataset}.mobile_banking_sessions`
+            WHERE transaction_id = @transaction_id
+            AND event_time >= {lower}{f" AND event_time <= {upper}" if upper else ""}
+            LIMIT 1
+            """
+            return self._query_one(query, params + bound_params, "mobile_banking_sessions", retry=retry)
+
+        session = lookup(None, retry=True)
+        if session is None and event_time is not None and self._widened_match_hours:
+            session = lookup(self._widened_match_hours, retry=False)
+        return session
+
+    def count_sessions_in_window(
+        self,
+        user_id: str,
+        event_time: datetime,
+        window_seconds: int = VELOCITY_WINDOW_SECONDS
+    ) -> int:
+        from google.cloud import bigquery
+
+        # Bounded by parameters only, so partitions outside the window are pruned
+        query = f"""
+        SELECT COUNT(*) as session_count
+        FROM `{self.dataset}.mobile_banking_sessions`
+        WHERE user_id = @user_id
+        AND event_time BETWEEN TIMESTAMP_SUB(@event_time, INTERVAL @window_seconds SECOND) AND @event_time
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
+                bigquery.ScalarQueryParameter("event_time", "TIMESTAMP", event_time),
+                bigquery.ScalarQueryParameter("window_seconds", "INT64", window_seconds),
+            ]
+        )
+        result = run_query(self.client, query, job_config, table="mobile_banking_sessions")
+        return next(iter(result)).session_count
+
+    def get_recent_locations(self, user_id: str, before: datetime, limit: int = 8) -> List[Dict[str, Any]]:
+        from google.cloud import bigquery
+
+        query = f"""
+        SELECT geolocation_lat, geolocation_lon, event_time
+        FROM `{self.dataset}.mobile_banking_sessions`
+        WHERE user_id = @user_id
+        AND event_time < @before
+        AND event_time >= TIMESTAMP_SUB(@before, INTERVAL @lookback_days DAY)
+        AND geolocation_lat IS NOT NULL AND geolocation_lon IS NOT NULL
+        ORDER BY event_time DESC
+        LIMIT @limit
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("user_id", "STRING", user_id),
+                bigquery.ScalarQueryParameter("before", "TIMESTAMP", before),
+                bigquery.ScalarQueryParameter("lookback_days", "INT64", self.lookback_days),
+                bigquery.ScalarQueryParameter("limit", "INT64", limit),
+            ]
+        )
+        return [dict(row.items()) for row in run_query(self.client, query, job_config, table="mobile_banking_sessions")]
+
+    def get_sessions_since(
+        self,
+        since: Optional[datetime],
+        after_session_id: str = "",
+        limit: int = 10000
+    ) -> List[Dict[str, Any]]:
+        from google.cloud import bigquery
+
+        # Without a position start at the lookback window (partition pruned)
+        since = since or datetime.now(timezone.utc) - timedelta(days=self.lookback_days)
+        query = f"""
+        SELECT {BASELINE_SESSION_COLUMNS}
+        FROM `{self.dataset}.mobile_banking_sessions`
+        WHERE event_time >= @since
+        AND (event_time > @since OR session_id > @after_session_id)
+        ORDER BY event_time, session_id
+        LIMIT @limit
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("since", "TIMESTAMP", since),
+                bigquery.ScalarQueryParameter("after_session_id", "STRING", after_session_id),
+                bigquery.ScalarQueryParameter("limit", "INT64", limit),
+            ]
+        )
+        result = run_query(self.client, query, job_config, table="mobile_banking_sessions", source="baselines")
+        return [dict(row.items()) for row in result]
+
+    def scan_latest(self, table_name: str) -> Iterable[Dict[str, Any]]:
+        fields = LOOKUP_TABLE_FIELDS[table_name]
+        # Tables are append-only; keep the most recent version of each record
+        query = f"""
+        SELECT {', '.join(fields)}
+        FROM `{self.dataset}.{table_name}`
+        WHERE {fields[0]} IS NOT NULL
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY {fields[0]} ORDER BY created_at DESC) = 1
+        """
+        for row in run_query(self.client, query, table=table_name, source="shared_cache", page_size=100_000):
+            yield dict(row.items())
+
+    def _query_keyed(self, query: str, params: list, key: str, table: str) -> Dict[str, Dict[str, Any]]:
+        """Run a batch query and index the rows by a key column (first row wins)."""
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        results = {}
+        for row in run_query(self.client, query, job_config, table=table):
+            results.setdefault(row[key], dict(row.items()))
+        return results
+
+    def get_profiles(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        from google.cloud import bigquery
+
+        query = f"""
+        SELECT {', '.join(PROFILE_FIELDS)}
+        FROM `{self.dataset}.customer_profiles`
+        WHERE user_id IN UNNEST(@ids)
+        """
+        return self._query_keyed(query, [bigquery.ArrayQueryParameter("ids", "STRING", list(user_ids))], "user_id", "customer_profiles")
+
+    def get_beneficiaries(self, account_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        from google.cloud import bigquery
+
+        query = f"""
+        SELECT {', '.join(BENEFICIARY_FIELDS)}
+        FROM `{self.dataset}.beneficiary_graph`
+        WHERE account_id IN UNNEST(@ids)
+        """
+        return self._query_keyed(query, [bigquery.ArrayQueryParameter("ids", "STRING", list(account_ids))], "account_id", "beneficiary_graph")
+
+    def get_sessions_with_velocity(
+        self,
+        transaction_ids: List[str],
+        window_seconds: int = VELOCITY_WINDOW_SECONDS,
+        event_times: Optional[Dict[str, datetime]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        from google.cloud import bigquery
+
+        # One job: the target sessions plus each user's session count in the
+        # window ending at that session. The join condition can't prune
+        # partitions, so both scans also carry constant bounds: around the
+        # batch's alert event times when every alert has one, else the
+        # lookback window.
+        times = [to_datetime((event_times or {}).get(transaction_id)) for transaction_id in transaction_ids]
+        known = None not in times and bool(times)
+        lower, upper, bound_params = self._session_bounds(min(times) if known else None,
+                                                          max(times) if known else None)
+        upper_target = f" AND event_time <= {upper}" if upper else ""
+        upper_velocity = f" AND s.event_time <= {upper}" if upper else ""
+        query = f"""
+        WITH target AS (
+            SELECT transaction_id, {', '.join(SESSION_FIELDS)}
+            FROM `{self.dataset}.mobile_banking_sessions`
+            WHERE transaction_id IN UNNEST(@ids)
+            AND event_time >= {lower}{upper_target}
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY transaction_id) = 1
+        ),
+        velocity AS (
+            SELECT t.transaction_id, COUNT(*) AS velocity_count
+            FROM target t
+            JOIN `{self.dataset}.mobile_banking_sessions` s
+              ON s.user_id = t.user_id
+             AND s.event_time BETWEEN TIMESTAMP_SUB(t.event_time, INTERVAL @window_seconds SECOND) AND t.event_time
+            WHERE s.event_time >= TIMESTAMP_SUB({lower}, INTERVAL @window_seconds SECOND){upper_velocity}
+            GROUP BY t.transaction_id
+        )
+        SELECT target.*, IFNULL(velocity.velocity_count, 0) AS velocity_count
+        FROM target
+        LEFT JOIN velocity USING (transaction_id)
+        """
+        params = [
+            bigquery.ArrayQueryParameter("ids", "STRING", list(transaction_ids)),
+            bigquery.ScalarQueryParameter("window_seconds", "INT64", window_seconds),
+        ]
+        results = self._query_keyed(query, params + bound_params, "transaction_id", "mobile_banking_sessions")
+
+        # Misses with a known event_time: one lookup widened to
+        # lookback_days either side of their event times (still partition
+        # bounded), then their velocity from the window count. Anything
+        # still missing has no session.
+        missing = {transaction_id: event_time for transaction_id, event_time in zip(transaction_ids, times)
+                   if transaction_id not in results and event_time is not None}
+        if missing and self._widened_match_hours:
+            lower, upper, bound_params = self._session_bounds(min(missing.values()), max(missing.values()),
+                                                              self._widened_match_hours)
+            query = f"""
+            SELECT transaction_id, {', '.join(SESSION_FIELDS)}
+            FROM `{self.dataset}.mobile_banking_sessions`
+            WHERE transaction_id IN UNNEST(@ids)
+            AND event_time >= {lower} AND event_time <= {upper}
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY transaction_id) = 1
+            """
+            params = [bigquery.ArrayQueryParameter("ids", "STRING", list(missing))]
+            found = self._query_keyed(query, params + bound_params, "transaction_id", "mobile_banking_sessions")
+            for transaction_id, session in found.items():
+                session["velocity_count"] = self.count_sessions_in_window(
+                    session["user_id"], session["event_time"], window_seconds
+                )
+                results[transaction_id] = session
+        return results
+
+
+# Same tables/columns as scripts/create_playground_tables.py.
+# TIMESTAMP columns are stored as UTC ISO-8601 text so they sort correctly.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customer_profiles (
+    user_id TEXT NOT NULL,
+    age_group TEXT,
+    account_tenure_days INTEGER,
+    avg_transfer_amount REAL,
+    behavioral_segment TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_profiles_user ON customer_profiles (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS beneficiary_graph (
+    account_id TEXT NOT NULL,
+    risk_score INTEGER,
+    account_age_hours INTEGER,
+    linked_to_flagged_device INTEGER,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_beneficiary_account ON beneficiary_graph (account_id, created_at);
+
+CREATE TABLE IF NOT EXISTS mobile_banking_sessions (
+    session_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    transaction_id TEXT,
+    event_type TEXT NOT NULL,
+    is_call_active INTEGER,
+    typing_cadence_score REAL,
+    session_duration_seconds INTEGER,
+    battery_level INTEGER,
+    app_version TEXT,
+    os_version TEXT,
+    is_rooted_jailbroken INTEGER,
+    geolocation_lat REAL,
+    geolocation_lon REAL,
+    geolocation_accuracy_meters REAL,
+    time_of_day_hour INTEGER,
+    event_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_transaction ON mobile_banking_sessions (transaction_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_time ON mobile_banking_sessions (user_id, event_time);
+"""
+
+SQLITE_TABLE_COLUMNS = {
+    "customer_profiles": PROFILE_FIELDS + ["created_at"],
+    "beneficiary_graph": ["account_id", "risk_score", "account_age_hours", "linked_to_flagged_device", "created_at"],
+    "mobile_banking_sessions": [
+        "session_id", "user_id", "transaction_id", "event_type", "is_call_active",
+        "typing_cadence_score", "session_duration_seconds", "battery_level",
+        "app_version", "os_version", "is_rooted_jailbroken",
+        "geolocation_lat", "geolocation_lon", "geolocation_accuracy_meters",
+        "time_of_day_hour", "event_time",
+    ],
+}
+
+_TIMESTAMP_COLUMNS = {"created_at", "event_time"}
+# Stay well under SQLITE_MAX_VARIABLE_NUMBER for IN-lists
+_SQLITE_MAX_PARAMS = 900
+_BOOLEAN_COLUMNS = {"linked_to_flagged_device", "is_call_active", "is_rooted_jailbroken"}
+
+
+def to_sqlite_timestamp(value: Any) -> Optional[str]:
+    """Normalize a datetime, ISO string or epoch value to sortable UTC text."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        # Epoch seconds, or milliseconds as used by the Avro schemas
+        seconds = value / 1000 if value > 1e11 else value
+        value = datetime.fromtimestamp(seconds, tz=timezone.utc)
+    elif isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def from_sqlite_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse stored UTC text back into an aware datetime."""
+    if value is None:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f").replace(tzinfo=timezone.utc)
+
+
+class SQLiteBackend(StorageBackend):
+    """Lookups against an embedded SQLite database.
+
+    Uses WAL journaling so lookups from many threads never block on the
+    writer, and one connection per thread.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize the backend and create the schema if needed.
+
+        Args:
+            path: Database file (defaults to DETECTIVE_SQLITE_PATH or <repo>/.streamguard.db)
+        """
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.path = path or os.getenv("DETECTIVE_SQLITE_PATH", os.path.join(base_dir, ".streamguard.db"))
+        self._local = threading.local()
+        self._conn().executescript(SQLITE_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        result = dict(row)
+        for key in result.keys() & _BOOLEAN_COLUMNS:
+            if result[key] is not None:
+                result[key] = bool(result[key])
+        if "event_time" in result:
+            result["event_time"] = from_sqlite_timestamp(result["event_time"])
+        return result
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            f"SELECT {', '.join(PROFILE_FIELDS)} FROM customer_profiles "
+            "WHERE user_id = ? ORDER BY created_at DESC LIMIT 1",
+            (user_id,)
+        ).fetchone()
+        return self._to_dict(row)
+
+    def get_beneficiary(self, account_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            f"SELECT {', '.join(BENEFICIARY_FIELDS)} FROM beneficiary_graph "
+            "WHERE account_id = ? ORDER BY created_at DESC LIMIT 1",
+            (account_id,)
+        ).fetchone()
+        return self._to_dict(row)
+
+    def get_session(self, transaction_id: str, event_time: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        # Answered from idx_sessions_transaction; event_time is not needed
+        row = self._conn().execute(
+            f"SELECT {', '.join(SESSION_FIELDS)} FROM mobile_banking_sessions "
+            "WHERE transaction_id = ? LIMIT 1",
+            (transaction_id,)
+        ).fetchone()
+        return self._to_dict(row)
+
+    def count_sessions_in_window(
+        self,
+        user_id: str,
+        event_time: datetime,
+        window_seconds: int = VELOCITY_WINDOW_SECONDS
+    ) -> int:
+        end = to_sqlite_timestamp(event_time)
+        start = to_sqlite_timestamp(event_time - timedelta(seconds=window_seconds))
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM mobile_banking_sessions "
+            "WHERE user_id = ? AND event_time BETWEEN ? AND ?",
+            (user_id, start, end)
+        ).fetchone()
+        return row[0]
+
+    def get_recent_locations(self, user_id: str, before: datetime, limit: int = 8) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT geolocation_lat, geolocation_lon, event_time FROM mobile_banking_sessions "
+            "WHERE user_id = ? AND event_time < ? "
+            "AND geolocation_lat IS NOT NULL AND geolocation_lon IS NOT NULL "
+            "ORDER BY event_time DESC LIMIT ?",
+            (user_id, to_sqlite_timestamp(before), limit)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def get_sessions_since(
+        self,
+        since: Optional[datetime],
+        after_session_id: str = "",
+        limit: int = 10000
+    ) -> List[Dict[str, Any]]:
+        start = to_sqlite_timestamp(since) if since is not None else ""
+        rows = self._conn().execute(
+            f"SELECT {BASELINE_SESSION_COLUMNS} FROM mobile_banking_sessions "
+            "WHERE event_time >= ? AND (event_time > ? OR session_id > ?) "
+            "ORDER BY event_time, session_id LIMIT ?",
+            (start, start, after_session_id, limit)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def _select_keyed(self, sql: str, key: str, keys: List[str], extra_params: tuple = ()) -> Dict[str, Dict[str, Any]]:
+        """Run `sql` (containing one `{placeholders}` IN-list) over chunks of keys."""
+        results = {}
+        conn = self._conn()
+        for start in range(0, len(keys), _SQLITE_MAX_PARAMS):
+            chunk = keys[start:start + _SQLITE_MAX_PARAMS]
+            placeholders = ", ".join("?" for _ in chunk)
+            for row in conn.execute(sql.format(placeholders=placeholders), (*extra_params, *chunk)):
+                results.setdefault(row[key], self._to_dict(row))
+        return results
+
+    def get_profiles(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return self._select_keyed(
+            f"SELECT {', '.join(PROFILE_FIELDS)} FROM customer_profiles "
+            "WHERE user_id IN ({placeholders}) ORDER BY created_at DESC",
+            "user_id", list(user_ids)
+        )
+
+    def get_beneficiaries(self, account_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return self._select_keyed(
+            f"SELECT {', '.join(BENEFICIARY_FIELDS)} FROM beneficiary_graph "
+            "WHERE account_id IN ({placeholders}) ORDER BY created_at DESC",
+            "account_id", list(account_ids)
+        )
+
+    def get_sessions_with_velocity(
+        self,
+        transaction_ids: List[str],
+        window_seconds: int = VELOCITY_WINDOW_SECONDS,
+        event_times: Optional[Dict[str, datetime]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        # The velocity subquery is answered from idx_sessions_user_time. Stored
+        # timestamps are fixed-width text; SQLite date functions round to
+        # milliseconds, so the window start shifts only the whole-second part
+        # and re-attaches the original microseconds to stay exact.
+        columns = ", ".join(f"t.{name}" for name in SESSION_FIELDS)
+        sql = (
+            f"SELECT t.transaction_id, {columns}, "
+            "(SELECT COUNT(*) FROM mobile_banking_sessions s "
+            " WHERE s.user_id = t.user_id "
+            " AND s.event_time BETWEEN "
+            "  strftime('%Y-%m-%d %H:%M:%S', substr(t.event_time, 1, 19), ?) || substr(t.event_time, 20) "
+            "  AND t.event_time"
+            ") AS velocity_count "
+            "FROM mobile_banking_sessions t WHERE t.transaction_id IN ({placeholders})"
+        )
+        return self._select_keyed(sql, "transaction_id", list(transaction_ids), (f"-{int(window_seconds)} seconds",))
+
+    def scan_latest(self, table_name: str) -> Iterable[Dict[str, Any]]:
+        fields = LOOKUP_TABLE_FIELDS[table_name]
+        cursor = self._conn().execute(
+            f"SELECT {', '.join(fields)} FROM ("
+            f" SELECT *, ROW_NUMBER() OVER (PARTITION BY {fields[0]} ORDER BY created_at DESC) AS rn"
+            f" FROM {table_name}) WHERE rn = 1"
+        )
+        for row in cursor:
+            yield self._to_dict(row)
+
+    def insert_rows(self, table: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insert rows (same dict shape as BigQuery insert_rows_json).
+
+        Args:
+            table: One of customer_profiles, beneficiary_graph, mobile_banking_sessions
+            rows: Row dicts; missing columns are stored as NULL
+
+        Returns:
+            Number of rows inserted
+        """
+        columns = SQLITE_TABLE_COLUMNS[table]
+        now = to_sqlite_timestamp(datetime.now(timezone.utc))
+
+        def _values(row: Dict[str, Any]) -> List[Any]:
+            values = []
+            for column in columns:
+                value = row.get(column)
+                if column in _TIMESTAMP_COLUMNS:
+                    value = to_sqlite_timestamp(value) if value is not None else (now if column == "created_at" else None)
+                elif column in _BOOLEAN_COLUMNS and value is not None:
+                    value = int(bool(value))
+                values.append(value)
+            return values
+
+        conn = self._conn()
+        placeholders = ", ".join("?" for _ in columns)
+        with conn:
+            cursor = conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                (_values(row) for row in rows)
+            )
+        return cursor.rowcount
+
+
+# Singleton instance
+_storage_backend = None
+
+def get_storage_backend() -> StorageBackend:
+    """Get the configured storage backend (DETECTIVE_STORAGE_BACKEND).
+
+    When DETECTIVE_SHARED_CACHE_NAME is set, profile and beneficiary lookups
+    are served from that shared-memory segment first (see shared_cache.py).
+
+    Raises:
+        ValueError: If the configured backend name is unknown
+    """
+    global _storage_backend
+    if _storage_backend is None:
+        backend_name = os.getenv("DETECTIVE_STORAGE_BACKEND", "bigquery").lower()
+        if backend_name == "bigquery":
+            _storage_backend = BigQueryBackend()
+        elif backend_name == "sqlite":
+            _storage_backend = SQLiteBackend()
+        else:
+            raise ValueError(f"Unknown DETECTIVE_STORAGE_BACKEND: {backend_name}")
+        segment_name = os.getenv("DETECTIVE_SHARED_CACHE_NAME")
+        if segment_name:
+            from .shared_cache import SharedCacheBackend
+            _storage_backend = SharedCacheBackend(_storage_backend, segment_name)
+    return _storage_backend
+
+
+def set_storage_backend(backend: Optional[StorageBackend]) -> None:
+    """Override the storage backend (e.g. for load tests). None resets to config."""
+    global _storage_backend
+    _storage_backend = backend
@@ -0,0 +1,296 @@
+"""Per-user violation counts backing `previous_violations`.
+
+The workflow records a violation whenever the Judge returns a BLOCK
+decision; get_user_history reads the count with a dict lookup, so repeat
+offenders (Policy 2) are recognised without a BigQuery round trip.
+
+Counts live in memory and are merged into a JSON snapshot (temp file +
+os.replace, so readers never see a partial file) by a background thread
+every VIOLATION_SNAPSHOT_SECONDS when something changed, and again at exit.
+The snapshot path is VIOLATION_STORE_PATH (default
+<FEATURE_STORE_DIR>/violations.json). scripts/backfill_violations.py rebuilds
+the counts from historical decisions.
+
+Several workers can share one snapshot. Each keeps the violations it
+recorded since its last save; save() takes an flock on <path>.lock,
+re-reads the snapshot, adds the pending violations whose transaction ID it
+has not seen yet and writes the result. Workers and a backfill therefore
+add to each other's counts instead of overwriting them, and get() picks up
+other processes' saves every snapshot interval. Without fcntl (Windows)
+there is no file lock, so run a single writer per snapshot.
+
+A BLOCK for the same transaction is only counted once: the snapshot keeps
+the last RECENT_TRANSACTIONS transaction IDs, so a re-delivered alert does
+not make a user a repeat offender, even on another worker.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.metrics import get_metrics_registry
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows: single writer only
+    HAS_FCNTL = False
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_SECONDS = 30.0
+RECENT_TRANSACTIONS = 100_000
+
+
+def default_violation_path() -> str:
+    """Snapshot path (VIOLATION_STORE_PATH or <FEATURE_STORE_DIR>/violations.json)."""
+    from .feature_store import _default_directory
+    return os.getenv("VIOLATION_STORE_PATH", os.path.join(_default_directory(), "violations.json"))
+
+
+def _file_identity(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class ViolationStore:
+    """In-memory violation counters merged into a shared durable snapshot."""
+
+    def __init__(self, path: Optional[str] = None, snapshot_interval: Optional[float] = None):
+        """Load the snapshot (if any).
+
+        Args:
+            path: Snapshot file (defaults to VIOLATION_STORE_PATH)
+            snapshot_interval: Seconds between snapshot merges and re-reads
+                (defaults to VIOLATION_SNAPSHOT_SECONDS, 30); 0 disables the
+                background thread and re-reads (call save() / load() yourself)
+        """
+        self.path = path or default_violation_path()
+        self.snapshot_interval = snapshot_interval if snapshot_interval is not None else float(
+            os.getenv("VIOLATION_SNAPSHOT_SECONDS", DEFAULT_SNAPSHOT_SECONDS)
+        )
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        # (user_id, transaction_id) recorded here and not yet in the snapshot
+        self._pending: List[Tuple[str, Optional[str]]] = []
+        self._identity = None
+        self._checked_at = time.monotonic()
+        self._snapshotter: Optional[threading.Thread] = None
+        self.load()
+
+        metrics = get_metrics_registry()
+        metrics.register_gauge("violations.users", lambda: len(self._counts))
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @property
+    def total_violations(self) -> int:
+        """Sum of all users' violation counts."""
+        return sum(self._counts.values())
+
+    def get(self, user_id: str) -> int:
+        """Number of recorded violations for a user (0 if none)."""
+        if self.snapshot_interval > 0 and time.monotonic() - self._checked_at >= self.snapshot_interval:
+            self._checked_at = time.monotonic()
+            if _file_identity(self.path) != self._identity:
+                self.load()
+        return self._counts.get(user_id, 0)
+
+    def record(self, user_id: str, transaction_id: Optional[str] = None) -> int:
+        """Count a violation (BLOCK decision) for a user.
+
+        Returns:
+            The user's new violation count
+        """
+        with self._lock:
+            if transaction_id is not None:
+                if transaction_id in self._recent:
+                    return self._counts.get(user_id, 0)
+                self._remember(transaction_id)
+            count = self._counts.get(user_id, 0) + 1
+            self._counts[user_id] = count
+            self._pending.append((user_id, transaction_id))
+
+        get_metrics_registry().inc("violations.recorded")
+        self._ensure_snapshotter()
+        return count
+
+    def replace_all(self, violations: Iterable[Tuple[str, str]]) -> int:
+        """Rebuild all counts from historical (user_id, transaction_id) violations.
+
+        Duplicate transaction IDs are counted once. The new counts replace
+        the snapshot immediately; violations other workers record afterwards
+        are merged on top of them (skipping transactions the rebuild already
+        counted).
+
+        Returns:
+            Number of users with at least one violation
+        """
+        counts: Dict[str, int] = {}
+        seen: Dict[str, None] = {}
+        for user_id, transaction_id in violations:
+            if transaction_id is not None:
+                if transaction_id in seen:
+                    continue
+                seen[transaction_id] = None
+            counts[user_id] = counts.get(user_id, 0) + 1
+        transactions = list(seen)[-RECENT_TRANSACTIONS:]
+
+        with self._save_lock, self._file_lock():
+            if not self._write(counts, transactions):
+                raise OSError(f"Failed to write violation snapshot {self.path}")
+            with self._lock:
+                self._counts = counts
+                self._recent = OrderedDict.fromkeys(transactions)
+                self._pending = []
+                self._identity = _file_identity(self.path)
+        return len(counts)
+
+    def load(self) -> None:
+        """Re-read the snapshot on disk, keeping violations not saved yet (no-op if missing)."""
+        snapshot = self._read()
+        if snapshot is None:
+            return
+        counts, transactions, identity = snapshot
+        with self._lock:
+            self._apply(counts, transactions, identity)
+
+    def save(self) -> bool:
+        """Merge violations recorded since the last save into the snapshot.
+
+        Returns:
+            True if a snapshot was written
+        """
+        with self._save_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return False
+            with self._file_lock():
+                counts, transactions, _ = self._read() or ({}, [], None)
+                seen = OrderedDict.fromkeys(transactions)
+                for user_id, transaction_id in pending:
+                    if transaction_id is not None:
+                        if transaction_id in seen:
+                            continue  # already counted by another writer or a backfill
+                        seen[transaction_id] = None
+                    counts[user_id] = counts.get(user_id, 0) + 1
+                transactions = list(seen)[-RECENT_TRANSACTIONS:]
+                if not self._write(counts, transactions):
+                    with self._lock:
+                        self._pending[:0] = pending
+                    return False
+                with self._lock:
+                    self._apply(counts, transactions, _file_identity(self.path))
+            return True
+
+    def _remember(self, transaction_id: str) -> None:
+        """Add a transaction ID to the bounded dedupe window (caller holds _lock)."""
+        self._recent[transaction_id] = None
+        if len(self._recent) > RECENT_TRANSACTIONS:
+            self._recent.popitem(last=False)
+
+    def _apply(self, counts: Dict[str, int], transactions: List[str], identity) -> None:
+        """Adopt snapshot counts plus this process's pending violations (caller holds _lock)."""
+        merged = dict(counts)
+        for user_id, _ in self._pending:
+            merged[user_id] = merged.get(user_id, 0) + 1
+        self._counts = merged
+        for transaction_id in transactions:
+            if transaction_id not in self._recent:
+                self._remember(transaction_id)
+        self._identity = identity
+
+    def _read(self):
+        """(counts, transactions, identity) from the snapshot, or None if missing or invalid."""
+        identity = _file_identity(self.path)
+        try:
+            with open(self.path, "r") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[Violations] Failed to read snapshot {self.path}: {e}")
+            return None
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            print(f"[Violations] Ignoring snapshot {self.path} with version {snapshot.get('version')}")
+            return None
+        counts = {user_id: int(count) for user_id, count in snapshot.get("counts", {}).items()}
+        return counts, list(snapshot.get("transactions", [])), identity
+
+    def _write(self, counts: Dict[str, int], transactions: List[str]) -> bool:
+        snapshot = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "counts": counts,
+                    "transactions": transactions}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp.{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            print(f"[Violations] Failed to write snapshot {self.path}: {e}")
+            return False
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on <path>.lock across processes (no-op without fcntl)."""
+        if not HAS_FCNTL:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # releases the flock
+
+    def _ensure_snapshotter(self) -> None:
+        """Start the background snapshot thread on first write."""
+        if self.snapshot_interval <= 0 or self._snapshotter is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(self.snapshot_interval)
+                self.save()
+
+        with self._lock:
+            if self._snapshotter is None:
+                self._snapshotter = threading.Thread(target=_loop, name="violation-snapshots", daemon=True)
+                self._snapshotter.start()
+                atexit.register(self.save)
+
+
+# Singleton instance
+_violation_store = None
+_violation_store_lock = threading.Lock()
+
+
+def get_violation_store() -> ViolationStore:
+    """Get the process-wide violation store (VIOLATION_STORE_PATH / VIOLATION_SNAPSHOT_SECONDS)."""
+    global _violation_store
+    if _violation_store is None:
+        with _violation_store_lock:
+            if _violation_store is None:
+                _violation_store = ViolationStore()
+    return _violation_store
+
+
+def set_violation_store(store) -> None:
+    """Override the violation store (e.g. a temporary one for replays). None resets to config."""
+    global _violation_store
+    _violation_store = store
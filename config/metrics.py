@@ -0,0 +1,126 @@
+"""Per-process metrics registry for StreamGuard components.
+
+Counters and gauges are keyed by metric name plus optional labels, so the same
+metric can be broken down per table, per tool, etc. Gauges can also be backed
+by a callback that is evaluated when a snapshot is taken (e.g. snapshot age).
+"""
+import threading
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def make_key(name: str, **labels) -> MetricKey:
+    """Build a registry key once, for repeated use with inc_many()."""
+    return _make_key(name, labels)
+
+
+def _make_key(name: str, labels: Dict[str, Any]) -> MetricKey:
+    """Build a hashable registry key from a metric name and its labels."""
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def format_key(key: MetricKey) -> str:
+    """Render a registry key as `name{label=value,...}`."""
+    name, labels = key
+    if not labels:
+        return name
+    return f"{name}{{{','.join(f'{k}={v}' for k, v in labels)}}}"
+
+
+class MetricsRegistry:
+    """Thread-safe in-process registry of counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[MetricKey, float] = {}
+        self._gauges: Dict[MetricKey, float] = {}
+        self._gauge_callbacks: Dict[MetricKey, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter.
+
+        Args:
+            name: Metric name (e.g. "feature_store.hits")
+            value: Amount to add (default 1)
+            **labels: Optional labels (e.g. table="customer_profiles")
+        """
+        key = _make_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def inc_many(self, increments: Iterable[Tuple[MetricKey, float]]) -> None:
+        """Increment several counters under one lock (keys from make_key()).
+
+        For hot paths that update many labelled counters per call.
+        """
+        with self._lock:
+            for key, value in increments:
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to an absolute value."""
+        key = _make_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float], **labels) -> None:
+        """Register a gauge whose value is computed on read.
+
+        Args:
+            name: Metric name
+            callback: Zero-argument callable returning the current value
+            **labels: Optional labels
+        """
+        key = _make_key(name, labels)
+        with self._lock:
+            self._gauge_callbacks[key] = callback
+
+    def get(self, name: str, **labels) -> float:
+        """Get the current value of a counter or gauge (0 if unknown)."""
+        key = _make_key(name, labels)
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            if key in self._gauges:
+                return self._gauges[key]
+            callback = self._gauge_callbacks.get(key)
+        if callback is not None:
+            return callback()
+        return 0
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return a point-in-time copy of all metrics.
+
+        Returns:
+            dict with "counters" and "gauges" maps keyed by formatted metric name
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            callbacks = dict(self._gauge_callbacks)
+
+        for key, callback in callbacks.items():
+            try:
+                gauges[key] = callback()
+            except Exception as e:
+                print(f"[Metrics] Gauge {format_key(key)} callback failed: {e}")
+
+        return {
+            "counters": {format_key(k): v for k, v in sorted(counters.items())},
+            "gauges": {format_key(k): v for k, v in sorted(gauges.items())},
+        }
+
+    def reset(self) -> None:
+        """Clear all counters and gauges (callbacks are kept)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+# Singleton instance (created eagerly so concurrent first use never races)
+_metrics_registry = MetricsRegistry()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the singleton per-process metrics registry."""
+    return _metrics_registry
@@ -115,7 +115,7 @@ Recommendation: {self.recommendation.value}
 class JudgmentDecision(BaseModel):
     """Structured output from Judge Agent."""
     decision: Decision
-    policy_applied: int = Field(ge=1, le=5, description="Policy number (1-5) that triggered this decision")
+    policy_applied: int = Field(ge=1, description="Priority of the policy that triggered this decision (1-6 built in)")
     reasoning: str = Field(min_length=10, description="Why this decision was made")
     action_required: str = Field(min_length=5, description="Specific next step")
     human_override_allowed: bool = Field(description="Whether a human can override this decision")
@@ -2,12 +2,58 @@
 
 This module provides a rule-based policy engine that can be tested independently
 and configured without modifying agent code.
+
+PolicyEngine.evaluate_features() decides on a compact RiskFeatures record
+(config/risk_features.py) for callers that never build the pydantic report.
+
+PolicyEngine.evaluate_batch() applies the same rules to columnar inputs
+(NumPy arrays or a DataFrame) with one boolean mask per policy, for
+backtests and bulk re-scoring.
+
+Policies can also be declared in a YAML/JSON rules file (config/policies.yaml,
+see config/policy_rules.py); get_policy_engine() loads it and hot-reloads it
+on change.
+
+Rules are immutable (frozen PolicyRule) and an engine evaluates against a
+PolicySnapshot: a sorted tuple of rules plus the lookup tables derived from
+it. add_policy, remove_policy, replace_policies and reloads build a new
+snapshot and publish it with a single reference assignment, so evaluations
+take no lock and always see one complete rule set.
+
+Every policy evaluation is counted per rule:
+
+- policy.evaluations{policy=N}: condition checks (rows, for batches)
+- policy.eval_ms{policy=N}: time spent in the condition
+- policy.matches{policy=N}: times the policy decided
 """
-from typing import Dict, Any, Optional, Callable
-from dataclasses import dataclass
+import os
+import threading
+import time
+from typing import Dict, Any, Iterable, Mapping, Optional, Callable
+from dataclasses import dataclass, field
 from enum import Enum
 
+import numpy as np
+
+from config.metrics import get_metrics_registry, make_key
 from config.models import InvestigationReport, JudgmentDecision, Decision
+from config.risk_features import RISK_LEVEL_CODES, RiskFeatures
+
+# Columns read by evaluate_batch() and the vector conditions
+BATCH_COLUMNS = (
+    "risk_level", "active_voice_call", "previous_violations",
+    "account_age_hours", "account_tenure_days", "risk_score",
+)
+
+# Used when no policy matches (see make_decision)
+FALLBACK_DECISION = Decision.SAFE
+FALLBACK_CONFIDENCE = 50
+
+# Policies are combined as bits of a uint16 in evaluate_batch
+MAX_BATCH_POLICIES = 16
+
+# How often a file-backed engine checks its rules file for changes
+DEFAULT_RELOAD_SECONDS = 5.0
 
 
 class PolicyPriority(int, Enum):
@@ -20,25 +66,62 @@ class PolicyPriority(int, Enum):
     LOW_RISK = 6
 
 
-@dataclass
+@dataclass(frozen=True)
 class PolicyRule:
-    """A single policy rule definition."""
-    priority: PolicyPriority
+    """A single policy rule definition (immutable; build a new rule to change one).
+
+    priority is a PolicyPriority for the built-in policies; rules files may
+    use any positive int (lower number = higher priority).
+    """
+    priority: int
     name: str
     condition: Callable[[InvestigationReport], bool]
     decision: Decision
     human_override_allowed: bool
     confidence_range: tuple[int, int]  # (min, max)
     action_required_template: str
-
-    def matches(self, investigation: InvestigationReport) -> bool:
+    # Same condition over batch columns (dict of arrays -> bool mask); needed
+    # for evaluate_batch
+    vector_condition: Optional[Callable[[Dict[str, np.ndarray]], np.ndarray]] = None
+    # Same condition over a RiskFeatures record; needed for evaluate_features
+    feature_condition: Optional[Callable[[RiskFeatures], bool]] = None
+    # The conditions take a second `memo` argument: a dict the engine creates
+    # fresh for each evaluation pass and shares across its rules, so shared
+    # sub-conditions are computed once per pass (config/policy_rules.py)
+    shared_memo: bool = False
+
+    def matches(self, investigation: InvestigationReport, memo: Optional[dict] = None) -> bool:
         """Check if this policy's conditions are met."""
         try:
+            if self.shared_memo:
+                return self.condition(investigation, memo)
             return self.condition(investigation)
         except Exception as e:
             print(f"Policy {self.name} condition check failed: {e}")
             return False
 
+    def matches_features(self, features: RiskFeatures, memo: Optional[dict] = None) -> bool:
+        """Check this policy's conditions against a RiskFeatures record."""
+        try:
+            if self.shared_memo:
+                return self.feature_condition(features, memo)
+            return self.feature_condition(features)
+        except Exception as e:
+            print(f"Policy {self.name} condition check failed: {e}")
+            return False
+
+    def mask(self, columns: Dict[str, np.ndarray], memo: Optional[dict] = None) -> np.ndarray:
+        """This policy's vector_condition over batch columns."""
+        if self.shared_memo:
+            return self.vector_condition(columns, memo)
+        return self.vector_condition(columns)
+
+    def confidence_for(self, risk_score: int) -> int:
+        """Confidence within the policy's range (higher risk score = higher confidence)."""
+        min_conf, max_conf = self.confidence_range
+        confidence = min_conf + int((risk_score / 100) * (max_conf - min_conf))
+        return max(min_conf, min(max_conf, confidence))  # Clamp to range
+
     def generate_reasoning(self, investigation: InvestigationReport) -> str:
         """Generate reasoning text for this policy application."""
         if self.priority == PolicyPriority.CRITICAL_FRAUD:
@@ -66,7 +149,7 @@ class PolicyRule:
         elif self.priority == PolicyPriority.LOW_RISK:
             return f"Transaction shows {investigation.risk_level.value} risk level ({investigation.risk_score}/100) with no critical fraud indicators. Policy 6 LOW RISK approves transaction for normal processing."
 
-        return f"Policy {self.priority} ({self.name}) applied."
+        return f"Policy {int(self.priority)} ({self.name}) applied."
 
     def generate_action_required(self, investigation: InvestigationReport) -> str:
         """Generate action required text for this policy."""
@@ -138,9 +221,74 @@ def _is_low_risk(investigation: InvestigationReport) -> bool:
     return investigation.risk_level.value in ["LOW", "MEDIUM"]
 
 
+# Decision-field conditions: one definition per policy for RiskFeatures
+# records (feature_condition) and batch columns (vector_condition). They only
+# use comparisons, & | and _negate, which behave the same on scalars and
+# NumPy arrays; _ColumnView gives the columns RiskFeatures' attribute names.
+
+def _below(value, bound):
+    """value < bound; a missing value (None, or NaN in a column) never is."""
+    return value is not None and value < bound
+
+
+def _above(value, bound):
+    """value > bound; a missing value (None, or NaN in a column) never is."""
+    return value is not None and value > bound
+
+
+def _negate(condition):
+    """Logical not for a bool or a bool array."""
+    return condition ^ True
+
+
+def _critical_fraud(f: RiskFeatures):
+    return f.active_voice_call | (f.risk_level == RISK_LEVEL_CODES["CRITICAL"])
+
+
+def _repeat_offender(f: RiskFeatures):
+    return f.previous_violations >= 1
+
+
+def _first_time_clean(f: RiskFeatures):
+    return (f.previous_violations == 0) & _negate(_new_account(f)) & _negate(_vip_customer(f))
+
+
+def _new_account(f: RiskFeatures):
+    return _below(f.account_age_hours, 24)
+
+
+def _vip_customer(f: RiskFeatures):
+    return _above(f.account_tenure_days, 1825)
+
+
+def _low_risk(f: RiskFeatures):
+    # Unknown levels are -1 in batch columns
+    return (f.risk_level >= RISK_LEVEL_CODES["LOW"]) & (f.risk_level <= RISK_LEVEL_CODES["MEDIUM"])
+
+
+class _ColumnView:
+    """evaluate_batch columns under RiskFeatures attribute names."""
+
+    __slots__ = ("_columns",)
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self._columns = columns
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _over_columns(condition: Callable[[RiskFeatures], Any]) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+    """vector_condition for a decision-field condition."""
+    return lambda columns: condition(_ColumnView(columns))
+
+
 # Policy Definitions
 
-POLICIES = [
+POLICIES = (
     PolicyRule(
         priority=PolicyPriority.CRITICAL_FRAUD,
         name="Critical Fraud Detection",
@@ -149,6 +297,8 @@ POLICIES = [
         human_override_allowed=False,
         confidence_range=(95, 100),
         action_required_template="Immediately block transaction and notify fraud team for investigation",
+        vector_condition=_over_columns(_critical_fraud),
+        feature_condition=_critical_fraud,
     ),
     PolicyRule(
         priority=PolicyPriority.REPEAT_OFFENDERS,
@@ -158,6 +308,8 @@ POLICIES = [
         human_override_allowed=True,
         confidence_range=(90, 95),
         action_required_template="Block transaction and flag account for closure review",
+        vector_condition=_over_columns(_repeat_offender),
+        feature_condition=_repeat_offender,
     ),
     PolicyRule(
         priority=PolicyPriority.FIRST_TIME,
@@ -167,6 +319,8 @@ POLICIES = [
         human_override_allowed=True,
         confidence_range=(70, 85),
         action_required_template="Allow transaction to proceed with enhanced monitoring",
+        vector_condition=_over_columns(_first_time_clean),
+        feature_condition=_first_time_clean,
     ),
     PolicyRule(
         priority=PolicyPriority.NEW_ACCOUNT,
@@ -176,6 +330,8 @@ POLICIES = [
         human_override_allowed=True,
         confidence_range=(60, 75),
         action_required_template="Escalate to fraud analyst for verification of beneficiary legitimacy",
+        vector_condition=_over_columns(_new_account),
+        feature_condition=_new_account,
     ),
     PolicyRule(
         priority=PolicyPriority.VIP_PROTECTION,
@@ -185,6 +341,8 @@ POLICIES = [
         human_override_allowed=True,
         confidence_range=(50, 70),
         action_required_template="Contact VIP customer via verified phone number to confirm transaction intent",
+        vector_condition=_over_columns(_vip_customer),
+        feature_condition=_vip_customer,
     ),
     PolicyRule(
         priority=PolicyPriority.LOW_RISK,
@@ -194,22 +352,214 @@ POLICIES = [
         human_override_allowed=False,
         confidence_range=(80, 95),
         action_required_template="Transaction approved - proceed with normal processing",
+        vector_condition=_over_columns(_low_risk),
+        feature_condition=_low_risk,
     ),
-]
+)
+
+
+def _batch_columns(data: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """Normalize batch inputs (dict of array-likes or DataFrame) to NumPy columns.
+
+    risk_level may hold strings, RiskLevel members or RISK_LEVEL_CODES
+    integers (unknown levels become -1); missing ages/tenures (None) become NaN.
+    """
+    missing = [name for name in BATCH_COLUMNS if name not in data]
+    if missing:
+        raise ValueError(f"evaluate_batch is missing columns: {', '.join(missing)}")
+
+    risk_level = np.asarray(data["risk_level"])
+    if risk_level.dtype == object:
+        risk_level = np.array([getattr(level, "value", level) for level in risk_level], dtype=str)
+    if risk_level.dtype.kind in "iu":
+        risk_level = risk_level.astype(np.int8)
+    else:
+        # One comparison per level, then every condition compares small ints
+        codes = np.full(len(risk_level), -1, dtype=np.int8)
+        for level, code in RISK_LEVEL_CODES.items():
+            codes[risk_level == level] = code
+        risk_level = codes
+    columns = {
+        "risk_level": risk_level,
+        "active_voice_call": np.asarray(data["active_voice_call"], dtype=bool),
+        "previous_violations": np.asarray(data["previous_violations"], dtype=np.int64),
+        "account_age_hours": np.asarray(data["account_age_hours"], dtype=np.float64),
+        "account_tenure_days": np.asarray(data["account_tenure_days"], dtype=np.float64),
+        "risk_score": np.asarray(data["risk_score"], dtype=np.int64),
+    }
+    sizes = {len(column) for column in columns.values()}
+    if len(sizes) > 1:
+        raise ValueError(f"evaluate_batch columns have different lengths: {sorted(sizes)}")
+    return columns
+
+
+@dataclass
+class BatchEvaluation:
+    """Per-row results of PolicyEngine.evaluate_batch (parallel arrays).
+
+    policy_ids is 0 where no policy matched; those rows get the
+    make_decision fallback (SAFE, confidence 50).
+    """
+    policy_ids: np.ndarray     # int64
+    decisions: np.ndarray      # Decision members (object)
+    confidences: np.ndarray    # int16
+
+    def __len__(self) -> int:
+        return len(self.policy_ids)
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    """An immutable, priority-sorted rule set and the tables derived from it.
+
+    Build with PolicySnapshot.of(). The batch tables (read-only arrays) are
+    None when there are more than MAX_BATCH_POLICIES rules.
+    """
+    rules: tuple[PolicyRule, ...]
+    version: int = 0
+    # (evaluations, eval_ms, matches) counter keys, parallel to rules
+    metric_keys: tuple = ()
+    # Every rule has a feature_condition (required by evaluate_features)
+    feature_ready: bool = False
+    # first_match: bitfield of matching rules (bit i = i-th rule) -> rank of
+    # the first one (i + 1; 0 = no match)
+    first_match: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    # Indexed by rank: policy id (priority, 0 = no match), decision, and
+    # confidence for each risk score 0-100 (flattened, rank * 101 + score).
+    # Ranks rather than priorities keep the tables small for any priority.
+    policy_table: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    decision_table: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    confidence_table: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def of(cls, policies: Iterable[PolicyRule], version: int = 0) -> "PolicySnapshot":
+        # sorted() copies, so the caller's list (or POLICIES) is never reordered
+        rules = tuple(sorted(policies, key=lambda p: int(p.priority)))
+        tables = {}
+        if len(rules) <= MAX_BATCH_POLICIES:
+            patterns = np.arange(1 << len(rules))
+            first_match = np.zeros(len(patterns), dtype=np.uint8)
+            for bit in reversed(range(len(rules))):
+                first_match[(patterns >> bit) & 1 == 1] = bit + 1
+            policy_table = np.array([0] + [int(p.priority) for p in rules], dtype=np.int64)
+            decision_table = np.array([FALLBACK_DECISION] + [p.decision for p in rules], dtype=object)
+            confidence_table = np.full((len(rules) + 1, 101), FALLBACK_CONFIDENCE, dtype=np.int16)
+            for rank, policy in enumerate(rules, start=1):
+                confidence_table[rank] = [policy.confidence_for(score) for score in range(101)]
+            tables = {"first_match": first_match, "policy_table": policy_table, "decision_table": decision_table,
+                      "confidence_table": confidence_table.ravel()}
+            for table in tables.values():
+                table.setflags(write=False)
+        return cls(rules=rules, version=version,
+                   metric_keys=tuple(_rule_metric_keys(p) for p in rules),
+                   feature_ready=all(p.feature_condition is not None for p in rules), **tables)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
 
 
 class PolicyEngine:
-    """Rule-based policy engine for fraud detection decisions."""
+    """Rule-based policy engine for fraud detection decisions.
+
+    Evaluations read the current PolicySnapshot without locking; updates
+    are copy-on-write and serialized by a writer lock.
+    """
 
-    def __init__(self, policies: list[PolicyRule] = None):
+    def __init__(self, policies: Iterable[PolicyRule] = None):
         """Initialize policy engine with optional custom policies.
 
         Args:
-            policies: List of PolicyRule objects (defaults to POLICIES)
+            policies: PolicyRule objects (defaults to POLICIES); sorted by
+                priority into the engine's own snapshot, the input is not
+                modified
+        """
+        self._snapshot = PolicySnapshot.of(POLICIES if policies is None else policies)
+        self.rules_path: Optional[str] = None
+        self.reload_seconds = DEFAULT_RELOAD_SECONDS
+        self._rules_identity = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()  # writers only
+
+    @property
+    def snapshot(self) -> PolicySnapshot:
+        """The rule set evaluations currently run against."""
+        return self._snapshot
+
+    @property
+    def policies(self) -> tuple[PolicyRule, ...]:
+        """Current rules in priority order (read-only tuple)."""
+        return self._snapshot.rules
+
+    def _publish(self, policies: Iterable[PolicyRule]) -> PolicySnapshot:
+        """Swap in a new snapshot; caller holds _reload_lock."""
+        snapshot = PolicySnapshot.of(policies, version=self._snapshot.version + 1)
+        self._snapshot = snapshot  # single reference assignment; readers see old or new, never a mix
+        return snapshot
+
+    def replace_policies(self, policies: Iterable[PolicyRule]) -> PolicySnapshot:
+        """Atomically replace the whole rule set.
+
+        Returns:
+            The published snapshot
         """
-        self.policies = policies or POLICIES
-        # Sort by priority (lower number = higher priority)
-        self.policies.sort(key=lambda p: p.priority.value)
+        with self._reload_lock:
+            return self._publish(policies)
+
+    @classmethod
+    def from_file(cls, path: str, reload_seconds: Optional[float] = None) -> "PolicyEngine":
+        """Create an engine from a rules file and keep it in sync with the file.
+
+        The file is re-checked at most every `reload_seconds`
+        (POLICY_RELOAD_SECONDS, default 5). A changed file is compiled and
+        swapped in as a whole; if it fails to load, the current policies
+        stay active.
+
+        Raises:
+            ValueError: If the rules file is invalid
+        """
+        from config.policy_rules import load_policy_rules
+
+        identity = _file_identity(path)
+        engine = cls(load_policy_rules(path))
+        engine.rules_path = path
+        engine._rules_identity = identity
+        engine._checked_at = time.monotonic()
+        if reload_seconds is None:
+            reload_seconds = float(os.getenv("POLICY_RELOAD_SECONDS", DEFAULT_RELOAD_SECONDS))
+        engine.reload_seconds = reload_seconds
+        return engine
+
+    def reload(self) -> bool:
+        """Reload the rules file if it changed; returns True if new policies were swapped in."""
+        if self.rules_path is None:
+            return False
+        from config.policy_rules import load_policy_rules
+
+        with self._reload_lock:
+            self._checked_at = time.monotonic()
+            identity = _file_identity(self.rules_path)
+            if identity is None or identity == self._rules_identity:
+                return False
+            try:
+                policies = load_policy_rules(self.rules_path)
+            except Exception as e:
+                print(f"[PolicyEngine] Failed to reload {self.rules_path}, keeping current policies: {e}")
+                self._rules_identity = identity  # don't retry until the file changes again
+                get_metrics_registry().inc("policy.reload_errors")
+                return False
+            self._publish(policies)  # in-flight evaluations keep the old snapshot
+            self._rules_identity = identity
+            get_metrics_registry().inc("policy.reloads")
+            print(f"[PolicyEngine] Reloaded {len(policies)} policies from {self.rules_path}")
+            return True
+
+    def _active_snapshot(self) -> PolicySnapshot:
+        if self.rules_path is not None and time.monotonic() - self._checked_at >= self.reload_seconds:
+            self.reload()
+        return self._snapshot
 
     def evaluate(self, investigation: InvestigationReport) -> Optional[PolicyRule]:
         """Evaluate investigation against policies and return first matching policy.
@@ -220,10 +570,81 @@ class PolicyEngine:
         Returns:
             The first matching PolicyRule, or None if no policies match
         """
-        for policy in self.policies:
-            if policy.matches(investigation):
-                return policy
-        return None
+        return self._first_match(self._active_snapshot(), investigation, features=False)
+
+    def evaluate_features(self, features: RiskFeatures) -> Optional[PolicyRule]:
+        """Like evaluate(), on a RiskFeatures record (no pydantic models involved).
+
+        Raises:
+            ValueError: If a policy has no feature_condition
+        """
+        snapshot = self._active_snapshot()
+        if not snapshot.feature_ready:
+            missing = next(p.name for p in snapshot.rules if p.feature_condition is None)
+            raise ValueError(f"Policy {missing} has no feature_condition for feature evaluation")
+        return self._first_match(snapshot, features, features=True)
+
+    def _first_match(self, snapshot: PolicySnapshot, subject, features: bool) -> Optional[PolicyRule]:
+        increments = []
+        matched_policy = None
+        memo = {}  # this pass only: a re-evaluated (possibly mutated) report starts fresh
+        for policy, (evaluations, eval_ms, matches) in zip(snapshot.rules, snapshot.metric_keys):
+            started = time.perf_counter()
+            matched = policy.matches_features(subject, memo) if features else policy.matches(subject, memo)
+            increments.append((evaluations, 1))
+            increments.append((eval_ms, (time.perf_counter() - started) * 1000))
+            if matched:
+                increments.append((matches, 1))
+                matched_policy = policy
+                break
+        get_metrics_registry().inc_many(increments)
+        return matched_policy
+
+    def evaluate_batch(self, data: Mapping[str, Any]) -> BatchEvaluation:
+        """Evaluate many investigations at once with first-match priority.
+
+        Equivalent to make_decision() per row for policy, decision and
+        confidence (reasoning and action text are not generated).
+
+        Args:
+            data: Columns named in BATCH_COLUMNS (dict of arrays or a DataFrame)
+
+        Returns:
+            BatchEvaluation with one entry per row
+
+        Raises:
+            ValueError: If a column is missing, lengths differ, or a policy
+                has no vector_condition
+        """
+        snapshot = self._active_snapshot()
+        policies = snapshot.rules
+        columns = _batch_columns(data)
+        risk_scores = columns["risk_score"]
+        if len(risk_scores) and (risk_scores.min() < 0 or risk_scores.max() > 100):
+            raise ValueError("evaluate_batch risk_score values must be within 0-100")
+        if snapshot.first_match is None:
+            raise ValueError(f"evaluate_batch supports at most {MAX_BATCH_POLICIES} policies")
+
+        # Bit i is set where the i-th policy (in priority order) matches;
+        # first_match maps every bit pattern to its lowest set bit's rank
+        increments = []
+        memo = {}
+        matches = np.zeros(len(risk_scores), dtype=np.uint16)
+        for bit, (policy, (evaluations, eval_ms, _)) in enumerate(zip(policies, snapshot.metric_keys)):
+            if policy.vector_condition is None:
+                raise ValueError(f"Policy {policy.name} has no vector_condition for batch evaluation")
+            started = time.perf_counter()
+            matches |= policy.mask(columns, memo).astype(np.uint16) << bit
+            increments.append((evaluations, len(risk_scores)))
+            increments.append((eval_ms, (time.perf_counter() - started) * 1000))
+        get_metrics_registry().inc_many(increments)
+        ranks = snapshot.first_match.take(matches)
+
+        return BatchEvaluation(
+            policy_ids=snapshot.policy_table.take(ranks),
+            decisions=snapshot.decision_table.take(ranks),
+            confidences=snapshot.confidence_table.take(ranks.astype(np.intp) * 101 + risk_scores),
+        )
 
     def make_decision(self, investigation: InvestigationReport) -> JudgmentDecision:
         """Make a decision based on policy evaluation.
@@ -253,15 +674,11 @@ class PolicyEngine:
                 risk_score=investigation.risk_score
             )
 
-        # Calculate confidence within the policy's range
-        min_conf, max_conf = matched_policy.confidence_range
-        # Higher risk score = higher confidence
-        confidence = min_conf + int((investigation.risk_score / 100) * (max_conf - min_conf))
-        confidence = max(min_conf, min(max_conf, confidence))  # Clamp to range
+        confidence = matched_policy.confidence_for(investigation.risk_score)
 
         return JudgmentDecision(
             decision=matched_policy.decision,
-            policy_applied=matched_policy.priority.value,
+            policy_applied=int(matched_policy.priority),
             reasoning=matched_policy.generate_reasoning(investigation),
             action_required=matched_policy.generate_action_required(investigation),
             human_override_allowed=matched_policy.human_override_allowed,
@@ -273,13 +690,16 @@ class PolicyEngine:
     def add_policy(self, policy: PolicyRule) -> None:
         """Add a new policy to the engine.
 
+        Publishes a new snapshot; evaluations already running finish on the
+        previous one.
+
         Args:
             policy: The PolicyRule to add
         """
-        self.policies.append(policy)
-        self.policies.sort(key=lambda p: p.priority.value)
+        with self._reload_lock:
+            self._publish(self._snapshot.rules + (policy,))
 
-    def remove_policy(self, priority: PolicyPriority) -> bool:
+    def remove_policy(self, priority: int) -> bool:
         """Remove a policy by priority.
 
         Args:
@@ -288,17 +708,61 @@ class PolicyEngine:
         Returns:
             True if policy was removed, False if not found
         """
-        original_len = len(self.policies)
-        self.policies = [p for p in self.policies if p.priority != priority]
-        return len(self.policies) < original_len
+        with self._reload_lock:
+            current = self._snapshot.rules
+            remaining = [p for p in current if p.priority != priority]
+            if len(remaining) == len(current):
+                return False
+            self._publish(remaining)
+            return True
+
+
+def _rule_metric_keys(policy: PolicyRule) -> tuple:
+    """(evaluations, eval_ms, matches) counter keys for a policy."""
+    label = int(policy.priority)
+    return (
+        make_key("policy.evaluations", policy=label),
+        make_key("policy.eval_ms", policy=label),
+        make_key("policy.matches", policy=label),
+    )
+
+
+def _file_identity(path: str):
+    """(inode, mtime, size) of a file, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
 
 
 # Singleton instance
 _policy_engine = None
 
 def get_policy_engine() -> PolicyEngine:
-    """Get the singleton policy engine instance."""
+    """Get the singleton policy engine instance.
+
+    Loads the rules file (POLICY_RULES_PATH, else config/policies.yaml) with
+    hot reload. Falls back to the built-in POLICIES if there is no file or it
+    cannot be loaded.
+    """
     global _policy_engine
     if _policy_engine is None:
-        _policy_engine = PolicyEngine()
+        from config.policy_rules import default_rules_path
+
+        path = default_rules_path()
+        if path:
+            try:
+                _policy_engine = PolicyEngine.from_file(path)
+                print(f"[PolicyEngine] Loaded {len(_policy_engine.policies)} policies from {path}")
+            except Exception as e:
+                print(f"[PolicyEngine] ⚠️ Could not load {path}, using built-in policies: {e}")
+        if _policy_engine is None:
+            _policy_engine = PolicyEngine()
     return _policy_engine
+
+
+def set_policy_engine(engine: Optional[PolicyEngine]) -> None:
+    """Override the policy engine (e.g. for backtests). None resets to config."""
+    global _policy_engine
+    _policy_engine = engine
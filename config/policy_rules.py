@@ -0,0 +1,353 @@
+"""Declarative policy rules (YAML/JSON) compiled into a shared predicate DAG.
+
+A rules file names reusable conditions and lists the policies in priority
+order:
+
+    conditions:
+      new_beneficiary: {field: account_age_hours, op: "<", value: 24}
+      long_tenure: {field: account_tenure_days, op: ">", value: 1825}
+    policies:
+      - priority: 4
+        name: New Account Escalation
+        when: new_beneficiary
+        decision: ESCALATE_TO_HUMAN
+        human_override_allowed: true
+        confidence_range: [60, 75]
+        action_required: Escalate to fraud analyst for verification of beneficiary legitimacy
+
+Priorities are positive integers, lower first; 1-6 reuse the built-in
+policies' reasoning text, other numbers get a generic one.
+
+A `when` expression (and a named condition) is one of:
+- a condition name
+- a leaf {field, op, value}. The field is one of FIELDS and the op one of
+  ==, !=, <, <=, >, >=, in. risk_level compares by severity
+  (LOW < MEDIUM < HIGH < CRITICAL). A missing value never matches a leaf.
+- {all: [...]}, {any: [...]} or {not: expr}
+
+Identical sub-expressions across all policies compile to a single DAG node.
+Within one evaluation pass each node is computed at most once: per
+investigation in PolicyEngine.evaluate, per batch in evaluate_batch. So
+`not new_beneficiary` inside the FIRST-TIME rule reuses the node the NEW
+ACCOUNT rule evaluates, and adding rules over the same fields adds little
+cost.
+
+The compiled rules are ordinary (frozen) PolicyRule objects whose
+`condition`, `feature_condition` and `vector_condition` are bound to the DAG. PolicyEngine.from_file() loads a
+file and hot-reloads it when it changes.
+"""
+import json
+import operator
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.models import Decision, InvestigationReport
+from config.policy_engine import PolicyPriority, PolicyRule
+from config.risk_features import RISK_LEVEL_CODES, RiskFeatures
+
+# Field -> getter on an InvestigationReport (same fields as the batch columns)
+FIELDS: Dict[str, Callable[[InvestigationReport], Any]] = {
+    "risk_level": lambda inv: RISK_LEVEL_CODES.get(inv.risk_level.value),
+    "risk_score": lambda inv: inv.risk_score,
+    "active_voice_call": lambda inv: inv.security_flags.get("active_voice_call", False),
+    "previous_violations": lambda inv: inv.user_profile.previous_violations,
+    "account_age_hours": lambda inv: inv.beneficiary_analysis.account_age_hours,
+    "account_tenure_days": lambda inv: inv.user_profile.account_tenure_days,
+}
+
+# Field -> getter on a RiskFeatures record (risk_level is already a code)
+FEATURE_FIELDS: Dict[str, Callable[[RiskFeatures], Any]] = {
+    field: operator.attrgetter(field) for field in FIELDS
+}
+
+# Priorities with built-in reasoning text (PolicyRule.generate_reasoning);
+# rules files may use any other positive int
+BUILTIN_PRIORITIES = frozenset(p.value for p in PolicyPriority)
+
+OPERATORS = {
+    "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge,
+}
+
+
+def _contains(actual: Any, operand: tuple) -> bool:
+    return actual in operand
+
+
+def _leaf_function(node_id: int, getter: Callable, compare: Callable, operand: Any) -> Callable:
+    def leaf(investigation, memo):
+        result = memo[node_id]
+        if result is None:
+            actual = getter(investigation)
+            result = memo[node_id] = actual is not None and bool(compare(actual, operand))
+        return result
+    return leaf
+
+
+def _not_function(node_id: int, child: Callable) -> Callable:
+    def negate(investigation, memo):
+        result = memo[node_id]
+        if result is None:
+            result = memo[node_id] = not child(investigation, memo)
+        return result
+    return negate
+
+
+def _junction_function(node_id: int, require_all: bool, children: List[Callable]) -> Callable:
+    def junction(investigation, memo):
+        result = memo[node_id]
+        if result is None:
+            result = require_all
+            for child in children:
+                if child(investigation, memo) != require_all:
+                    result = not require_all
+                    break
+            memo[node_id] = result
+        return result
+    return junction
+
+
+def _present(field: str, column: np.ndarray) -> np.ndarray:
+    """Mask of rows where a batch column holds a value (mirrors `is not None`)."""
+    if field == "risk_level":
+        return column >= 0
+    if column.dtype.kind == "f":
+        return ~np.isnan(column)
+    return np.ones(len(column), dtype=bool)
+
+
+class PredicateDAG:
+    """Deduplicated condition nodes shared by a set of compiled policies.
+
+    Nodes are ("leaf", field, op, operand), ("all", children),
+    ("any", children) or ("not", child). Results are memoized in the
+    `memo` dict the engine creates for each evaluation pass (see
+    PolicyRule.shared_memo); a call without one computes from scratch, so a
+    report mutated between evaluations is never served stale results.
+    """
+
+    def __init__(self):
+        self.nodes: List[Tuple] = []
+        self._ids: Dict[Tuple, int] = {}
+        self._functions: Optional[list] = None
+        self._feature_functions: Optional[list] = None
+
+    def add(self, node: Tuple) -> int:
+        """Node id for `node`, reusing an identical existing node."""
+        kind = node[0]
+        key = (kind, frozenset(node[1])) if kind in ("all", "any") else node
+        if key not in self._ids:
+            self._ids[key] = len(self.nodes)
+            self.nodes.append(node)
+            self._functions = self._feature_functions = None
+        return self._ids[key]
+
+    def _memo(self, kind: str, memo: Optional[Dict[Any, list]]) -> list:
+        """This DAG's node results within one evaluation pass."""
+        if memo is None:
+            return [None] * len(self.nodes)
+        key = (self, kind)
+        results = memo.get(key)
+        if results is None:
+            results = memo[key] = [None] * len(self.nodes)
+        return results
+
+    # -- one investigation ---------------------------------------------------
+
+    def value(self, node_id: int, investigation: InvestigationReport, memo: Optional[dict] = None) -> bool:
+        if self._functions is None:
+            self._functions = self._compile_functions()
+        return self._functions[node_id](investigation, self._memo("scalar", memo))
+
+    def value_features(self, node_id: int, features: RiskFeatures, memo: Optional[dict] = None) -> bool:
+        if self._feature_functions is None:
+            self._feature_functions = self._compile_functions(FEATURE_FIELDS)
+        return self._feature_functions[node_id](features, self._memo("features", memo))
+
+    def _compile_functions(self, getters: Dict[str, Callable] = FIELDS) -> list:
+        """One memoizing closure per node (children precede parents)."""
+        functions = []
+        for node_id, node in enumerate(self.nodes):
+            kind = node[0]
+            if kind == "leaf":
+                _, field, op, operand = node
+                functions.append(_leaf_function(node_id, getters[field], OPERATORS.get(op, _contains), operand))
+            elif kind == "not":
+                functions.append(_not_function(node_id, functions[node[1]]))
+            else:
+                functions.append(_junction_function(node_id, kind == "all", [functions[c] for c in node[1]]))
+        return functions
+
+    # -- batch columns ---------------------------------------------------------
+
+    def mask(self, node_id: int, columns: Dict[str, np.ndarray], memo: Optional[dict] = None) -> np.ndarray:
+        return self._mask(node_id, columns, self._memo("batch", memo))
+
+    def _mask(self, node_id: int, columns: Dict[str, np.ndarray], memo: list) -> np.ndarray:
+        result = memo[node_id]
+        if result is None:
+            node = self.nodes[node_id]
+            kind = node[0]
+            if kind == "leaf":
+                _, field, op, operand = node
+                column = columns[field]
+                if op == "in":
+                    result = np.isin(column, list(operand))
+                else:
+                    result = OPERATORS[op](column, operand)
+                if op == "!=" or field == "risk_level":
+                    result &= _present(field, column)
+            elif kind == "all":
+                result = np.logical_and.reduce([self._mask(c, columns, memo) for c in node[1]])
+            elif kind == "any":
+                result = np.logical_or.reduce([self._mask(c, columns, memo) for c in node[1]])
+            else:
+                result = ~self._mask(node[1], columns, memo)
+            memo[node_id] = result
+        return result
+
+
+class _Compiler:
+    """Turns parsed rule documents into PolicyRules over one PredicateDAG."""
+
+    def __init__(self, document: Dict[str, Any], source: str):
+        self.source = source
+        self.definitions = document.get("conditions") or {}
+        self.dag = PredicateDAG()
+        self._named: Dict[str, int] = {}
+        self._resolving: List[str] = []
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"{self.source}: {message}")
+
+    def condition(self, name: str) -> int:
+        if name in self._named:
+            return self._named[name]
+        if name not in self.definitions:
+            raise self.error(f"unknown condition {name!r}")
+        if name in self._resolving:
+            raise self.error(f"condition cycle: {' -> '.join(self._resolving + [name])}")
+        self._resolving.append(name)
+        node_id = self.expression(self.definitions[name])
+        self._resolving.pop()
+        self._named[name] = node_id
+        return node_id
+
+    def expression(self, expr: Any) -> int:
+        if isinstance(expr, str):
+            return self.condition(expr)
+        if not isinstance(expr, dict):
+            raise self.error(f"invalid expression {expr!r}")
+        if "field" in expr:
+            return self.dag.add(self.leaf(expr))
+        if len(expr) != 1:
+            raise self.error(f"expression must have one of all/any/not/field: {expr!r}")
+        kind, operand = next(iter(expr.items()))
+        if kind == "not":
+            return self.dag.add(("not", self.expression(operand)))
+        if kind in ("all", "any"):
+            if not isinstance(operand, list) or not operand:
+                raise self.error(f"{kind} needs a non-empty list")
+            children = tuple(dict.fromkeys(self.expression(item) for item in operand))
+            return children[0] if len(children) == 1 else self.dag.add((kind, children))
+        raise self.error(f"unknown expression type {kind!r}")
+
+    def leaf(self, expr: Dict[str, Any]) -> Tuple:
+        field, op, value = expr.get("field"), expr.get("op", "=="), expr.get("value")
+        if field not in FIELDS:
+            raise self.error(f"unknown field {field!r} (expected one of {', '.join(FIELDS)})")
+        if op != "in" and op not in OPERATORS:
+            raise self.error(f"unknown operator {op!r}")
+        values = value if op == "in" else [value]
+        if not isinstance(values, list) or any(v is None for v in values):
+            raise self.error(f"invalid value for {field} {op}: {value!r}")
+        if field == "risk_level":
+            unknown = [v for v in values if v not in RISK_LEVEL_CODES]
+            if unknown:
+                raise self.error(f"unknown risk_level {unknown[0]!r}")
+            values = [RISK_LEVEL_CODES[v] for v in values]
+        operand = tuple(sorted(set(values))) if op == "in" else values[0]
+        return ("leaf", field, op, operand)
+
+    def policy(self, spec: Dict[str, Any]) -> PolicyRule:
+        label = spec.get("name") or spec.get("priority")
+        if "when" not in spec:
+            raise self.error(f"policy {label} is missing 'when'")
+        node_id = self.expression(spec["when"])
+        dag = self.dag
+        try:
+            priority = spec["priority"]
+            if isinstance(priority, bool) or not isinstance(priority, int) or priority < 1:
+                raise ValueError(f"priority must be a positive integer, got {priority!r}")
+            if priority in BUILTIN_PRIORITIES:
+                priority = PolicyPriority(priority)  # keeps the built-in reasoning text
+            low, high = spec["confidence_range"]
+            return PolicyRule(
+                priority=priority,
+                name=spec.get("name") or getattr(priority, "name", f"POLICY_{priority}"),
+                condition=lambda investigation, memo=None: dag.value(node_id, investigation, memo),
+                decision=Decision(spec["decision"]),
+                human_override_allowed=bool(spec["human_override_allowed"]),
+                confidence_range=(int(low), int(high)),
+                action_required_template=spec["action_required"],
+                vector_condition=lambda columns, memo=None: dag.mask(node_id, columns, memo),
+                feature_condition=lambda features, memo=None: dag.value_features(node_id, features, memo),
+                shared_memo=True,
+            )
+        except KeyError as e:
+            raise self.error(f"policy {label} is missing {e}") from None
+        except (TypeError, ValueError) as e:
+            raise self.error(f"invalid policy {label}: {e}") from None
+
+    def compile(self, policies: List[Dict[str, Any]]) -> List[PolicyRule]:
+        if not isinstance(policies, list) or not policies:
+            raise self.error("'policies' must be a non-empty list")
+        rules = [self.policy(spec) for spec in policies]
+        priorities = [rule.priority for rule in rules]
+        duplicates = sorted({int(p) for p in priorities if priorities.count(p) > 1})
+        if duplicates:
+            raise self.error(f"duplicate policy priorities {duplicates}")
+        return rules
+
+
+def parse_rules_file(path: str) -> Dict[str, Any]:
+    """Read a YAML (.yaml/.yml, needs PyYAML) or JSON rules file."""
+    with open(path) as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError(f"Reading {path} needs PyYAML (pip install pyyaml); or use a .json rules file")
+        document = yaml.safe_load(text)
+    else:
+        document = json.loads(text)
+    if not isinstance(document, dict):
+        raise ValueError(f"{path}: expected a mapping with 'conditions' and 'policies'")
+    return document
+
+
+def compile_rules(document: Dict[str, Any], source: str = "<rules>") -> List[PolicyRule]:
+    """Compile a parsed rules document into PolicyRules sharing one PredicateDAG.
+
+    Raises:
+        ValueError: If the document is invalid (message names the source)
+    """
+    return _Compiler(document, source).compile(document.get("policies"))
+
+
+def load_policy_rules(path: str) -> List[PolicyRule]:
+    """Parse and compile a rules file."""
+    return compile_rules(parse_rules_file(path), source=path)
+
+
+def default_rules_path() -> Optional[str]:
+    """POLICY_RULES_PATH, else config/policies.yaml if present."""
+    path = os.getenv("POLICY_RULES_PATH")
+    if path:
+        return path
+    bundled = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policies.yaml")
+    return bundled if os.path.exists(bundled) else None
@@ -0,0 +1,331 @@
+"""Retries with full jitter, deadlines and per-dependency retry budgets.
+
+Fixed exponential backoff makes every client that failed at the same moment
+retry at the same moment, so a brief outage comes back as synchronized
+waves of load. Here each wait is drawn uniformly from
+[0, min(max_delay, base_delay * 2**retry)] ("full jitter"), and retries are
+bounded three ways:
+
+- max_attempts per call,
+- an overall Deadline: no retry starts, and no backoff sleeps, past it,
+- a RetryBudget per dependency (bigquery, vertex, confluent_rest): each
+  call deposits `ratio` tokens (plus a small time-based floor) and each
+  retry spends one, so retries stay a bounded fraction of traffic instead
+  of multiplying it while a dependency is down.
+
+    @retry("bigquery", RetryPolicy(max_attempts=4, deadline_seconds=20))
+    def load_profile(user_id): ...
+
+    rows = call_with_retry(client.query, sql, dependency="bigquery")
+    status = await call_with_retry_async(fetch, dependency="confluent_rest")
+
+`retry` works on both plain and `async def` functions. Counters (label
+dependency=...): resilience.attempts, resilience.retries,
+resilience.backoff_ms, resilience.failures, resilience.budget_exhausted and
+resilience.deadline_exceeded.
+
+Budget settings come from RETRY_BUDGET_RATIO (default 0.2),
+RETRY_BUDGET_MIN_PER_SECOND (default 1.0) and RETRY_BUDGET_MAX_TOKENS
+(default 20).
+"""
+import asyncio
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from config.metrics import get_metrics_registry
+
+T = TypeVar('T')
+
+# Dependencies with their own retry budget
+DEPENDENCIES = ("bigquery", "vertex", "confluent_rest")
+
+DEFAULT_BUDGET_RATIO = 0.2
+DEFAULT_BUDGET_MIN_PER_SECOND = 1.0
+DEFAULT_BUDGET_MAX_TOKENS = 20.0
+
+# HTTP statuses worth retrying (throttling and transient server errors)
+RETRYABLE_HTTP_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class Deadline:
+    """An absolute point in (monotonic) time that a whole operation must finish by."""
+
+    def __init__(self, seconds: Optional[float]):
+        """Start a deadline `seconds` from now (None = no deadline)."""
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How one call is retried.
+
+    Args:
+        max_attempts: Total attempts including the first
+        base_delay: Backoff cap for the first retry, in seconds
+        max_delay: Upper bound for any single backoff
+        deadline_seconds: Overall time budget across attempts (None = unbounded)
+        retry_on: Exception types that may be retried
+        should_retry: Optional extra check on a caught exception (e.g.
+            retryable_http_error); False re-raises immediately
+        retry_on_result: Optional check on a returned value; True retries it
+            (e.g. a query that returns None until data lands). When attempts
+            run out, the last result is returned
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    deadline_seconds: Optional[float] = None
+    retry_on: Tuple[type, ...] = (Exception,)
+    should_retry: Optional[Callable[[BaseException], bool]] = None
+    retry_on_result: Optional[Callable[[Any], bool]] = None
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter wait before retry number `retry` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    def retryable(self, error: BaseException) -> bool:
+        if not isinstance(error, self.retry_on):
+            return False
+        return self.should_retry is None or bool(self.should_retry(error))
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+class RetryBudget:
+    """Token bucket limiting retries to a fraction of a dependency's calls."""
+
+    def __init__(self, ratio: float = DEFAULT_BUDGET_RATIO,
+                 min_per_second: float = DEFAULT_BUDGET_MIN_PER_SECOND,
+                 max_tokens: float = DEFAULT_BUDGET_MAX_TOKENS):
+        """Create a full bucket.
+
+        Args:
+            ratio: Tokens deposited per call (0.2 = at most ~20% extra load)
+            min_per_second: Tokens added per second regardless of traffic, so
+                low-volume callers can still retry
+            max_tokens: Bucket size (bounds a retry burst after a quiet period)
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        """Record a first attempt."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one token for a retry; False when the budget is exhausted."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+# Per-dependency budgets
+_budgets: Dict[str, RetryBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_retry_budget(dependency: str) -> RetryBudget:
+    """Get the shared retry budget for a dependency (created on first use)."""
+    budget = _budgets.get(dependency)
+    if budget is None:
+        with _budgets_lock:
+            budget = _budgets.get(dependency)
+            if budget is None:
+                budget = _budgets[dependency] = RetryBudget(
+                    ratio=float(os.getenv("RETRY_BUDGET_RATIO", DEFAULT_BUDGET_RATIO)),
+                    min_per_second=float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", DEFAULT_BUDGET_MIN_PER_SECOND)),
+                    max_tokens=float(os.getenv("RETRY_BUDGET_MAX_TOKENS", DEFAULT_BUDGET_MAX_TOKENS)),
+                )
+    return budget
+
+
+def set_retry_budget(dependency: str, budget: Optional[RetryBudget]) -> None:
+    """Override a dependency's budget (None resets it to the env defaults)."""
+    with _budgets_lock:
+        if budget is None:
+            _budgets.pop(dependency, None)
+        else:
+            _budgets[dependency] = budget
+
+
+def retryable_http_error(error: BaseException) -> bool:
+    """should_retry for HTTP clients: connection errors and 408/429/5xx responses.
+
+    Errors carrying a response (e.g. requests.HTTPError) are retried only for
+    RETRYABLE_HTTP_STATUSES; other 4xx responses will not succeed on retry.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is None or status in RETRYABLE_HTTP_STATUSES
+
+
+def jittered(seconds: float, spread: float = 0.5) -> float:
+    """A polling interval randomized by +/- `spread` so pollers drift apart."""
+    return random.uniform(seconds * (1 - spread), seconds * (1 + spread))
+
+
+class _Attempts:
+    """Bookkeeping shared by the sync and async retry loops.
+
+    next_delay() returns the backoff before the next attempt, or None when
+    the call must stop (attempts, deadline or budget exhausted).
+    """
+
+    def __init__(self, dependency: str, policy: RetryPolicy, deadline: Optional[Deadline], name: str):
+        self.dependency = dependency
+        self.policy = policy
+        self.deadline = deadline or Deadline(policy.deadline_seconds)
+        self.name = name
+        self.attempt = 0
+        self.metrics = get_metrics_registry()
+        self.budget = get_retry_budget(dependency)
+        self.budget.deposit()
+
+    def started(self) -> None:
+        self.attempt += 1
+        self.metrics.inc("resilience.attempts", dependency=self.dependency)
+
+    def next_delay(self, reason: str) -> Optional[float]:
+        labels = {"dependency": self.dependency}
+        if self.attempt >= self.policy.max_attempts:
+            print(f"[Retry] ❌ {self.name}: all {self.attempt} attempts failed ({reason})")
+            self.metrics.inc("resilience.failures", **labels)
+            return None
+        delay = self.policy.backoff(self.attempt - 1)
+        remaining = self.deadline.remaining()
+        if remaining is not None and delay >= remaining:
+            print(f"[Retry] ❌ {self.name}: deadline reached after {self.attempt} attempt(s) ({reason})")
+            self.metrics.inc("resilience.deadline_exceeded", **labels)
+            self.metrics.inc("resilience.failures", **labels)
+            return None
+        if not self.budget.try_spend():
+            print(f"[Retry] ❌ {self.name}: {self.dependency} retry budget exhausted ({reason})")
+            self.metrics.inc("resilience.budget_exhausted", **labels)
+            self.metrics.inc("resilience.failures", **labels)
+            return None
+        print(f"[Retry] ⚠️ {self.name}: attempt {self.attempt} failed ({reason}), retrying in {delay:.2f}s")
+        self.metrics.inc("resilience.retries", **labels)
+        self.metrics.inc("resilience.backoff_ms", delay * 1000, **labels)
+        return delay
+
+
+def _describe(error: BaseException) -> str:
+    return f"{type(error).__name__}: {str(error)[:100]}"
+
+
+def call_with_retry(func: Callable[..., T], *args, dependency: str = "default",
+                    policy: RetryPolicy = DEFAULT_POLICY, deadline: Optional[Deadline] = None, **kwargs) -> T:
+    """Call `func(*args, **kwargs)`, retrying per `policy` and the dependency's budget.
+
+    Args:
+        dependency: Retry budget and metrics label (see DEPENDENCIES)
+        policy: Attempts, backoff and what to retry
+        deadline: Shared Deadline (overrides policy.deadline_seconds), e.g.
+            one budget across several calls
+
+    Returns:
+        The first accepted result (or the last result if retry_on_result
+        never accepted one)
+
+    Raises:
+        The last exception once it is not retryable or retries run out
+    """
+    attempts = _Attempts(dependency, policy, deadline, getattr(func, "__qualname__", "call"))
+    while True:
+        attempts.started()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            if not policy.retryable(e):
+                raise
+            delay = attempts.next_delay(_describe(e))
+            if delay is None:
+                raise
+        else:
+            if policy.retry_on_result is None or not policy.retry_on_result(result):
+                return result
+            delay = attempts.next_delay("result not ready")
+            if delay is None:
+                return result
+        time.sleep(delay)
+
+
+async def call_with_retry_async(func: Callable[..., Any], *args, dependency: str = "default",
+                                policy: RetryPolicy = DEFAULT_POLICY, deadline: Optional[Deadline] = None,
+                                **kwargs) -> Any:
+    """Async call_with_retry: awaits `func(*args, **kwargs)` and backs off with asyncio.sleep."""
+    attempts = _Attempts(dependency, policy, deadline, getattr(func, "__qualname__", "call"))
+    while True:
+        attempts.started()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            if not policy.retryable(e):
+                raise
+            delay = attempts.next_delay(_describe(e))
+            if delay is None:
+                raise
+        else:
+            if policy.retry_on_result is None or not policy.retry_on_result(result):
+                return result
+            delay = attempts.next_delay("result not ready")
+            if delay is None:
+                return result
+        await asyncio.sleep(delay)
+
+
+def retry(dependency: str = "default", policy: RetryPolicy = DEFAULT_POLICY):
+    """Decorator form of call_with_retry / call_with_retry_async.
+
+    Coroutine functions get the async loop (non-blocking backoff); plain
+    functions the sync one.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await call_with_retry_async(func, *args, dependency=dependency, policy=policy, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return call_with_retry(func, *args, dependency=dependency, policy=policy, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,134 @@
+"""Compact risk feature record for hot-path policy decisions.
+
+The policies only read six values from an InvestigationReport, but going
+through the pydantic model means three nested models, validators and a
+security_flags dict per decision. RiskFeatures holds just those values (plus
+the ids used in action text) in a __slots__ object:
+
+    features = RiskFeatures.from_report(investigation)
+    policy = get_policy_engine().evaluate_features(features)
+
+risk_level is stored as its RISK_LEVEL_CODES integer, and missing ages and
+tenures stay None (the same semantics as the report). to_columns() turns a
+list of records into evaluate_batch() input.
+
+See scripts/benchmark_risk_features.py for allocation and timing numbers.
+"""
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+
+from config.models import InvestigationReport
+
+# risk_level severity codes (also used by evaluate_batch and the rules compiler)
+RISK_LEVEL_CODES = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
+RISK_LEVEL_NAMES = {code: name for name, code in RISK_LEVEL_CODES.items()}
+
+
+class RiskFeatures:
+    """The fields the policy engine decides on, without model overhead."""
+
+    __slots__ = (
+        "transaction_id", "user_id", "risk_score", "risk_level", "active_voice_call",
+        "previous_violations", "account_age_hours", "account_tenure_days",
+    )
+
+    def __init__(
+        self,
+        transaction_id: str,
+        user_id: str,
+        risk_score: int,
+        risk_level: int,
+        active_voice_call: bool = False,
+        previous_violations: int = 0,
+        account_age_hours: Optional[float] = None,
+        account_tenure_days: Optional[int] = None,
+    ):
+        self.transaction_id = transaction_id
+        self.user_id = user_id
+        self.risk_score = risk_score
+        self.risk_level = risk_level  # RISK_LEVEL_CODES value
+        self.active_voice_call = active_voice_call
+        self.previous_violations = previous_violations
+        self.account_age_hours = account_age_hours
+        self.account_tenure_days = account_tenure_days
+
+    @classmethod
+    def from_report(cls, investigation: InvestigationReport) -> "RiskFeatures":
+        """Extract the decision fields from a validated InvestigationReport."""
+        profile = investigation.user_profile
+        return cls(
+            investigation.transaction_id,
+            profile.user_id,
+            investigation.risk_score,
+            RISK_LEVEL_CODES[investigation.risk_level.value],
+            bool(investigation.security_flags.get("active_voice_call", False)),
+            profile.previous_violations,
+            investigation.beneficiary_analysis.account_age_hours,
+            profile.account_tenure_days,
+        )
+
+    @classmethod
+    def from_mapping(cls, row: Mapping[str, Any]) -> "RiskFeatures":
+        """Build from a flat row keyed like BATCH_COLUMNS (e.g. a cache or export row).
+
+        risk_level may be a name ("HIGH") or a code.
+
+        Raises:
+            ValueError: If risk_level or risk_score is missing or invalid
+        """
+        level = row.get("risk_level")
+        code = RISK_LEVEL_CODES.get(level) if isinstance(level, str) else level
+        if code not in RISK_LEVEL_CODES.values():
+            raise ValueError(f"Invalid risk_level: {level!r}")
+        score = row.get("risk_score")
+        if score is None or not 0 <= int(score) <= 100:
+            raise ValueError(f"Invalid risk_score: {score!r}")
+        return cls(
+            row.get("transaction_id", ""),
+            row.get("user_id", ""),
+            int(score),
+            code,
+            bool(row.get("active_voice_call") or False),
+            int(row.get("previous_violations") or 0),
+            row.get("account_age_hours"),
+            row.get("account_tenure_days"),
+        )
+
+    @property
+    def risk_level_name(self) -> str:
+        return RISK_LEVEL_NAMES[self.risk_level]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RiskFeatures):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"RiskFeatures({fields})"
+
+
+def to_columns(records: Iterable[RiskFeatures]) -> Dict[str, np.ndarray]:
+    """Columnar evaluate_batch() input for a sequence of records.
+
+    Missing ages and tenures become NaN, as evaluate_batch expects.
+    """
+    records = list(records)
+    return {
+        "risk_level": np.fromiter((r.risk_level for r in records), dtype=np.int8, count=len(records)),
+        "risk_score": np.fromiter((r.risk_score for r in records), dtype=np.int64, count=len(records)),
+        "active_voice_call": np.fromiter((r.active_voice_call for r in records), dtype=bool, count=len(records)),
+        "previous_violations": np.fromiter(
+            (r.previous_violations for r in records), dtype=np.int64, count=len(records)
+        ),
+        "account_age_hours": np.array(
+            [np.nan if r.account_age_hours is None else r.account_age_hours for r in records], dtype=np.float64
+        ),
+        "account_tenure_days": np.array(
+            [np.nan if r.account_tenure_days is None else r.account_tenure_days for r in records], dtype=np.float64
+        ),
+    }
@@ -1,8 +1,8 @@
 """Validation and error handling utilities for agent workflows."""
-import time
+import inspect
 from typing import Dict, Any, Optional, Callable, TypeVar
-from functools import wraps
 from config.models import InvestigationReport, JudgmentDecision
+from config.resilience import RetryPolicy, retry
 
 T = TypeVar('T')
 
@@ -121,78 +121,69 @@ def validate_judgment_policy(judgment: JudgmentDecision, investigation: Investig
 def retry_on_failure(
     max_retries: int = 3,
     backoff_seconds: float = 1.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    deadline_seconds: Optional[float] = None,
+    dependency: str = "default",
 ):
-    """Decorator to retry a function on failure with exponential backoff.
+    """Decorator to retry a function on failure with jittered exponential backoff.
+
+    Thin wrapper over config.resilience: waits are drawn with full jitter,
+    bounded by an optional overall deadline and the dependency's retry budget.
 
     Args:
         max_retries: Maximum number of retry attempts
-        backoff_seconds: Initial backoff time in seconds
+        backoff_seconds: Backoff cap for the first retry (doubles per retry)
         exceptions: Tuple of exception types to catch and retry
+        deadline_seconds: Optional time budget across all attempts
+        dependency: Retry budget / metrics label (e.g. "bigquery")
 
     Returns:
         Decorator function
     """
-    def decorator(func: Callable[..., T]) -> Callable[..., T]:
-        @wraps(func)
-        def wrapper(*args, **kwargs) -> T:
-            last_exception = None
-            for attempt in range(max_retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except exceptions as e:
-                    last_exception = e
-                    if attempt < max_retries:
-                        wait_time = backoff_seconds * (2 ** attempt)
-                        print(f"⚠️ Attempt {attempt + 1} failed: {e}. Retrying in {wait_time}s...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"❌ All {max_retries} retries exhausted")
-
-            raise last_exception
-
-        return wrapper
-    return decorator
+    return retry(dependency, _retry_policy(max_retries, backoff_seconds, exceptions, deadline_seconds))
 
 
-async def retry_on_failure_async(
+def retry_on_failure_async(
     max_retries: int = 3,
     backoff_seconds: float = 1.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    deadline_seconds: Optional[float] = None,
+    dependency: str = "default",
 ):
-    """Async version of retry_on_failure decorator.
+    """Async version of retry_on_failure decorator (for `async def` functions).
+
+    Backoff uses asyncio.sleep, so retries never block the event loop.
 
     Args:
         max_retries: Maximum number of retry attempts
-        backoff_seconds: Initial backoff time in seconds
+        backoff_seconds: Backoff cap for the first retry (doubles per retry)
         exceptions: Tuple of exception types to catch and retry
+        deadline_seconds: Optional time budget across all attempts
+        dependency: Retry budget / metrics label (e.g. "vertex")
 
     Returns:
         Decorator function
     """
+    policy = _retry_policy(max_retries, backoff_seconds, exceptions, deadline_seconds)
+
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
-        @wraps(func)
-        async def wrapper(*args, **kwargs) -> T:
-            import asyncio
-            last_exception = None
-            for attempt in range(max_retries + 1):
-                try:
-                    return await func(*args, **kwargs)
-                except exceptions as e:
-                    last_exception = e
-                    if attempt < max_retries:
-                        wait_time = backoff_seconds * (2 ** attempt)
-                        print(f"⚠️ Attempt {attempt + 1} failed: {e}. Retrying in {wait_time}s...")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        print(f"❌ All {max_retries} retries exhausted")
-
-            raise last_exception
-
-        return wrapper
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"retry_on_failure_async needs an async function, got {func!r}")
+        return retry(dependency, policy)(func)
     return decorator
 
 
+def _retry_policy(max_retries: int, backoff_seconds: float, exceptions: tuple,
+                  deadline_seconds: Optional[float]) -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=max_retries + 1,
+        base_delay=backoff_seconds,
+        max_delay=backoff_seconds * (2 ** max_retries),
+        deadline_seconds=deadline_seconds,
+        retry_on=exceptions,
+    )
+
+
 def create_error_investigation(transaction_id: str, error_msg: str) -> Dict[str, Any]:
     """Create a fallback investigation report when Detective fails.
 
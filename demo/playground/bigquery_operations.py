@@ -4,10 +4,13 @@ Handles inserting test data and checking credentials availability.
 """
 
 import os
+import time
 from datetime import datetime
 from typing import Callable
 import uuid
 
+from agents.tools.bigquery_utils import record_insert_telemetry
+
 try:
     import streamlit as st
     HAS_STREAMLIT = True
@@ -122,6 +125,14 @@ def ensure_playground_tables(
         ]
     }
 
+    # Partition sessions by day and cluster every table by its lookup keys
+    # (same layout as scripts/create_playground_tables.py)
+    LAYOUTS = {
+        'customer_profiles': (None, ["user_id"]),
+        'beneficiary_graph': (None, ["account_id"]),
+        'mobile_banking_sessions': ("event_time", ["transaction_id", "user_id"]),
+    }
+
     for table_id, schema in TABLES.items():
         table_ref = f"{client.project}.{dataset}.{table_id}"
         try:
@@ -131,12 +142,32 @@ def ensure_playground_tables(
             # Table doesn't exist, create it
             try:
                 table = bigquery.Table(table_ref, schema=schema)
+                partition_field, cluster_fields = LAYOUTS[table_id]
+                if partition_field:
+                    table.time_partitioning = bigquery.TimePartitioning(
+                        type_=bigquery.TimePartitioningType.DAY, field=partition_field
+                    )
+                table.clustering_fields = cluster_fields
                 client.create_table(table)
             except Exception:
                 # Ignore errors (might be permissions or already created by another process)
                 pass
 
 
+def _insert_rows(client, table_ref: str, rows: list) -> list:
+    """Streaming insert that records latency telemetry for the target table."""
+    start = time.perf_counter()
+    errors = None
+    try:
+        errors = client.insert_rows_json(table_ref, rows)
+        return errors
+    finally:
+        record_insert_telemetry(
+            table_ref.rsplit(".", 1)[-1], "playground", time.perf_counter() - start,
+            rows=len(rows), error=errors is None or bool(errors)
+        )
+
+
 def insert_customer_profile(
     customer_data: dict,
     on_progress: Callable[[dict], None] | None = None
@@ -160,7 +191,7 @@ def insert_customer_profile(
         if "created_at" not in customer_data:
             customer_data["created_at"] = datetime.utcnow().isoformat()
 
-        errors = client.insert_rows_json(table_ref, [customer_data])
+        errors = _insert_rows(client, table_ref, [customer_data])
         if errors:
             if on_progress:
                 on_progress({"type": "error", "content": f"Insert errors: {errors}"})
@@ -197,7 +228,7 @@ def insert_beneficiary(
         if "created_at" not in beneficiary_data:
             beneficiary_data["created_at"] = datetime.utcnow().isoformat()
 
-        errors = client.insert_rows_json(table_ref, [beneficiary_data])
+        errors = _insert_rows(client, table_ref, [beneficiary_data])
         if errors:
             if on_progress:
                 on_progress({"type": "error", "content": f"Insert errors: {errors}"})
@@ -239,7 +270,7 @@ def insert_session_context(
         if "event_type" not in session_data:
             session_data["event_type"] = "PLAYGROUND_TEST"
 
-        errors = client.insert_rows_json(table_ref, [session_data])
+        errors = _insert_rows(client, table_ref, [session_data])
         if errors:
             if on_progress:
                 on_progress({"type": "error", "content": f"Insert errors: {errors}"})
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Rebuild the violation store (previous_violations) from historical decisions.
+
+Sources:
+
+--jsonl FILE
+    Decision records, one JSON object per line, with user_id,
+    transaction_id and decision (only "BLOCK" counts). Nested
+    {"judgment": {...}, "investigation": {"user_profile": {...}}} records as
+    returned by ThreatProcessingWorkflow are accepted too.
+
+--bigquery
+    Blocked transfers sunk to the quarantined_transactions table
+    (sender_user_id, transaction_id).
+
+Counts are replaced, not added to, so the backfill can be re-run safely.
+The swarm can keep running: its workers re-read the snapshot every
+VIOLATION_SNAPSHOT_SECONDS and merge violations they record later on top of
+the rebuilt counts, skipping transactions the backfill already counted.
+
+Examples:
+    python scripts/backfill_violations.py --jsonl decisions.jsonl
+    python scripts/backfill_violations.py --bigquery --dataset streamguard_threats
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from agents.tools.violation_store import ViolationStore
+
+load_dotenv()
+
+
+def violations_from_jsonl(path: str):
+    """Yield (user_id, transaction_id) for BLOCK decisions in a JSONL file."""
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"   ⚠️  Skipping malformed line {line_number}")
+                continue
+
+            judgment = record.get("judgment") or record
+            profile = (record.get("investigation") or {}).get("user_profile") or {}
+            decision = judgment.get("decision")
+            user_id = record.get("user_id") or profile.get("user_id")
+            if decision == "BLOCK" and user_id:
+                yield user_id, judgment.get("transaction_id") or record.get("transaction_id")
+
+
+def violations_from_bigquery(dataset: str):
+    """Yield (user_id, transaction_id) for transfers in quarantined_transactions."""
+    from agents.tools.bigquery_utils import get_client, run_query
+
+    query = f"""
+    SELECT DISTINCT sender_user_id, transaction_id
+    FROM `{dataset}.quarantined_transactions`
+    WHERE sender_user_id IS NOT NULL
+    """
+    result = run_query(get_client(), query, table="quarantined_transactions", source="backfill", page_size=100_000)
+    for row in result:
+        yield row["sender_user_id"], row["transaction_id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill StreamGuard violation counts')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--jsonl', type=str, help='Decision records (JSON lines)')
+    source.add_argument('--bigquery', action='store_true', help='Read quarantined_transactions')
+    parser.add_argument('--dataset', type=str, default=os.getenv("BIGQUERY_DATASET", "streamguard_threats"),
+                        help='BigQuery dataset (default: BIGQUERY_DATASET or streamguard_threats)')
+    parser.add_argument('--path', type=str, default=None,
+                        help='Snapshot path (default: VIOLATION_STORE_PATH or <FEATURE_STORE_DIR>/violations.json)')
+    args = parser.parse_args()
+
+    store = ViolationStore(path=args.path, snapshot_interval=0)
+    print(f"📥 Backfilling {store.path} ({len(store):,} users before)")
+
+    violations = violations_from_jsonl(args.jsonl) if args.jsonl else violations_from_bigquery(args.dataset)
+    users = store.replace_all(violations)
+    print(f"✅ {store.total_violations:,} violations across {users:,} users")
+
+
+if __name__ == "__main__":
+    main()
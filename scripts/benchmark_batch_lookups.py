@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-key vs batched Detective lookups.
+
+Compares a loop of get_user_history / get_beneficiary_risk / get_session_context
+calls against the *_batch tools at several batch sizes and reports keys/sec.
+
+By default runs against a temporary SQLite database seeded with synthetic
+rows, so no cloud credentials are needed. Use --backend bigquery to measure
+against the configured BigQuery dataset (keys are sampled from existing rows).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Keep the feature store out of the measurement
+os.environ.setdefault("FEATURE_STORE_DIR", tempfile.mkdtemp(prefix="bench_fs_"))
+
+from agents.tools.storage_backends import SQLiteBackend, get_storage_backend, set_storage_backend
+from agents.tools.bigquery_tools import (
+    get_user_history, get_user_history_batch,
+    get_beneficiary_risk, get_beneficiary_risk_batch,
+)
+from agents.tools.session_tools import get_session_context, get_session_context_batch
+from agents.tools.location_index import LocationIndex, set_location_index
+
+# Location signals depend on which sessions the (stateful) location index has
+# already seen, so they are left out of the single-vs-batch comparison
+LOCATION_SIGNALS = ("geolocation_distance_km", "travel_speed_kmh", "impossible_travel", "geolocation_anomalous")
+
+
+def _comparable(result):
+    if isinstance(result, dict) and "risk_signals" in result:
+        signals = {k: v for k, v in result["risk_signals"].items() if k not in LOCATION_SIGNALS}
+        return {**result, "risk_signals": signals}
+    return result
+
+
+def seed_sqlite(path: str, num_users: int, sessions_per_user: int):
+    """Create a SQLite backend with synthetic profiles, beneficiaries and sessions."""
+    backend = SQLiteBackend(path)
+    now = datetime.now(timezone.utc)
+
+    backend.insert_rows("customer_profiles", (
+        {
+            "user_id": f"user_{i}",
+            "age_group": random.choice(["Young", "Active", "Senior"]),
+            "account_tenure_days": random.randint(30, 5000),
+            "avg_transfer_amount": round(random.uniform(50, 2000), 2),
+            "behavioral_segment": "Conservative Saver",
+        }
+        for i in range(num_users)
+    ))
+    backend.insert_rows("beneficiary_graph", (
+        {
+            "account_id": f"acc_{i}",
+            "risk_score": random.randint(0, 100),
+            "account_age_hours": random.randint(1, 10000),
+            "linked_to_flagged_device": random.random() < 0.05,
+        }
+        for i in range(num_users)
+    ))
+    backend.insert_rows("mobile_banking_sessions", (
+        {
+            "session_id": f"sess_{i}_{j}",
+            "user_id": f"user_{i}",
+            "transaction_id": f"tx_{i}_{j}",
+            "event_type": "SUBMIT",
+            "is_call_active": random.random() < 0.1,
+            "typing_cadence_score": round(random.uniform(0.2, 1.0), 2),
+            "session_duration_seconds": random.randint(20, 300),
+            "battery_level": random.randint(5, 100),
+            "is_rooted_jailbroken": False,
+            "geolocation_lat": 40.7128 + random.uniform(-0.1, 0.1),
+            "geolocation_lon": -74.0060 + random.uniform(-0.1, 0.1),
+            "time_of_day_hour": random.randint(0, 23),
+            "event_time": now - timedelta(minutes=10 * j),
+        }
+        for i in range(num_users)
+        for j in range(sessions_per_user)
+    ))
+    return backend
+
+
+def sample_bigquery_keys(backend, limit: int):
+    """Sample existing user, account and transaction IDs from BigQuery."""
+    def _ids(column: str, table: str):
+        query = f"SELECT DISTINCT {column} FROM `{backend.dataset}.{table}` WHERE {column} IS NOT NULL LIMIT {limit}"
+        return [row[column] for row in backend.client.query(query).result()]
+
+    return (
+        _ids("user_id", "customer_profiles"),
+        _ids("account_id", "beneficiary_graph"),
+        _ids("transaction_id", "mobile_banking_sessions"),
+    )
+
+
+def measure(label: str, single_fn, batch_fn, keys: list, batch_size: int):
+    """Time the single-key loop and the batch call over the same keys."""
+    keys = keys[:batch_size]
+
+    # Fresh location index per pass (allocated outside the timed region)
+    set_location_index(LocationIndex(capacity=len(keys) * 2))
+    start = time.perf_counter()
+    single = {key: single_fn(key) for key in keys}
+    single_elapsed = time.perf_counter() - start
+
+    set_location_index(LocationIndex(capacity=len(keys) * 2))
+    start = time.perf_counter()
+    batch = batch_fn(keys)
+    batch_elapsed = time.perf_counter() - start
+
+    mismatched = sum(1 for key in keys if _comparable(single[key]) != _comparable(batch.get(key)))
+    print(f"   {label:<12} n={len(keys):<5} "
+          f"single: {len(keys) / single_elapsed:>10.0f} keys/s   "
+          f"batch: {len(keys) / batch_elapsed:>10.0f} keys/s   "
+          f"speedup: {single_elapsed / batch_elapsed:>6.1f}x"
+          + (f"   ⚠️  {mismatched} mismatched" if mismatched else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched Detective lookups')
+    parser.add_argument('--backend', choices=['sqlite', 'bigquery'], default='sqlite',
+                        help='Backend to measure (default: temporary SQLite database)')
+    parser.add_argument('--batch-sizes', type=str, default='1,10,100,1000',
+                        help='Comma-separated batch sizes (default: 1,10,100,1000)')
+    parser.add_argument('--users', type=int, default=5000,
+                        help='Synthetic users to seed for SQLite (default: 5000)')
+    parser.add_argument('--sessions-per-user', type=int, default=10,
+                        help='Synthetic sessions per user for SQLite (default: 10)')
+    args = parser.parse_args()
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+
+    if args.backend == 'sqlite':
+        db_path = os.path.join(tempfile.mkdtemp(prefix="bench_db_"), "bench.db")
+        print(f"🗄️  Seeding {args.users} users x {args.sessions_per_user} sessions into {db_path}")
+        backend = seed_sqlite(db_path, args.users, args.sessions_per_user)
+        user_ids = [f"user_{i}" for i in range(args.users)]
+        account_ids = [f"acc_{i}" for i in range(args.users)]
+        transaction_ids = [f"tx_{i}_{j}" for i in range(args.users) for j in range(args.sessions_per_user)]
+    else:
+        os.environ["DETECTIVE_STORAGE_BACKEND"] = "bigquery"
+        backend = get_storage_backend()
+        user_ids, account_ids, transaction_ids = sample_bigquery_keys(backend, max(batch_sizes))
+
+    set_storage_backend(backend)
+    for keys in (user_ids, account_ids, transaction_ids):
+        random.shuffle(keys)
+
+    print(f"\n📊 Backend: {backend.name}")
+    for batch_size in batch_sizes:
+        measure("profiles", get_user_history, get_user_history_batch, user_ids, batch_size)
+        measure("beneficiary", get_beneficiary_risk, get_beneficiary_risk_batch, account_ids, batch_size)
+        measure("sessions", get_session_context, get_session_context_batch, transaction_ids, batch_size)
+
+
+if __name__ == "__main__":
+    main()
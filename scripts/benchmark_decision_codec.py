@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark Avro encoding of investigations and judgments against JSON.
+
+For --rows synthetic InvestigationReports (filled session maps, flags and
+reasoning text, as the Detective produces them) and their PolicyEngine
+judgments, this compares:
+
+- size: model_dump_json() bytes vs schemaless Avro bytes, plus a deflate
+  Avro container file vs gzipped JSONL for the whole batch
+- encode: model_dump_json() vs encode_investigation / encode_judgment
+- decode: model_validate_json() vs decode_investigation / decode_judgment
+
+Before timing, every report and judgment must round-trip unchanged through
+the binary codec and through a container file.
+
+Examples:
+    python scripts/benchmark_decision_codec.py
+    python scripts/benchmark_decision_codec.py --rows 100000 --repeat 5
+"""
+import argparse
+import gzip
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.decision_codec import (
+    decode_investigation, decode_judgment, encode_investigation, encode_judgment, read_container, write_container,
+)
+from config.models import (
+    BeneficiaryRisk, InvestigationReport, JudgmentDecision, Recommendation, RiskLevel, SessionContext, UserProfile,
+)
+from config.policy_engine import PolicyEngine
+
+REASONS = [
+    "Established beneficiary and typical amount for this long-tenured customer.",
+    "Active voice call during the transfer to a beneficiary created hours ago.",
+    "Beneficiary linked to a flagged device and shows heavy fan-in from new senders.",
+    "Session was rushed and the device is rooted, but the beneficiary is well established.",
+]
+
+
+def synthetic_reports(rows: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    reports = []
+    for i in range(rows):
+        score = rng.randint(0, 100)
+        level = RiskLevel.CRITICAL if score >= 85 else RiskLevel.HIGH if score >= 60 else \
+            RiskLevel.MEDIUM if score >= 30 else RiskLevel.LOW
+        call = rng.random() < 0.05
+        reports.append(InvestigationReport(
+            transaction_id=f"txn_{i:08d}",
+            user_profile=UserProfile(
+                user_id=f"user_{rng.randint(0, 999_999):06d}", age_group=rng.choice(["18-25", "26-40", "41-65", "65+"]),
+                account_tenure_days=rng.randint(0, 5000), avg_transfer_amount=round(rng.uniform(50, 5000), 2),
+                behavioral_segment=rng.choice(["saver", "spender", "business", "retiree"]),
+                previous_violations=rng.choice([0, 0, 0, 1, 2]),
+            ),
+            beneficiary_analysis=BeneficiaryRisk(
+                account_id=f"acc_{rng.randint(0, 999_999):06d}", account_age_hours=round(rng.uniform(0.5, 20000), 1),
+                risk_score=rng.randint(0, 100), linked_to_flagged_device=rng.random() < 0.02,
+            ),
+            session_analysis=SessionContext(
+                transaction_id=f"txn_{i:08d}", user_id=f"user_{i}", session_id=f"sess_{i:08d}", is_call_active=call,
+                behavioral_metrics={"typing_cadence": round(rng.uniform(0.2, 1.0), 3),
+                                    "session_duration_sec": rng.randint(10, 900), "rushed": rng.random() < 0.1},
+                device_context={"battery_level": rng.randint(1, 100), "is_rooted": rng.random() < 0.03,
+                                "os_risk": rng.choice(["LOW", "HIGH"])},
+                risk_signals={"velocity_last_hour": rng.randint(0, 6), "time_of_day_risk": rng.choice(["LOW", "HIGH"]),
+                              "geolocation_distance_km": round(rng.uniform(0, 800), 1),
+                              "geolocation_anomalous": rng.random() < 0.03,
+                              **({"recent_countries": rng.sample(["US", "GB", "NG", "RO", "PH"], 2)}
+                                 if rng.random() < 0.05 else {})},
+            ),
+            risk_score=score,
+            risk_level=level,
+            reasoning=rng.choice(REASONS),
+            recommendation=Recommendation.BLOCK if score >= 85 else Recommendation.HOLD_FOR_REVIEW
+            if score >= 30 else Recommendation.APPROVE,
+            security_flags={"active_voice_call": call, "new_beneficiary": rng.random() < 0.1},
+        ))
+    return reports
+
+
+def verify(reports: list, judgments: list) -> None:
+    """Binary and container round trips must return equal models."""
+    for report, judgment in zip(reports, judgments):
+        assert decode_investigation(encode_investigation(report)) == report, report.transaction_id
+        assert decode_judgment(encode_judgment(judgment)) == judgment, judgment.transaction_id
+    for models in (reports, judgments):
+        container = io.BytesIO()
+        write_container(container, models)
+        container.seek(0)
+        assert list(read_container(container)) == models, "container round trip differs"
+    print(f"✅ {len(reports):,} investigations and judgments round-trip through Avro")
+
+
+def best_of(fn, items: list, repeat: int) -> float:
+    """Best-of-`repeat` seconds per item."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            fn(item)
+        timings.append(time.perf_counter() - started)
+    return min(timings) / len(items)
+
+
+def compare(label: str, models: list, model_cls, encode, decode, repeat: int) -> None:
+    json_payloads = [model.model_dump_json().encode() for model in models]
+    avro_payloads = [encode(model) for model in models]
+    json_bytes = sum(map(len, json_payloads))
+    avro_bytes = sum(map(len, avro_payloads))
+    jsonl_gz = len(gzip.compress(b"\n".join(json_payloads)))
+    container = io.BytesIO()
+    write_container(container, models)
+
+    print(f"\n📦 {label} ({len(models):,}):")
+    print(f"   size/message     JSON {json_bytes / len(models):8.1f} B   Avro {avro_bytes / len(models):8.1f} B   "
+          f"({json_bytes / avro_bytes:.1f}x smaller)")
+    print(f"   batch file       JSONL.gz {jsonl_gz / 1e6:7.2f} MB   Avro deflate {container.tell() / 1e6:7.2f} MB")
+
+    encode_json = best_of(lambda m: m.model_dump_json(), models, repeat)
+    encode_avro = best_of(encode, models, repeat)
+    decode_json = best_of(model_cls.model_validate_json, json_payloads, repeat)
+    decode_avro = best_of(decode, avro_payloads, repeat)
+    print(f"   encode           JSON {encode_json * 1e6:8.2f} µs  Avro {encode_avro * 1e6:8.2f} µs   "
+          f"({1 / encode_avro:,.0f} msg/s)")
+    print(f"   decode+validate  JSON {decode_json * 1e6:8.2f} µs  Avro {decode_avro * 1e6:8.2f} µs   "
+          f"({1 / decode_avro:,.0f} msg/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Avro vs JSON for investigations and judgments')
+    parser.add_argument('--rows', type=int, default=20_000, help='Synthetic investigations (default: 20,000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions, best is kept (default: 3)')
+    args = parser.parse_args()
+
+    reports = synthetic_reports(args.rows)
+    engine = PolicyEngine()
+    judgments = [engine.make_decision(report) for report in reports]
+    verify(reports, judgments)
+
+    compare("InvestigationReport", reports, InvestigationReport, encode_investigation, decode_investigation,
+            args.repeat)
+    compare("JudgmentDecision", judgments, JudgmentDecision, encode_judgment, decode_judgment, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark the learned first-stage scorer on synthetic alert history.
+
+Generates --rows {"alert", "features", "investigation", "judgment"} records
+where most high-value alerts are benign. It trains a model (or loads --model), then
+reports:
+
+- holdout AUC, bypass rate and bypassed alerts that were not SAFE
+- LLM calls avoided (3 per bypassed alert: Detective, Judge, Enforcer)
+- feature building and scalar scoring in µs per alert, and score_batch
+  throughput
+
+Before timing, score() and score_batch() must agree on every row.
+--write-log saves the synthetic records in the LEARNED_SCORER_TRAINING_LOG
+format, so scripts/train_learned_scorer.py can be tried end to end.
+
+Examples:
+    python scripts/benchmark_learned_scorer.py
+    python scripts/benchmark_learned_scorer.py --rows 500000 --batch 1000000
+    python scripts/benchmark_learned_scorer.py --write-log /tmp/decisions.jsonl --rows 20000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from agents.tools.learned_scorer import (
+    DEFAULT_TARGET_PRECISION, FEATURES, LearnedScorer, alert_features, auc, choose_threshold, fit_logistic,
+    training_example,
+)
+
+LLM_CALLS_PER_ALERT = 3
+
+
+def synthetic_records(rows: int, seed: int = 7) -> list:
+    """Alert history: ~90% SAFE, risk concentrated in new/risky beneficiaries and repeat offenders."""
+    rng = np.random.default_rng(seed)
+    mule = rng.random(rows) < 0.05
+    amount = np.round(1000 + rng.lognormal(7.0, 1.0, rows), 2)
+    average = rng.lognormal(6.5, 0.8, rows)
+    tenure = rng.integers(1, 4000, rows)
+    violations = rng.choice([0, 0, 0, 0, 0, 0, 0, 0, 1, 3], rows)
+    age = np.where(rng.random(rows) < 0.12, rng.uniform(1, 48, rows), rng.uniform(48, 20000, rows))
+    risk = np.clip(rng.normal(20, 15, rows) + mule * 45, 0, 100).astype(int)
+    linked = rng.random(rows) < 0.02 + mule * 0.3
+    missing_profile = rng.random(rows) < 0.02
+    missing_beneficiary = rng.random(rows) < 0.03
+    hour = rng.integers(0, 24, rows)
+
+    logit = (-5.0 + 3.5 * (age < 24) + 0.06 * (risk - 20) + 3.0 * linked + 1.5 * violations
+             + 0.8 * np.log(amount / average) + 1.5 * mule + 0.7 * (hour < 6) - 0.0008 * tenure
+             + 4.0 * missing_profile + 3.5 * missing_beneficiary)
+    risky = rng.random(rows) < 1 / (1 + np.exp(-logit))
+
+    records = []
+    for i in range(rows):
+        txn = f"txn_{i}"
+        profile = ({"user_id": f"user_{i}", "status": "not_found"} if missing_profile[i] else {
+            "user_id": f"user_{i}", "account_tenure_days": int(tenure[i]),
+            "avg_transfer_amount": round(float(average[i]), 2), "previous_violations": int(violations[i]),
+        })
+        beneficiary = ({"account_id": f"acc_{i}", "status": "unknown_account", "risk_score": 50}
+                       if missing_beneficiary[i] else {
+            "account_id": f"acc_{i}", "account_age_hours": round(float(age[i]), 1),
+            "risk_score": int(risk[i]), "linked_to_flagged_device": bool(linked[i]),
+        })
+        alert = {
+            "alert_id": f"alert_{i}", "transaction_id": txn, "user_id": f"user_{i}",
+            "amount": float(amount[i]), "beneficiary_account": f"acc_{i}",
+            "investigation_type": "mule_fan_in" if mule[i] else "high_value_transaction",
+            "priority": "HIGH", "event_time": int(1_760_000_000_000 + i * 60_000 + hour[i] * 3_600_000),
+        }
+        records.append({
+            "alert": alert,
+            # What the swarm logs: the vector scored from the stores on arrival
+            "features": dict(zip(FEATURES, alert_features(alert, profile, beneficiary))),
+            "investigation": {"transaction_id": txn, "user_profile": profile, "beneficiary_analysis": beneficiary},
+            "judgment": {"transaction_id": txn,
+                         "decision": ("BLOCK" if rng.random() < 0.6 else "ESCALATE_TO_HUMAN") if risky[i] else "SAFE"},
+        })
+    return records
+
+
+def verify(scorer: LearnedScorer, X: np.ndarray) -> None:
+    """score() and score_batch() must agree on every row."""
+    batch = scorer.score_batch(X)
+    scalar = np.array([scorer.score(row) for row in X.tolist()])
+    assert np.allclose(scalar, batch, rtol=1e-12, atol=1e-12), \
+        f"max |scalar - batch| = {np.max(np.abs(scalar - batch))}"
+    print(f"✅ score() and score_batch() agree on {len(X):,} alerts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the learned first-stage scorer')
+    parser.add_argument('--rows', type=int, default=100_000, help='Synthetic alerts (default: 100,000)')
+    parser.add_argument('--batch', type=int, default=1_000_000, help='Rows for score_batch throughput')
+    parser.add_argument('--model', help='Benchmark this model file instead of training one')
+    parser.add_argument('--target-precision', type=float, default=DEFAULT_TARGET_PRECISION,
+                        help=f'SAFE precision for the threshold (default: {DEFAULT_TARGET_PRECISION})')
+    parser.add_argument('--write-log', help='Also write the synthetic records as training JSONL')
+    args = parser.parse_args()
+
+    records = synthetic_records(args.rows)
+    if args.write_log:
+        with open(args.write_log, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"📝 Wrote {len(records):,} records to {args.write_log}")
+
+    examples = [training_example(record) for record in records]
+    started = time.perf_counter()
+    for record in records:
+        investigation = record["investigation"]
+        alert_features(record["alert"], investigation["user_profile"], investigation["beneficiary_analysis"])
+    features_seconds = time.perf_counter() - started
+    X = np.array([features for features, _ in examples], dtype=np.float64)
+    y = np.array([safe for _, safe in examples], dtype=bool)
+    print(f"📥 {len(y):,} synthetic alerts, {y.mean():.1%} SAFE")
+
+    test = np.arange(len(y)) % 5 == 0
+    if args.model:
+        scorer = LearnedScorer.load(args.model)
+        print(f"📦 Loaded model {scorer.model_version} (threshold {scorer.threshold:.4f})")
+    else:
+        started = time.perf_counter()
+        fit = fit_logistic(X[~test], y[~test])
+        fit_seconds = time.perf_counter() - started
+        probe = LearnedScorer(**fit, threshold=1.0, model_version="benchmark")
+        threshold = choose_threshold(probe.score_batch(X[test]), y[test], args.target_precision)
+        if threshold is None:
+            print(f"❌ No threshold reaches SAFE precision {args.target_precision}")
+            sys.exit(1)
+        scorer = LearnedScorer(**fit, threshold=threshold, model_version="benchmark")
+        print(f"🏋️  Trained on {(~test).sum():,} alerts in {fit_seconds:.2f}s, threshold {threshold:.4f}")
+
+    verify(scorer, X[test])
+    p = scorer.score_batch(X[test])
+    bypass = p >= scorer.threshold
+    print(f"\n📊 Holdout ({test.sum():,} alerts): AUC {auc(p, y[test]):.4f}")
+    print(f"✂️  Bypassed {bypass.sum():,} ({bypass.mean():.1%}), not SAFE among them: "
+          f"{(bypass & ~y[test]).sum():,} (precision {y[test][bypass].mean() if bypass.any() else float('nan'):.4f})")
+    print(f"   SAFE alerts caught: {(bypass & y[test]).sum() / max(y[test].sum(), 1):.1%}; "
+          f"LLM calls avoided: {bypass.sum() * LLM_CALLS_PER_ALERT:,} of {test.sum() * LLM_CALLS_PER_ALERT:,}")
+
+    rows = X.tolist()
+    started = time.perf_counter()
+    for row in rows:
+        scorer.score(row)
+    scalar_seconds = time.perf_counter() - started
+    big = X[np.arange(args.batch) % len(X)]
+    started = time.perf_counter()
+    scorer.score_batch(big)
+    batch_seconds = time.perf_counter() - started
+    print(f"\n⚡ alert_features: {features_seconds / len(records) * 1e6:,.2f} µs/alert")
+    print(f"⚡ score (scalar): {scalar_seconds / len(rows) * 1e6:,.2f} µs/alert")
+    print(f"⚡ score_batch: {args.batch / batch_seconds / 1e6:,.1f}M alerts/s ({len(FEATURES)} features)")
+
+
+if __name__ == "__main__":
+    main()
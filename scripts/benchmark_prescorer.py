@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Replay investigations through the deterministic pre-scorer and report how
+much Detective LLM traffic it removes.
+
+Input is either a replay log written by the router (PRESCORE_REPLAY_LOG,
+one {"threat", "context", "investigation"} record per line) or, without
+--input, a synthetic mix of traffic scenarios (normal transfers, new
+payees, scam calls, mule accounts, account takeovers, incomplete tool
+data).
+
+For every record the scalar prescore() and the vectorized prescore_batch()
+must agree on flags, score, level and verdict. The report lists the LOW /
+CRITICAL / gray split (LLM calls skipped = LOW + CRITICAL), per scenario
+for synthetic input, and for replays with LLM-produced investigations
+(e.g. recorded with the default DETECTIVE_PRESCORE=shadow) how often the LLM's risk
+level matched the pre-score on the cases that would have been skipped.
+
+Examples:
+    python scripts/benchmark_prescorer.py
+    python scripts/benchmark_prescorer.py --synthetic 200000 --seed 3
+    PRESCORE_REPLAY_LOG=replay.jsonl DETECTIVE_PRESCORE=shadow python scripts/run_adk_swarm.py
+    python scripts/benchmark_prescorer.py --input replay.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from agents.tools.risk_prescorer import (
+    SECURITY_FLAGS, VERDICT_NAMES, build_investigation, extract_signals, prescore_batch, prescore_signals,
+    signals_to_columns,
+)
+from config.risk_features import RISK_LEVEL_NAMES
+
+# Synthetic traffic mix (scenario -> share)
+SCENARIOS = {
+    "normal": 0.70, "new_payee": 0.08, "scam_call": 0.07,
+    "mule": 0.05, "takeover": 0.05, "incomplete": 0.05,
+}
+
+
+def synthetic_record(rng: random.Random, index: int, scenario: str) -> dict:
+    """Tool results shaped like gather_context_async() output for one scenario."""
+    night = scenario == "takeover" or rng.random() < 0.05
+    call = scenario == "scam_call" or rng.random() < 0.01
+    age = {
+        "new_payee": rng.uniform(2, 160),
+        "scam_call": rng.uniform(1, 23) if rng.random() < 0.7 else rng.uniform(24, 120),
+        "mule": rng.uniform(24, 2000),
+    }.get(scenario, rng.uniform(200, 20000))
+    duration = rng.randint(15, 55) if scenario in ("takeover", "scam_call") else rng.randint(70, 400)
+    z = lambda: round(rng.gauss(0, 1.2), 2)  # noqa: E731
+    user = {
+        "user_id": f"user_{index}", "account_tenure_days": rng.randint(30, 4000), "previous_violations": 0,
+        "transfer_baseline": {"amount_z": z()},
+    }
+    beneficiary = {
+        "account_id": f"acc_{index}", "account_age_hours": round(age, 1),
+        "risk_score": rng.randint(50, 95) if scenario == "mule" else rng.randint(0, 35),
+        "linked_to_flagged_device": scenario == "mule" and rng.random() < 0.3,
+        "network": {"flagged": False, "hops_to_flagged": rng.choice([1, 2]) if scenario == "mule" else None},
+        "fan_in": {"distinct_senders_1h": rng.randint(8, 30) if scenario == "mule" else rng.randint(0, 2),
+                   "alert_threshold": 5},
+    }
+    session = {
+        "transaction_id": f"txn_{index}", "user_id": f"user_{index}", "session_id": f"sess_{index}",
+        "is_call_active": call,
+        "behavioral_metrics": {"typing_cadence": 0.9, "session_duration_sec": duration},
+        "device_context": {"is_rooted": rng.random() < (0.4 if scenario == "takeover" else 0.02)},
+        "risk_signals": {
+            "velocity_last_hour": rng.randint(4, 9) if scenario == "takeover" else rng.randint(0, 2),
+            "time_of_day_risk": "HIGH" if night else "LOW",
+            "geolocation_distance_km": rng.uniform(100, 900) if rng.random() < 0.03 else rng.uniform(0, 20),
+        },
+        "baseline_deviations": {"hour_z": z(), "typing_cadence_z": z(), "duration_z": z()},
+    }
+    if scenario == "incomplete":
+        broken = rng.choice(["user", "beneficiary", "session"])
+        if broken == "user":
+            user = {"user_id": user["user_id"], "status": "not_found", "risk": "unknown"}
+        elif broken == "beneficiary":
+            beneficiary = {"account_id": beneficiary["account_id"], "status": "unknown_account", "risk_score": 50}
+        else:
+            session = {"transaction_id": session["transaction_id"], "status": "no_session_found"}
+    threat = {"transaction_id": f"txn_{index}", "prescreen": {
+        "known_bad_account": scenario == "mule" and rng.random() < 0.5, "known_bad_device": False,
+    }}
+    return {"scenario": scenario, "threat": threat,
+            "context": {"user_profile": user, "beneficiary": beneficiary, "session": session}}
+
+
+def synthetic_records(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    names, weights = zip(*SCENARIOS.items())
+    return [synthetic_record(rng, i, rng.choices(names, weights)[0]) for i in range(count)]
+
+
+def read_replay(path: str) -> list:
+    records = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("context"):
+                    records.append(record)
+    return records
+
+
+def verify(scores: list, batch: dict) -> None:
+    """Scalar and vectorized results must match row by row."""
+    for i, score in enumerate(scores):
+        actual = (int(batch["risk_score"][i]), RISK_LEVEL_NAMES[int(batch["risk_level"][i])],
+                  VERDICT_NAMES[int(batch["verdict"][i])], {f: bool(batch[f][i]) for f in SECURITY_FLAGS})
+        expected = (score.risk_score, score.risk_level, score.verdict,
+                    {f: bool(v) for f, v in score.security_flags.items()})
+        assert actual == expected, f"row {i}: batch {actual} != scalar {expected}"
+    print(f"✅ prescore_batch matches prescore on {len(scores):,} investigations")
+
+
+def verify_reports(records: list, scores: list) -> None:
+    """Every clear-cut pre-score must produce a valid InvestigationReport."""
+    built = 0
+    for record, score in zip(records, scores):
+        if score.clear_cut:
+            txn = (record.get("threat") or {}).get("transaction_id", "replay")
+            report = build_investigation(txn, record["context"], score)
+            assert report.risk_level.value == score.risk_level, f"{txn}: report level != pre-score"
+            built += 1
+    print(f"✅ build_investigation produced {built:,} valid reports for the skipped investigations")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay investigations through the risk pre-scorer')
+    parser.add_argument('--input', help='PRESCORE_REPLAY_LOG JSONL to replay (default: synthetic traffic)')
+    parser.add_argument('--synthetic', type=int, default=50_000, help='Synthetic investigations (default: 50,000)')
+    parser.add_argument('--seed', type=int, default=42, help='Synthetic traffic seed (default: 42)')
+    args = parser.parse_args()
+
+    records = read_replay(args.input) if args.input else synthetic_records(args.synthetic, args.seed)
+    if not records:
+        print("❌ No records with tool context to replay")
+        sys.exit(1)
+    print(f"📼 Replaying {len(records):,} investigations from {args.input or 'synthetic traffic'}")
+
+    started = time.perf_counter()
+    rows = [extract_signals(r["context"], r.get("threat")) for r in records]
+    extract_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    scores = [prescore_signals(row) for row in rows]
+    scalar_seconds = time.perf_counter() - started
+    columns = signals_to_columns(rows)
+    started = time.perf_counter()
+    batch = prescore_batch(columns)
+    batch_seconds = time.perf_counter() - started
+    verify(scores, batch)
+    verify_reports(records, scores)
+
+    verdicts = Counter(score.verdict or "GRAY" for score in scores)
+    skipped = verdicts["LOW"] + verdicts["CRITICAL"]
+    print(f"\n🧮 Verdicts: LOW {verdicts['LOW']:,}, CRITICAL {verdicts['CRITICAL']:,}, "
+          f"gray {verdicts['GRAY']:,}")
+    print(f"✂️  Detective LLM calls skipped: {skipped:,} / {len(scores):,} ({skipped / len(scores):.1%})")
+
+    if "scenario" in records[0]:
+        by_scenario = defaultdict(Counter)
+        for record, score in zip(records, scores):
+            by_scenario[record["scenario"]][score.verdict or "GRAY"] += 1
+        for scenario in SCENARIOS:
+            counts = by_scenario[scenario]
+            total = sum(counts.values()) or 1
+            print(f"   {scenario:<11} {total:>8,}  LOW {counts['LOW'] / total:6.1%}  "
+                  f"CRITICAL {counts['CRITICAL'] / total:6.1%}  gray {counts['GRAY'] / total:6.1%}")
+
+    llm_rows = [(record["investigation"], score) for record, score in zip(records, scores)
+                if (record.get("investigation") or {}).get("source") == "llm" and score.clear_cut]
+    if llm_rows:
+        agree = sum(inv["risk_level"] == score.verdict for inv, score in llm_rows)
+        print(f"🤝 LLM agreed with the pre-score level on {agree:,} / {len(llm_rows):,} "
+              f"would-be-skipped investigations ({agree / len(llm_rows):.1%})")
+
+    print(f"\n⚡ extract_signals: {extract_seconds / len(rows) * 1e6:,.2f} µs/investigation")
+    print(f"⚡ prescore (scalar): {scalar_seconds / len(rows) * 1e6:,.2f} µs/investigation")
+    print(f"⚡ prescore_batch: {len(rows) / batch_seconds / 1e6:,.1f}M investigations/s")
+    levels = np.bincount(batch["risk_level"], minlength=4)
+    print("   levels: " + ", ".join(f"{RISK_LEVEL_NAMES[i]} {levels[i]:,}" for i in range(4)))
+
+
+if __name__ == "__main__":
+    main()
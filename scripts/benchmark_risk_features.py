@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark RiskFeatures against the pydantic InvestigationReport decision path.
+
+For --rows synthetic investigations (same generator as
+benchmark_policy_engine.py) this measures, with tracemalloc:
+
+- building the record: InvestigationReport.model_validate() from the
+  nested dict the Detective emits vs RiskFeatures.from_mapping() from a flat
+  row (retained bytes per record, and time)
+- deciding: PolicyEngine.evaluate() on reports vs evaluate_features() on
+  records (time and peak transient bytes)
+
+Before timing, every row must get the same policy from evaluate(),
+evaluate_features() and evaluate_batch() over to_columns().
+
+Examples:
+    python scripts/benchmark_risk_features.py
+    python scripts/benchmark_risk_features.py --rows 200000 --repeat 5
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from benchmark_policy_engine import synthetic_columns, to_reports
+from config.models import InvestigationReport
+from config.policy_engine import PolicyEngine
+from config.risk_features import RiskFeatures, to_columns
+
+
+def flat_rows(columns: dict, rows: int) -> list:
+    """Flat dicts (as from a cache or export) for the first `rows` rows."""
+    out = []
+    for i in range(rows):
+        age = columns["account_age_hours"][i]
+        tenure = columns["account_tenure_days"][i]
+        out.append({
+            "transaction_id": f"txn_{i}",
+            "user_id": f"user_{i}",
+            "risk_score": int(columns["risk_score"][i]),
+            "risk_level": str(columns["risk_level"][i]),
+            "active_voice_call": bool(columns["active_voice_call"][i]),
+            "previous_violations": int(columns["previous_violations"][i]),
+            "account_age_hours": None if np.isnan(age) else float(age),
+            "account_tenure_days": None if np.isnan(tenure) else int(tenure),
+        })
+    return out
+
+
+def measure(label: str, fn, items: list, repeat: int, keep: bool = False) -> float:
+    """Best-of-`repeat` seconds per item; also prints tracemalloc bytes per item.
+
+    With `keep` the results are held (retained bytes per record), otherwise
+    they are dropped (peak transient bytes over the whole run).
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [fn(item) for item in items]
+        timings.append(time.perf_counter() - started)
+        del results
+
+    tracemalloc.start()
+    if keep:
+        results = [fn(item) for item in items]
+        memory = f"{tracemalloc.get_traced_memory()[0] / len(items):,.0f} B retained/record"
+        del results
+    else:
+        for item in items:
+            fn(item)
+        memory = f"{tracemalloc.get_traced_memory()[1]:,} B peak transient"
+    tracemalloc.stop()
+    per_item = min(timings) / len(items)
+    print(f"   {label:<44} {per_item * 1e6:8.2f} µs   {memory}")
+    return per_item
+
+
+def verify(engine: PolicyEngine, reports: list, features: list) -> None:
+    """All decision paths must pick the same policy for every row."""
+    batch = engine.evaluate_batch(to_columns(features))
+    for i, (report, record) in enumerate(zip(reports, features)):
+        assert RiskFeatures.from_report(report) == record, f"row {i}: from_report != from_mapping"
+        expected = engine.evaluate(report)
+        expected_id = int(expected.priority) if expected else 0
+        policy = engine.evaluate_features(record)
+        actual_id = int(policy.priority) if policy else 0
+        assert actual_id == expected_id, f"row {i}: evaluate_features policy {actual_id} != {expected_id}"
+        assert int(batch.policy_ids[i]) == expected_id, f"row {i}: evaluate_batch != {expected_id}"
+    print(f"✅ All decision paths agree on {len(reports):,} investigations")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark RiskFeatures vs pydantic decisions')
+    parser.add_argument('--rows', type=int, default=50_000, help='Synthetic investigations (default: 50,000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions, best is kept (default: 3)')
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.rows, seed=5)
+    reports = to_reports(columns, args.rows)
+    payloads = [report.model_dump(mode="json") for report in reports]
+    rows = flat_rows(columns, args.rows)
+    features = [RiskFeatures.from_mapping(row) for row in rows]
+
+    engine = PolicyEngine()
+    verify(engine, reports, features)
+
+    print(f"\n🧱 Building records ({args.rows:,}):")
+    build_model = measure("InvestigationReport.model_validate(dict)", InvestigationReport.model_validate,
+                          payloads, args.repeat, keep=True)
+    measure("RiskFeatures.from_report(report)", RiskFeatures.from_report, reports, args.repeat, keep=True)
+    build_features = measure("RiskFeatures.from_mapping(row)", RiskFeatures.from_mapping,
+                             rows, args.repeat, keep=True)
+
+    print(f"\n⚖️  Deciding ({args.rows:,}):")
+    decide_model = measure("evaluate(report)", engine.evaluate, reports, args.repeat)
+    decide_features = measure("evaluate_features(features)", engine.evaluate_features, features, args.repeat)
+
+    print(f"\n📈 Build + decide: {(build_model + decide_model) * 1e6:,.2f} µs (pydantic) vs "
+          f"{(build_features + decide_features) * 1e6:,.2f} µs (RiskFeatures), "
+          f"{(build_model + decide_model) / (build_features + decide_features):,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
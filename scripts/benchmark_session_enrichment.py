@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark scalar vs vectorized session enrichment.
+
+Generates synthetic mobile_banking_sessions rows (with missing values mixed
+in) and a location-index assessment for them, checks that
+enrich_sessions_batch matches the scalar _enrich_session row for row, then
+reports rows/sec for:
+
+- scalar: one _enrich_session call per row
+- signals: compute_session_signals on object columns (None for missing)
+- typed: compute_session_signals on float64 columns (NaN for missing), as
+  produced by pandas / Arrow readers
+- batch: enrich_sessions_batch (column arrays + result dicts)
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from agents.tools.location_index import LocationIndex
+from agents.tools.session_enrichment import compute_session_signals, enrich_sessions_batch
+from agents.tools.session_tools import _enrich_session
+
+
+def make_columns(rows: int, seed: int = 42) -> dict:
+    """Synthetic session columns; ~5% of nullable values are missing."""
+    rng = np.random.default_rng(seed)
+
+    def _with_missing(values):
+        values = values.astype(object)
+        values[rng.random(rows) < 0.05] = None
+        return values
+
+    return {
+        "transaction_id": np.array([f"tx_{i}" for i in range(rows)], dtype=object),
+        "user_id": np.array([f"user_{i % 100000}" for i in range(rows)], dtype=object),
+        "session_id": np.array([f"sess_{i}" for i in range(rows)], dtype=object),
+        "is_call_active": _with_missing(rng.random(rows) < 0.1),
+        "typing_cadence_score": _with_missing(np.round(rng.uniform(0.1, 1.0, rows), 2)),
+        "session_duration_seconds": _with_missing(rng.integers(10, 300, rows)),
+        "battery_level": _with_missing(rng.integers(1, 100, rows)),
+        "is_rooted_jailbroken": _with_missing(rng.random(rows) < 0.05),
+        "geolocation_lat": _with_missing(rng.uniform(25.0, 50.0, rows)),
+        "geolocation_lon": rng.uniform(-120.0, -70.0, rows),
+        "event_time": 1.7e9 + rng.uniform(0, 86400 * 30, rows),
+        "time_of_day_hour": _with_missing(rng.integers(0, 24, rows)),
+        "velocity_count": rng.integers(1, 10, rows),
+    }
+
+
+def assess_locations(columns: dict, history_rows: int = 200_000) -> dict:
+    """Seed a location index with synthetic history and assess every row against it."""
+    rng = np.random.default_rng(7)
+    index = LocationIndex(capacity=200_000)
+    user_ids = columns["user_id"]
+    seed_users = user_ids[:history_rows]
+    index.observe_batch(
+        seed_users,
+        rng.uniform(40.0, 41.0, len(seed_users)),
+        rng.uniform(-75.0, -73.0, len(seed_users)),
+        np.full(len(seed_users), 1.6e9),
+    )
+    lat = np.where(np.equal(columns["geolocation_lat"], None), np.nan, columns["geolocation_lat"]).astype(np.float64)
+    return index.assess_batch(user_ids, lat, columns["geolocation_lon"], columns["event_time"])
+
+
+def scalar_enrich(columns: dict, location: dict) -> list:
+    names = list(columns.keys())
+    lists = [columns[name].tolist() for name in names]
+    distance = np.round(location["geolocation_distance_km"], 1).tolist()
+    speed = np.round(location["travel_speed_kmh"], 1).tolist()
+    impossible = location["impossible_travel"].tolist()
+    results = []
+    for i, values in enumerate(zip(*lists)):
+        row = dict(zip(names, values))
+        row_location = {
+            "geolocation_distance_km": distance[i],
+            "travel_speed_kmh": None if np.isnan(speed[i]) else speed[i],
+            "impossible_travel": impossible[i],
+        }
+        results.append(_enrich_session(row["transaction_id"], row, row["velocity_count"], row_location))
+    return results
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized session enrichment')
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help='Number of synthetic sessions (default: 1,000,000)')
+    args = parser.parse_args()
+
+    columns = make_columns(args.rows)
+    print(f"🧪 {args.rows:,} synthetic sessions\n")
+
+    location, location_elapsed = _timed(assess_locations, columns)
+    print(f"📍 Location assessment (assess_batch): {args.rows / location_elapsed:,.0f} rows/s\n")
+
+    scalar, scalar_elapsed = _timed(scalar_enrich, columns, location)
+    _, signals_elapsed = _timed(compute_session_signals, columns, location)
+    typed_columns = {
+        name: (np.where(np.equal(values, None), np.nan, values).astype(np.float64)
+               if name not in ("transaction_id", "user_id", "session_id", "event_time") else values)
+        for name, values in columns.items()
+    }
+    _, typed_elapsed = _timed(compute_session_signals, typed_columns, location)
+    batch, batch_elapsed = _timed(enrich_sessions_batch, columns, location)
+
+    mismatched = sum(1 for a, b in zip(scalar, batch) if a != b)
+    if mismatched:
+        print(f"❌ {mismatched:,} rows differ between scalar and batch enrichment")
+        sys.exit(1)
+    print("✅ Batch enrichment matches scalar enrichment for every row\n")
+
+    for label, elapsed in (("scalar", scalar_elapsed), ("signals", signals_elapsed),
+                           ("typed", typed_elapsed), ("batch", batch_elapsed)):
+        print(f"   {label:<8} {args.rows / elapsed:>14,.0f} rows/s   "
+              f"({elapsed:.2f}s, {scalar_elapsed / elapsed:.1f}x vs scalar)")
+
+
+if __name__ == "__main__":
+    main()
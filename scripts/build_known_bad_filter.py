@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Rebuild the known-bad Bloom filters used by the prescreen.
+
+Flagged beneficiary accounts come from beneficiary_graph (risk_score at or
+above --flag-risk-score, or linked_to_flagged_device) and from
+quarantined_transactions; flagged devices are the device fingerprints of
+quarantined transfers.
+
+The file is replaced atomically; workers remap it within a few seconds.
+Accounts blocked after the build are added to the live file by the
+workflow, and the next rebuild picks them up from quarantined_transactions.
+
+Examples:
+    python scripts/build_known_bad_filter.py
+    python scripts/build_known_bad_filter.py --fp-rate 0.0001 --interval 3600
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from agents.tools.known_bad_filter import (
+    DEFAULT_FALSE_POSITIVE_RATE, DEFAULT_HEADROOM, KnownBadFilter, default_filter_path,
+)
+
+load_dotenv()
+
+
+def known_bad_values(dataset: str, min_risk_score: int):
+    """{"account": [...], "device": [...]} from BigQuery."""
+    from agents.tools.bigquery_utils import get_client, run_query
+
+    client = get_client()
+    accounts, devices = [], []
+    query = f"""
+    SELECT DISTINCT account_id
+    FROM `{dataset}.beneficiary_graph`
+    WHERE risk_score >= {int(min_risk_score)} OR linked_to_flagged_device
+    """
+    for row in run_query(client, query, table="beneficiary_graph", source="known_bad_filter", page_size=100_000):
+        accounts.append(row["account_id"])
+
+    query = f"""
+    SELECT DISTINCT beneficiary_account_id, device_fingerprint
+    FROM `{dataset}.quarantined_transactions`
+    """
+    for row in run_query(client, query, table="quarantined_transactions", source="known_bad_filter",
+                         page_size=100_000):
+        if row["beneficiary_account_id"]:
+            accounts.append(row["beneficiary_account_id"])
+        if row["device_fingerprint"]:
+            devices.append(row["device_fingerprint"])
+    return {"account": accounts, "device": devices}
+
+
+def build_once(args, path: str) -> None:
+    started = time.perf_counter()
+    values = known_bad_values(args.dataset, args.flag_risk_score)
+    print(f"   📥 {len(values['account']):,} accounts, {len(values['device']):,} devices "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    stats = KnownBadFilter.write(path, values, false_positive_rate=args.fp_rate, headroom=args.headroom)
+    for kind, kind_stats in stats.items():
+        print(f"   🧮 {kind}: {kind_stats['items']:,} items, {kind_stats['num_bits'] / 8 / 1024:,.0f} KB, "
+              f"{kind_stats['num_hashes']} hashes")
+    print(f"   ✅ Saved in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the StreamGuard known-bad Bloom filters')
+    parser.add_argument('--dataset', type=str, default=os.getenv("BIGQUERY_DATASET", "streamguard_threats"),
+                        help='BigQuery dataset (default: BIGQUERY_DATASET or streamguard_threats)')
+    parser.add_argument('--flag-risk-score', type=int, default=80,
+                        help='Beneficiaries at or above this risk_score are flagged (default: 80)')
+    parser.add_argument('--fp-rate', type=float, default=DEFAULT_FALSE_POSITIVE_RATE,
+                        help=f'Target false-positive rate at capacity (default: {DEFAULT_FALSE_POSITIVE_RATE})')
+    parser.add_argument('--headroom', type=float, default=DEFAULT_HEADROOM,
+                        help=f'Capacity as a multiple of the flagged count, for blocks added '
+                             f'between rebuilds (default: {DEFAULT_HEADROOM})')
+    parser.add_argument('--path', type=str, default=None,
+                        help='Filter path (default: KNOWN_BAD_FILTER_PATH or <FEATURE_STORE_DIR>/known_bad.bloom)')
+    parser.add_argument('--interval', type=float, default=0,
+                        help='Rebuild every N seconds (default: build once and exit)')
+    args = parser.parse_args()
+
+    path = args.path or default_filter_path()
+
+    while True:
+        print(f"🔨 Building known-bad filters -> {path}")
+        try:
+            build_once(args, path)
+        except Exception as e:
+            print(f"   ❌ Build failed: {e}")
+            if not args.interval:
+                sys.exit(1)
+
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Compare bytes scanned by the Detective session lookups on a flat vs a
+partitioned/clustered mobile_banking_sessions table.
+
+Two modes:
+
+--estimate (default, no cloud access)
+    Models BigQuery's columnar billing: a query is charged for the referenced
+    columns of every partition/block it reads, with a 10 MB minimum per table.
+
+--live
+    Builds synthetic flat and partitioned/clustered tables in a scratch
+    dataset with CREATE TABLE AS SELECT, then runs the real lookup queries
+    (cache disabled) and reports total_bytes_processed / billed. This creates
+    and scans real tables: 100M rows is roughly 10 GB of storage per table.
+
+Examples:
+    python scripts/compare_session_layouts.py
+    python scripts/compare_session_layouts.py --rows 10000000,100000000 --retention-days 90
+    python scripts/compare_session_layouts.py --live --dataset streamguard_scratch --rows 10000000
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from agents.tools.storage_backends import SESSION_FIELDS, DEFAULT_SESSION_LOOKBACK_DAYS
+
+load_dotenv()
+
+MB = 1024 ** 2
+GB = 1024 ** 3
+
+# BigQuery logical sizes: STRING is 2 bytes + UTF-8 length, BOOL 1 byte,
+# INT64/FLOAT64/TIMESTAMP 8 bytes. String lengths match the synthetic data.
+COLUMN_BYTES = {
+    "session_id": 2 + 20, "user_id": 2 + 12, "transaction_id": 2 + 16,
+    "event_type": 2 + 6, "is_call_active": 1, "typing_cadence_score": 8,
+    "session_duration_seconds": 8, "battery_level": 8, "app_version": 2 + 5,
+    "os_version": 2 + 10, "is_rooted_jailbroken": 1, "geolocation_lat": 8,
+    "geolocation_lon": 8, "geolocation_accuracy_meters": 8, "time_of_day_hour": 8,
+    "event_time": 8,
+}
+MIN_BILLED_BYTES = 10 * MB
+
+SESSION_LOOKUP_COLUMNS = sorted(set(SESSION_FIELDS) | {"transaction_id"})
+VELOCITY_COLUMNS = ["user_id", "event_time"]
+
+
+def _bytes_per_row(columns):
+    return sum(COLUMN_BYTES[name] for name in columns)
+
+
+def estimate(rows: int, retention_days: int, lookback_days: int, block_mb: float) -> dict:
+    """Estimate bytes billed for the session and velocity lookups.
+
+    Assumes rows are spread evenly over `retention_days` daily partitions.
+    Clustering on transaction_id narrows a session lookup to about one block
+    per partition; velocity filters on user_id, the second clustering column,
+    so it is only pruned to the one partition covering the hour window.
+    """
+    rows_per_partition = rows / retention_days
+    session_row_bytes = _bytes_per_row(SESSION_LOOKUP_COLUMNS)
+    velocity_row_bytes = _bytes_per_row(VELOCITY_COLUMNS)
+    block_bytes = block_mb * MB
+
+    partitions_scanned = min(lookback_days + 1, retention_days)
+    session_partitioned = partitions_scanned * min(rows_per_partition * session_row_bytes, block_bytes)
+
+    return {
+        "session_flat": max(rows * session_row_bytes, MIN_BILLED_BYTES),
+        "session_partitioned": max(session_partitioned, MIN_BILLED_BYTES),
+        "velocity_flat": max(rows * velocity_row_bytes, MIN_BILLED_BYTES),
+        "velocity_partitioned": max(rows_per_partition * velocity_row_bytes, MIN_BILLED_BYTES),
+    }
+
+
+def _format_bytes(value: float) -> str:
+    return f"{value / GB:.2f} GB" if value >= GB else f"{value / MB:.1f} MB"
+
+
+def run_estimate(row_counts, args):
+    print(f"📐 Estimated bytes billed per lookup "
+          f"(retention {args.retention_days} days, lookback {args.lookback_days} days, "
+          f"~{args.block_mb:.0f} MB clustered blocks)\n")
+    print(f"{'rows':>12}  {'lookup':<10} {'flat':>12} {'partitioned':>14} {'reduction':>10}")
+    for rows in row_counts:
+        result = estimate(rows, args.retention_days, args.lookback_days, args.block_mb)
+        for lookup in ("session", "velocity"):
+            flat = result[f"{lookup}_flat"]
+            partitioned = result[f"{lookup}_partitioned"]
+            print(f"{rows:>12,}  {lookup:<10} {_format_bytes(flat):>12} "
+                  f"{_format_bytes(partitioned):>14} {flat / partitioned:>9.0f}x")
+
+
+def _create_synthetic_tables(client, dataset: str, rows: int, retention_days: int):
+    """Create flat and partitioned/clustered tables with `rows` synthetic sessions."""
+    outer = max(rows // 10000, 1)
+    select = f"""
+    SELECT
+      CONCAT('sess_', CAST(id AS STRING)) AS session_id,
+      CONCAT('user_', CAST(MOD(id, 1000000) AS STRING)) AS user_id,
+      CONCAT('tx_', CAST(id AS STRING)) AS transaction_id,
+      'SUBMIT' AS event_type,
+      MOD(id, 10) = 0 AS is_call_active,
+      RAND() AS typing_cadence_score,
+      CAST(20 + RAND() * 280 AS INT64) AS session_duration_seconds,
+      CAST(RAND() * 100 AS INT64) AS battery_level,
+      '2.4.1' AS app_version,
+      'iOS 17.2' AS os_version,
+      FALSE AS is_rooted_jailbroken,
+      40.7 + RAND() AS geolocation_lat,
+      -74.0 + RAND() AS geolocation_lon,
+      10.0 AS geolocation_accuracy_meters,
+      CAST(RAND() * 24 AS INT64) AS time_of_day_hour,
+      TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL CAST(RAND() * {retention_days * 86400} AS INT64) SECOND) AS event_time
+    FROM UNNEST(GENERATE_ARRAY(0, {outer - 1})) AS a, UNNEST(GENERATE_ARRAY(0, 9999)) AS b,
+    UNNEST([a * 10000 + b]) AS id
+    """
+    flat = f"{dataset}.sessions_flat_{rows}"
+    layout = f"{dataset}.sessions_layout_{rows}"
+    print(f"   Creating {flat} ...")
+    client.query(f"CREATE OR REPLACE TABLE `{flat}` AS {select}").result()
+    print(f"   Creating {layout} ...")
+    client.query(
+        f"CREATE OR REPLACE TABLE `{layout}` "
+        f"PARTITION BY DATE(event_time) CLUSTER BY transaction_id, user_id "
+        f"AS SELECT * FROM `{flat}`"
+    ).result()
+    return flat, layout
+
+
+def run_live(row_counts, args):
+    from google.cloud import bigquery
+    from agents.tools.bigquery_utils import get_client
+
+    client = get_client()
+    print(f"🔬 Live comparison in dataset {args.dataset}\n")
+
+    for rows in row_counts:
+        flat, layout = _create_synthetic_tables(client, args.dataset, rows, args.retention_days)
+        sample = next(iter(client.query(
+            f"SELECT transaction_id, user_id, event_time FROM `{flat}` "
+            f"WHERE event_time >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 1 DAY) LIMIT 1"
+        ).result()))
+
+        for table, bounded in ((flat, False), (layout, True)):
+            lookback = (
+                "AND event_time >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @lookback_days DAY)"
+                if bounded else ""
+            )
+            queries = {
+                "session": f"SELECT {', '.join(SESSION_FIELDS)} FROM `{table}` "
+                           f"WHERE transaction_id = @transaction_id {lookback} LIMIT 1",
+                "velocity": f"SELECT COUNT(*) FROM `{table}` WHERE user_id = @user_id "
+                            f"AND event_time BETWEEN TIMESTAMP_SUB(@event_time, INTERVAL 3600 SECOND) AND @event_time",
+            }
+            for lookup, query in queries.items():
+                job_config = bigquery.QueryJobConfig(
+                    use_query_cache=False,
+                    query_parameters=[
+                        bigquery.ScalarQueryParameter("transaction_id", "STRING", sample.transaction_id),
+                        bigquery.ScalarQueryParameter("user_id", "STRING", sample.user_id),
+                        bigquery.ScalarQueryParameter("event_time", "TIMESTAMP", sample.event_time),
+                        bigquery.ScalarQueryParameter("lookback_days", "INT64", args.lookback_days),
+                    ],
+                )
+                job = client.query(query, job_config=job_config)
+                job.result()
+                layout_name = "partitioned" if bounded else "flat"
+                print(f"   {rows:>12,}  {lookup:<10} {layout_name:<12} "
+                      f"processed {_format_bytes(job.total_bytes_processed or 0):>10}  "
+                      f"billed {_format_bytes(job.total_bytes_billed or 0):>10}")
+
+        if not args.keep_tables:
+            for table in (flat, layout):
+                client.delete_table(table, not_found_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare bytes scanned by session lookups per table layout')
+    parser.add_argument('--rows', type=str, default='10000000,100000000',
+                        help='Comma-separated session row counts (default: 10M,100M)')
+    parser.add_argument('--retention-days', type=int, default=90,
+                        help='Days of sessions kept in the table (default: 90)')
+    parser.add_argument('--lookback-days', type=int,
+                        default=int(os.getenv("SESSION_LOOKBACK_DAYS", DEFAULT_SESSION_LOOKBACK_DAYS)),
+                        help='Session lookup lookback (default: SESSION_LOOKBACK_DAYS or 7)')
+    parser.add_argument('--block-mb', type=float, default=100,
+                        help='Estimated clustered block size read per partition (default: 100)')
+    parser.add_argument('--live', action='store_true',
+                        help='Create synthetic tables and run the real queries')
+    parser.add_argument('--dataset', type=str, default=None,
+                        help='Scratch dataset for --live')
+    parser.add_argument('--keep-tables', action='store_true',
+                        help='Keep the synthetic tables after --live')
+    args = parser.parse_args()
+
+    row_counts = [int(value) for value in args.rows.split(',')]
+    if args.live:
+        if not args.dataset:
+            parser.error("--live requires --dataset")
+        run_live(row_counts, args)
+    else:
+        run_estimate(row_counts, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -49,18 +49,40 @@ TABLES = {
     ]
 }
 
+# Physical layout: lookups filter on these keys, so partition pruning and
+# clustering keep them from scanning the whole table
+# (table_id -> (time partitioning column, clustering columns))
+LAYOUTS = {
+    'customer_profiles': (None, ["user_id"]),
+    'beneficiary_graph': (None, ["account_id"]),
+    'mobile_banking_sessions': ("event_time", ["transaction_id", "user_id"]),
+}
+
 dataset_id = 'streamguard_threats'
 
 for table_id, schema in TABLES.items():
     table_ref = f"{client.project}.{dataset_id}.{table_id}"
+    partition_field, cluster_fields = LAYOUTS[table_id]
 
     try:
         # Check if table exists
-        client.get_table(table_ref)
+        existing = client.get_table(table_ref)
         print(f"[OK] Table {table_id} already exists")
+        if existing.clustering_fields != cluster_fields or (
+            partition_field and not existing.time_partitioning
+        ):
+            # Partitioning can't be added in place; recreate the table with
+            # CREATE TABLE ... PARTITION BY ... CLUSTER BY ... AS SELECT
+            print(f"[WARN] Table {table_id} is not partitioned/clustered as expected "
+                  f"(partition: {partition_field}, cluster: {cluster_fields})")
     except Exception as e:
         # Create table
         table = bigquery.Table(table_ref, schema=schema)
+        if partition_field:
+            table.time_partitioning = bigquery.TimePartitioning(
+                type_=bigquery.TimePartitioningType.DAY, field=partition_field
+            )
+        table.clustering_fields = cluster_fields
         table = client.create_table(table)
         print(f"[CREATED] Table {table_id}")
 
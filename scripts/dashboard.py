@@ -8,6 +8,13 @@ import subprocess
 import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from pathlib import Path
+import sys
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.tools.bigquery_utils import run_query
 
 # Load environment variables
 load_dotenv()
@@ -593,9 +600,8 @@ def main():
                     LIMIT 10
                     """
 
-                    # Execute query
-                    query_job = client.query(query)
-                    results = query_job.result()
+                    # Execute query (job statistics recorded per table)
+                    results = run_query(client, query, table=table_name, source="dashboard")
 
                     # Convert to DataFrame
                     df = pd.DataFrame([dict(row) for row in results])
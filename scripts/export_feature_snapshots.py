@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Export customer_profiles and beneficiary_graph into local feature-store snapshots.
+
+The Detective tools (get_user_history / get_beneficiary_risk) read these
+memory-mapped snapshots before falling back to BigQuery point lookups.
+Run once, or with --interval to keep the snapshots fresh.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from agents.tools.feature_store import FeatureStore
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export StreamGuard feature-store snapshots')
+    parser.add_argument('--dir', type=str, default=None,
+                        help='Snapshot directory (default: FEATURE_STORE_DIR or .feature_store)')
+    parser.add_argument('--dataset', type=str, default=None,
+                        help='BigQuery dataset (default: BIGQUERY_DATASET or streamguard_threats)')
+    parser.add_argument('--interval', type=float, default=0,
+                        help='Re-export every N seconds (default: export once and exit)')
+    args = parser.parse_args()
+
+    store = FeatureStore(directory=args.dir)
+    print(f"📦 Exporting snapshots to {store.directory}")
+
+    while True:
+        try:
+            exported = store.refresh(dataset=args.dataset)
+            for table_name, count in exported.items():
+                print(f"   ✅ {table_name}: {count} rows")
+        except Exception as e:
+            print(f"   ❌ Export failed: {e}")
+            if not args.interval:
+                sys.exit(1)
+
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
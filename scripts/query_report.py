@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Report the most expensive BigQuery lookups issued by StreamGuard.
+
+Reads the telemetry written by agents.tools.bigquery_utils.run_query, either
+from the JSONL log (QUERY_TELEMETRY_LOG) or from INFORMATION_SCHEMA.JOBS using
+the streamguard_* job labels, groups identical query shapes per table and
+lists them by total bytes processed.
+
+Examples:
+    QUERY_TELEMETRY_LOG=telemetry.jsonl python scripts/run_adk_swarm.py
+    python scripts/query_report.py --log telemetry.jsonl --top 10
+    python scripts/query_report.py --information-schema --hours 24
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def load_log(path: str) -> list:
+    """Load telemetry records from a JSONL log."""
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def load_information_schema(hours: int, region: str) -> list:
+    """Load telemetry records for labelled StreamGuard jobs from INFORMATION_SCHEMA."""
+    from agents.tools.bigquery_utils import get_client
+
+    client = get_client()
+    query = f"""
+    SELECT
+      creation_time AS timestamp,
+      (SELECT value FROM UNNEST(labels) WHERE key = 'streamguard_table') AS table,
+      (SELECT value FROM UNNEST(labels) WHERE key = 'streamguard_source') AS source,
+      query,
+      total_bytes_processed AS bytes_processed,
+      total_slot_ms AS slot_millis,
+      cache_hit,
+      TIMESTAMP_DIFF(start_time, creation_time, MILLISECOND) AS queue_ms,
+      TIMESTAMP_DIFF(end_time, start_time, MILLISECOND) AS exec_ms,
+      TIMESTAMP_DIFF(end_time, creation_time, MILLISECOND) AS latency_ms
+    FROM `region-{region}`.INFORMATION_SCHEMA.JOBS_BY_PROJECT
+    WHERE creation_time > TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @hours HOUR)
+      AND job_type = 'QUERY'
+      AND EXISTS (SELECT 1 FROM UNNEST(labels) WHERE key = 'streamguard_source')
+    """
+    from google.cloud import bigquery
+
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("hours", "INT64", hours)]
+    )
+    return [dict(row.items()) for row in client.query(query, job_config=job_config).result()]
+
+
+def summarize(records: list) -> list:
+    """Group records by (source, table, query shape) and aggregate their cost."""
+    groups = defaultdict(lambda: {
+        "count": 0, "bytes_processed": 0, "slot_millis": 0, "cache_hits": 0,
+        "latency_ms": 0.0, "queue_ms": 0.0, "exec_ms": 0.0, "max_bytes": 0,
+    })
+    for record in records:
+        group = groups[(record.get("source"), record.get("table"), record.get("query"))]
+        group["count"] += 1
+        group["bytes_processed"] += record.get("bytes_processed") or 0
+        group["max_bytes"] = max(group["max_bytes"], record.get("bytes_processed") or 0)
+        group["slot_millis"] += record.get("slot_millis") or 0
+        group["cache_hits"] += 1 if record.get("cache_hit") else 0
+        for field in ("latency_ms", "queue_ms", "exec_ms"):
+            group[field] += record.get(field) or 0
+
+    rows = []
+    for (source, table, query), group in groups.items():
+        count = group["count"]
+        rows.append({
+            "source": source,
+            "table": table,
+            "query": query,
+            "count": count,
+            "total_bytes": group["bytes_processed"],
+            "avg_bytes": group["bytes_processed"] / count,
+            "max_bytes": group["max_bytes"],
+            "total_slot_ms": group["slot_millis"],
+            "cache_hit_rate": group["cache_hits"] / count,
+            "avg_latency_ms": group["latency_ms"] / count,
+            "avg_queue_ms": group["queue_ms"] / count,
+            "avg_exec_ms": group["exec_ms"] / count,
+        })
+    rows.sort(key=lambda row: row["total_bytes"], reverse=True)
+    return rows
+
+
+def _format_bytes(value: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} PB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the most expensive StreamGuard BigQuery lookups')
+    parser.add_argument('--log', type=str, default=os.getenv("QUERY_TELEMETRY_LOG"),
+                        help='Telemetry JSONL log (default: QUERY_TELEMETRY_LOG)')
+    parser.add_argument('--information-schema', action='store_true',
+                        help='Read labelled jobs from INFORMATION_SCHEMA.JOBS_BY_PROJECT instead of the log')
+    parser.add_argument('--hours', type=int, default=24,
+                        help='Lookback for --information-schema (default: 24)')
+    parser.add_argument('--region', type=str, default=os.getenv("BIGQUERY_REGION", "us"),
+                        help='BigQuery region for --information-schema (default: us)')
+    parser.add_argument('--top', type=int, default=20,
+                        help='Number of query shapes to list (default: 20)')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the summary as JSON')
+    args = parser.parse_args()
+
+    if args.information_schema:
+        records = load_information_schema(args.hours, args.region)
+    elif args.log:
+        records = load_log(args.log)
+    else:
+        parser.error("Pass --log (or set QUERY_TELEMETRY_LOG) or use --information-schema")
+
+    rows = summarize(records)[:args.top]
+    if args.json:
+        print(json.dumps(rows, indent=2, default=str))
+        return
+
+    print(f"📊 {len(records)} queries, {len(rows)} most expensive query shapes\n")
+    for i, row in enumerate(rows, 1):
+        print(f"{i:>3}. [{row['source']}] {row['table']}  x{row['count']}")
+        print(f"     bytes: total {_format_bytes(row['total_bytes'])}, avg {_format_bytes(row['avg_bytes'])}, "
+              f"max {_format_bytes(row['max_bytes'])}   slot-ms: {row['total_slot_ms']:.0f}   "
+              f"cache hits: {row['cache_hit_rate']:.0%}")
+        print(f"     latency avg {row['avg_latency_ms']:.0f} ms "
+              f"(queue {row['avg_queue_ms']:.0f} ms, exec {row['avg_exec_ms']:.0f} ms)")
+        print(f"     {(row['query'] or '')[:160]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Load customer_profiles / beneficiary_graph into the shared-memory lookup cache.
+
+Worker processes started with DETECTIVE_SHARED_CACHE_NAME=<name> answer
+Detective profile and beneficiary lookups from the segment without locks, and
+fall back to the storage backend on a miss. This script is the only writer.
+It creates the segment if needed, then every --interval seconds scans the
+latest row per key from the configured backend (DETECTIVE_STORAGE_BACKEND) and
+swaps each table in.
+
+The segment outlives this process, so workers keep serving the last refresh
+while it restarts. Pass --recreate to resize it (workers re-attach within a
+few seconds) and --unlink-on-exit to remove it on shutdown.
+
+Examples:
+    python scripts/refresh_shared_cache.py --once
+    python scripts/refresh_shared_cache.py --interval 300 --profiles 2000000
+    DETECTIVE_STORAGE_BACKEND=sqlite python scripts/refresh_shared_cache.py --name sg_lookups
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.tools.shared_cache import DEFAULT_SLOT_BYTES, SharedLookupCache
+from agents.tools.storage_backends import get_storage_backend, set_storage_backend
+
+DEFAULT_SEGMENT_NAME = "streamguard_lookups"
+
+
+def open_segment(name: str, capacity: dict, slot_bytes: dict, recreate: bool) -> SharedLookupCache:
+    """Attach to the named segment, creating (or with `recreate`, replacing) it."""
+    if recreate:
+        try:
+            old = SharedLookupCache.attach(name)
+            old.unlink()
+            old.close()
+            print(f"🗑️  Removed segment {name}")
+        except FileNotFoundError:
+            pass
+    try:
+        cache = SharedLookupCache.create(name, capacity, slot_bytes)
+        size = sum(2 * t.slots * t.slot_size for t in cache.tables.values())
+        print(f"🆕 Created segment {name} ({size / 1024 ** 2:,.1f} MB)")
+    except FileExistsError:
+        cache = SharedLookupCache.attach(name)
+        print(f"📂 Attached to segment {name}")
+    for table in cache.tables.values():
+        print(f"   {table.name}: {table.slots:,} slots x {table.slot_size} bytes")
+    return cache
+
+
+def refresh(cache: SharedLookupCache, backend) -> None:
+    """Reload every table of the segment from the backend."""
+    for table_name in cache.tables:
+        started = time.monotonic()
+        stats = cache.write_table(table_name, backend.scan_latest(table_name))
+        print(f"✅ {table_name}: {stats['written']:,} rows in {time.monotonic() - started:.1f}s")
+        if stats["oversized"] or stats["overflow"]:
+            print(f"   ⚠️  Not cached: {stats['oversized']:,} records larger than a slot, "
+                  f"{stats['overflow']:,} beyond capacity (served by the backend)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the shared-memory Detective lookup cache')
+    parser.add_argument('--name', type=str, default=os.getenv("DETECTIVE_SHARED_CACHE_NAME", DEFAULT_SEGMENT_NAME),
+                        help=f'Segment name (default: DETECTIVE_SHARED_CACHE_NAME or {DEFAULT_SEGMENT_NAME})')
+    parser.add_argument('--profiles', type=int, default=int(os.getenv("SHARED_CACHE_PROFILES", 1_000_000)),
+                        help='Profile capacity when creating the segment (default: 1,000,000)')
+    parser.add_argument('--beneficiaries', type=int, default=int(os.getenv("SHARED_CACHE_BENEFICIARIES", 1_000_000)),
+                        help='Beneficiary capacity when creating the segment (default: 1,000,000)')
+    parser.add_argument('--profile-slot-bytes', type=int, default=DEFAULT_SLOT_BYTES["customer_profiles"],
+                        help=f'Profile slot size (default: {DEFAULT_SLOT_BYTES["customer_profiles"]})')
+    parser.add_argument('--beneficiary-slot-bytes', type=int, default=DEFAULT_SLOT_BYTES["beneficiary_graph"],
+                        help=f'Beneficiary slot size (default: {DEFAULT_SLOT_BYTES["beneficiary_graph"]})')
+    parser.add_argument('--interval', type=float, default=300, help='Seconds between refreshes (default: 300)')
+    parser.add_argument('--once', action='store_true', help='Refresh once and exit (segment is kept)')
+    parser.add_argument('--recreate', action='store_true', help='Replace an existing segment (e.g. to resize it)')
+    parser.add_argument('--unlink-on-exit', action='store_true', help='Remove the segment when stopping')
+    args = parser.parse_args()
+
+    # Read from the backend itself, never from an existing cache segment
+    os.environ.pop("DETECTIVE_SHARED_CACHE_NAME", None)
+    set_storage_backend(None)
+    backend = get_storage_backend()
+
+    cache = open_segment(
+        args.name,
+        {"customer_profiles": args.profiles, "beneficiary_graph": args.beneficiaries},
+        {"customer_profiles": args.profile_slot_bytes, "beneficiary_graph": args.beneficiary_slot_bytes},
+        args.recreate,
+    )
+    print(f"📡 Source: {backend.name} backend")
+
+    try:
+        while True:
+            refresh(cache, backend)
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping")
+    finally:
+        if args.unlink_on_exit:
+            cache.unlink()
+            print(f"🗑️  Removed segment {args.name}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
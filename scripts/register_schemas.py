@@ -29,6 +29,8 @@ schema_files = [
     ('customer_bank_transfers-value', 'customer_bank_transfer.avsc'),
     ('mobile_banking_sessions-value', 'mobile_banking_session.avsc'),
     ('fraud_investigation_queue-value', 'fraud_investigation_alert.avsc'),
+    ('investigation_reports-value', 'investigation_report.avsc'),
+    ('judgment_decisions-value', 'judgment_decision.avsc'),
 
     # Legacy/Other Project Schemas
     ('clean_transactions-value', 'clean_transaction.avsc'),
@@ -5,6 +5,7 @@ import os
 import json
 import sys
 import time
+from collections import deque
 from pathlib import Path
  # Add project root to sys.path
 sys.path.append(str(Path(__file__).parent.parent))
@@ -15,6 +16,10 @@ from confluent_kafka.schema_registry import SchemaRegistryClient
 from confluent_kafka.schema_registry.avro import AvroDeserializer
 from confluent_kafka.error import KafkaError
 from agents.router_agent import ThreatProcessingWorkflow
+from agents.tools.amount_prefilter import DOWNGRADE, DROP, PASS, PrefilterConfig, prefilter_alert
+from agents.tools.known_bad_filter import prescreen
+from agents.tools.learned_scorer import FEATURES, features_for_alert, get_learned_scorer
+from config.metrics import get_metrics_registry
 from google.adk.errors.already_exists_error import AlreadyExistsError
 
 # Kafka Configuration
@@ -29,10 +34,176 @@ CONSUMER_CONFIG = {
     'sasl.mechanism': 'PLAIN',
     'sasl.username': os.getenv('CONFLUENT_CLUSTER_API_KEY'),
     'sasl.password': os.getenv('CONFLUENT_CLUSTER_API_SECRET'),
-    'group.id': f'adk-agent-swarm-{int(time.time())}',
+    # Stable group: workers share the queue's partitions, and a restarted
+    # worker resumes from the group's committed offsets, so alerts
+    # republished at shutdown (PREFILTER_DEFER_TOPIC) are read exactly once.
+    # 'latest' only applies the first time the group starts.
+    'group.id': os.getenv('SWARM_CONSUMER_GROUP', 'streamguard-adk-swarm'),
     'auto.offset.reset': 'latest'
 }
 
+# Learned first-stage scorer: "shadow" (default) only logs the score, "gate"
+# (opt-in) skips the agents for high-confidence SAFE alerts
+LEARNED_SCORER_MODE = os.getenv('LEARNED_SCORER_MODE', 'shadow').lower()
+# Append {alert, investigation, judgment} JSONL for scripts/train_learned_scorer.py
+LEARNED_SCORER_TRAINING_LOG = os.getenv('LEARNED_SCORER_TRAINING_LOG')
+
+# Per-user amount prefilter: "enforce" drops routine amounts and defers
+# near-routine ones, "shadow" (default) only logs, "off" skips it
+PREFILTER_MODE = os.getenv('PREFILTER_MODE', 'shadow').lower()
+# Deferred (downgraded) alerts held in memory; beyond this they are investigated immediately
+PREFILTER_DEFER_MAX = int(os.getenv('PREFILTER_DEFER_MAX', '1000'))
+# Deferred alerts are investigated when the queue is idle, and also while it
+# is busy: once the oldest has waited this many seconds, or after every
+# PREFILTER_DEFER_EVERY live alerts
+PREFILTER_DEFER_MAX_AGE = float(os.getenv('PREFILTER_DEFER_MAX_AGE', '300'))
+PREFILTER_DEFER_EVERY = int(os.getenv('PREFILTER_DEFER_EVERY', '10'))
+# Deferred alerts still queued at shutdown are republished here (priority LOW).
+# They are held in memory after their offsets are committed, so a worker that
+# crashes (rather than shutting down) loses the alerts it had deferred
+PREFILTER_DEFER_TOPIC = os.getenv('PREFILTER_DEFER_TOPIC', 'fraud_investigation_queue')
+
+PRODUCER_CONFIG = {k: v for k, v in CONSUMER_CONFIG.items() if k not in ('group.id', 'auto.offset.reset')}
+
+
+def log_training_record(threat_data, features, investigation, judgment):
+    """Append one labelled alert, with its serving-time features, for training the learned scorer."""
+    record = {
+        "alert": {k: v for k, v in threat_data.items() if k != 'prescreen'},
+        "features": dict(zip(FEATURES, features)),
+        "investigation": investigation.model_dump(mode="json"),
+        "judgment": judgment.model_dump(mode="json"),
+    }
+    try:
+        with open(LEARNED_SCORER_TRAINING_LOG, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    except OSError as e:
+        print(f"   ⚠️ Could not write training record: {e}")
+
+
+async def investigate(workflow, threat_data):
+    """Run the agent workflow for one alert (unless the learned scorer clears it).
+
+    Returns:
+        True if the agents ran
+    """
+    scorer = get_learned_scorer() if LEARNED_SCORER_MODE in ('gate', 'shadow') else None
+    # Looked up once: the score and the training log see the same vector
+    features = features_for_alert(threat_data) if scorer is not None or LEARNED_SCORER_TRAINING_LOG else None
+    if not threat_data['prescreen']['hit']:
+        # Learned first stage: high-confidence SAFE alerts skip the three LLM calls
+        if scorer is not None:
+            p_safe = scorer.score(features)
+            bypass = scorer.bypasses(p_safe)
+            print(f"   🧮 Learned scorer {scorer.model_version}: P(SAFE)={p_safe:.3f} "
+                  f"(threshold {scorer.threshold:.3f})")
+            if bypass:
+                get_metrics_registry().inc("learned_scorer.bypassed", mode=LEARNED_SCORER_MODE)
+            if bypass and LEARNED_SCORER_MODE == 'gate':
+                print("   ✅ ACTION: SAFE - Transaction approved by learned scorer (agents skipped)")
+                return False
+
+    # Execute Agent Workflow
+    print("   🕵️ Detective Investigating...")
+    try:
+        result = await workflow.process_threat_async(threat_data)
+
+        # Handle structured output
+        investigation = result.get('investigation')
+        judgment = result.get('judgment')
+        errors = result.get('errors', [])
+
+        print("\n📝 Workflow Result:")
+        if investigation:
+            print(f"   - Detective: Risk={investigation.risk_level.value}, Score={investigation.risk_score}")
+        else:
+            print(f"   - Detective: {len(result.get('investigation_text', ''))} chars report")
+
+        if judgment:
+            print(f"   - Judge: Decision={judgment.decision.value}, Policy=#{judgment.policy_applied}, Confidence={judgment.confidence}%")
+        else:
+            print(f"   - Judge: {len(result.get('judgment_text', ''))} chars decision")
+
+        print(f"   - Enforcer: {len(result.get('execution', ''))} chars output")
+
+        if investigation and judgment and LEARNED_SCORER_TRAINING_LOG:
+            log_training_record(threat_data, features, investigation, judgment)
+
+        if errors:
+            print(f"   ⚠️ Errors: {len(errors)}")
+            for error in errors:
+                print(f"      - {error}")
+
+        # Check decision using structured data if available
+        if judgment:
+            decision_str = judgment.decision.value
+            if decision_str == "BLOCK":
+                print("   ⛔ ACTION: BLOCK executed")
+            elif decision_str == "SAFE":
+                print("   ✅ ACTION: SAFE - Transaction approved")
+            elif decision_str == "ESCALATE_TO_HUMAN":
+                print("   👤 ACTION: ESCALATED TO HUMAN")
+            else:
+                print("   ℹ️ ACTION: Other decision")
+        else:
+            # Fallback to text matching
+            judgment_text = result.get('judgment_text', '')
+            if "BLOCK" in judgment_text:
+                print("   ⛔ ACTION: BLOCK executed")
+            elif "SAFE" in judgment_text:
+                print("   ✅ ACTION: SAFE - Transaction approved")
+            else:
+                print("   ℹ️ ACTION: Other decision")
+    except AlreadyExistsError:
+        print(f"   ⚠️ Warning: Session for {threat_data.get('transaction_id')} already being processed by another worker. Skipping.")
+    except Exception as e:
+        print(f"   ❌ Workflow Error: {e}")
+    return True
+
+
+def drain_reason(deferred, live_since_drain):
+    """Why the oldest deferred alert is due while the queue is busy, or None."""
+    if not deferred:
+        return None
+    if time.monotonic() - deferred[0][0] >= PREFILTER_DEFER_MAX_AGE:
+        return "max_age"
+    if PREFILTER_DEFER_EVERY > 0 and live_since_drain >= PREFILTER_DEFER_EVERY:
+        return "interleave"
+    return None
+
+
+async def investigate_deferred(workflow, deferred, reason):
+    """Investigate the oldest deferred alert."""
+    deferred_at, threat_data = deferred.popleft()
+    get_metrics_registry().inc("prefilter.drained", reason=reason)
+    print(f"\n⏫ Deferred Alert: {threat_data.get('transaction_id')} ({reason}, waited "
+          f"{time.monotonic() - deferred_at:.0f}s, {len(deferred)} left)")
+    await investigate(workflow, threat_data)
+
+
+def republish_deferred(deferred, schema_registry_client, schema_str):
+    """Hand deferred alerts that were never investigated back to Kafka."""
+    from confluent_kafka import SerializingProducer
+    from confluent_kafka.schema_registry.avro import AvroSerializer
+
+    fields = [field['name'] for field in json.loads(schema_str)['fields']]
+    try:
+        producer = SerializingProducer({
+            **PRODUCER_CONFIG,
+            'value.serializer': AvroSerializer(schema_registry_client, schema_str),
+        })
+        for _, threat_data in deferred:
+            producer.produce(topic=PREFILTER_DEFER_TOPIC, value={name: threat_data.get(name) for name in fields})
+            producer.poll(0)
+        remaining = producer.flush(10)
+    except Exception as e:
+        print(f"   ❌ Could not republish {len(deferred)} deferred alert(s): {e}")
+        return
+    get_metrics_registry().inc("prefilter.republished", len(deferred) - remaining)
+    print(f"   📤 Republished {len(deferred) - remaining} deferred alert(s) to {PREFILTER_DEFER_TOPIC}"
+          + (f", {remaining} undelivered" if remaining else ""))
+
+
 async def process_messages():
     print("🛡️ Initializing ADK Agent Swarm...")
     
@@ -58,12 +229,30 @@ async def process_messages():
     consumer.subscribe([topic])
     print(f"📡 Listening to topic: {topic}")
 
+    prefilter_config = PrefilterConfig.from_env()
+    deferred = deque()  # (monotonic time deferred, alert)
+    live_since_drain = 0
+    if PREFILTER_MODE != 'off':
+        print(f"📏 Amount prefilter ({PREFILTER_MODE}): drop <= p{prefilter_config.drop_percentile * 100:g}, "
+              f"downgrade <= p{prefilter_config.downgrade_percentile * 100:g} of each user's transfers")
+
     try:
         while True:
+            reason = drain_reason(deferred, live_since_drain)
+            if reason:
+                # Busy queue: deferred alerts still get a turn
+                await investigate_deferred(workflow, deferred, reason)
+                live_since_drain = 0
+
             msg = consumer.poll(1.0)
 
             if msg is None:
-                await asyncio.sleep(0.1) # Yield to event loop
+                if deferred:
+                    # Queue is idle: investigate a downgraded alert
+                    await investigate_deferred(workflow, deferred, "idle")
+                    live_since_drain = 0
+                else:
+                    await asyncio.sleep(0.1) # Yield to event loop
                 continue
 
             if msg.error():
@@ -77,59 +266,35 @@ async def process_messages():
             if threat_data:
                 print(f"\n🚨 New Threat Detected: {threat_data.get('transaction_id')}")
                 print(f"   Investigating: {threat_data.get('investigation_type')}")
-                
-                # Execute Agent Workflow
-                print("   🕵️ Detective Investigating...")
-                try:
-                    result = await workflow.process_threat_async(threat_data)
-
-                    # Handle structured output
-                    investigation = result.get('investigation')
-                    judgment = result.get('judgment')
-                    errors = result.get('errors', [])
-
-                    print("\n📝 Workflow Result:")
-                    if investigation:
-                        print(f"   - Detective: Risk={investigation.risk_level.value}, Score={investigation.risk_score}")
-                    else:
-                        print(f"   - Detective: {len(result.get('investigation_text', ''))} chars report")
-
-                    if judgment:
-                        print(f"   - Judge: Decision={judgment.decision.value}, Policy=#{judgment.policy_applied}, Confidence={judgment.confidence}%")
-                    else:
-                        print(f"   - Judge: {len(result.get('judgment_text', ''))} chars decision")
-
-                    print(f"   - Enforcer: {len(result.get('execution', ''))} chars output")
-
-                    if errors:
-                        print(f"   ⚠️ Errors: {len(errors)}")
-                        for error in errors:
-                            print(f"      - {error}")
-
-                    # Check decision using structured data if available
-                    if judgment:
-                        decision_str = judgment.decision.value
-                        if decision_str == "BLOCK":
-                            print("   ⛔ ACTION: BLOCK executed")
-                        elif decision_str == "SAFE":
-                            print("   ✅ ACTION: SAFE - Transaction approved")
-                        elif decision_str == "ESCALATE_TO_HUMAN":
-                            print("   👤 ACTION: ESCALATED TO HUMAN")
-                        else:
-                            print("   ℹ️ ACTION: Other decision")
-                    else:
-                        # Fallback to text matching
-                        judgment_text = result.get('judgment_text', '')
-                        if "BLOCK" in judgment_text:
-                            print("   ⛔ ACTION: BLOCK executed")
-                        elif "SAFE" in judgment_text:
-                            print("   ✅ ACTION: SAFE - Transaction approved")
-                        else:
-                            print("   ℹ️ ACTION: Other decision")
-                except AlreadyExistsError:
-                    print(f"   ⚠️ Warning: Session for {threat_data.get('transaction_id')} already being processed by another worker. Skipping.")
-                except Exception as e:
-                    print(f"   ❌ Workflow Error: {e}")
+
+                # O(1) known-bad check before any LLM / BigQuery work
+                threat_data['prescreen'] = prescreen(
+                    threat_data.get('beneficiary_account'), threat_data.get('device_fingerprint')
+                )
+                if threat_data['prescreen']['hit']:
+                    print("   🎯 Prescreen: known-bad "
+                          f"{'beneficiary' if threat_data['prescreen']['known_bad_account'] else 'device'}")
+                elif PREFILTER_MODE in ('enforce', 'shadow'):
+                    # Per-user amount norms before any scoring or LLM work
+                    decision = prefilter_alert(threat_data, prefilter_config)
+                    if decision.action != PASS:
+                        print(f"   📏 Prefilter: {decision.describe()}")
+                    if PREFILTER_MODE == 'enforce' and decision.action == DROP:
+                        get_metrics_registry().inc("prefilter.dropped", reason=decision.reason)
+                        print("   🔕 Dropped: routine amount for this user")
+                        continue
+                    if PREFILTER_MODE == 'enforce' and decision.action == DOWNGRADE:
+                        if len(deferred) < PREFILTER_DEFER_MAX:
+                            threat_data['priority'] = 'LOW'
+                            deferred.append((time.monotonic(), threat_data))
+                            get_metrics_registry().inc("prefilter.deferred", reason=decision.reason)
+                            print(f"   ⏬ Downgraded: investigating later ({len(deferred)} deferred)")
+                            continue
+                        get_metrics_registry().inc("prefilter.defer_overflow")
+
+                live_since_drain += 1
+                if not await investigate(workflow, threat_data):
+                    continue
 
             # Simple manual rate limit/monitoring interval
             await asyncio.sleep(1)
@@ -138,6 +303,8 @@ async def process_messages():
         print("🛑 Stopping swarm...")
     finally:
         consumer.close()
+        if deferred:
+            republish_deferred(deferred, schema_registry_client, schema_str)
 
 if __name__ == "__main__":
     asyncio.run(process_messages())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Track per-beneficiary fan-in and raise mule alerts.
+
+Consumes customer_bank_transfers, folds every transfer into the
+FanInTracker (HyperLogLog distinct senders per beneficiary over 1h / 24h
+windows) and, the first time a beneficiary reaches --threshold distinct
+senders within the alert window, publishes a FraudInvestigationAlert with
+investigation_type "mule_fan_in" to fraud_investigation_queue so the agent
+swarm investigates it.
+
+The tracker is saved atomically every --interval seconds (get_beneficiary_risk
+reads it from FAN_IN_TRACKER_PATH); consumer offsets are committed only after
+the snapshot containing them is saved. Alert IDs are derived from the
+transaction ID, so an alert re-sent after a crash can be de-duplicated.
+
+Run one tracker per snapshot path (it is the only writer).
+
+Examples:
+    python scripts/track_fan_in.py
+    python scripts/track_fan_in.py --threshold 20 --interval 15
+    python scripts/track_fan_in.py --dry-run        # log alerts, do not publish
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from agents.tools.fan_in_tracker import (
+    DEFAULT_ALERT_THRESHOLD, DEFAULT_CAPACITY, DEFAULT_PRECISION, FanInTracker, default_fan_in_path, fan_in_alert,
+)
+from agents.tools.location_index import to_epoch_seconds
+
+load_dotenv()
+
+TRANSFERS_TOPIC = "customer_bank_transfers"
+ALERTS_TOPIC = "fraud_investigation_queue"
+SCHEMAS_DIR = Path(__file__).parent.parent / "schemas"
+
+
+def _schema_registry_client():
+    from confluent_kafka.schema_registry import SchemaRegistryClient
+
+    return SchemaRegistryClient({
+        'url': os.getenv('CONFLUENT_SCHEMA_REGISTRY_URL'),
+        'basic.auth.user.info': f"{os.getenv('CONFLUENT_SR_API_KEY')}:{os.getenv('CONFLUENT_SR_API_SECRET')}"
+    })
+
+
+def _kafka_config() -> dict:
+    return {
+        'bootstrap.servers': os.getenv('CONFLUENT_KAFKA_BOOTSTRAP_ENDPOINT'),
+        'security.protocol': 'SASL_SSL',
+        'sasl.mechanism': 'PLAIN',
+        'sasl.username': os.getenv('CONFLUENT_CLUSTER_API_KEY'),
+        'sasl.password': os.getenv('CONFLUENT_CLUSTER_API_SECRET'),
+    }
+
+
+def create_consumer():
+    from confluent_kafka import DeserializingConsumer
+    from confluent_kafka.schema_registry.avro import AvroDeserializer
+
+    consumer = DeserializingConsumer({
+        **_kafka_config(),
+        'group.id': 'streamguard-fan-in-tracker',
+        'auto.offset.reset': 'earliest',
+        'enable.auto.commit': False,
+        'value.deserializer': AvroDeserializer(
+            _schema_registry_client(), (SCHEMAS_DIR / "customer_bank_transfer.avsc").read_text()
+        ),
+    })
+    consumer.subscribe([TRANSFERS_TOPIC])
+    return consumer
+
+
+def create_producer():
+    from confluent_kafka import SerializingProducer
+    from confluent_kafka.schema_registry.avro import AvroSerializer
+
+    return SerializingProducer({
+        **_kafka_config(),
+        'value.serializer': AvroSerializer(
+            _schema_registry_client(), (SCHEMAS_DIR / "fraud_investigation_alert.avsc").read_text()
+        ),
+    })
+
+
+def track(tracker: FanInTracker, consumer, producer, duration_seconds: float, max_alert_age: float):
+    """Fold transfers polled for up to `duration_seconds`; returns (transfers, alerts)."""
+    transfers = alerts = 0
+    deadline = time.monotonic() + duration_seconds
+    while time.monotonic() < deadline:
+        msg = consumer.poll(min(1.0, max(deadline - time.monotonic(), 0.0)))
+        if msg is None:
+            continue
+        if msg.error():
+            print(f"   ❌ Consumer error: {msg.error()}")
+            continue
+        transfer = msg.value()
+        if not transfer:
+            continue
+        transfers += 1
+        distinct = tracker.observe(
+            transfer["beneficiary_account_id"], transfer["sender_user_id"], transfer.get("event_time")
+        )
+        if distinct is None:
+            continue
+        # Replaying old history must not page anyone
+        if transfer.get("event_time") and time.time() - to_epoch_seconds(transfer["event_time"]) > max_alert_age:
+            continue
+
+        alert = fan_in_alert(transfer)
+        alerts += 1
+        print(f"   🚨 Fan-in: {alert['beneficiary_account']} received from ~{distinct} distinct senders "
+              f"(threshold {tracker.alert_threshold}) -> {alert['alert_id']}")
+        if producer is not None:
+            producer.produce(topic=ALERTS_TOPIC, value=alert)
+            producer.poll(0)
+    if producer is not None and alerts:
+        producer.flush()
+    return transfers, alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Track beneficiary fan-in and raise mule alerts')
+    parser.add_argument('--path', type=str, default=None,
+                        help='Snapshot path (default: FAN_IN_TRACKER_PATH or <FEATURE_STORE_DIR>/fan_in.npz)')
+    parser.add_argument('--threshold', type=int,
+                        default=int(os.getenv("FAN_IN_ALERT_THRESHOLD", DEFAULT_ALERT_THRESHOLD)),
+                        help=f'Distinct senders within 1h that raise an alert (default: {DEFAULT_ALERT_THRESHOLD})')
+    parser.add_argument('--capacity', type=int, default=int(os.getenv("FAN_IN_CAPACITY", DEFAULT_CAPACITY)),
+                        help=f'Beneficiaries tracked when creating a new tracker (default: {DEFAULT_CAPACITY:,})')
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION,
+                        help=f'HyperLogLog precision for a new tracker (default: {DEFAULT_PRECISION})')
+    parser.add_argument('--interval', type=float, default=30,
+                        help='Seconds between snapshots / offset commits (default: 30)')
+    parser.add_argument('--max-alert-age', type=float, default=3600,
+                        help='Do not alert on transfers older than this many seconds (default: 3600)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help=f'Log alerts instead of publishing them to {ALERTS_TOPIC}')
+    args = parser.parse_args()
+
+    path = args.path or default_fan_in_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if os.path.exists(path):
+        tracker = FanInTracker.load(path)
+        tracker.alert_threshold = args.threshold
+        print(f"📂 Loaded {path} ({len(tracker):,} beneficiaries)")
+    else:
+        tracker = FanInTracker(precision=args.precision, capacity=args.capacity, alert_threshold=args.threshold)
+        print(f"🆕 New fan-in tracker for {args.capacity:,} beneficiaries")
+
+    consumer = create_consumer()
+    producer = None if args.dry_run else create_producer()
+    print(f"📡 {TRANSFERS_TOPIC} -> {'(dry run)' if args.dry_run else ALERTS_TOPIC}")
+
+    try:
+        while True:
+            started = time.monotonic()
+            transfers, alerts = track(tracker, consumer, producer, args.interval, args.max_alert_age)
+            tracker.save(path)
+            if transfers:
+                consumer.commit(asynchronous=False)
+            print(f"✅ +{transfers:,} transfers, {alerts} alerts, {len(tracker):,} beneficiaries "
+                  f"({tracker.memory_bytes / 1024 ** 2:,.1f} MB) in {time.monotonic() - started:.1f}s")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping; saving snapshot")
+        tracker.save(path)
+    finally:
+        consumer.close()
+
+
+if __name__ == "__main__":
+    main()
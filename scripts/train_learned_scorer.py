@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Train the learned first-stage scorer (agents/tools/learned_scorer.py).
+
+Input is JSONL (optionally .gz) of {"alert", "features", "investigation",
+"judgment"} records, as appended by scripts/run_adk_swarm.py to
+LEARNED_SCORER_TRAINING_LOG. Training uses the logged serving-time
+"features"; records written before those were logged are rebuilt from the
+investigation (counted, since those can differ from what the swarm scores),
+or skipped with --logged-features-only. The label is judgment.decision ==
+"SAFE"; records without an alert amount or a decision are skipped.
+
+Alerts are split into train and holdout sets by a hash of transaction_id
+(stable across re-runs). The model is fitted on the train set, and the
+bypass threshold is the lowest holdout score at which at least
+--target-precision of the alerts above it were SAFE. If no threshold
+reaches the target, no model is written (use --threshold to force one).
+
+The model file is written atomically. Running swarms reload it within a
+few seconds.
+
+Examples:
+    python scripts/train_learned_scorer.py decisions.jsonl
+    python scripts/train_learned_scorer.py logs/decisions-*.jsonl.gz --target-precision 0.999 \\
+        --output models/learned_scorer.npz --version 2026-10-19
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from agents.tools.learned_scorer import (
+    DEFAULT_L2, DEFAULT_TARGET_PRECISION, FEATURES, MIN_BYPASS_SUPPORT, LearnedScorer, auc, choose_threshold,
+    default_scorer_path, fit_logistic, logged_features, training_example,
+)
+
+
+def read_examples(patterns: list, logged_only: bool = False) -> tuple:
+    """(X, y, holdout_key, skipped, rebuilt) from JSONL files matching `patterns`."""
+    features, labels, keys, skipped, rebuilt = [], [], [], 0, 0
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    if not paths:
+        print(f"❌ No input files match: {' '.join(patterns)}")
+        sys.exit(1)
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    skipped += 1
+                    continue
+                logged = logged_features(record) is not None
+                example = training_example(record) if logged or not logged_only else None
+                if example is None:
+                    skipped += 1
+                    continue
+                rebuilt += not logged
+                features.append(example[0])
+                labels.append(example[1])
+                transaction_id = (record.get("alert") or {}).get("transaction_id") or line
+                keys.append(int.from_bytes(hashlib.blake2b(transaction_id.encode(), digest_size=2).digest(), "little"))
+    X = np.array(features, dtype=np.float64).reshape(-1, len(FEATURES))
+    return X, np.array(labels, dtype=bool), np.array(keys) % 100, skipped, rebuilt
+
+
+def train(X, y, holdout, args) -> LearnedScorer:
+    """Fit on the train split, pick the threshold on the holdout split."""
+    test = holdout < args.holdout_percent
+    fit = fit_logistic(X[~test], y[~test], l2=args.l2)
+    probe = LearnedScorer(**fit, threshold=1.0, model_version="")
+    p = probe.score_batch(X[test])
+    threshold = args.threshold if args.threshold is not None else choose_threshold(
+        p, y[test], args.target_precision, args.min_support
+    )
+
+    metrics = {
+        "train_rows": int((~test).sum()),
+        "holdout_rows": int(test.sum()),
+        "safe_rate": round(float(y.mean()), 4),
+        "holdout_auc": round(auc(p, y[test]), 4),
+    }
+    print(f"📊 Train {metrics['train_rows']:,}, holdout {metrics['holdout_rows']:,}, "
+          f"SAFE {metrics['safe_rate']:.1%}, holdout AUC {metrics['holdout_auc']:.4f}")
+    if threshold is None:
+        print(f"❌ No threshold keeps SAFE precision >= {args.target_precision} on >= {args.min_support} "
+              "holdout alerts; model not written")
+        sys.exit(1)
+
+    bypass = p >= threshold
+    metrics.update({
+        "target_precision": args.target_precision,
+        "holdout_bypass_rate": round(float(bypass.mean()), 4),
+        "holdout_bypass_precision": round(float(y[test][bypass].mean()), 4) if bypass.any() else None,
+        "holdout_bypassed_not_safe": int((bypass & ~y[test]).sum()),
+    })
+    print(f"🎚️  Threshold P(SAFE) >= {threshold:.4f}: bypasses {metrics['holdout_bypass_rate']:.1%} of holdout "
+          f"alerts, {metrics['holdout_bypassed_not_safe']:,} of them not SAFE "
+          f"(precision {metrics['holdout_bypass_precision']})")
+
+    weights = dict(zip(FEATURES, np.round(fit["weights"], 4).tolist()))
+    for name, weight in sorted(weights.items(), key=lambda item: -abs(item[1])):
+        print(f"   {name:<28} {weight:+.4f}")
+    return LearnedScorer(**fit, threshold=threshold, model_version=args.version, metadata={
+        "trained_at": time.time(), "l2": args.l2, "metrics": metrics,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the learned first-stage SAFE scorer')
+    parser.add_argument('inputs', nargs='+', help='JSONL files or globs of alert/investigation/judgment records')
+    parser.add_argument('--output', default=None, help='Model path (default: LEARNED_SCORER_PATH)')
+    parser.add_argument('--version', default=time.strftime("%Y%m%d-%H%M%S"), help='Model version label')
+    parser.add_argument('--l2', type=float, default=DEFAULT_L2, help=f'L2 penalty (default: {DEFAULT_L2})')
+    parser.add_argument('--holdout-percent', type=int, default=20, help='Holdout share in percent (default: 20)')
+    parser.add_argument('--target-precision', type=float, default=DEFAULT_TARGET_PRECISION,
+                        help=f'Required SAFE precision of bypassed alerts (default: {DEFAULT_TARGET_PRECISION})')
+    parser.add_argument('--min-support', type=int, default=MIN_BYPASS_SUPPORT,
+                        help=f'Fewest holdout alerts above the threshold (default: {MIN_BYPASS_SUPPORT})')
+    parser.add_argument('--threshold', type=float, default=None, help='Use this threshold instead of choosing one')
+    parser.add_argument('--logged-features-only', action='store_true',
+                        help='Skip records without logged serving-time features instead of rebuilding them')
+    args = parser.parse_args()
+
+    X, y, holdout, skipped, rebuilt = read_examples(args.inputs, args.logged_features_only)
+    print(f"📥 {len(y):,} labelled alerts ({skipped:,} records skipped)")
+    if rebuilt:
+        print(f"   ⚠️  {rebuilt:,} alerts have no logged features; rebuilt from the investigation, which can "
+              "differ from serving-time lookups (see --logged-features-only)")
+    if len(y) == 0 or y.all() or not y.any():
+        print("❌ Training needs both SAFE and non-SAFE decisions")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    scorer = train(X, y, holdout, args)
+    output = args.output or default_scorer_path()
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    scorer.save(output)
+    print(f"✅ Model {scorer.model_version} written to {output} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Keep the per-user behavioral baselines and home-location index up to date.
+
+Consumes two streams and folds every event into the BaselineStore with an
+O(1) update, then saves an atomic snapshot that the Detective tools reload:
+
+- sessions: new mobile_banking_sessions rows from the storage backend, read
+  incrementally from the (event_time, session_id) watermark saved in the
+  snapshot. Their coordinates also go into the LocationIndex, saved next to
+  it (--locations-path)
+- transfers: the customer_bank_transfers Kafka topic (--transfers); offsets
+  are committed only after the snapshot containing them is saved
+
+Run one updater per snapshot path (it is the only writer).
+
+Examples:
+    python scripts/update_baselines.py                       # catch up on sessions once
+    python scripts/update_baselines.py --transfers --interval 60
+    DETECTIVE_STORAGE_BACKEND=sqlite python scripts/update_baselines.py --path /tmp/baselines.npz
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to sys.path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from agents.tools.baseline_store import BaselineStore, DEFAULT_CAPACITY, default_baseline_path
+from agents.tools.location_index import MAX_LOAD, LocationIndex, configured_index, default_location_path
+from agents.tools.storage_backends import get_storage_backend
+
+load_dotenv()
+
+TRANSFERS_TOPIC = "customer_bank_transfers"
+
+
+def load_or_create(path: str, capacity: int) -> BaselineStore:
+    if os.path.exists(path):
+        store = BaselineStore.load(path)
+        print(f"📂 Loaded {path} (watermarks: {store.watermarks or 'none'})")
+        return store
+    print(f"🆕 New baseline store for {capacity:,} users")
+    return BaselineStore(capacity=capacity)
+
+
+def load_or_create_locations(path: str, users: int) -> LocationIndex:
+    """Location index snapshot, or an empty one with room for `users` (see configured_index).
+
+    A new index only receives sessions after the baseline watermark; older
+    users are seeded from the backend by the Detective tools.
+    """
+    if os.path.exists(path):
+        index = LocationIndex.load(path)
+        print(f"📂 Loaded {path} ({index.num_users:,} users)")
+        return index
+    index = configured_index(users)
+    print(f"🆕 New location index for {index.capacity:,} users")
+    return index
+
+
+def grow_if_full(index: LocationIndex) -> LocationIndex:
+    """Double the index while it holds more than MAX_LOAD of its capacity (unless LOCATION_INDEX_CAPACITY pins it)."""
+    if os.getenv("LOCATION_INDEX_CAPACITY") or index.num_users <= index.capacity * MAX_LOAD:
+        return index
+    capacity = index.capacity * 2
+    while index.num_users > capacity * MAX_LOAD:
+        capacity *= 2
+    print(f"   📈 Growing location index to {capacity:,} users")
+    return index.resized(capacity)
+
+
+def update_sessions(store: BaselineStore, backend, page_size: int, locations: LocationIndex = None) -> int:
+    """Fold sessions newer than the saved watermark into the store (and their coordinates into `locations`)."""
+    watermark = store.watermarks.get("sessions", {})
+    since = datetime.fromisoformat(watermark["event_time"]) if watermark.get("event_time") else None
+    after_session_id = watermark.get("session_id", "")
+
+    total = 0
+    while True:
+        rows = backend.get_sessions_since(since, after_session_id, limit=page_size)
+        for row in rows:
+            store.update_session(
+                row["user_id"],
+                hour=row["time_of_day_hour"],
+                typing_cadence=row["typing_cadence_score"],
+                duration_seconds=row["session_duration_seconds"],
+                event_time=row["event_time"],
+            )
+        if locations is not None and rows:
+            locations.observe_batch(
+                [row["user_id"] for row in rows],
+                [row.get("geolocation_lat") for row in rows],
+                [row.get("geolocation_lon") for row in rows],
+                [row["event_time"] for row in rows],
+            )
+        total += len(rows)
+        if rows:
+            since, after_session_id = rows[-1]["event_time"], rows[-1]["session_id"]
+            store.watermarks["sessions"] = {"event_time": since.isoformat(), "session_id": after_session_id}
+        if len(rows) < page_size:
+            return total
+
+
+def create_transfer_consumer():
+    """Avro consumer for the transfers topic (committed offsets = consumed into a saved snapshot)."""
+    from confluent_kafka import DeserializingConsumer
+    from confluent_kafka.schema_registry import SchemaRegistryClient
+    from confluent_kafka.schema_registry.avro import AvroDeserializer
+
+    schema_path = Path(__file__).parent.parent / "schemas" / "customer_bank_transfer.avsc"
+    schema_registry_client = SchemaRegistryClient({
+        'url': os.getenv('CONFLUENT_SCHEMA_REGISTRY_URL'),
+        'basic.auth.user.info': f"{os.getenv('CONFLUENT_SR_API_KEY')}:{os.getenv('CONFLUENT_SR_API_SECRET')}"
+    })
+    consumer = DeserializingConsumer({
+        'bootstrap.servers': os.getenv('CONFLUENT_KAFKA_BOOTSTRAP_ENDPOINT'),
+        'security.protocol': 'SASL_SSL',
+        'sasl.mechanism': 'PLAIN',
+        'sasl.username': os.getenv('CONFLUENT_CLUSTER_API_KEY'),
+        'sasl.password': os.getenv('CONFLUENT_CLUSTER_API_SECRET'),
+        'group.id': 'streamguard-baseline-updater',
+        'auto.offset.reset': 'earliest',
+        'enable.auto.commit': False,
+        'value.deserializer': AvroDeserializer(schema_registry_client, schema_path.read_text()),
+    })
+    consumer.subscribe([TRANSFERS_TOPIC])
+    return consumer
+
+
+def update_transfers(store: BaselineStore, consumer, duration_seconds: float) -> int:
+    """Fold transfers polled for up to `duration_seconds` into the store."""
+    total = 0
+    deadline = time.monotonic() + duration_seconds
+    while time.monotonic() < deadline:
+        msg = consumer.poll(min(1.0, max(deadline - time.monotonic(), 0.0)))
+        if msg is None:
+            continue
+        if msg.error():
+            print(f"   ❌ Consumer error: {msg.error()}")
+            continue
+        transfer = msg.value()
+        if transfer:
+            store.update_transfer(transfer["sender_user_id"], transfer["amount"], transfer.get("event_time"))
+            total += 1
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update StreamGuard per-user behavioral baselines')
+    parser.add_argument('--path', type=str, default=None,
+                        help='Snapshot path (default: BASELINE_STORE_PATH or <FEATURE_STORE_DIR>/baselines.npz)')
+    parser.add_argument('--locations-path', type=str, default=None,
+                        help='Location index snapshot (default: LOCATION_INDEX_PATH or <FEATURE_STORE_DIR>/locations.npz)')
+    parser.add_argument('--capacity', type=int,
+                        default=int(os.getenv("BASELINE_STORE_CAPACITY", DEFAULT_CAPACITY)),
+                        help='Users tracked when creating a new store (default: 1,000,000)')
+    parser.add_argument('--transfers', action='store_true',
+                        help=f'Also consume the {TRANSFERS_TOPIC} Kafka topic')
+    parser.add_argument('--interval', type=float, default=0,
+                        help='Keep running and save a snapshot every N seconds (default: run once)')
+    parser.add_argument('--page-size', type=int, default=10000,
+                        help='Sessions fetched per backend query (default: 10000)')
+    args = parser.parse_args()
+
+    path = args.path or default_baseline_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    store = load_or_create(path, args.capacity)
+    print(f"   {store.memory_bytes / 1024 ** 2:,.0f} MB for {store.capacity:,} users")
+    locations_path = args.locations_path or default_location_path()
+    locations = load_or_create_locations(locations_path, store.num_users)
+    print(f"   {locations.memory_bytes / 1024 ** 2:,.0f} MB location index")
+
+    backend = get_storage_backend()
+    consumer = create_transfer_consumer() if args.transfers else None
+
+    try:
+        while True:
+            started = time.monotonic()
+            sessions = update_sessions(store, backend, args.page_size, locations)
+            locations = grow_if_full(locations)
+            transfers = update_transfers(store, consumer, max(args.interval, 5.0)) if consumer else 0
+            store.save(path)
+            locations.save(locations_path)
+            if consumer is not None and transfers:
+                consumer.commit(asynchronous=False)
+            print(f"✅ +{sessions:,} sessions, +{transfers:,} transfers "
+                  f"in {time.monotonic() - started:.1f}s -> {path}")
+
+            if not args.interval:
+                break
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping; saving snapshot")
+        store.save(path)
+        locations.save(locations_path)
+    finally:
+        if consumer is not None:
+            consumer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -42,6 +42,9 @@ resource "google_bigquery_table" "customer_profiles" {
   table_id            = "customer_profiles"
   deletion_protection = false
 
+  # Lookups filter on user_id
+  clustering = ["user_id"]
+
   schema = <<EOF
 [
   {
@@ -83,6 +86,9 @@ resource "google_bigquery_table" "beneficiary_graph" {
   table_id            = "beneficiary_graph"
   deletion_protection = false
 
+  # Lookups filter on account_id
+  clustering = ["account_id"]
+
   schema = <<EOF
 [
   {
@@ -119,6 +125,15 @@ resource "google_bigquery_table" "mobile_banking_sessions" {
   table_id            = "mobile_banking_sessions"
   deletion_protection = false
 
+  # Session lookups by transaction_id and velocity counts by user_id both
+  # carry an event_time range, so they only read the matching partitions
+  time_partitioning {
+    type  = "DAY"
+    field = "event_time"
+  }
+
+  clustering = ["transaction_id", "user_id"]
+
   schema = <<EOF
 [
   {
@@ -34,7 +34,8 @@ resource "confluent_flink_statement" "fraud_investigation_trigger" {
       'high_value_transaction' AS investigation_type,
       'fraud-quarantine-' || sender_user_id AS suggested_quarantine_name,
       'HIGH' AS priority,
-      event_time
+      event_time,
+      device_fingerprint
     FROM customer_bank_transfers
     WHERE amount > 1000.00;
   EOT
@@ -52,7 +52,8 @@ resource "confluent_schema" "fraud_investigation_alert" {
     {"name": "investigation_type", "type": "string"},
     {"name": "suggested_quarantine_name", "type": "string"},
     {"name": "priority", "type": "string"},
-    {"name": "event_time", "type": "long", "logicalType": "timestamp-millis"}
+    {"name": "event_time", "type": "long", "logicalType": "timestamp-millis"},
+    {"name": "device_fingerprint", "type": ["null", "string"], "default": null}
   ]
 }
 EOF
@@ -0,0 +1,70 @@
+"""Single and batch session lookups must see the same location history."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from agents.tools.location_index import LocationIndex, set_location_index
+from agents.tools.session_tools import get_session_context, get_session_context_batch
+from agents.tools.storage_backends import SQLiteBackend, set_storage_backend
+
+T0 = datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc)
+NEW_YORK = (40.71, -74.01)
+LONDON = (51.51, -0.13)
+
+# (session_id, user_id, transaction_id or None, hours after T0, (lat, lon))
+SESSIONS = [
+    ("s1", "user_a", "txn_1", 0, NEW_YORK),
+    ("s2", "user_a", None, 20, NEW_YORK),          # no alert: only in the backend
+    ("s3", "user_a", "txn_3", 24, NEW_YORK),
+    ("s4", "user_a", "txn_4", 25, LONDON),         # ~5,570 km in an hour
+    ("s5", "user_b", "txn_5", 2, LONDON),
+    ("s6", "user_b", "txn_6", 50, LONDON),
+]
+LOCATION_SIGNALS = ("geolocation_distance_km", "travel_speed_kmh", "impossible_travel", "geolocation_anomalous")
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "sessions.db"))
+    backend.insert_rows("mobile_banking_sessions", [
+        {
+            "session_id": session_id, "user_id": user_id, "transaction_id": transaction_id,
+            "event_type": "transfer", "is_call_active": False, "typing_cadence_score": 0.6,
+            "session_duration_seconds": 240, "battery_level": 80, "is_rooted_jailbroken": False,
+            "geolocation_lat": lat, "geolocation_lon": lon,
+            "time_of_day_hour": (T0 + timedelta(hours=hours)).hour,
+            "event_time": T0 + timedelta(hours=hours),
+        }
+        for session_id, user_id, transaction_id, hours, (lat, lon) in SESSIONS
+    ])
+    set_storage_backend(backend)
+    yield backend
+    set_storage_backend(None)
+    set_location_index(None)
+
+
+def _signals(context: dict) -> dict:
+    return {name: context["risk_signals"][name] for name in LOCATION_SIGNALS}
+
+
+def test_single_and_batch_lookups_agree_over_a_session_sequence(backend):
+    alerted = [transaction_id for _, _, transaction_id, _, _ in SESSIONS if transaction_id]
+
+    set_location_index(LocationIndex(capacity=64))
+    single = {transaction_id: _signals(get_session_context(transaction_id)) for transaction_id in alerted}
+
+    set_location_index(LocationIndex(capacity=64))
+    batch = {transaction_id: _signals(context)
+             for transaction_id, context in get_session_context_batch(alerted).items()}
+
+    assert single == batch
+    assert single["txn_4"]["impossible_travel"]
+    assert not single["txn_3"]["impossible_travel"]
+
+
+def test_later_lookups_see_sessions_after_the_first_seed(backend):
+    set_location_index(LocationIndex(capacity=64))
+    assert get_session_context("txn_1")["risk_signals"]["travel_speed_kmh"] is None
+    # The previous session of txn_3 is s2, which was never looked up
+    assert get_session_context("txn_3")["risk_signals"]["travel_speed_kmh"] == 0.0
+    assert get_session_context("txn_4")["risk_signals"]["impossible_travel"]